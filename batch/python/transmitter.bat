@@ -30,7 +30,15 @@ echo - 포트: %TRANSMITTER_PORT%
 echo - 스크립트: !PY_FILE!
 echo.
 
-echo [1/2] 스크립트 업로드 중... (예상 소요시간: 5초)
+echo [1/3] 공통 라이브러리 업로드 중... (lib 폴더)
+mpremote connect %TRANSMITTER_PORT% cp -r "%~dp0..\..\lib" :
+if errorlevel 1 (
+    echo 라이브러리 업로드 실패!
+    pause
+    exit /b 1
+)
+
+echo [2/3] 스크립트 업로드 중... (예상 소요시간: 5초)
 mpremote connect %TRANSMITTER_PORT% cp "!PY_FILE!" :main.py
 if errorlevel 1 (
     echo 업로드 실패!
@@ -39,9 +47,10 @@ if errorlevel 1 (
 )
 
 echo.
-echo [2/2] 시리얼 모니터 시작... (포트: %TRANSMITTER_PORT%)
+echo [3/3] 시리얼 모니터 시작... (포트: %TRANSMITTER_PORT%)
+echo rlog 기록은 host\rlog_decode.py가 메시지로 복원합니다. REPL이 필요하면 repl.bat을 사용하세요.
 echo 모니터를 종료하려면 Ctrl+C를 누르세요.
 echo.
-mpremote connect %TRANSMITTER_PORT% repl
+python "%~dp0..\..\host\rlog_decode.py" --port %TRANSMITTER_PORT% --reset
 
 endlocal 
\ No newline at end of file
@@ -31,6 +31,20 @@ set RETRY_COUNT=0
 set /a RETRY_COUNT+=1
 echo Upload attempt !RETRY_COUNT! of !MAX_RETRIES!
 
+REM 공통 라이브러리 전송 (lib 폴더를 보드의 /lib로 업로드)
+mpremote connect COM6 cp -r ..\..\lib :
+if errorlevel 1 (
+    if !RETRY_COUNT! lss !MAX_RETRIES! (
+        echo Upload failed, retrying after reset...
+        mpremote connect COM6 soft-reset
+        timeout /t 2 /nobreak > nul
+        goto RETRY_UPLOAD
+    ) else (
+        echo Failed to upload lib after !MAX_RETRIES! attempts!
+        exit /b 1
+    )
+)
+
 REM 파일 전송
 mpremote connect COM6 cp receiver.py :main.py
 if errorlevel 1 (
@@ -1,8 +1,16 @@
 import bluetooth
 from micropython import const
-import struct
 import time
 from machine import Pin, reset
+import advdata
+import framing
+import gattcache
+import bleevents
+import bleprofile
+import logcodes
+import memcheck
+import rlog
+import supervisor
 
 # 시작 시 1초 딜레이
 print("리시버 시작 대기 중...")
@@ -25,9 +33,16 @@ _IRQ_GATTC_READ_RESULT = const(15)
 _IRQ_GATTC_READ_DONE = const(16)
 _IRQ_GATTC_WRITE_DONE = const(17)
 _IRQ_GATTC_NOTIFY = const(18)
+_IRQ_GATTC_SERVICE_DONE = const(10)
+_IRQ_GATTC_CHARACTERISTIC_DONE = const(12)
+_IRQ_MTU_EXCHANGED = const(21)
+_IRQ_CONNECTION_UPDATE = const(27)
 
-# 트랜스미터 MAC 주소 (고정)
-TRANSMITTER_MAC = bytes.fromhex("dc0675680b52")  # "dc:06:75:68:0b:52"에서 콜론 제거
+# 스캔 결과 종류
+_SCAN_RSP = const(4)
+
+# 트랜스미터 선택: 서비스 UUID를 광고하는 보드를 찾음 (보드마다 MAC을 고칠 필요 없음)
+TRANSMITTER_MAC = None  # 특정 보드만 연결하려면 MAC 주소 (예: bytes.fromhex("dc0675680b52"))
 
 # BLE 서비스와 특성 UUID (README.md와 일치)
 SERVICE_UUID = bluetooth.UUID("6E400001-B5A3-F393-E0A9-E50E24DCCA9E")
@@ -37,6 +52,8 @@ CHARACTERISTIC_UUID_NOTIFY = bluetooth.UUID("6E400003-B5A3-F393-E0A9-E50E24DCCA9
 # BLE 클라이언트 설정
 ble = bluetooth.BLE()
 ble.active(True)
+BLE_MTU = 247  # 요청할 ATT MTU (23~512, 연결 직후 교환 요청, 두 장치 중 작은 값으로 정해짐)
+ble.config(mtu=BLE_MTU)
 
 # 연결 상태
 connected = False
@@ -45,39 +62,82 @@ char_handle = None
 count = 0
 scanning = False  # 스캔 상태 추적
 last_scan_time = 0  # 마지막 스캔 시작 시간
-SCAN_INTERVAL = 1000  # 스캔 간격 (ms)
-SCAN_WINDOW = 500  # 스캔 윈도우 (ms)
+ACTIVE_SCAN = False  # True: 스캔 요청을 보내 스캔 응답(트랜스미터 이름)도 받음 (서비스 UUID는 광고에 있으므로 찾는 데는 불필요)
+scan_started = 0  # 스캔을 실제로 시작한 시각 (ms)
+discover_ms = -1  # 스캔 시작 -> 트랜스미터 발견 (ms)
+SCAN_INTERVAL = 1000  # 스캔 재시작 최소 간격 (ms)
 SCAN_DURATION = 10000  # 스캔 지속 시간 (ms)
+CONNECT_SCAN_DURATION = 2000  # 연결 요청 중 트랜스미터를 찾는 시간 (ms)
+CONNECT_DELAY = 50  # 스캔 중지 후 연결 요청까지 대기 (ms, 메인 루프에서 시각을 확인)
+connect_target = None  # 연결 요청할 (주소 종류, 주소), None: 대기 중인 요청 없음
+connect_at = 0  # 연결 요청 시각 (ms)
 
-# 재시도 제한
-MAX_RETRY_COUNT = 5
-retry_count = 0
-last_retry_time = 0
-RETRY_INTERVAL = 5000  # 재시도 간격 (ms)
+# BLE 이벤트 대기열 (bt_irq는 이벤트를 복사만 하고 메인 루프가 처리, 알림만 bt_irq 안에서 바로 처리)
+EVENT_QUEUE = 16  # 대기열 크기 (2의 거듭제곱)
 
-def decode_message(data):
-    """수신된 데이터를 문자열로 디코딩"""
-    try:
-        if isinstance(data, memoryview):
-            return bytes(data).decode()
-        elif isinstance(data, bytes):
-            return data.decode()
-        else:
-            return str(data)
-    except Exception as e:
-        print(f"메시지 디코딩 실패: {e}")
-        return ""
+# GATT 핸들 캐시 (트랜스미터 광고의 GATT 버전이 같으면 재연결 시 검색 없이 바로 구독)
+GATT_CACHE = True  # False: 연결할 때마다 서비스/특성 검색
+gatt_cache = gattcache.GattCache()
+peer_addr = b""  # 연결할 트랜스미터 주소 (스캔 결과)
+peer_version = -1  # 광고의 GATT 버전 (-1: 없음)
+service_range = None  # 서비스 검색으로 찾은 (시작 핸들, 끝 핸들)
+cccd_handle = None  # 알림 구독 설정(CCCD) 핸들
+cached = False  # 이번 연결에서 캐시한 핸들 사용
+ready = False  # 알림 구독 완료
+connect_time = 0  # 연결된 시각 (ms)
+ready_ms = -1  # 연결 -> 구독 완료 (ms)
+
+# 연결 프로필 (스캔/연결 간격, lib/bleprofile.py): low-latency, balanced, low-power
+BLE_PROFILE = "balanced"
+profile = bleprofile.get(BLE_PROFILE)
+
+# 재시도 설정
+RETRY_BASE_DELAY = 500  # 첫 재시도 대기 시간 (ms, 실패할 때마다 2배)
+RETRY_MAX_DELAY = 10000 # 최대 재시도 대기 시간 (ms)
+RESET_AFTER = 10        # 연속 실패가 이 횟수에 도달하면 재시작 (최후의 수단)
+CONNECT_TIMEOUT = 5000  # 연결 요청 후 응답 대기 시간 (ms)
+LOG_LEVEL = rlog.DEBUG  # 기록할 최소 레벨 (rlog.INFO: 메시지별 기록 생략)
+ALLOC_CHECK_EVERY = 1000  # 메시지 N개마다 힙 할당량 출력
+
+# 응답 조립 버퍼 (프레임 [길이][종류 "R"][수신 메시지 + " world"]를 복사해서 조립, 메시지마다 할당 없음)
+reply = framing.FrameWriter(64)
+REPLY_SUFFIX = b" world"
+
+# 쓰기 흐름 제어 (크레딧): 응답과 대량 데이터는 응답 없는 쓰기(mode 0)로, 트랜스미터가 알림의
+# 첫 바이트로 알린 크레딧 한도까지만 보냄 (트랜스미터의 쓰기 버퍼가 넘치지 않음)
+FLOW_CONTROL = True  # False: 크레딧을 무시하고 ENOMEM이 날 때까지 씀 (비교용)
+credit_limit = 0  # 트랜스미터가 알린 크레딧 한도 (보낸 쓰기 수 기준, 256으로 나눈 나머지)
+replies_sent = 0  # 보낸 응답 수 (bt_irq만 변경)
+bulk_sent = 0  # 보낸 대량 데이터 쓰기 수 (메인 루프만 변경, 256으로 나눈 나머지)
+bulk_total = 0  # 보낸 대량 데이터 쓰기 수 (누적)
+write_busy = 0  # 전송 대기열이 가득 차서(ENOMEM) 미룬 쓰기 수
+no_credit = 0  # 크레딧이 없어 보내지 못한 응답 수
+
+# 대량 데이터 쓰기 (처리량 측정, 결과는 트랜스미터 [통계])
+BULK = False  # True: 구독이 끝나면 크레딧이 남는 동안 MTU - 3바이트 프레임(종류 "B")을 계속 씀
+BULK_WRITE_MODE = 0  # 0: 응답 없는 쓰기, 1: 응답 있는 쓰기 (WRITE_DONE마다 하나씩, 비교용)
+REPLY_RESERVE = 1  # 대량 쓰기가 응답용으로 남겨 두는 크레딧
+bulk = framing.FrameWriter(BLE_MTU - 3 - framing.HEADER_SIZE)  # 대량 데이터 프레임 (구독 완료 시 MTU에 맞춰 한 번 조립)
+bulk_frame = None
+bulk_inflight = False  # 응답 있는 쓰기의 WRITE_DONE 대기 중
+mtu = 23  # 현재 연결의 ATT MTU
+
+# 링 버퍼 로거 (bt_irq 안에서는 print() 대신 기록만 하고 메인 루프에서 UART로 출력)
+log = rlog.RingLog(level=LOG_LEVEL)
+
+# 정상 상태의 할당 0 확인
+alloc_meter = memcheck.AllocMeter(ALLOC_CHECK_EVERY)
+alloc_due = False  # 할당 측정 결과 출력 대기 (bt_irq가 설정, 메인 루프가 출력)
+
+# 연결 상태 머신 (스캔 재시작 시점과 재시작 여부 관리)
+link = supervisor.Supervisor("BLE 클라이언트", RETRY_BASE_DELAY, RETRY_MAX_DELAY,
+                             connect_timeout=CONNECT_TIMEOUT, reset_after=RESET_AFTER, on_reset=reset)
+connecting = False  # 연결 요청 후 응답 대기 중
 
 def start_scan():
-    global scanning, last_scan_time, retry_count
+    global scanning, last_scan_time, scan_started
     current_time = time.ticks_ms()
     
-    # 재시도 횟수 확인
-    if retry_count >= MAX_RETRY_COUNT:
-        print("최대 재시도 횟수 초과. 재시작합니다.")
-        reset()
-        return False
-    
     # 이전 스캔으로부터 충분한 시간이 지났는지 확인
     if not scanning and time.ticks_diff(current_time, last_scan_time) > SCAN_INTERVAL:
         try:
@@ -86,15 +146,16 @@ def start_scan():
             time.sleep(0.05)  # 스캔 중지 대기 시간 줄임
             
             # 새 스캔 시작
-            ble.gap_scan(SCAN_DURATION, SCAN_INTERVAL, SCAN_WINDOW)
+            ble.gap_scan(SCAN_DURATION, profile.scan_interval_us, profile.scan_window_us, ACTIVE_SCAN)
+            scan_started = time.ticks_ms()
             scanning = True
             last_scan_time = current_time
-            retry_count += 1
-            print(f"스캔 시작... (시도 {retry_count}/{MAX_RETRY_COUNT})")
+            link.begin("스캔")
+            print(f"스캔 시작... (연속 실패 {link.failures}회)")
         except Exception as e:
             print(f"스캔 시작 실패: {e}")
             scanning = False
-            time.sleep(0.1)
+            link.fail("스캔 시작 실패")
             return False
     else:
         if not scanning:
@@ -107,123 +168,259 @@ def stop_scan():
         try:
             ble.gap_scan(None)
             scanning = False
-            print("스캔 중지...")
-            time.sleep(0.05)  # 스캔 중지 대기 시간 줄임
+            log.info(logcodes.BLE_SCAN_STOP)
         except Exception as e:
-            print(f"스캔 중지 실패: {e}")
+            log.warn(logcodes.BLE_SCAN_STOP_FAIL, data=str(e))
+
+def set_profile(name):
+    """연결 프로필 변경 (연결 중이면 끊고 새 간격으로 다시 연결, MicroPython에는 연결 파라미터 갱신 함수가 없음)"""
+    global profile
+    profile = bleprofile.get(name)
+    print(f"연결 프로필: {profile.format()}")
+    if connected:
+        ble.gap_disconnect(conn_handle)
+
+def start_gatt():
+    """알림 구독 시작: 캐시한 핸들이 있으면 바로 구독, 없으면 서비스 검색"""
+    global char_handle, cccd_handle, cached, service_range
+    handles = gatt_cache.get(peer_addr, SERVICE_UUID, peer_version) if GATT_CACHE else None
+    cached = handles is not None
+    if cached:
+        char_handle, cccd_handle = handles
+        subscribe()
+    else:
+        char_handle = None
+        service_range = None
+        ble.gattc_discover_services(conn_handle)
+
+def subscribe():
+    """CCCD에 써서 알림 구독 (응답은 _IRQ_GATTC_WRITE_DONE)"""
+    ble.gattc_write(conn_handle, cccd_handle, b"\x01\x00", 1)
+
+def credits():
+    """남은 크레딧 (보낼 수 있는 쓰기 수)"""
+    return (credit_limit - replies_sent - bulk_sent) & 0xFF
+
+def send_bulk():
+    """크레딧이 남아 있는 동안 대량 데이터 쓰기 (메인 루프에서 호출)"""
+    global bulk_sent, bulk_total, bulk_inflight, write_busy
+    while bulk_frame is not None and not bulk_inflight:
+        if FLOW_CONTROL and credits() <= REPLY_RESERVE:
+            return
+        try:
+            ble.gattc_write(conn_handle, char_handle, bulk_frame, BULK_WRITE_MODE)
+        except OSError:
+            write_busy += 1  # 전송 대기열 가득 참 (ENOMEM): 다음 루프에서 다시
+            return
+        bulk_sent = (bulk_sent + 1) & 0xFF
+        bulk_total += 1
+        bulk_inflight = BULK_WRITE_MODE == 1
+
+def request_connect():
+    """스캔에서 찾은 트랜스미터에 연결 요청 (메인 루프에서 CONNECT_DELAY 뒤에 호출)"""
+    global connect_target, connecting
+    addr_type, addr = connect_target
+    connect_target = None
+    try:
+        ble.gap_connect(addr_type, addr, CONNECT_SCAN_DURATION,
+                        profile.min_conn_us, profile.max_conn_us)
+    except Exception as e:
+        log.warn(logcodes.BLE_CONNECT_FAIL, data=str(e))
+        connecting = False
+        link.fail("연결 요청 실패")
 
 def bt_irq(event, data):
-    global connected, conn_handle, char_handle, count, scanning, retry_count
+    """블루투스 이벤트 처리 (알림은 bt_irq 안에서, 나머지는 메인 루프의 events.dispatch()에서 호출)"""
+    global connected, conn_handle, char_handle, count, scanning, connecting, alloc_due
+    global cccd_handle, cached, service_range, peer_addr, peer_version, ready, connect_time, ready_ms
+    global connect_target, connect_at, discover_ms
+    global mtu, credit_limit, replies_sent, bulk_sent, bulk_frame, bulk_inflight, write_busy, no_credit
     try:
         if event == _IRQ_SCAN_RESULT:
-            # 스캔 결과 처리
+            # 스캔 결과 처리 (주소와 광고 데이터는 대기열이 bytes로 복사해 둠)
             addr_type, addr, adv_type, rssi, adv_data = data
-            addr = bytes(addr)
             
-            # 트랜스미터 MAC 주소와 일치하는지 확인
-            if addr == TRANSMITTER_MAC:
-                print(f"트랜스미터 발견! RSSI: {rssi}")
-                # 스캔 중지 후 연결 시도
+            if adv_type == _SCAN_RSP:
+                # 액티브 스캔의 스캔 응답: 찾은 트랜스미터의 이름
+                if addr == peer_addr:
+                    log.info(logcodes.BLE_SCAN_NAME, data=advdata.find(adv_data, advdata.COMPLETE_NAME) or b"")
+            elif (advdata.has_service(adv_data, SERVICE_UUID) and (TRANSMITTER_MAC is None or addr == TRANSMITTER_MAC)
+                  and not connected and not connecting):
+                # 서비스 UUID를 광고하는 트랜스미터
+                discover_ms = time.ticks_diff(time.ticks_ms(), scan_started)
+                log.info(logcodes.BLE_DISCOVERED, discover_ms, rssi, data=addr)
+                peer_addr = addr
+                peer_version = gattcache.adv_version(adv_data)
+                # 스캔 중지 후 CONNECT_DELAY 뒤에 메인 루프에서 연결 요청 (기다리는 동안 다른 이벤트 처리)
                 stop_scan()
-                time.sleep(0.05)  # 연결 전 대기 시간 줄임
-                ble.gap_connect(addr_type, addr)
+                connecting = True
+                link.begin("연결 요청")  # 연결 시간 초과는 스캔 시작이 아니라 여기부터
+                connect_target = (addr_type, addr)
+                connect_at = time.ticks_add(time.ticks_ms(), CONNECT_DELAY)
                 
         elif event == _IRQ_SCAN_DONE:
-            # 스캔 완료 후 재시작 (연결되지 않은 경우에만)
+            # 트랜스미터를 찾지 못하고 스캔이 끝나면 백오프 후 메인 루프에서 재스캔
+            # (연결하려고 stop_scan()으로 멈춘 스캔은 제외, 연결 시간 초과는 메인 루프가 이미 실패 처리)
+            stopped = not scanning
             scanning = False
-            if not connected:
-                print("스캔 완료, 재시작...")
-                time.sleep(0.05)  # 재스캔 전 대기 시간 줄임
-                start_scan()
+            if stopped or connected or connecting:
+                log.info(logcodes.BLE_SCAN_DONE_BUSY)
             else:
-                print("스캔 완료 (연결 유지 중)")
+                log.info(logcodes.BLE_SCAN_DONE_MISS)
+                link.fail("트랜스미터 없음")
                 
         elif event == _IRQ_PERIPHERAL_CONNECT:
             # 연결 성공
             conn_handle, addr_type, addr = data
             connected = True
-            conn_handle = conn_handle
-            retry_count = 0  # 연결 성공 시 재시도 카운트 초기화
-            print(f"트랜스미터 연결됨: {bytes(addr).hex()}")
-            # 서비스 검색 시작
-            ble.gattc_discover_services(conn_handle)
+            connecting = False
+            ready = False
+            connect_time = time.ticks_ms()
+            ready_ms = -1
+            link.up(bytes(addr).hex())
+            log.info(logcodes.BLE_TX_CONNECT, data=addr)
+            # MTU 교환 요청 (결과는 _IRQ_MTU_EXCHANGED, 끝나면 구독 시작)
+            try:
+                ble.gattc_exchange_mtu(conn_handle)
+            except Exception as e:
+                log.warn(logcodes.BLE_MTU_FAIL, data=str(e))
+                start_gatt()
             
         elif event == _IRQ_PERIPHERAL_DISCONNECT:
             # 연결 해제
             conn_handle, addr_type, addr = data
             connected = False
+            connecting = False
             conn_handle = None
             char_handle = None
-            print("트랜스미터 연결 해제, 재스캔 시작...")
-            # 재시도 횟수 증가
-            retry_count += 1
-            if retry_count >= MAX_RETRY_COUNT:
-                print("최대 재시도 횟수 초과. 재시작합니다.")
-                reset()
-            # 재스캔 시작
-            time.sleep(0.2)  # 연결 해제 후 대기 시간 조정
-            start_scan()
+            ready = False
+            # 크레딧은 연결마다 새로 (연결 이벤트는 대기열을 거치므로 바로 처리되는 알림보다 늦을 수 있어 여기서 초기화)
+            credit_limit = replies_sent = bulk_sent = 0
+            bulk_frame = None
+            bulk_inflight = False
+            # 연결 실패도 같은 이벤트로 전달됨, 백오프 후 메인 루프에서 재스캔
+            log.info(logcodes.BLE_TX_DISCONNECT)
+            if link.state != supervisor.BACKOFF:  # 연결 시간 초과로 이미 실패 처리된 경우 제외
+                link.fail("연결 해제")
+            
+        elif event == _IRQ_MTU_EXCHANGED:
+            # MTU 교환 완료
+            conn_handle, mtu = data
+            log.info(logcodes.BLE_MTU_EXCHANGED, mtu)
+            if not ready:
+                start_gatt()  # GATT 요청은 하나씩 (MTU 교환 -> 구독)
+            
+        elif event == _IRQ_CONNECTION_UPDATE:
+            # 트랜스미터가 연결 파라미터를 바꿈 (간격 단위 1.25ms)
+            conn_handle, conn_interval, conn_latency, supervision_timeout, status = data
+            log.info(logcodes.BLE_CONN_UPDATE, conn_interval, conn_latency, supervision_timeout)
             
         elif event == _IRQ_GATTC_SERVICE_RESULT:
             # 서비스 검색 결과
             conn_handle, start_handle, end_handle, uuid = data
             if uuid == SERVICE_UUID:
-                print("서비스 발견!")
-                # 특성 검색 시작
-                ble.gattc_discover_characteristics(conn_handle, start_handle, end_handle)
+                log.info(logcodes.BLE_SERVICE_FOUND)
+                service_range = (start_handle, end_handle)
+                
+        elif event == _IRQ_GATTC_SERVICE_DONE:
+            # 서비스 검색 완료: 특성 검색
+            if service_range:
+                ble.gattc_discover_characteristics(conn_handle, service_range[0], service_range[1])
                 
         elif event == _IRQ_GATTC_CHARACTERISTIC_RESULT:
             # 특성 검색 결과
             conn_handle, def_handle, value_handle, properties, uuid = data
             if uuid == CHARACTERISTIC_UUID:
-                print("특성 발견!")
+                log.info(logcodes.BLE_CHAR_FOUND)
                 char_handle = value_handle
-                # 알림 활성화
-                ble.gattc_write(conn_handle, value_handle + 1, struct.pack("<h", 0x0001))
+                cccd_handle = value_handle + 1  # 알림 특성의 CCCD는 값 바로 다음 핸들
+                
+        elif event == _IRQ_GATTC_CHARACTERISTIC_DONE:
+            # 특성 검색 완료: 알림 구독
+            if char_handle is not None:
+                subscribe()
+                
+        elif event == _IRQ_GATTC_WRITE_DONE:
+            # 구독(CCCD 쓰기) 결과, 응답 있는 대량 쓰기 완료
+            conn_handle, value_handle, status = data
+            if value_handle == char_handle:
+                bulk_inflight = False
+            elif value_handle == cccd_handle and not ready:
+                if status == 0:
+                    ready = True
+                    ready_ms = time.ticks_diff(time.ticks_ms(), connect_time)
+                    log.info(logcodes.BLE_READY, ready_ms, cached)
+                    if GATT_CACHE and not cached:
+                        gatt_cache.put(peer_addr, SERVICE_UUID, peer_version, char_handle, cccd_handle)
+                    if BULK:
+                        # 대량 데이터 프레임: 쓰기 하나(MTU - 3바이트)를 채움
+                        bulk.begin()
+                        bulk.write(b"B")
+                        while bulk.end < mtu - 3:
+                            bulk.write(b"\x00")
+                        bulk_frame = bulk.finish()
+                elif cached:
+                    # 트랜스미터의 서비스 구성이 바뀜 (버전을 올리지 않음): 캐시를 버리고 검색
+                    log.warn(logcodes.BLE_CACHE_STALE, status)
+                    gatt_cache.forget(peer_addr, SERVICE_UUID)
+                    cached = False
+                    char_handle = None
+                    service_range = None
+                    ble.gattc_discover_services(conn_handle)
+                else:
+                    log.warn(logcodes.BLE_SUBSCRIBE_FAIL, status)
                 
         elif event == _IRQ_GATTC_NOTIFY:
-            # 알림 수신
+            # 알림 수신: [크레딧 한도][메시지] (메시지가 없으면 크레딧 알림)
             conn_handle, value_handle, notify_data = data
+            if (notify_data[0] - credit_limit) & 0xFF < 0x80:
+                credit_limit = notify_data[0]  # 늦게 도착한 이전 한도(트랜스미터 알림 대기열에서 재전송)는 무시
+            if len(notify_data) == 1:
+                return
             count += 1
             
-            # 수신된 데이터 디코딩
-            message = decode_message(notify_data)
-            if message:
-                print(f"[반복:{count} | 진행:2/4] 수신한 메시지 : {message}")
-                
-                # 응답 메시지 생성 및 전송
-                response = f"{message} world"
-                print(f"[반복:{count} | 진행:3/4] 응답할 메시지 : {response}")
-                
-                if connected and char_handle is not None:
+            # 응답 조립: 수신 메시지 뒤에 " world" 추가 (notify_data는 IRQ 안에서만 유효하므로 바로 복사)
+            reply.begin()
+            reply.write(b"R")
+            reply.write(notify_data, 1)
+            reply.write(REPLY_SUFFIX)
+            log.debug(logcodes.HELLO_RECV, count, data=notify_data, start=1)
+            log.debug(logcodes.HELLO_REPLY, count, data=notify_data, start=1)
+            
+            # 응답 없는 쓰기 (mode 0, 크레딧 하나 사용)
+            if connected and char_handle is not None:
+                if FLOW_CONTROL and credits() == 0:
+                    no_credit += 1
+                    log.warn(logcodes.HELLO_REPLY_FAIL, data="크레딧 없음")
+                else:
                     try:
-                        ble.gattc_write(conn_handle, char_handle, response.encode())
+                        ble.gattc_write(conn_handle, char_handle, reply.finish(), 0)
+                        replies_sent = (replies_sent + 1) & 0xFF
                     except Exception as e:
-                        print(f"응답 전송 실패: {e}")
-                        retry_count += 1
-                        if retry_count >= MAX_RETRY_COUNT:
-                            print("최대 재시도 횟수 초과. 재시작합니다.")
-                            reset()
-            else:
-                print(f"[반복:{count}] 수신된 메시지 디코딩 실패")
+                        log.warn(logcodes.HELLO_REPLY_FAIL, data=str(e))
+            
+            if alloc_meter.tick():
+                alloc_due = True  # 출력은 메인 루프에서 (bt_irq 안에서 print() 하지 않음)
                 
     except Exception as e:
-        print(f"이벤트 처리 중 오류 발생: {e}")
-        # 오류 발생 시 스캔 상태 초기화
+        log.error(logcodes.IRQ_ERROR, data=str(e))
+        # 오류 발생 시 스캔 상태 초기화, 백오프 후 메인 루프에서 재스캔
         scanning = False
-        retry_count += 1
-        if retry_count >= MAX_RETRY_COUNT:
-            print("최대 재시도 횟수 초과. 재시작합니다.")
-            reset()
-        time.sleep(0.2)  # 오류 후 대기 시간 조정
         if not connected:
-            start_scan()
+            connecting = False
+            connect_target = None
+            link.fail("이벤트 처리 오류")
 
-# BLE 콜백 설정
-ble.irq(bt_irq)
+# BLE 콜백 설정 (bt_irq는 대기열을 거쳐 메인 루프에서 호출)
+events = bleevents.EventQueue(bt_irq, EVENT_QUEUE, inline=(_IRQ_GATTC_NOTIFY,))
+ble.irq(events.irq)
 
 print("블루투스 클라이언트 시작...")
-print(f"트랜스미터({TRANSMITTER_MAC.hex()}) 스캔 중...")
+if TRANSMITTER_MAC:
+    print(f"트랜스미터({TRANSMITTER_MAC.hex()}) 스캔 중...")
+else:
+    print("서비스 UUID를 광고하는 트랜스미터 스캔 중...")
+print(f"연결 프로필: {profile.format()} (왕복 시간은 트랜스미터 [통계])")
 print(f"서비스 UUID: {SERVICE_UUID}")
 print(f"특성 UUID: {CHARACTERISTIC_UUID}")
 print(f"알림 특성 UUID: {CHARACTERISTIC_UUID_NOTIFY}")
@@ -234,15 +431,40 @@ start_scan()
 
 # 메인 루프
 while True:
-    current_time = time.ticks_ms()
+    # bt_irq가 쌓은 이벤트 처리
+    events.dispatch()
+    
+    # bt_irq에서 쌓인 기록 출력, 새로 검색한 GATT 핸들 저장 (플래시 쓰기는 bt_irq 밖에서)
+    log.flush()
+    gatt_cache.save()
     
-    # 재시도 간격 확인
-    if not connected and time.ticks_diff(current_time, last_retry_time) > RETRY_INTERVAL:
-        last_retry_time = current_time
-        if retry_count >= MAX_RETRY_COUNT:
-            print("최대 재시도 횟수 초과. 재시작합니다.")
-            reset()
+    # 할당 측정 결과와 bt_irq 체류 시간/대기열 통계 (메시지 ALLOC_CHECK_EVERY개마다)
+    if alloc_due:
+        alloc_due = False
+        print(alloc_meter.format())
+        print(f"[통계] {events.format()}")
+        print(f"[통계] 크레딧 남음 {credits()} | 크레딧 없어 못 보낸 응답 {no_credit} | ENOMEM {write_busy}")
+        events.reset_stats()
+        alloc_meter.rebase()
+    
+    # 대량 데이터: 크레딧이 남은 만큼 쓰기 (크레딧 알림은 bt_irq가 credit_limit에 반영)
+    if BULK and ready:
+        send_bulk()
+    
+    # 스캔 중지 후 CONNECT_DELAY가 지났으면 연결 요청
+    if connect_target and time.ticks_diff(time.ticks_ms(), connect_at) >= 0:
+        request_connect()
+    
+    # 연결 요청에 응답이 없으면 취소 (연결 해제 이벤트에서 실패 처리)
+    if connecting and link.check_timeout():
+        connecting = False
+        connect_target = None
+        try:
+            ble.gap_connect(None)
+        except Exception:
+            pass
     
-    if not connected and not scanning:
-        start_scan()  # 연결되지 않은 상태에서 스캔이 중지되었다면 재시작
-    time.sleep(0.1) 
\ No newline at end of file
+    # 연결되지 않은 상태에서 백오프가 끝났으면 재스캔
+    if not connected and not scanning and not connecting and link.ready():
+        start_scan()
+    events.wait(1 if BULK and ready else 100)  # 새 이벤트가 오면 바로 깨어남 (대량 쓰기 중에는 크레딧 알림을 1ms마다 확인) 
\ No newline at end of file
@@ -10,6 +10,13 @@ echo 1. Uploading transmitter code...
 echo Port: COM5
 echo.
 
+REM Shared library transfer (upload lib folder to the board's /lib)
+mpremote connect COM5 cp -r ..\..\lib :
+if errorlevel 1 (
+    echo Failed to upload lib!
+    exit /b 1
+)
+
 REM File transfer
 mpremote connect COM5 cp transmitter.py :main.py
 if errorlevel 1 (
@@ -3,6 +3,15 @@ from micropython import const
 import struct
 import time
 from machine import Pin, reset
+import supervisor
+import histogram
+import advdata
+import bleevents
+import framing
+import gattcache
+import logcodes
+import notifyqueue
+import rlog
 
 # 시작 시 1초 딜레이
 print("트랜스미터 시작 대기 중...")
@@ -25,6 +34,7 @@ _IRQ_GATTC_READ_RESULT = const(15)
 _IRQ_GATTC_READ_DONE = const(16)
 _IRQ_GATTC_WRITE_DONE = const(17)
 _IRQ_GATTC_NOTIFY = const(18)
+_IRQ_MTU_EXCHANGED = const(21)
 
 # BLE 서비스와 특성 UUID (README.md와 일치)
 SERVICE_UUID = bluetooth.UUID("6E400001-B5A3-F393-E0A9-E50E24DCCA9E")
@@ -34,63 +44,202 @@ CHARACTERISTIC_UUID_NOTIFY = bluetooth.UUID("6E400003-B5A3-F393-E0A9-E50E24DCCA9
 # BLE 서버 설정
 ble = bluetooth.BLE()
 ble.active(True)
+BLE_MTU = 247  # 요청할 ATT MTU (23~512, 연결 후 리시버가 교환 요청, 알림 최대 MTU - 3바이트)
+ble.config(mtu=BLE_MTU)
 
 # 연결 상태
 connected = False
 conn_handle = None
 char_handle = None
+mtu = 23  # 현재 연결의 ATT MTU (교환 전 기본값)
 count = 0
 last_send_time = 0  # 마지막 메시지 전송 시간
 SEND_INTERVAL = 5000  # 메시지 전송 간격 (ms)
 current_count = 0
+STATS_EVERY = 10  # 응답 N개마다 왕복 시간 통계 출력
+stats_due = False  # 통계 출력 대기 (bt_irq가 설정, 메인 루프가 출력)
+EVENT_QUEUE = 8  # BLE 이벤트 대기열 크기 (2의 거듭제곱, 응답 수신만 bt_irq 안에서 바로 처리)
+LOG_LEVEL = rlog.DEBUG  # 기록할 최소 레벨 (rlog.INFO: 메시지별 기록 생략)
+REQUEST_MESSAGE = b"hello"
 
-# 재시도 제한
-MAX_RETRY_COUNT = 5
-retry_count = 0
-last_retry_time = 0
-RETRY_INTERVAL = 5000  # 재시도 간격 (ms)
+# 리시버 쓰기 흐름 제어 (크레딧)
+# 리시버는 응답과 대량 데이터를 응답 없는 쓰기(ATT Write Command)로 보내고, 트랜스미터가 허락한
+# 만큼만 보낸다. 알림의 첫 바이트가 크레딧 한도(지금까지 읽은 쓰기 수 + CREDITS, 256으로 나눈
+# 나머지)이고, 리시버는 한도에 닿을 때까지 쓴다. 읽지 않은 쓰기는 최대 CREDITS개이므로
+# 특성 버퍼(CREDITS개 분량)가 넘치지 않는다.
+CREDITS = 8  # 리시버가 응답 없이 보낼 수 있는 쓰기 수 (1~255, 쓰기 버퍼 = CREDITS * (BLE_MTU - 3)바이트)
+_FRAME_REPLY = const(0x52)  # 쓰기 프레임 종류 "R": hello 응답
+_FRAME_BULK = const(0x42)   # 쓰기 프레임 종류 "B": 대량 데이터 (처리량 측정)
+
+# 알림 전송 대기열 (메인 루프의 알림은 BLE 전송 버퍼가 가득 차면(ENOMEM) 보관했다가 다시 전송)
+NOTIFY_QUEUE = 4  # 보관할 알림 수 (2의 거듭제곱)
+NOTIFY_POLICY = notifyqueue.COALESCE  # 가득 찼을 때: DROP_OLDEST, DROP_NEWEST, COALESCE(대기 중인 크레딧 알림을 새 한도로 교체)
+NOTIFY_RETRY = 5  # 보관한 알림이 있을 때 메인 루프가 다시 보내는 간격 (ms)
+_CREDIT_KEY = const(0)  # 크레딧 알림 (마지막 한도만 의미 있으므로 합침)
+
+# 링 버퍼 로거 (bt_irq 안에서는 print() 대신 기록만 하고 메인 루프에서 UART로 출력)
+log = rlog.RingLog(level=LOG_LEVEL)
+
+# 크레딧과 쓰기 수신 집계
+consumed = 0  # 이번 연결에서 읽은 쓰기 수
+granted = 0  # 마지막으로 알린 크레딧 한도의 기준 (consumed)
+grant_due = False  # 크레딧 알림 대기 (전송 실패 또는 연결 직후, 메인 루프가 전송)
+request = bytearray(1 + len(REQUEST_MESSAGE))  # 요청 알림: [크레딧 한도][메시지]
+request[1:] = REQUEST_MESSAGE
+credit_update = bytearray(1)  # 크레딧 알림: [크레딧 한도]
+notifier = notifyqueue.NotifyQueue(ble, NOTIFY_QUEUE, len(request), NOTIFY_POLICY)
+bulk_frames = 0  # 받은 대량 데이터 프레임 수
+bulk_bytes = 0  # 받은 대량 데이터 바이트 수
+bad_writes = 0  # 잘리거나 형식이 잘못된 쓰기 (버퍼 초과)
+peak_buffered = 0  # gatts_read() 한 번에 읽은 최대 바이트 수 (버퍼에 쌓인 양)
+stats_ms = 0  # 통계 구간 시작 시각 (ms)
+
+# 왕복 시간(us) 분포와 손실 집계 (다음 전송 전까지 응답이 없으면 손실)
+rtt_hist = histogram.Histogram()
+sent_us = 0             # 마지막 요청 전송 시각 (us)
+awaiting_reply = False  # 마지막 요청의 응답 대기 중
+
+# 재시도 설정
+RETRY_BASE_DELAY = 500  # 첫 재시도 대기 시간 (ms, 실패할 때마다 2배)
+RETRY_MAX_DELAY = 10000 # 최대 재시도 대기 시간 (ms)
+RESET_AFTER = 10        # 연속 실패가 이 횟수에 도달하면 재시작 (최후의 수단)
+ADV_INTERVAL = 100000   # 광고 간격 (us)
+ADV_FAST_INTERVAL = 20000  # 광고 시작 후 ADV_FAST_TIME 동안의 광고 간격 (us, BLE 최소 20ms: 리시버가 빨리 찾음)
+ADV_FAST_TIME = 30000  # 빠른 광고 유지 시간 (ms)
+adv_fast = False  # 빠른 간격으로 광고 중
+adv_started = 0  # 광고 시작 시각 (ms)
+GATT_VERSION = 1  # 서비스 구성(특성 순서/종류)을 바꾸면 올림 (리시버의 GATT 핸들 캐시 무효화)
+
+# 광고: 플래그 + 서비스 UUID + GATT 버전 (리시버는 서비스 UUID로 찾음), 이름은 스캔 응답에
+adv_payload = advdata.build(services=(SERVICE_UUID,), manufacturer=gattcache.manufacturer(GATT_VERSION))
+resp_payload = advdata.build(name="ESP32_BLE_Server", flags=False)
+
+# 연결 상태 머신 (광고 재시작 시점과 재시작 여부 관리)
+link = supervisor.Supervisor("BLE 서버", RETRY_BASE_DELAY, RETRY_MAX_DELAY,
+                             reset_after=RESET_AFTER, on_reset=reset)
+advertising = False
+
+def start_advertising():
+    """광고 시작 (연결되면 자동으로 중지됨, 처음 ADV_FAST_TIME 동안은 빠른 간격)"""
+    global advertising, adv_fast, adv_started
+    try:
+        ble.gap_advertise(ADV_FAST_INTERVAL, adv_payload, resp_data=resp_payload)
+        advertising = True
+        adv_fast = True
+        adv_started = time.ticks_ms()
+        link.begin("광고 중")
+    except Exception as e:
+        print(f"광고 시작 실패: {e}")
+        link.fail("광고 시작 실패")
+
+def print_stats():
+    """왕복 시간, 쓰기 수신 통계 출력"""
+    global bulk_frames, bulk_bytes, bad_writes, peak_buffered, stats_ms
+    log.flush()  # 앞선 기록을 먼저 출력해서 순서 유지
+    print(f"[통계] {rtt_hist.format()} | MTU {mtu} (알림 최대 {mtu - 3}바이트)")
+    elapsed = max(time.ticks_diff(time.ticks_ms(), stats_ms), 1)
+    print(f"[통계] 쓰기 {consumed}개 (크레딧 {CREDITS}) | 대량 {bulk_frames}개 {bulk_bytes * 1000 // elapsed}B/s"
+          f" | 버퍼 최대 {peak_buffered}/{write_buffer}B, 잘림 {bad_writes}")
+    print(f"[통계] {notifier.format()}")
+    print(f"[통계] {events.format()}")
+    events.reset_stats()
+    notifier.reset_stats()
+    bulk_frames = bulk_bytes = bad_writes = peak_buffered = 0
+    stats_ms = time.ticks_ms()
+
+def send_credit():
+    """크레딧 한도 알림 (bt_irq 안에서 바로 전송), 실패하면 메인 루프가 대기열로 다시"""
+    global granted, grant_due
+    credit_update[0] = (consumed + CREDITS) & 0xFF
+    try:
+        ble.gatts_notify(conn_handle, char_handle, credit_update)
+        granted = consumed
+    except OSError:
+        grant_due = True  # 전송 버퍼 가득 참 (ENOMEM)
+
+def read_writes():
+    """쓰기 버퍼에 쌓인 프레임 처리 (응답: 왕복 시간, 대량: 처리량 집계)
+
+    버퍼는 이어 쓰기 모드라 지난 읽기 이후의 쓰기가 [길이 2바이트][종류][내용] 프레임으로
+    이어져 있고, 읽으면 비워진다. 쓰기 하나가 프레임 하나이므로 프레임 수가 읽은 쓰기 수다.
+    """
+    global consumed, awaiting_reply, stats_due, bulk_frames, bulk_bytes, bad_writes, peak_buffered
+    data = ble.gatts_read(char_handle)  # 매번 새 bytes (API 제약), 프레임은 슬라이스 없이 위치로 해석
+    size = len(data)
+    if size > peak_buffered:
+        peak_buffered = size
+    i = 0
+    while i + framing.HEADER_SIZE < size:
+        length = (data[i] << 8) | data[i + 1]
+        start = i + framing.HEADER_SIZE
+        if length == 0 or start + length > size:
+            bad_writes += 1  # 버퍼가 넘쳐 잘린 쓰기: 나머지는 버림
+            break
+        consumed += 1
+        if data[start] == _FRAME_REPLY:
+            log.debug(logcodes.HELLO_REPLY_RECV, current_count, data=data, start=start + 1, end=start + length)
+            if awaiting_reply:
+                rtt_hist.record(time.ticks_diff(time.ticks_us(), sent_us))
+                awaiting_reply = False
+                if rtt_hist.count % STATS_EVERY == 0:
+                    stats_due = True  # 출력은 메인 루프에서 (bt_irq 안에서 print() 하지 않음)
+        elif data[start] == _FRAME_BULK:
+            bulk_frames += 1
+            bulk_bytes += length - 1
+        i = start + length
+    if consumed - granted >= credit_batch:
+        send_credit()
 
 def bt_irq(event, data):
-    global connected, conn_handle, char_handle, count, current_count, retry_count
+    """블루투스 이벤트 처리 (응답 수신은 bt_irq 안에서, 나머지는 메인 루프의 events.dispatch()에서 호출)"""
+    global connected, conn_handle, char_handle, count, current_count, advertising, awaiting_reply, mtu
+    global consumed, granted, grant_due
     try:
         if event == _IRQ_CENTRAL_CONNECT:
             # 클라이언트 연결
             conn_handle, addr_type, addr = data
             connected = True
-            retry_count = 0  # 연결 성공 시 재시도 카운트 초기화
-            print(f"클라이언트 연결됨: {bytes(addr).hex()}")
+            advertising = False
+            mtu = 23
+            # 크레딧 카운터는 연결 해제 때 초기화 (쓰기는 bt_irq 안에서 바로 처리되므로 이 처리보다 먼저 올 수 있음)
+            grant_due = True  # 첫 크레딧은 메인 루프에서 알림
+            link.up(bytes(addr).hex())
+            log.info(logcodes.BLE_CLIENT_CONNECT, data=addr)
+            notifier.bind(conn_handle, char_handle)
             
         elif event == _IRQ_CENTRAL_DISCONNECT:
-            # 클라이언트 연결 해제
+            # 클라이언트 연결 해제 (백오프 후 메인 루프에서 광고 재시작)
             conn_handle, addr_type, addr = data
             connected = False
             conn_handle = None
-            char_handle = None
-            print("클라이언트 연결 해제")
+            notifier.clear()
+            # 다음 연결의 크레딧은 처음부터 (광고는 이 처리 뒤 백오프가 끝나야 다시 시작하므로 다음 연결의 쓰기보다 먼저)
+            consumed = 0
+            granted = 0
+            ble.gatts_read(char_handle)  # 남은 쓰기 버림
+            if awaiting_reply:
+                rtt_hist.lose()
+                awaiting_reply = False
+            log.info(logcodes.BLE_CLIENT_DISCONNECT)
+            link.fail("연결 해제")
             
-            # 재시도 횟수 증가
-            retry_count += 1
-            if retry_count >= MAX_RETRY_COUNT:
-                print("최대 재시도 횟수 초과. 재시작합니다.")
-                reset()
+        elif event == _IRQ_MTU_EXCHANGED:
+            # 리시버가 요청한 MTU 교환 완료
+            conn_handle, mtu = data
+            log.info(logcodes.BLE_MTU_EXCHANGED, mtu)
             
         elif event == _IRQ_GATTS_WRITE:
             # 클라이언트로부터 데이터 수신
             conn_handle, attr_handle = data
             if attr_handle == char_handle:
-                received_data = ble.gatts_read(char_handle)
-                message = received_data.decode()
-                print(f"[반복:{current_count} | 진행:4/4] 수신한 메시지 : {message}")
+                read_writes()
                 
     except Exception as e:
-        print(f"이벤트 처리 중 오류 발생: {e}")
-        retry_count += 1
-        if retry_count >= MAX_RETRY_COUNT:
-            print("최대 재시도 횟수 초과. 재시작합니다.")
-            reset()
+        log.error(logcodes.IRQ_ERROR, data=str(e))
 
-# BLE 콜백 설정
-ble.irq(bt_irq)
+# BLE 콜백 설정 (bt_irq는 대기열을 거쳐 메인 루프에서 호출, 왕복 시간을 재는 응답 수신만 바로 처리)
+events = bleevents.EventQueue(bt_irq, EVENT_QUEUE, inline=(_IRQ_GATTS_WRITE,))
+ble.irq(events.irq)
 
 # 서비스와 특성 생성
 services = (
@@ -103,6 +252,11 @@ services = (
 # 서비스 등록
 ((char_handle, notify_handle),) = ble.gatts_register_services(services)
 
+# 쓰기 버퍼: 읽지 않은 쓰기 CREDITS개 분량, 이어 쓰기 (기본값은 20바이트 덮어쓰기라 응답 없는 쓰기가 연달아 오면 유실)
+write_buffer = CREDITS * (BLE_MTU - 3)
+ble.gatts_set_buffer(char_handle, write_buffer, True)
+credit_batch = max(1, CREDITS // 2)  # 새로 읽은 쓰기가 이만큼 모이면 크레딧 알림 (요청 알림에도 한도가 실림)
+
 print("블루투스 서버 시작...")
 print("클라이언트 연결 대기 중...")
 print(f"서비스 UUID: {SERVICE_UUID}")
@@ -110,33 +264,59 @@ print(f"특성 UUID: {CHARACTERISTIC_UUID}")
 print(f"알림 특성 UUID: {CHARACTERISTIC_UUID_NOTIFY}")
 
 # 광고 시작
-ble.gap_advertise(100000, b"ESP32_BLE_Server")
+start_advertising()
 
 # 메인 루프
 while True:
+    # bt_irq가 쌓은 이벤트 처리, 쌓인 기록 출력
+    events.dispatch()
+    log.flush()
+    if stats_due:
+        stats_due = False
+        print_stats()
     current_time = time.ticks_ms()
     
-    # 재시도 간격 확인
-    if not connected and time.ticks_diff(current_time, last_retry_time) > RETRY_INTERVAL:
-        last_retry_time = current_time
-        if retry_count >= MAX_RETRY_COUNT:
-            print("최대 재시도 횟수 초과. 재시작합니다.")
-            reset()
+    # 대기열에 보관한 알림 다시 전송, 연결 직후 첫 크레딧과 bt_irq에서 보내지 못한 크레딧 알림
+    if connected:
+        try:
+            notifier.flush()
+            if grant_due:
+                grant_due = False
+                credit_update[0] = (consumed + CREDITS) & 0xFF
+                notifier.send(credit_update, _CREDIT_KEY)  # 대기 중인 크레딧 알림이 있으면 새 한도로 교체
+                granted = consumed
+        except Exception as e:
+            log.warn(logcodes.HELLO_SEND_FAIL, data=str(e))  # 연결 해제 이벤트가 오면 상태 머신이 처리
+    
+    # 연결이 끊어졌으면 백오프가 끝난 뒤 광고 재시작
+    if not connected and not advertising and link.ready():
+        start_advertising()
+
+    # 빠른 광고 시간이 지나도록 연결되지 않으면 기본 간격으로 (리시버가 없을 때 전력 절약)
+    if advertising and adv_fast and time.ticks_diff(current_time, adv_started) >= ADV_FAST_TIME:
+        adv_fast = False
+        try:
+            ble.gap_advertise(ADV_INTERVAL, adv_payload, resp_data=resp_payload)
+        except Exception as e:
+            print(f"광고 간격 변경 실패: {e}")
     
     # 5초마다 메시지 전송
     if connected and time.ticks_diff(current_time, last_send_time) > SEND_INTERVAL:
         count += 1
         current_count = count  # 현재 메시지의 반복 카운트 저장
-        message = "hello"
-        print(f"[반복:{current_count} | 진행:1/4] 전송할 메시지 : {message}")
+        log.debug(logcodes.HELLO_SEND, current_count, data=REQUEST_MESSAGE)
+        if awaiting_reply:
+            rtt_hist.lose()  # 이전 요청의 응답이 전송 간격 안에 오지 않음
         try:
-            ble.gatts_notify(conn_handle, char_handle, message.encode())
+            sent_us = time.ticks_us()
+            awaiting_reply = True
+            request[0] = (consumed + CREDITS) & 0xFF  # 크레딧 한도를 함께 알림
+            notifier.send(request)  # 전송 버퍼가 가득 차면 보관했다가 다시 (왕복 시간에 대기 시간 포함)
+            granted = consumed
             last_send_time = current_time
         except Exception as e:
-            print(f"메시지 전송 실패: {e}")
-            retry_count += 1
-            if retry_count >= MAX_RETRY_COUNT:
-                print("최대 재시도 횟수 초과. 재시작합니다.")
-                reset()
+            log.warn(logcodes.HELLO_SEND_FAIL, data=str(e))
+            awaiting_reply = False
+            last_send_time = current_time  # 연결 해제 이벤트가 오면 상태 머신이 처리
     
-    time.sleep(0.1)  # CPU 부하 감소 
\ No newline at end of file
+    events.wait(NOTIFY_RETRY if notifier.pending() else 100)  # CPU 부하 감소 (새 이벤트가 오면 바로 깨어남)
\ No newline at end of file
@@ -1,7 +1,16 @@
+import errno
 import network
 import socket
 import time
 from machine import Pin, reset
+import evloop
+import fastwifi
+import framing
+import logcodes
+import memcheck
+import pipeline
+import rlog
+import supervisor
 
 # 시작 시 1초 딜레이
 print("리시버 시작 대기 중...")
@@ -13,82 +22,115 @@ WIFI_SSID = "ESP32_AP"  # 트랜스미터의 AP 이름
 WIFI_PASSWORD = "12345678"  # 트랜스미터의 AP 비밀번호
 PORT = 8080  # 통신 포트
 
+# 빠른 재연결 설정 (고정 IP + 캐시된 BSSID/채널, 10ms 간격 상태 확인)
+FAST_RECONNECT = True
+STATIC_IP = ("192.168.4.2", "255.255.255.0", "192.168.4.1", "192.168.4.1")  # (IP, 마스크, 게이트웨이, DNS)
+
 # WiFi 스테이션 모드 설정
 wlan = network.WLAN(network.STA_IF)
 wlan.active(True)
+fast_link = fastwifi.FastLink(wlan, WIFI_SSID, WIFI_PASSWORD, STATIC_IP)
 
 # 연결 상태
 connected = False
 sock = None
 count = 0
-last_send_time = 0
-last_retry_time = 0
 
 # 상수
 SEND_INTERVAL = 5000    # 메시지 전송 간격 (ms)
-MAX_RETRY_COUNT = 5     # 최대 재시도 횟수
-RETRY_INTERVAL = 5000   # 재시도 간격 (ms)
 CONNECT_TIMEOUT = 30    # 연결 시도 타임아웃 (초)
-retry_count = 0         # 현재 재시도 횟수
+RETRY_BASE_DELAY = 500  # 첫 재시도 대기 시간 (ms, 실패할 때마다 2배)
+RETRY_MAX_DELAY = 10000 # 최대 재시도 대기 시간 (ms)
+RESET_AFTER = 10        # 연속 실패가 이 횟수에 도달하면 재시작 (최후의 수단)
+LOG_LEVEL = rlog.DEBUG  # 기록할 최소 레벨 (rlog.INFO: 메시지별 기록 생략)
+ALLOC_CHECK_EVERY = 1000  # 메시지 N개마다 힙 할당량 출력
+
+# 수신 프레임 재조립 버퍼 (소켓에서 직접 수신)
+rx_frames = framing.FrameReader()
+
+# 응답 조립 버퍼 (태그 + 수신 메시지 + " world"를 복사해서 조립, 메시지마다 할당 없음)
+tx_frame = framing.FrameWriter()
+REPLY_SUFFIX = b" world"
+
+# 링 버퍼 로거 (메시지별 기록은 유휴 시간에 UART로 출력, host/rlog_decode.py로 복원)
+log = rlog.RingLog(level=LOG_LEVEL)
+
+# 정상 상태의 할당 0 확인
+alloc_meter = memcheck.AllocMeter(ALLOC_CHECK_EVERY)
+
+# 연결 상태 머신 (재시도 간격과 재시작 시점 관리)
+link = supervisor.Supervisor("WiFi 리시버", RETRY_BASE_DELAY, RETRY_MAX_DELAY,
+                             reset_after=RESET_AFTER, on_reset=reset)
+
+# 이벤트 루프와 타이머 (소켓 이벤트나 타이머 마감 시각에만 깨어남)
+loop = evloop.EventLoop()
+loop.idle = log.drain
+connect_timer = None  # 재연결 타이머
+
+def close_socket():
+    """소켓을 이벤트 루프에서 해제하고 닫기"""
+    global sock
+    if sock:
+        loop.unregister(sock)
+        try:
+            sock.close()
+        except:
+            pass
+        sock = None
+
+def disconnect(reason):
+    """연결을 정리하고 백오프 후 재연결 예약"""
+    global connected
+    close_socket()
+    connected = False
+    loop.schedule(connect_timer, link.fail(reason))
 
 def connect_to_transmitter():
-    """트랜스미터에 연결"""
-    global connected, sock, retry_count
+    """트랜스미터에 연결 (실패 시 실패 사유 반환, 성공 시 None)"""
+    global connected, sock
     
     try:
         # 이전 연결이 있다면 정리
-        if sock:
-            try:
-                sock.close()
-            except:
-                pass
-            sock = None
+        close_socket()
         connected = False
         
-        # WiFi 연결 상태 확인
-        if wlan.isconnected():
-            print("기존 WiFi 연결 해제 중...")
-            wlan.disconnect()
-            time.sleep(1)
-        
-        # 트랜스미터 AP에 연결
-        print("트랜스미터 AP에 연결 중...")
-        print(f"AP 정보: SSID={WIFI_SSID}, Password={WIFI_PASSWORD}")
-        wlan.connect(WIFI_SSID, WIFI_PASSWORD)
-        
-        # 연결 대기 (최대 30초)
-        max_wait = CONNECT_TIMEOUT
-        while max_wait > 0:
-            status = wlan.status()
-            if status == network.STAT_GOT_IP:
-                break
-            elif status == network.STAT_CONNECTING:
-                print(f"연결 중... {max_wait}초 남음")
-            elif status == network.STAT_CONNECT_FAIL:
-                print("연결 실패")
-                retry_count += 1
-                if retry_count >= MAX_RETRY_COUNT:
-                    print("최대 재시도 횟수 초과. 재시작합니다.")
-                    reset()
-                return False
-            elif status == network.STAT_NO_AP_FOUND:
-                print("AP를 찾을 수 없음")
-                retry_count += 1
-                if retry_count >= MAX_RETRY_COUNT:
-                    print("최대 재시도 횟수 초과. 재시작합니다.")
-                    reset()
-                return False
-            max_wait -= 1
-            time.sleep(1)
+        if FAST_RECONNECT:
+            # WiFi 연결이 살아 있으면 그대로 두고 소켓만 다시 연결
+            if not wlan.isconnected():
+                print("트랜스미터 AP에 빠른 연결 중...")
+                if fast_link.connect(CONNECT_TIMEOUT * 1000):
+                    links, last, fastest, avg, slowest = fast_link.stats()
+                    print(f"WiFi 링크 연결: {last}ms (평균 {avg}ms | 최소 {fastest}ms | 최대 {slowest}ms | {links}회)")
+        else:
+            # WiFi 연결 상태 확인
+            if wlan.isconnected():
+                print("기존 WiFi 연결 해제 중...")
+                wlan.disconnect()
+                time.sleep(1)
+            
+            # 트랜스미터 AP에 연결
+            print("트랜스미터 AP에 연결 중...")
+            print(f"AP 정보: SSID={WIFI_SSID}, Password={WIFI_PASSWORD}")
+            wlan.connect(WIFI_SSID, WIFI_PASSWORD)
+            
+            # 연결 대기 (최대 30초)
+            max_wait = CONNECT_TIMEOUT
+            while max_wait > 0:
+                status = wlan.status()
+                if status == network.STAT_GOT_IP:
+                    break
+                elif status == network.STAT_CONNECTING:
+                    print(f"연결 중... {max_wait}초 남음")
+                elif status == network.STAT_CONNECT_FAIL:
+                    return "WiFi 연결 실패"
+                elif status == network.STAT_NO_AP_FOUND:
+                    return "AP를 찾을 수 없음"
+                max_wait -= 1
+                time.sleep(1)
         
         if not wlan.isconnected():
-            print("WiFi 연결 실패")
-            retry_count += 1
-            if retry_count >= MAX_RETRY_COUNT:
-                print("최대 재시도 횟수 초과. 재시작합니다.")
-                reset()
-            return False
-            
+            return f"WiFi 연결 실패 (상태: {wlan.status()})"
+        
         # IP 정보 출력
         ip_info = wlan.ifconfig()
         print(f"WiFi 연결됨: {ip_info}")
@@ -97,193 +139,140 @@ def connect_to_transmitter():
         server_ip = ip_info[2]  # 게이트웨이 IP
         print(f"트랜스미터 IP: {server_ip}")
         
-        # 소켓 생성 및 연결 (최대 3번 시도)
-        for attempt in range(3):
-            try:
-                sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-                sock.settimeout(5)  # 5초 타임아웃
-                
-                print(f"트랜스미터({server_ip}:{PORT})에 연결 시도 중... (시도 {attempt + 1}/3)")
-                sock.connect((server_ip, PORT))
-                
-                connected = True
-                retry_count = 0  # 연결 성공 시 재시도 카운트 초기화
-                print(f"트랜스미터({server_ip}:{PORT})에 연결됨")
-                return True
-                
-            except Exception as e:
-                print(f"연결 시도 {attempt + 1} 실패: {e}")
-                if sock:
-                    try:
-                        sock.close()
-                    except:
-                        pass
-                    sock = None
-                if attempt < 2:  # 마지막 시도가 아니면 대기 후 재시도
-                    print("3초 후 재시도...")
-                    time.sleep(3)
-        
-        print("모든 연결 시도 실패")
-        retry_count += 1
-        if retry_count >= MAX_RETRY_COUNT:
-            print("최대 재시도 횟수 초과. 재시작합니다.")
-            reset()
-        return False
+        # 소켓 생성 및 연결 (실패하면 상태 머신의 백오프 후 다시 시도)
+        try:
+            sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            sock.settimeout(5)  # 5초 타임아웃
+            
+            print(f"트랜스미터({server_ip}:{PORT})에 연결 시도 중...")
+            sock.connect((server_ip, PORT))
+            rx_frames.reset()  # 이전 연결의 잔여 데이터 제거
+            
+            # 연결 후에는 논블로킹으로 전환하고 수신 이벤트 등록
+            sock.setblocking(False)
+            loop.register(sock, evloop.POLLIN, on_socket_event)
+            
+            connected = True
+            print(f"트랜스미터({server_ip}:{PORT})에 연결됨")
+            return None
         
+        except Exception as e:
+            print(f"트랜스미터 연결 실패: {e}")
+            close_socket()
+            return "서버 연결 실패"
+    
     except Exception as e:
         print(f"연결 중 예외 발생: {e}")
-        if sock:
-            try:
-                sock.close()
-            except:
-                pass
-            sock = None
+        close_socket()
         connected = False
-        retry_count += 1
-        if retry_count >= MAX_RETRY_COUNT:
-            print("최대 재시도 횟수 초과. 재시작합니다.")
-            reset()
-        return False
+        return "연결 중 예외"
 
 def send_message(message):
     """메시지 전송"""
-    global sock, count, connected, retry_count
+    global sock, count, connected
     
     try:
         if not connected or not sock:
             print("연결이 끊어짐")
-            connected = False
-            retry_count += 1
-            if retry_count >= MAX_RETRY_COUNT:
-                print("최대 재시도 횟수 초과. 재시작합니다.")
-                reset()
             return False
-            
-        # 메시지 전송
-        sock.send(message.encode())
+        
+        # 메시지 전송 (길이 헤더 포함 프레임)
+        loop.send(sock, framing.encode(message.encode()))
         print(f"[반복:{count} | 진행:1/4] 전송할 메시지 : {message}")
-        retry_count = 0  # 전송 성공 시 재시도 카운트 초기화
         return True
-        
+    
     except Exception as e:
         print(f"메시지 전송 실패: {e}")
-        connected = False
-        if sock:
-            try:
-                sock.close()
-            except:
-                pass
-            sock = None
-        retry_count += 1
-        if retry_count >= MAX_RETRY_COUNT:
-            print("최대 재시도 횟수 초과. 재시작합니다.")
-            reset()
+        disconnect("전송 실패")
         return False
 
 def receive_message():
     """메시지 수신"""
-    global sock, count, connected, retry_count
+    global sock, count, connected
     
     try:
         if not connected or not sock:
             print("연결이 끊어짐")
-            connected = False
-            retry_count += 1
-            if retry_count >= MAX_RETRY_COUNT:
-                print("최대 재시도 횟수 초과. 재시작합니다.")
-                reset()
             return False
-            
-        # 메시지 수신
-        data = sock.recv(1024)
-        if data:
+        
+        # 프레임 버퍼로 직접 수신 후 프레임 단위로 재조립
+        if rx_frames.recv_into(sock) == 0:
+            print("트랜스미터 연결 종료")
+            disconnect("연결 종료")
+            return False
+        received = False
+        buf = rx_frames.buf
+        while True:
+            length = rx_frames.next_frame()
+            if length < 0:
+                break
             count += 1  # 메시지 수신 시 카운트 증가
-            message = data.decode()
-            print(f"[반복:{count} | 진행:2/4] 수신한 메시지 : {message}")
+            start = rx_frames.payload_start
+            end = start + length
             
-            # 응답 메시지 생성 및 전송
-            response = f"{message} world"
-            print(f"[반복:{count} | 진행:3/4] 응답할 메시지 : {response}")
+            # 응답 조립: 시퀀스 태그를 그대로 돌려주고 메시지 뒤에 " world" 추가
+            tx_frame.begin()
+            tx_frame.write(buf, start, end)
+            tx_frame.write(REPLY_SUFFIX)
+            log.debug(logcodes.HELLO_RECV, count, data=buf, start=start + pipeline.TAG_SIZE, end=end)
+            log.debug(logcodes.HELLO_REPLY, count, data=buf, start=start + pipeline.TAG_SIZE, end=end)
             
             try:
-                sock.send(response.encode())
-                retry_count = 0  # 수신 및 응답 성공 시 재시도 카운트 초기화
-                return True
+                loop.send(sock, tx_frame.finish())
+                received = True
             except Exception as e:
-                print(f"응답 전송 실패: {e}")
-                connected = False
-                if sock:
-                    try:
-                        sock.close()
-                    except:
-                        pass
-                    sock = None
-                retry_count += 1
-                if retry_count >= MAX_RETRY_COUNT:
-                    print("최대 재시도 횟수 초과. 재시작합니다.")
-                    reset()
+                log.warn(logcodes.HELLO_REPLY_FAIL, data=str(e))
+                disconnect("응답 전송 실패")
                 return False
             
+            if alloc_meter.tick():
+                log.flush()  # 앞선 기록을 먼저 출력해서 순서 유지
+                print(alloc_meter.format())
+                alloc_meter.rebase()
+        return received
+    
     except OSError as e:
-        if "timed out" in str(e):  # 타임아웃은 일반적인 상황
+        if e.args[0] == errno.EAGAIN:  # 아직 읽을 데이터 없음
             pass
         else:
-            print(f"메시지 수신 실패: {e}")
-            connected = False
-            if sock:
-                try:
-                    sock.close()
-                except:
-                    pass
-                sock = None
-            retry_count += 1
-            if retry_count >= MAX_RETRY_COUNT:
-                print("최대 재시도 횟수 초과. 재시작합니다.")
-                reset()
+            log.warn(logcodes.HELLO_RECV_FAIL, data=str(e))
+            disconnect("수신 실패")
     except Exception as e:
-        print(f"메시지 수신 실패: {e}")
-        connected = False
-        if sock:
-            try:
-                sock.close()
-            except:
-                pass
-            sock = None
-        retry_count += 1
-        if retry_count >= MAX_RETRY_COUNT:
-            print("최대 재시도 횟수 초과. 재시작합니다.")
-            reset()
+        log.warn(logcodes.HELLO_RECV_FAIL, data=str(e))
+        disconnect("수신 실패")
     return False
 
+def on_socket_event(s, event):
+    """소켓 이벤트: 수신 데이터 처리 또는 연결 오류 처리"""
+    if event & evloop.POLLIN:
+        receive_message()
+    elif event & (evloop.POLLERR | evloop.POLLHUP):
+        print("소켓 오류로 연결이 끊어짐")
+        disconnect("소켓 오류")
+
+def try_connect():
+    """트랜스미터 연결 시도 (재연결 타이머에서 호출)"""
+    if connected:
+        return
+    link.begin()
+    reason = connect_to_transmitter()
+    if reason is None:
+        link.up()
+        print("연결 성공, 메시지 수신 시작")
+    else:
+        delay = link.fail(reason)
+        print(f"재연결 시도 중... {delay}ms 후 다시 시도합니다.")
+        loop.schedule(connect_timer, delay)
+
 print("WiFi 클라이언트 시작...")
 print(f"AP 정보: SSID={WIFI_SSID}, Password={WIFI_PASSWORD}")
 print(f"서버 포트: {PORT}")
-print(f"최대 재시도 횟수: {MAX_RETRY_COUNT}")
-print(f"재시도 간격: {RETRY_INTERVAL}ms")
+print(f"재시도 간격: {RETRY_BASE_DELAY}ms ~ {RETRY_MAX_DELAY}ms (연속 {RESET_AFTER}회 실패 시 재시작)")
 print(f"연결 타임아웃: {CONNECT_TIMEOUT}초")
 
-# 메인 루프
+# 최초 연결 예약
+connect_timer = loop.call_later(0, try_connect)
+
+# 메인 루프 (소켓 이벤트와 타이머 마감 시각에 맞춰서만 깨어남)
 while True:
-    current_time = time.ticks_ms()
-    
-    # 재시도 간격 확인
-    if not connected and time.ticks_diff(current_time, last_retry_time) > RETRY_INTERVAL:
-        last_retry_time = current_time
-        if retry_count >= MAX_RETRY_COUNT:
-            print("최대 재시도 횟수 초과. 재시작합니다.")
-            reset()
-    
-    # 연결이 끊어진 경우 재연결
-    if not connected:
-        if connect_to_transmitter():
-            print("연결 성공, 2초 대기 후 메시지 수신 시작")
-            time.sleep(2)  # 연결 후 대기 시간
-        else:
-            print("재연결 시도 중... 10초 후 다시 시도합니다.")
-            time.sleep(10)  # 재연결 실패 시 대기 시간
-        continue
-    
-    # 메시지 수신 및 응답
-    receive_message()
-    
-    time.sleep(0.1)  # CPU 부하 감소 
\ No newline at end of file
+    loop.run_once()
\ No newline at end of file
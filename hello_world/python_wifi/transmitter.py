@@ -1,7 +1,16 @@
+import errno
 import network
 import socket
 import time
 from machine import Pin, reset
+import evloop
+import framing
+import histogram
+import logcodes
+import memcheck
+import pipeline
+import rlog
+import supervisor
 
 # 시작 시 1초 딜레이
 print("트랜스미터 시작 대기 중...")
@@ -23,191 +32,285 @@ server_sock = None
 client_sock = None
 connected = False
 count = 0
-last_client_time = 0
-last_send_time = 0
-last_retry_time = 0
 
 # 상수
 SERVER_PORT = 8080
 CLIENT_TIMEOUT = 10000  # 10초
 SEND_INTERVAL = 5000    # 5초
-MAX_RETRY_COUNT = 5     # 최대 재시도 횟수
-RETRY_INTERVAL = 5000   # 재시도 간격 (ms)
-retry_count = 0         # 현재 재시도 횟수
+RETRY_BASE_DELAY = 500  # 첫 재시도 대기 시간 (ms, 실패할 때마다 2배)
+RETRY_MAX_DELAY = 10000 # 최대 재시도 대기 시간 (ms)
+RESET_AFTER = 10        # 연속 실패가 이 횟수에 도달하면 재시작 (최후의 수단)
+WINDOW_SIZE = 1         # 응답을 기다리는 동안 추가로 보낼 수 있는 요청 수 (1: 한 번에 하나)
+REQUEST_TIMEOUT = 5000  # 요청별 응답 대기 시간 (ms)
+STATS_EVERY = 10        # 응답 N개마다 왕복 시간 통계 출력
+LOG_LEVEL = rlog.DEBUG  # 기록할 최소 레벨 (rlog.INFO: 메시지별 기록 생략)
+ALLOC_CHECK_EVERY = 1000  # 응답 N개마다 힙 할당량 출력
+
+# 수신 프레임 재조립 버퍼 (소켓에서 직접 수신)
+rx_frames = framing.FrameReader()
+
+# 요청 조립 버퍼 (시퀀스 태그 + 메시지, 요청마다 할당 없음)
+tx_frame = framing.FrameWriter()
+REQUEST_MESSAGE = b"hello"
+
+# 링 버퍼 로거 (메시지별 기록은 유휴 시간에 UART로 출력, host/rlog_decode.py로 복원)
+log = rlog.RingLog(level=LOG_LEVEL)
+
+# 정상 상태의 할당 0 확인
+alloc_meter = memcheck.AllocMeter(ALLOC_CHECK_EVERY)
+
+# 왕복 시간(us) 분포와 손실 집계
+rtt_hist = histogram.Histogram()
+
+# 응답 대기 중인 요청 (시퀀스 번호로 요청/응답 매칭, 왕복 시간은 rtt_hist에 기록)
+window = pipeline.RequestWindow(WINDOW_SIZE, REQUEST_TIMEOUT, rtt_hist)
+
+# 연결 상태 머신 (재시도 간격과 재시작 시점 관리)
+link = supervisor.Supervisor("WiFi 서버", RETRY_BASE_DELAY, RETRY_MAX_DELAY,
+                             reset_after=RESET_AFTER, on_reset=reset)
+
+# 이벤트 루프와 타이머 (소켓 이벤트나 타이머 마감 시각에만 깨어남)
+loop = evloop.EventLoop()
+loop.idle = log.drain
+server_timer = None   # 서버 시작 재시도 타이머
+send_timer = None     # 전송 간격 타이머
+client_timer = None   # 클라이언트 타임아웃 타이머
+request_timer = None  # 요청 응답 타임아웃 타이머
 
 def start_server():
-    """서버 시작 (최초 1회만 실행)"""
-    global server_sock, retry_count
+    """서버 시작 (실패 시 백오프 후 재시도)"""
+    global server_sock
     
     try:
         # 이전 서버 소켓 정리
         if server_sock:
+            loop.unregister(server_sock)
             try:
                 server_sock.close()
             except:
                 pass
             server_sock = None
         
-        # 서버 소켓 생성
+        # 서버 소켓 생성 (논블로킹, 연결 요청이 오면 이벤트 루프가 깨어남)
         server_sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
         server_sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
         server_sock.bind(('0.0.0.0', PORT))
         server_sock.listen(1)
-        server_sock.settimeout(5)  # 5초 타임아웃
+        server_sock.setblocking(False)
+        loop.register(server_sock, evloop.POLLIN, on_server_event)
         
         print(f"서버 시작됨: {ap.ifconfig()[0]}:{PORT}")
         print("클라이언트 연결 대기 중...")
-        retry_count = 0  # 서버 시작 성공 시 재시도 카운트 초기화
+        link.begin("클라이언트 대기")
         return True
-        
+    
     except Exception as e:
         print(f"서버 시작 실패: {e}")
-        retry_count += 1
-        if retry_count >= MAX_RETRY_COUNT:
-            print("최대 재시도 횟수 초과. 재시작합니다.")
-            reset()
+        loop.schedule(server_timer, link.fail("서버 시작 실패"))
         return False
 
-def cleanup_client():
+def cleanup_client(reason=""):
     """클라이언트 연결만 정리"""
-    global connected, client_sock, last_client_time, retry_count
+    global connected, client_sock
     
     if client_sock:
+        loop.unregister(client_sock)
         try:
             client_sock.close()
         except:
             pass
         client_sock = None
     
+    if connected:
+        # 다음 클라이언트 연결 요청 대기 재개
+        loop.modify(server_sock, evloop.POLLIN)
     connected = False
-    last_client_time = 0
-    retry_count += 1  # 클라이언트 연결 해제 시 재시도 카운트 증가
+    window.reset()  # 응답 대기 중인 요청 폐기
+    loop.cancel(send_timer)
+    loop.cancel(client_timer)
+    loop.cancel(request_timer)
     
-    if retry_count >= MAX_RETRY_COUNT:
-        print("최대 재시도 횟수 초과. 재시작합니다.")
-        reset()
+    # 서버 소켓은 계속 열려 있으므로 백오프 없이 바로 다음 클라이언트 대기
+    link.fail(reason)
+    if server_sock:
+        link.begin("클라이언트 대기")
 
 def accept_client():
     """클라이언트 연결 수락"""
-    global connected, client_sock, last_client_time, retry_count
+    global connected, client_sock, send_timer, client_timer
     
     try:
         if server_sock:
             client_sock, addr = server_sock.accept()
-            client_sock.settimeout(5)  # 5초 타임아웃
+            client_sock.setblocking(False)
+            loop.register(client_sock, evloop.POLLIN, on_client_event)
+            # 1:1 연결이므로 연결 중에는 추가 연결 요청을 받지 않음
+            loop.modify(server_sock, 0)
+            rx_frames.reset()  # 이전 연결의 잔여 데이터 제거
             connected = True
-            last_client_time = time.ticks_ms()
-            retry_count = 0  # 연결 성공 시 재시도 카운트 초기화
+            link.up(f"{addr[0]}:{addr[1]}")
+            send_timer = loop.call_every(SEND_INTERVAL, send_requests, first_delay=0)
+            client_timer = loop.call_later(CLIENT_TIMEOUT, check_client_timeout)
             print(f"클라이언트 연결됨: {addr[0]}:{addr[1]}")
             return True
     except OSError as e:
-        if "timed out" in str(e):  # 타임아웃은 일반적인 상황이므로 메시지 출력하지 않음
+        if e.args[0] == errno.EAGAIN:  # 대기 중인 연결 요청 없음
             pass
         else:
             print(f"클라이언트 연결 실패: {e}")
-            cleanup_client()
+            cleanup_client("연결 수락 실패")
     except Exception as e:
         print(f"클라이언트 연결 실패: {e}")
-        cleanup_client()
+        cleanup_client("연결 수락 실패")
     return False
 
 def check_client_timeout():
-    """클라이언트 타임아웃 확인"""
-    global connected, last_client_time, retry_count
-    
-    if connected and time.ticks_diff(time.ticks_ms(), last_client_time) > CLIENT_TIMEOUT:
+    """클라이언트 타임아웃 처리 (CLIENT_TIMEOUT 동안 송수신이 없을 때 호출됨)"""
+    if connected:
         print("클라이언트 타임아웃")
-        cleanup_client()
-        return True
-    return False
+        cleanup_client("클라이언트 타임아웃")
+        print("클라이언트 연결이 끊어짐. 새로운 연결 대기 중...")
+
+def touch_client():
+    """송수신 시 클라이언트 타임아웃 마감 시각 연장"""
+    if connected:
+        loop.schedule(client_timer, CLIENT_TIMEOUT)
+
+def update_request_timer():
+    """가장 오래된 요청의 응답 마감 시각에 타이머 설정"""
+    global request_timer
+    remaining = window.next_timeout()
+    if remaining < 0:
+        loop.cancel(request_timer)
+    elif request_timer is None:
+        request_timer = loop.call_later(remaining, expire_requests)
+    else:
+        loop.schedule(request_timer, remaining)
+
+def expire_requests():
+    """응답이 오지 않은 요청 정리"""
+    expired = window.expire()
+    if expired:
+        log.warn(logcodes.HELLO_TIMEOUT, expired, window.timeouts)
+    update_request_timer()
+    if SEND_INTERVAL == 0:
+        send_requests()
+
+def print_stats():
+    """왕복 시간 통계 출력"""
+    log.flush()  # 앞선 기록을 먼저 출력해서 순서 유지
+    print(f"[통계] {rtt_hist.format()}")
 
 def send_message(message):
-    """메시지 전송"""
-    global connected, client_sock, count, last_client_time, last_send_time, retry_count
+    """메시지 전송 (message: bytes)"""
+    global connected, client_sock, count
     
     try:
         if connected and client_sock:
             count += 1  # 메시지 전송 전에 카운트 증가
-            # 메시지 전송
-            client_sock.send(message.encode())
-            print(f"[반복:{count} | 진행:1/4] 전송할 메시지 : {message}")
-            last_client_time = time.ticks_ms()  # 전송 시간 갱신
-            last_send_time = time.ticks_ms()    # 마지막 전송 시간 갱신
-            retry_count = 0  # 전송 성공 시 재시도 카운트 초기화
+            seq = count & pipeline.SEQ_MASK
+            # 시퀀스 태그 + 메시지를 길이 헤더 포함 프레임으로 조립해서 전송
+            tx_frame.begin()
+            tx_frame.write_u16(seq)
+            tx_frame.write(message)
+            loop.send(client_sock, tx_frame.finish())
+            window.add(seq)
+            log.debug(logcodes.HELLO_SEND, count, data=message)
+            touch_client()  # 전송 시간 갱신
             return True
     except Exception as e:
-        print(f"메시지 전송 실패: {e}")
-        cleanup_client()
+        log.warn(logcodes.HELLO_SEND_FAIL, data=str(e))
+        cleanup_client("전송 실패")
     return False
 
+def send_requests():
+    """윈도우에 여유가 있는 만큼 요청 전송 (전송 간격 타이머에서 호출)"""
+    sent = False
+    while connected and window.can_send():
+        if not send_message(REQUEST_MESSAGE):
+            break
+        sent = True
+        if SEND_INTERVAL > 0:
+            break  # 전송 간격마다 1개씩
+    if sent:
+        update_request_timer()
+
 def receive_message():
     """메시지 수신"""
-    global connected, client_sock, count, last_client_time, retry_count
+    global connected, client_sock, count
     
     try:
         if connected and client_sock:
-            # 메시지 수신
-            data = client_sock.recv(1024)
-            if data:
-                last_client_time = time.ticks_ms()  # 통신 시간 갱신
-                message = data.decode()
-                print(f"[반복:{count} | 진행:4/4] 수신한 메시지 : {message}")
-                retry_count = 0  # 수신 성공 시 재시도 카운트 초기화
-                return True
+            # 프레임 버퍼로 직접 수신 후 프레임 단위로 재조립
+            if rx_frames.recv_into(client_sock) == 0:
+                print("클라이언트 연결 종료")
+                cleanup_client("연결 종료")
+                return False
+            touch_client()  # 통신 시간 갱신
+            received = False
+            buf = rx_frames.buf
+            while True:
+                length = rx_frames.next_frame()
+                if length < 0:
+                    break
+                start = rx_frames.payload_start
+                seq = pipeline.read_tag(buf, start)
+                if window.complete(seq) < 0:
+                    log.warn(logcodes.HELLO_UNMATCHED, seq, data=buf, start=start + pipeline.TAG_SIZE, end=start + length)
+                    continue
+                log.debug(logcodes.HELLO_REPLY_RECV, seq, data=buf, start=start + pipeline.TAG_SIZE, end=start + length)
+                received = True
+                if window.completed % STATS_EVERY == 0:
+                    print_stats()
+                    alloc_meter.rebase()  # 통계 출력에 쓰인 할당 제외
+                if alloc_meter.tick():
+                    log.flush()  # 앞선 기록을 먼저 출력해서 순서 유지
+                    print(alloc_meter.format())
+                    alloc_meter.rebase()
+            if received:
+                update_request_timer()
+                if SEND_INTERVAL == 0:
+                    send_requests()  # 간격 없이 전송하는 경우 응답 즉시 다음 요청
+            return received
     except OSError as e:
-        if "timed out" in str(e):  # 타임아웃은 일반적인 상황
+        if e.args[0] == errno.EAGAIN:  # 아직 읽을 데이터 없음
             pass
         else:
-            print(f"메시지 수신 실패: {e}")
-            cleanup_client()
+            log.warn(logcodes.HELLO_RECV_FAIL, data=str(e))
+            cleanup_client("수신 실패")
     except Exception as e:
-        print(f"메시지 수신 실패: {e}")
-        cleanup_client()
+        log.warn(logcodes.HELLO_RECV_FAIL, data=str(e))
+        cleanup_client("수신 실패")
     return False
 
+def on_server_event(sock, event):
+    """서버 소켓 이벤트: 연결 요청 수락"""
+    if not connected:
+        accept_client()
+
+def on_client_event(sock, event):
+    """클라이언트 소켓 이벤트: 수신 데이터 처리 또는 연결 오류 처리"""
+    if event & evloop.POLLIN:
+        receive_message()
+    elif event & (evloop.POLLERR | evloop.POLLHUP):
+        print("클라이언트 소켓 오류")
+        cleanup_client("소켓 오류")
+
 print("WiFi AP 시작...")
 print(f"AP 정보: SSID={AP_SSID}, Password={AP_PASSWORD}")
 print(f"서버 포트: {PORT}")
-print(f"최대 재시도 횟수: {MAX_RETRY_COUNT}")
-print(f"재시도 간격: {RETRY_INTERVAL}ms")
+print(f"재시도 간격: {RETRY_BASE_DELAY}ms ~ {RETRY_MAX_DELAY}ms (연속 {RESET_AFTER}회 실패 시 재시작)")
+print(f"요청 윈도우: {WINDOW_SIZE}개 (응답 타임아웃: {REQUEST_TIMEOUT}ms)")
 
-# 서버 시작 (최초 1회만 실행)
-if not start_server():
-    print("서버 시작 실패, 재시작 중...")
-    time.sleep(5)
-    reset()
+# 서버 시작 (실패 시 타이머로 재시도)
+server_timer = loop.call_later(0, start_server)
 
-# 메인 루프
+# 메인 루프 (소켓 이벤트와 타이머 마감 시각에 맞춰서만 깨어남)
 while True:
     try:
-        current_time = time.ticks_ms()
-        
-        # 재시도 간격 확인
-        if not connected and time.ticks_diff(current_time, last_retry_time) > RETRY_INTERVAL:
-            last_retry_time = current_time
-            if retry_count >= MAX_RETRY_COUNT:
-                print("최대 재시도 횟수 초과. 재시작합니다.")
-                reset()
-        
-        # 클라이언트 타임아웃 확인
-        if check_client_timeout():
-            print("클라이언트 연결이 끊어짐. 새로운 연결 대기 중...")
-            continue
-            
-        # 클라이언트 연결 대기
-        if not connected:
-            accept_client()  # 연결 요청이 있을 때만 처리
-        else:
-            # 5초마다 메시지 전송
-            if time.ticks_diff(current_time, last_send_time) > SEND_INTERVAL:
-                if send_message("hello"):
-                    last_send_time = current_time
-                    # 응답 대기
-                    receive_message()
-        
-        time.sleep(0.1)  # CPU 부하 감소
-        
+        loop.run_once()
+    
     except Exception as e:
         print(f"예기치 않은 오류 발생: {e}")
-        cleanup_client()
-        time.sleep(1) 
\ No newline at end of file
+        cleanup_client("예기치 않은 오류")
+        time.sleep(1)
\ No newline at end of file
@@ -0,0 +1,52 @@
+import network
+import asyncio
+import time
+from machine import reset
+import hello_server
+
+# 시작 시 1초 딜레이
+print("트랜스미터 시작 대기 중...")
+time.sleep(1)
+print("트랜스미터 시작!")
+
+# WiFi AP 설정
+AP_SSID = "ESP32_AP"
+AP_PASSWORD = "12345678"
+PORT = 8080
+
+# 상수
+SEND_INTERVAL = 5000    # 리시버별 요청 전송 간격 (ms)
+REQUEST_TIMEOUT = 5000  # 요청별 응답 대기 시간 (ms)
+MAX_CLIENTS = 8         # 연결 대기열 크기 (listen backlog)
+STATUS_INTERVAL = 10000 # 상태 출력 간격 (ms)
+
+# WiFi AP 모드 설정
+ap = network.WLAN(network.AP_IF)
+ap.active(True)
+ap.config(essid=AP_SSID, password=AP_PASSWORD, authmode=network.AUTH_WPA_WPA2_PSK)
+
+config = hello_server.ServerConfig(SEND_INTERVAL, REQUEST_TIMEOUT)
+stats = hello_server.ServerStats()
+
+async def main():
+    """서버 시작 후 주기적으로 상태 출력"""
+    await hello_server.start('0.0.0.0', PORT, config, stats, backlog=MAX_CLIENTS)
+    print(f"서버 시작됨: {ap.ifconfig()[0]}:{PORT}")
+    print("클라이언트 연결 대기 중... (여러 리시버 동시 연결 가능)")
+
+    while True:
+        await asyncio.sleep(STATUS_INTERVAL / 1000)
+        print(f"[상태] 연결: {stats.clients}개 | 완료: {stats.round_trips}건 | 타임아웃: {stats.timeouts}건")
+        print(f"[통계] {stats.rtt.format()}")
+
+print("WiFi AP 시작 (asyncio 스트림 서버 모드)...")
+print(f"AP 정보: SSID={AP_SSID}, Password={AP_PASSWORD}")
+print(f"서버 포트: {PORT}")
+print(f"요청 간격: {SEND_INTERVAL}ms (응답 타임아웃: {REQUEST_TIMEOUT}ms)")
+
+try:
+    asyncio.run(main())
+except Exception as e:
+    print(f"서버 실행 중 오류 발생: {e}")
+    time.sleep(5)
+    reset()
\ No newline at end of file
@@ -0,0 +1,172 @@
+"""ADC 필터 처리 시간과 잡음 제거 비교 (호스트 PC에서 실행)
+
+사용법:
+    python host/bench_adcfilter.py [--count N] [--trace 기록.txt ...]
+
+1. 창 크기별 샘플당 처리 시간: 기존 방식(매번 sum()으로 창 전체 합산)과
+   lib/adcfilter.py의 필터 비교. 이동 평균과 EMA는 창 크기와 관계없이 일정하다.
+2. 잡음 제거: 합성 ADC 기록(잡음, 스파이크, 계단)에서 실제 값 대비 오차와
+   계단 입력의 90% 도달 샘플 수. --trace로 보드에서 기록한 ADC 값 파일(한 줄에
+   값 하나, 또는 쉼표로 구분한 마지막 열)을 주면 출력의 샘플 간 흔들림을 비교한다.
+   기록 예: mpremote exec "from machine import ADC, Pin; import time
+   a = ADC(Pin(3)); a.atten(ADC.ATTN_11DB)
+   [print(a.read()) or time.sleep_ms(5) for _ in range(4000)]" > trace.txt
+
+호스트의 CPython에서 잰 시간이므로 절댓값보다 창 크기에 따른 증가 추세를 본다.
+"""
+import argparse
+import array
+import math
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "lib"))
+
+import adcfilter  # noqa: E402
+
+WINDOWS = (5, 16, 64, 256)
+TRACE_LENGTH = 4000
+SEED = 1
+
+
+class SumWindow:
+    """기존 트랜스미터의 get_filtered_adc() (매 샘플 창 전체 합산)"""
+
+    def __init__(self, size):
+        self.size = size
+        self.values = array.array('i', [0] * size)
+        self.index = 0
+
+    def update(self, value):
+        self.values[self.index] = value
+        self.index = (self.index + 1) % self.size
+        return sum(self.values) // self.size
+
+
+def make_filters(size):
+    """(이름, 필터) 목록"""
+    return [
+        ("기존 sum()", SumWindow(size)),
+        ("average", adcfilter.create("average", size)),
+        ("ema", adcfilter.create("ema", size)),
+        ("median", adcfilter.create("median", size)),
+    ]
+
+
+def time_per_sample(flt, values):
+    """샘플당 처리 시간 (us)"""
+    update = flt.update
+    start = time.perf_counter()
+    for value in values:
+        update(value)
+    return (time.perf_counter() - start) / len(values) * 1e6
+
+
+def synthetic_traces():
+    """(이름, 입력, 실제 값) 합성 ADC 기록"""
+    rng = random.Random(SEED)
+    clamp = lambda v: max(0, min(4095, int(round(v))))  # noqa: E731
+    n = TRACE_LENGTH
+
+    truth = [2000] * n
+    noise = [clamp(2000 + rng.gauss(0, 25)) for _ in range(n)]
+
+    spikes = []
+    for _ in range(n):
+        value = 2000 + rng.gauss(0, 10)
+        if rng.random() < 0.02:
+            value += rng.choice((-1000, 1000))
+        spikes.append(clamp(value))
+
+    step_truth = [1000 if i < n // 2 else 3000 for i in range(n)]
+    step = [clamp(v + rng.gauss(0, 25)) for v in step_truth]
+
+    slow_truth = [2048 + 1500 * math.sin(2 * math.pi * i / 2000) for i in range(n)]
+    slow = [clamp(v + rng.gauss(0, 25)) for v in slow_truth]
+    return [
+        ("잡음 σ25", noise, truth),
+        ("스파이크 2%", spikes, truth),
+        ("계단 1000->3000", step, step_truth),
+        ("느린 사인파", slow, slow_truth),
+    ]
+
+
+def load_trace(path):
+    """기록 파일에서 ADC 값 목록 읽기"""
+    values = []
+    with open(path, encoding="utf-8", errors="replace") as f:
+        for line in f:
+            field = line.strip().split(",")[-1].strip()
+            if field.lstrip("-").isdigit():
+                values.append(max(0, min(4095, int(field))))
+    return values
+
+
+def settle_samples(output, truth):
+    """계단 이후 출력이 변화량의 90%에 도달할 때까지 샘플 수"""
+    start = next(i for i in range(1, len(truth)) if truth[i] != truth[i - 1])
+    before, after = truth[start - 1], truth[start]
+    target = before + 0.9 * (after - before)
+    for i in range(start, len(output)):
+        if (output[i] - target) * (after - before) >= 0:
+            return i - start
+    return None
+
+
+def jitter(output):
+    """샘플 간 변화량의 RMS (출력 흔들림)"""
+    diffs = [output[i] - output[i - 1] for i in range(1, len(output))]
+    return math.sqrt(sum(d * d for d in diffs) / len(diffs))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="ADC 필터 처리 시간과 잡음 제거 비교")
+    parser.add_argument("--count", type=int, default=20000, help="처리 시간 측정 샘플 수")
+    parser.add_argument("--size", type=int, default=5, help="잡음 비교에 쓸 창 크기 (트랜스미터의 ADC_SAMPLES)")
+    parser.add_argument("--trace", nargs="*", default=[], help="보드에서 기록한 ADC 값 파일")
+    args = parser.parse_args()
+
+    rng = random.Random(SEED)
+    values = [rng.randrange(4096) for _ in range(args.count)]
+    print(f"샘플당 처리 시간 (us, CPython {sys.version.split()[0]})")
+    names = [name for name, _ in make_filters(WINDOWS[0])]
+    print(f"{'창 크기':>8} " + " ".join(f"{name:>11}" for name in names))
+    for size in WINDOWS:
+        row = [time_per_sample(flt, values) for _, flt in make_filters(size)]
+        print(f"{size:>8} " + " ".join(f"{t:>11.2f}" for t in row))
+
+    print()
+    print(f"잡음 제거 (창 크기 {args.size}, EMA 계수 1/{1 << adcfilter.ema_shift(args.size)})")
+    print(f"{'기록':<16} {'필터':<11} {'RMS 오차':>8} {'최대 오차':>8} {'흔들림':>7} {'90% 도달':>8}")
+    for trace_name, trace, truth in synthetic_traces():
+        step = trace_name.startswith("계단")
+        for name in ("none",) + adcfilter.FILTERS[:3]:
+            flt = adcfilter.create(name, args.size)
+            output = [flt.update(v) for v in trace]
+            errors = [o - t for o, t in zip(output, truth)]
+            if step:  # 계단 직후 과도 구간은 지연으로 따로 표시
+                middle = len(truth) // 2
+                errors = errors[:middle] + errors[middle + 50:]
+            rms = math.sqrt(sum(e * e for e in errors) / len(errors))
+            worst = max(abs(e) for e in errors)
+            settle = settle_samples(output, truth) if step else None
+            settle_text = "-" if settle is None else str(settle)
+            print(f"{trace_name:<16} {name:<11} {rms:>8.1f} {worst:>8.0f} {jitter(output):>7.1f} {settle_text:>8}")
+
+    for path in args.trace:
+        trace = load_trace(path)
+        if len(trace) < 2:
+            print(f"{path}: ADC 값이 없음")
+            continue
+        print()
+        print(f"{os.path.basename(path)} (샘플 {len(trace)}개): 출력 흔들림 (샘플 간 변화량 RMS)")
+        for name in ("none",) + adcfilter.FILTERS[:3]:
+            flt = adcfilter.create(name, args.size)
+            output = [flt.update(v) for v in trace]
+            print(f"  {name:<11} {jitter(output):>7.1f}")
+
+
+if __name__ == "__main__":
+    main()
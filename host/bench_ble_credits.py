@@ -0,0 +1,133 @@
+"""BLE 대량 쓰기 처리량 측정: 응답 있는 쓰기, 크레딧 흐름 제어, 흐름 제어 없음 (호스트 시뮬레이션)
+
+사용법: python host/bench_ble_credits.py [--duration 5] [--credits 2 4 8 16]
+
+hello_world/python_bluetooth 트랜스미터와 리시버(BULK = True)를 host/sim에서 실행하고,
+리시버가 MTU - 3바이트 프레임을 계속 쓰는 동안 트랜스미터가 받은 양을 잰다.
+hello 요청/응답도 1초마다 함께 주고받아 대량 쓰기 중의 왕복 시간을 본다.
+
+- 응답 있는 쓰기: BULK_WRITE_MODE = 1, WRITE_DONE을 받을 때마다 하나씩
+- 크레딧 N: 응답 없는 쓰기, 트랜스미터 CREDITS = N (쓰기 버퍼도 N개 분량)
+- 흐름 제어 없음: FLOW_CONTROL = False, 크레딧을 무시하고 ENOMEM이 날 때까지 씀
+- 유실: 리시버가 보낸 프레임 - 트랜스미터가 받은 프레임 (쓰기 버퍼 초과로 잘린 쓰기)
+
+연결 간격은 balanced 프로필(30ms), 연결 이벤트당 패킷 수와 전송 대기열은 시뮬레이션
+기본값(--ble-packets, --ble-txq)이다. 설정마다 별도 프로세스에서 실행한다.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+
+_here = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.join(_here, "..")
+sys.path.insert(0, os.path.join(ROOT, "lib"))
+sys.path.insert(0, os.path.join(_here, "sim"))
+
+from bench_ble_profiles import run_script, wait_for  # noqa: E402
+from bench_led_response import TX_MAC  # noqa: E402
+
+TIMEOUT = 30.0  # 구독 완료까지 기다리는 최대 시간 (초)
+WARMUP = 1.0  # 구독 완료 후 측정 시작까지 (초)
+FOLDER = os.path.join("hello_world", "python_bluetooth")
+
+
+def configs(credits):
+    """(이름, 트랜스미터 설정, 리시버 설정) 목록"""
+    result = [("응답 있는 쓰기", {"CREDITS": "8"}, {"BULK_WRITE_MODE": "1"})]
+    for n in credits:
+        result.append((f"크레딧 {n}", {"CREDITS": str(n)}, {}))
+    result.append(("흐름 제어 없음", {"CREDITS": "8"}, {"FLOW_CONTROL": "False"}))
+    return result
+
+
+def run_one(index, credits, duration):
+    """자식 프로세스: 설정 하나의 처리량/유실/왕복 시간을 JSON으로 출력"""
+    import simcore
+    simcore.install()
+
+    name, tx_values, rx_values = configs(credits)[index]
+    real_stdout = sys.stdout
+    sys.stdout = open(os.devnull, "w")  # 스크립트 출력은 버림
+    fs = os.path.join(simcore.SIM_DIR, "fs")
+    os.makedirs(fs, exist_ok=True)
+    os.chdir(fs)
+
+    tx = simcore.Device("credits-tx", bytes.fromhex(TX_MAC))
+    rx = simcore.Device("credits-rx")
+    tx_ns, rx_ns = {}, {}
+    tx_values = dict(tx_values, SEND_INTERVAL="1000", STATS_EVERY="1000000", LOG_LEVEL="rlog.INFO")
+    rx_values = dict(rx_values, BULK="True", LOG_LEVEL="rlog.INFO", ALLOC_CHECK_EVERY="1000000")
+    for device, script, values, ns in ((tx, "transmitter.py", tx_values, tx_ns),
+                                       (rx, "receiver.py", rx_values, rx_ns)):
+        path = os.path.join(ROOT, FOLDER, script)
+        threading.Thread(target=run_script, args=(simcore, device, path, values, ns),
+                         name=device.name, daemon=True).start()
+
+    result = {"name": name, "error": None}
+    if wait_for(lambda: rx_ns.get("ready"), TIMEOUT) is None:
+        result["error"] = tx_ns.get("_error") or rx_ns.get("_error") or "구독 시간 초과"
+    else:
+        time.sleep(WARMUP)
+        tx_ns["rtt_hist"].reset()
+        frames, size, busy = tx_ns["bulk_frames"], tx_ns["bulk_bytes"], rx_ns["write_busy"]
+        time.sleep(duration)
+        frames, size = tx_ns["bulk_frames"] - frames, tx_ns["bulk_bytes"] - size
+        rx_ns["BULK"] = False  # 쓰기를 멈추고 전송 중인 쓰기가 도착할 때까지 대기
+        time.sleep(0.5)
+        count, low, avg, p50, p99, high, lost = tx_ns["rtt_hist"].stats()
+        result.update({
+            "rate": size / duration, "writes": frames / duration,
+            "lost": rx_ns["bulk_total"] - tx_ns["bulk_frames"],
+            "peak": tx_ns["peak_buffered"], "buffer": tx_ns["write_buffer"],
+            "busy": rx_ns["write_busy"] - busy, "rtt": (count, p50, high, lost),
+            "error": tx_ns.get("_error") or rx_ns.get("_error"),
+        })
+    real_stdout.write(json.dumps(result) + "\n")
+    real_stdout.flush()
+    for device in (tx, rx):
+        device.shutdown()
+    os._exit(0)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="BLE 대량 쓰기 처리량 측정 (크레딧 흐름 제어)")
+    parser.add_argument("--duration", type=float, default=5.0, help="설정마다 측정 시간 (초)")
+    parser.add_argument("--credits", type=int, nargs="+", default=[2, 4, 8, 16], help="비교할 CREDITS 값")
+    parser.add_argument("--run", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    credit_args = [str(n) for n in args.credits]
+
+    if args.run is not None:
+        run_one(args.run, args.credits, args.duration)
+        return
+
+    print(f"hello BLE 리시버 -> 트랜스미터 대량 쓰기, {args.duration:g}초")
+    print(f"{'설정':<14} {'처리량':>10} {'쓰기/s':>7} {'유실':>5} {'버퍼 최대':>14} {'ENOMEM':>7} "
+          f"{'hello 왕복 p50/최대':>19}")
+    for index in range(len(configs(args.credits))):
+        command = [sys.executable, os.path.abspath(__file__), "--run", str(index),
+                   "--duration", str(args.duration), "--credits", *credit_args]
+        proc = subprocess.run(command, capture_output=True, text=True, timeout=TIMEOUT + args.duration + 30)
+        lines = proc.stdout.strip().splitlines()
+        if not lines:
+            print(f"{index}: 실행 실패: {proc.stderr.strip()[-200:]}")
+            continue
+        r = json.loads(lines[-1])
+        if "rate" not in r:
+            print(f"{r['name']:<14} 실행 실패: {r['error']}")
+            continue
+        count, p50, high, lost = r["rtt"]
+        rtt = f"{p50 / 1000:.0f}/{high / 1000:.0f}ms ({count}개, 손실 {lost})" if count else f"응답 없음 (손실 {lost})"
+        buffered = f"{r['peak']}/{r['buffer']}B"
+        print(f"{r['name']:<14} {r['rate'] / 1000:>7.1f}KB/s {r['writes']:>7.1f} {r['lost']:>5} "
+              f"{buffered:>14} {r['busy']:>7} {rtt:>19}")
+        if r["error"]:
+            print(f"  스크립트 오류: {r['error']}")
+
+
+if __name__ == "__main__":
+    main()
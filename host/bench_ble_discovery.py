@@ -0,0 +1,133 @@
+"""BLE 트랜스미터 발견 시간 측정: 광고 간격과 스캔 프로필별 (호스트 시뮬레이션)
+
+사용법: python host/bench_ble_discovery.py [--trials 20] [--adv 100000 20000]
+
+led_control/python_bluetooth 트랜스미터를 host/sim에서 실행해 광고만 하게 두고,
+벤치가 스캐너 장치로 서비스 UUID(advdata.has_service)를 찾을 때까지 걸린
+시간을 잰다. 리시버와 같은 필터이며 MAC 주소는 보지 않는다. 스캔 시작 시점은
+매번 0~300ms 임의로 바꾼다.
+
+- 광고 간격: 트랜스미터 ADV_FAST_INTERVAL (100000: 기존 고정 간격, 20000:
+  연결 전 빠른 광고). 측정 동안 빠른 광고가 끝나지 않도록 ADV_FAST_TIME을 늘림
+- 스캔: lib/bleprofile.py 프로필의 스캔 간격/창 (패시브 스캔)
+
+광고 간격마다 별도 프로세스에서 실행한다.
+"""
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import threading
+import time
+
+_here = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.join(_here, "..")
+sys.path.insert(0, os.path.join(ROOT, "lib"))
+sys.path.insert(0, os.path.join(_here, "sim"))
+
+import advdata  # noqa: E402
+import bleprofile  # noqa: E402
+from bench_ble_profiles import run_script  # noqa: E402
+from bench_led_response import TX_MAC  # noqa: E402
+
+SCAN_TIMEOUT = 5.0  # 한 번 찾는 데 기다리는 최대 시간 (초)
+_IRQ_SCAN_RESULT = 5
+_SERVICE_UUID = "6E400001-B5A3-F393-E0A9-E50E24DCCA9E"
+
+
+def run_one(adv_interval, trials):
+    """자식 프로세스: 프로필마다 발견 시간(ms) 목록을 JSON으로 출력"""
+    import simcore
+    simcore.install()
+    import bluetooth
+
+    real_stdout = sys.stdout
+    sys.stdout = open(os.devnull, "w")  # 스크립트 출력은 버림
+    fs = os.path.join(simcore.SIM_DIR, "fs")
+    os.makedirs(fs, exist_ok=True)
+    os.chdir(fs)
+
+    tx = simcore.Device("discovery-tx", bytes.fromhex(TX_MAC))
+    tx_ns = {}
+    values = {"ADV_FAST_INTERVAL": str(adv_interval), "ADV_FAST_TIME": "3600000"}
+    path = os.path.join(ROOT, "led_control", "python_bluetooth", "transmitter.py")
+    threading.Thread(target=run_script, args=(simcore, tx, path, values, tx_ns),
+                     name=tx.name, daemon=True).start()
+
+    # 벤치 스레드를 스캐너 장치로 사용
+    scanner = simcore.Device("discovery-scanner")
+    simcore.bind(scanner)
+    ble = bluetooth.BLE()
+    ble.active(True)
+    service = bluetooth.UUID(_SERVICE_UUID)
+    found = threading.Event()
+
+    def on_irq(event, data):
+        if event == _IRQ_SCAN_RESULT and advdata.has_service(data[4], service):
+            found.set()
+
+    ble.irq(on_irq)
+    while not tx_ns.get("advertising"):
+        time.sleep(0.01)
+
+    results = {}
+    for name in bleprofile.PROFILES:
+        profile = bleprofile.get(name)
+        times = []
+        for _ in range(trials):
+            time.sleep(random.uniform(0, 0.3))
+            found.clear()
+            start = time.monotonic()
+            ble.gap_scan(int(SCAN_TIMEOUT * 1000), profile.scan_interval_us, profile.scan_window_us)
+            if found.wait(SCAN_TIMEOUT):
+                times.append((time.monotonic() - start) * 1000)
+            ble.gap_scan(None)
+        results[name] = times
+    real_stdout.write(json.dumps({"results": results, "error": tx_ns.get("_error")}) + "\n")
+    real_stdout.flush()
+    tx.shutdown()
+    scanner.shutdown()
+    os._exit(0)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="BLE 트랜스미터 발견 시간 측정")
+    parser.add_argument("--trials", type=int, default=20, help="프로필마다 측정 횟수")
+    parser.add_argument("--adv", type=int, nargs="+", default=[100000, 20000], help="비교할 광고 간격 (us)")
+    parser.add_argument("--run", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run:
+        run_one(args.run, args.trials)
+        return
+
+    print(f"서비스 UUID로 발견, 프로필마다 {args.trials}회")
+    print(f"{'광고 간격':>9} {'프로필':<12} {'스캔 (창/간격)':>15} {'평균':>8} {'p90':>8} {'최대':>8} {'실패':>4}")
+    for adv in args.adv:
+        command = [sys.executable, os.path.abspath(__file__), "--run", str(adv), "--trials", str(args.trials)]
+        proc = subprocess.run(command, capture_output=True, text=True,
+                              timeout=(SCAN_TIMEOUT + 1) * args.trials * len(bleprofile.PROFILES) + 30)
+        lines = proc.stdout.strip().splitlines()
+        if not lines:
+            print(f"{adv / 1000:>7g}ms 실행 실패: {proc.stderr.strip()[-200:]}")
+            continue
+        result = json.loads(lines[-1])
+        for name, times in result["results"].items():
+            profile = bleprofile.get(name)
+            scan = f"{profile.scan_window_us / 1000:g}/{profile.scan_interval_us / 1000:g}ms"
+            missed = args.trials - len(times)
+            if not times:
+                print(f"{adv / 1000:>7g}ms {name:<12} {scan:>15} 발견 못함")
+                continue
+            times.sort()
+            p90 = times[min(len(times) - 1, len(times) * 9 // 10)]
+            print(f"{adv / 1000:>7g}ms {name:<12} {scan:>15} {sum(times) / len(times):>6.0f}ms "
+                  f"{p90:>6.0f}ms {times[-1]:>6.0f}ms {missed:>4}")
+        if result["error"]:
+            print(f"  스크립트 오류: {result['error']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+"""LED 제어 BLE 연결 프로필별 알림 지연과 재연결 시간 측정 (호스트 시뮬레이션)
+
+사용법: python host/bench_ble_profiles.py [--profiles low-latency balanced low-power] [--duration 10]
+
+led_control/python_bluetooth 트랜스미터(묶음 전송, STREAM = True)와 리시버를
+host/sim에서 실행하고, 연결된 상태에서 리시버의 set_profile()로 프로필을
+차례로 바꾼다. 프로필마다:
+
+- 전환 시간: set_profile() 호출부터 새 연결에서 첫 알림을 받을 때까지
+  (연결을 끊고 백오프, 스캔, 연결 요청을 거치므로 스캔 간격/창의 영향을 받음)
+- 알림 지연: 리시버 [통계]와 같은 TransitHistogram (알림의 마지막 샘플 시각 ->
+  bt_irq에서 받은 시각, 최소 대비). 시뮬레이션은 장치들이 같은 시계를 쓰므로
+  최솟값이 0에 가깝다
+- 알림 수/s
+
+시뮬레이션의 연결 간격은 gap_connect()의 min_conn_interval_us이다.
+"""
+import argparse
+import os
+import sys
+import threading
+import time
+
+_here = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.join(_here, "..")
+sys.path.insert(0, os.path.join(ROOT, "lib"))
+sys.path.insert(0, os.path.join(_here, "sim"))
+
+import bleprofile  # noqa: E402
+from bench_led_response import TX_MAC, override  # noqa: E402
+
+SWITCH_TIMEOUT = 30.0  # 프로필 전환 후 첫 알림까지 기다리는 최대 시간 (초)
+
+
+def run_script(simcore, device, path, values, namespace):
+    """설정값을 바꾼 스크립트를 장치 스레드에서 실행"""
+    simcore.bind(device)
+    with open(path, encoding="utf-8") as f:
+        code = compile(override(f.read(), values), path, "exec")
+    namespace.update({"__name__": "__main__", "__file__": path})
+    try:
+        exec(code, namespace)
+    except BaseException as e:  # noqa: B902 - 결과는 main()이 판단
+        namespace["_error"] = repr(e)
+
+
+def wait_for(condition, timeout):
+    """condition()이 참이 될 때까지 대기, 걸린 시간(초) 반환 (시간 초과: None)"""
+    start = time.monotonic()
+    while time.monotonic() - start < timeout:
+        if condition():
+            return time.monotonic() - start
+        time.sleep(0.005)
+    return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="LED 제어 BLE 연결 프로필별 알림 지연 측정")
+    parser.add_argument("--profiles", nargs="+", default=list(bleprofile.PROFILES), choices=bleprofile.PROFILES)
+    parser.add_argument("--duration", type=float, default=10.0, help="프로필마다 측정 시간 (초)")
+    args = parser.parse_args()
+
+    import simcore
+    simcore.install()
+    import machine
+
+    real_stdout = sys.stdout
+    sys.stdout = open(os.devnull, "w")  # 스크립트 출력은 버림
+    os.makedirs(os.path.join(simcore.SIM_DIR, "fs"), exist_ok=True)
+    os.chdir(os.path.join(simcore.SIM_DIR, "fs"))
+
+    folder = os.path.join(ROOT, "led_control", "python_bluetooth")
+    tx = simcore.Device("profiles-tx", bytes.fromhex(TX_MAC))
+    rx = simcore.Device("profiles-rx")
+    machine.set_adc(3, lambda t: 2048 + 1500 * ((t * 0.5) % 2 - 1), tx)  # 2초 주기 톱니파
+    tx_ns, rx_ns = {}, {}
+    for device, name, values, ns in ((tx, "transmitter.py", {"STREAM": "True"}, tx_ns),
+                                     (rx, "receiver.py", {"STATS_INTERVAL": "600000"}, rx_ns)):
+        threading.Thread(target=run_script, args=(simcore, device, os.path.join(folder, name), values, ns),
+                         name=device.name, daemon=True).start()
+
+    def out(line):
+        real_stdout.write(line + "\n")
+        real_stdout.flush()
+
+    if wait_for(lambda: rx_ns.get("connected") and rx_ns["transit"].count, SWITCH_TIMEOUT) is None:
+        out(f"연결 시간 초과 {rx_ns.get('_error') or tx_ns.get('_error') or ''}")
+        os._exit(1)
+
+    out(f"묶음 전송 200Hz, 프로필마다 {args.duration:.0f}초 측정 (지연은 최소 대비)")
+    out(f"{'프로필':<12} {'연결 간격':>12} {'전환 시간':>9} {'알림/s':>7} "
+        f"{'평균 지연':>9} {'p50':>7} {'p99':>7} {'최대':>7}")
+    for name in args.profiles:
+        transit = rx_ns["transit"]
+        rx_ns["set_profile"](name)
+        # 연결이 끊긴 뒤 새 연결에서 첫 알림을 받을 때까지
+        wait_for(lambda: not rx_ns["connected"], SWITCH_TIMEOUT)
+        switch = wait_for(lambda: rx_ns["connected"] and transit.count, SWITCH_TIMEOUT)
+        profile = rx_ns["profile"]
+        interval = f"{profile.min_conn_us / 1000:g}~{profile.max_conn_us / 1000:g}ms"
+        if switch is None:
+            out(f"{name:<12} {interval:>12} 다시 연결되지 않음")
+            continue
+        transit.reset()
+        notifies = rx_ns["notifies"]
+        time.sleep(args.duration)
+        count, low, avg, p50, p99, high, lost = transit.stats()
+        rate = (rx_ns["notifies"] - notifies) / args.duration
+        out(f"{name:<12} {interval:>12} {switch * 1000:>7.0f}ms {rate:>7.1f} "
+            f"{avg / 1000:>7.1f}ms {p50 / 1000:>5.1f}ms {p99 / 1000:>5.1f}ms {high / 1000:>5.1f}ms")
+
+    error = tx_ns.get("_error") or rx_ns.get("_error")
+    if error:
+        out(f"스크립트 오류: {error}")
+    for device in (tx, rx):
+        device.shutdown()
+    os._exit(0)
+
+
+if __name__ == "__main__":
+    main()
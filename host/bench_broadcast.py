@@ -0,0 +1,194 @@
+"""LED 제어 UDP 브로드캐스트: 리시버 수에 따른 전송량, 손실, 동기 측정 (호스트 시뮬레이션)
+
+사용법: python host/bench_broadcast.py [--receivers 1 10 50] [--duration 10] [--change]
+
+led_control/python_wifi 트랜스미터 하나(BROADCAST = True)와 리시버 N대를 host/sim에서
+함께 실행한다. 기본은 묶음 전송(STREAM = True, 200Hz 샘플을 50ms마다 전송)이고
+--change면 변화 시 전송이다. 모든 리시버가 연결된 뒤 DURATION초 동안:
+
+- 트랜스미터 전송 패킷/s, 바이트/s: 리시버 수와 관계없이 같아야 한다
+  (TCP 1:1 연결로 같은 양을 보내려면 리시버 수만큼 곱해짐)
+- 리시버별 수신 샘플/s와 손실(순번의 빈틈)
+- 동기 편차: 같은 패킷을 리시버들이 받은 시각의 최대 차이 (p50/최대)
+
+시뮬레이션은 브로드캐스트 하나를 리시버마다 루프백 UDP로 차례로 보내고 모든
+장치가 한 프로세스의 스레드로 돌기 때문에, 동기 편차는 리시버 수에 따라
+늘어나는 호스트 쪽 처리 시간을 포함한 상한이다 (무선에서는 프레임 하나를 모든
+리시버가 동시에 받음). 스레드 부하를 줄이려고 리시버의 슬루 타이머는
+SLEW_FREQ = 50으로 실행한다. 리시버 수마다 별도 프로세스에서 실행한다.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+
+_here = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.join(_here, "..")
+sys.path.insert(0, os.path.join(ROOT, "lib"))
+sys.path.insert(0, os.path.join(_here, "sim"))
+
+from bench_led_response import override  # noqa: E402
+
+CONNECT_TIMEOUT = 30.0  # 모든 리시버가 연결될 때까지 기다리는 최대 시간 (초)
+
+
+def run_script(simcore, device, path, values, namespace):
+    """설정값을 바꾼 스크립트를 장치 스레드에서 실행"""
+    simcore.bind(device)
+    with open(path, encoding="utf-8") as f:
+        code = compile(override(f.read(), values), path, "exec")
+    namespace.update({"__name__": "__main__", "__file__": path})
+    try:
+        exec(code, namespace)
+    except BaseException as e:  # noqa: B902 - 결과는 run_one()이 판단
+        namespace["_error"] = repr(e)
+
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p / 100))] if values else 0
+
+
+def run_one(receivers, duration, stream):
+    """자식 프로세스: 리시버 receivers대로 실행하고 결과를 JSON으로 출력"""
+    import simcore
+    simcore.install()
+    import machine
+
+    real_stdout = sys.stdout
+    sys.stdout = open(os.devnull, "w")  # 스크립트 출력은 버림
+    os.makedirs(os.path.join(simcore.SIM_DIR, "fs"), exist_ok=True)
+    os.chdir(os.path.join(simcore.SIM_DIR, "fs"))
+
+    folder = os.path.join(ROOT, "led_control", "python_wifi")
+    mode = {"STREAM": "True"} if stream else {"SEND_ON_CHANGE": "True"}
+    tx_values = dict(mode, BROADCAST="True")
+    rx_values = {"BROADCAST": "True", "STATIC_IP": "None", "FAST_RECONNECT": "False",
+                 "SLEW_FREQ": "50", "STATS_INTERVAL": "600000"}
+
+    tx = simcore.Device(f"bcast{receivers}-tx")
+    machine.set_adc(3, lambda t: 2048 + 1500 * ((t * 0.5) % 2 - 1), tx)  # 2초 주기 톱니파
+    tx_ns = {}
+    rx_list = []
+    threads = []
+    threads.append(threading.Thread(target=run_script, name=tx.name, daemon=True,
+                                    args=(simcore, tx, os.path.join(folder, "transmitter.py"), tx_values, tx_ns)))
+    for i in range(receivers):
+        device = simcore.Device(f"bcast{receivers}-rx{i}")
+        ns = {}
+        rx_list.append((device, ns))
+        threads.append(threading.Thread(target=run_script, name=device.name, daemon=True,
+                                        args=(simcore, device, os.path.join(folder, "receiver.py"), rx_values, ns)))
+    for thread in threads:
+        thread.start()
+
+    # 모든 리시버가 수신 소켓을 열 때까지 대기
+    start = time.monotonic()
+    while time.monotonic() - start < CONNECT_TIMEOUT:
+        if all(ns.get("sock") is not None and "decoder" in ns for _, ns in rx_list) and "send_packet" in tx_ns:
+            break
+        time.sleep(0.1)
+    else:
+        real_stdout.write(json.dumps({"error": "리시버 연결 시간 초과"}) + "\n")
+        os._exit(0)
+
+    # 패킷 첫 샘플(순번)별 수신 시각 기록과 트랜스미터 전송량 집계
+    arrivals = {}
+    lock = threading.Lock()
+
+    def hook(ns, index):
+        decoder = ns["decoder"]
+        on_sample = decoder.on_sample
+
+        def wrapped(value, seq, stamp):
+            if seq >= 0 and (seq == decoder.first or not stream):
+                now = time.monotonic()
+                with lock:
+                    arrivals.setdefault(seq, {}).setdefault(index, now)
+            on_sample(value, seq, stamp)
+        decoder.on_sample = wrapped
+
+    for i, (_, ns) in enumerate(rx_list):
+        hook(ns, i)
+
+    sent = [0, 0]  # 패킷 수, 바이트 수
+    send_packet = tx_ns["send_packet"]
+
+    def counted(data):
+        sent[0] += 1
+        sent[1] += len(data)
+        send_packet(data)
+    tx_ns["send_packet"] = counted
+
+    values_before = [ns["decoder"].values for _, ns in rx_list]
+    lost_before = [ns["seqs"].lost for _, ns in rx_list]
+    time.sleep(duration)
+    tx_ns["send_packet"] = send_packet
+    values = [ns["decoder"].values - v for (_, ns), v in zip(rx_list, values_before)]
+    lost = [ns["seqs"].lost - v for (_, ns), v in zip(rx_list, lost_before)]
+
+    with lock:
+        complete = [t for t in arrivals.values() if len(t) == receivers]
+    spreads = [(max(t.values()) - min(t.values())) * 1000 for t in complete[1:-1]]
+    errors = [ns.get("_error") for _, ns in [(tx, tx_ns)] + rx_list if ns.get("_error")]
+    result = {
+        "packets": sent[0] / duration,
+        "bytes": sent[1] / duration,
+        "rx_avg": sum(values) / len(values) / duration,
+        "rx_min": min(values) / duration,
+        "lost": sum(lost),
+        "received": sum(values),
+        "spread_p50": percentile(spreads, 50),
+        "spread_max": max(spreads) if spreads else 0,
+        "error": errors[0] if errors else None,
+    }
+    real_stdout.write(json.dumps(result) + "\n")
+    real_stdout.flush()
+    for device in [tx] + [d for d, _ in rx_list]:
+        device.shutdown()
+    os._exit(0)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="LED 제어 UDP 브로드캐스트 리시버 수별 측정")
+    parser.add_argument("--receivers", type=int, nargs="+", default=[1, 10, 50], help="리시버 수")
+    parser.add_argument("--duration", type=float, default=10.0, help="측정 시간 (초)")
+    parser.add_argument("--change", action="store_true", help="묶음 전송 대신 변화 시 전송")
+    parser.add_argument("--run", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run:
+        run_one(args.run, args.duration, not args.change)
+        return
+
+    print(f"{'변화 시 전송' if args.change else '묶음 전송 200Hz'}, {args.duration:.0f}초 측정")
+    print(f"{'리시버':>6} {'전송 패킷/s':>11} {'전송 B/s':>9} {'TCP 환산 B/s':>12} "
+          f"{'수신 샘플/s (평균/최소)':>22} {'손실률':>7} {'동기 편차 p50/최대(ms)':>22}")
+    for receivers in args.receivers:
+        command = [sys.executable, os.path.abspath(__file__), "--run", str(receivers),
+                   "--duration", str(args.duration)] + (["--change"] if args.change else [])
+        proc = subprocess.run(command, capture_output=True, text=True,
+                              timeout=CONNECT_TIMEOUT + args.duration + 30)
+        lines = proc.stdout.strip().splitlines()
+        if not lines:
+            print(f"{receivers:>6} 실행 실패: {proc.stderr.strip()[-200:]}")
+            continue
+        result = json.loads(lines[-1])
+        if "packets" not in result:
+            print(f"{receivers:>6} {result['error']}")
+            continue
+        total = result["received"] + result["lost"]
+        loss = result["lost"] / total * 100 if total else 0
+        print(f"{receivers:>6} {result['packets']:>11.1f} {result['bytes']:>9.0f} "
+              f"{result['bytes'] * receivers:>12.0f} "
+              f"{result['rx_avg']:>13.1f} / {result['rx_min']:<6.1f} {loss:>6.2f}% "
+              f"{result['spread_p50']:>14.1f} / {result['spread_max']:.1f}")
+        if result["error"]:
+            print(f"  스크립트 오류: {result['error']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+"""응답 지연 비교: sleep(0.1) 폴링 루프 vs poll 기반 이벤트 루프 (호스트 PC에서 실행)
+
+사용법: python host/bench_evloop.py [--requests N]
+
+리시버 역할의 서버를 두 방식으로 구현해 루프백으로 요청을 보내고, 요청 전송부터
+응답 수신까지의 시간을 측정한다. 요청은 무작위 간격으로 보내 루프 주기와
+동기화되지 않도록 한다. 유휴 상태에서 루프가 깨어난 횟수도 함께 출력한다.
+"""
+import argparse
+import os
+import random
+import socket
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "lib"))
+
+import evloop  # noqa: E402
+import framing  # noqa: E402
+
+IDLE_SECONDS = 1.0
+
+
+def sleep_loop_server(server, stop, stats):
+    """기존 방식: 블로킹 소켓 + 5초 타임아웃 recv, 루프 끝에서 sleep(0.1)"""
+    conn, _ = server.accept()
+    conn.settimeout(5)
+    reader = framing.FrameReader()
+    while not stop.is_set():
+        stats["wakeups"] += 1
+        try:
+            data = conn.recv(1024)
+            if not data:
+                break
+            reader.feed(data)
+            while True:
+                payload = reader.read_frame()
+                if payload is None:
+                    break
+                conn.sendall(framing.encode(bytes(payload) + b" world"))
+        except socket.timeout:
+            pass
+        time.sleep(0.1)  # CPU 부하 감소
+    conn.close()
+
+
+def event_loop_server(server, stop, stats):
+    """새 방식: 논블로킹 소켓 + EventLoop"""
+    loop = evloop.EventLoop()
+    reader = framing.FrameReader()
+    state = {"conn": None}
+
+    def on_client(sock, event):
+        data = sock.recv(1024)
+        if not data:
+            loop.unregister(sock)
+            stop.set()
+            return
+        reader.feed(data)
+        while True:
+            payload = reader.read_frame()
+            if payload is None:
+                break
+            loop.send(sock, framing.encode(bytes(payload) + b" world"))
+
+    def on_server(sock, event):
+        conn, _ = sock.accept()
+        conn.setblocking(False)
+        state["conn"] = conn
+        loop.register(conn, evloop.POLLIN, on_client)
+
+    server.setblocking(False)
+    loop.register(server, evloop.POLLIN, on_server)
+    # 클라이언트가 연결을 닫으면 stop이 설정되어 종료
+    while not stop.is_set():
+        loop.run_once()
+        stats["wakeups"] = loop.wakeups
+    loop.unregister(server)
+    if state["conn"]:
+        state["conn"].close()
+
+
+def measure(server_fn, requests):
+    server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    server.bind(("127.0.0.1", 0))
+    server.listen(1)
+    stop = threading.Event()
+    stats = {"wakeups": 0}
+    thread = threading.Thread(target=server_fn, args=(server, stop, stats))
+    thread.start()
+
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+    sock.connect(server.getsockname())
+    reader = framing.FrameReader()
+    latencies = []
+    for _ in range(requests):
+        time.sleep(random.uniform(0.0, 0.1))
+        start = time.perf_counter()
+        sock.sendall(framing.encode(b"hello"))
+        while reader.read_frame() is None:
+            reader.feed(sock.recv(1024))
+        latencies.append((time.perf_counter() - start) * 1000)
+
+    # 유휴 구간: 요청 없이 대기하며 깨어난 횟수 측정
+    idle_start = stats["wakeups"]
+    time.sleep(IDLE_SECONDS)
+    idle_wakeups = stats["wakeups"] - idle_start
+    stop.set()
+    sock.close()
+    thread.join()
+    server.close()
+    latencies.sort()
+    return {
+        "avg": sum(latencies) / len(latencies),
+        "p50": latencies[len(latencies) // 2],
+        "p99": latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))],
+        "max": latencies[-1],
+        "idle_wakeups": idle_wakeups,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="폴링 루프와 이벤트 루프의 응답 지연 비교")
+    parser.add_argument("--requests", type=int, default=100, help="방식별 요청 수")
+    args = parser.parse_args()
+
+    print(f"{'방식':<16} {'평균(ms)':>9} {'p50(ms)':>9} {'p99(ms)':>9} {'최대(ms)':>9} {'유휴 1초 깨어남':>14}")
+    for name, fn in (("sleep(0.1) 폴링", sleep_loop_server), ("poll 이벤트 루프", event_loop_server)):
+        r = measure(fn, args.requests)
+        print(f"{name:<16} {r['avg']:>9.2f} {r['p50']:>9.2f} {r['p99']:>9.2f} {r['max']:>9.2f} {r['idle_wakeups']:>14}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""프레이밍 계층 루프백 처리량 측정 (호스트 PC에서 실행)
+
+사용법: python host/bench_framing.py [--count N]
+
+127.0.0.1 TCP 연결로 프레임을 연속 전송하고, 수신 측에서 FrameReader로
+재조립한 메시지 수와 내용을 검증한 뒤 초당 메시지 수를 출력한다.
+"""
+import argparse
+import os
+import socket
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "lib"))
+
+import framing  # noqa: E402
+
+PAYLOAD_SIZES = (16, 256, 1024)
+RECV_SIZE = 1024  # 보드 스크립트와 동일한 recv() 크기
+
+
+def receive_all(server, count, payload, result):
+    """프레임을 재조립하며 수신하고 결과를 기록"""
+    conn, _ = server.accept()
+    reader = framing.FrameReader()
+    frames = 0
+    recv_calls = 0
+    errors = 0
+    while frames < count:
+        data = conn.recv(RECV_SIZE)
+        if not data:
+            break
+        recv_calls += 1
+        reader.feed(data)
+        while True:
+            frame = reader.read_frame()
+            if frame is None:
+                break
+            if frame != payload:
+                errors += 1
+            frames += 1
+    result["frames"] = frames
+    result["recv_calls"] = recv_calls
+    result["errors"] = errors
+    result["end"] = time.perf_counter()
+    conn.close()
+
+
+def run(size, count):
+    payload = bytes((i * 7) & 0xFF for i in range(size))
+    frame = framing.encode(payload)
+
+    server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    server.bind(("127.0.0.1", 0))
+    server.listen(1)
+    result = {}
+    thread = threading.Thread(target=receive_all, args=(server, count, payload, result))
+    thread.start()
+
+    client = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    client.connect(server.getsockname())
+    start = time.perf_counter()
+    for _ in range(count):
+        client.sendall(frame)
+    thread.join()
+    client.close()
+    server.close()
+
+    elapsed = result["end"] - start
+    return {
+        "size": size,
+        "frames": result["frames"],
+        "errors": result["errors"],
+        "recv_calls": result["recv_calls"],
+        "msgs_per_s": result["frames"] / elapsed,
+        "mb_per_s": result["frames"] * size / elapsed / 1e6,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="프레이밍 루프백 처리량 측정")
+    parser.add_argument("--count", type=int, default=50000, help="크기별 전송 메시지 수")
+    args = parser.parse_args()
+
+    print(f"{'페이로드':>8} {'메시지/s':>12} {'MB/s':>8} {'recv 호출':>10} {'수신':>8} {'오류':>5}")
+    for size in PAYLOAD_SIZES:
+        r = run(size, args.count)
+        print(f"{r['size']:>7}B {r['msgs_per_s']:>12.0f} {r['mb_per_s']:>8.2f} "
+              f"{r['recv_calls']:>10} {r['frames']:>8} {r['errors']:>5}")
+        if r["frames"] != args.count or r["errors"]:
+            print("  프레임 손실 또는 손상 발생!")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""BLE GATT 핸들 캐시 유무에 따른 재연결 -> 구독/첫 알림 시간 측정 (호스트 시뮬레이션)
+
+사용법: python host/bench_gatt_cache.py [--reconnects 10] [--profile balanced]
+
+led_control/python_bluetooth 트랜스미터(묶음 전송)와 리시버를 host/sim에서
+실행하고, 리시버의 set_profile()로 연결을 끊고 다시 연결하기를 반복한다.
+리시버 설정 GATT_CACHE = False(매번 서비스/특성 검색)와 True(캐시 파일을 지우고
+시작, 첫 연결만 검색)를 비교한다. 연결마다:
+
+- 구독: 연결 이벤트부터 CCCD 쓰기 응답까지 (MTU 교환 포함)
+- 첫 알림: 연결 이벤트부터 구독 완료 뒤 첫 알림까지
+
+설정마다 별도 프로세스에서 실행한다.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import threading
+
+_here = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.join(_here, "..")
+sys.path.insert(0, os.path.join(ROOT, "lib"))
+sys.path.insert(0, os.path.join(_here, "sim"))
+
+import bleprofile  # noqa: E402
+from bench_ble_profiles import run_script, wait_for  # noqa: E402
+from bench_led_response import TX_MAC  # noqa: E402
+
+TIMEOUT = 30.0  # 연결마다 첫 알림까지 기다리는 최대 시간 (초)
+
+
+def run_one(use_cache, reconnects, profile):
+    """자식 프로세스: 재연결을 반복하고 연결별 (구독 ms, 첫 알림 ms, 캐시 사용)을 JSON으로 출력"""
+    import simcore
+    simcore.install()
+    import machine
+
+    real_stdout = sys.stdout
+    sys.stdout = open(os.devnull, "w")  # 스크립트 출력은 버림
+    fs = os.path.join(simcore.SIM_DIR, "fs")
+    os.makedirs(fs, exist_ok=True)
+    os.chdir(fs)
+    try:
+        os.remove("gatt_cache.json")
+    except OSError:
+        pass
+
+    folder = os.path.join(ROOT, "led_control", "python_bluetooth")
+    tx = simcore.Device("gattcache-tx", bytes.fromhex(TX_MAC))
+    rx = simcore.Device("gattcache-rx")
+    machine.set_adc(3, lambda t: 2048, tx)
+    tx_ns, rx_ns = {}, {}
+    rx_values = {"GATT_CACHE": str(use_cache), "BLE_PROFILE": repr(profile), "STATS_INTERVAL": "600000"}
+    for device, name, values, ns in ((tx, "transmitter.py", {"STREAM": "True"}, tx_ns),
+                                     (rx, "receiver.py", rx_values, rx_ns)):
+        threading.Thread(target=run_script, args=(simcore, device, os.path.join(folder, name), values, ns),
+                         name=device.name, daemon=True).start()
+
+    results = []
+    for i in range(reconnects + 1):
+        if i:
+            rx_ns["set_profile"](profile)  # 같은 프로필: 연결을 끊고 다시 연결
+            wait_for(lambda: not rx_ns["connected"], TIMEOUT)
+        if wait_for(lambda: rx_ns.get("connected") and rx_ns.get("first_notify_ms", -1) >= 0, TIMEOUT) is None:
+            break
+        results.append((rx_ns["ready_ms"], rx_ns["first_notify_ms"], rx_ns["cached"]))
+    real_stdout.write(json.dumps({"results": results, "error": tx_ns.get("_error") or rx_ns.get("_error")}) + "\n")
+    real_stdout.flush()
+    for device in (tx, rx):
+        device.shutdown()
+    os._exit(0)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="BLE GATT 핸들 캐시 유무별 재연결 시간 측정")
+    parser.add_argument("--reconnects", type=int, default=10, help="재연결 횟수")
+    parser.add_argument("--profile", default="balanced", choices=bleprofile.PROFILES, help="연결 프로필")
+    parser.add_argument("--run", choices=["True", "False"], help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run:
+        run_one(args.run == "True", args.reconnects, args.profile)
+        return
+
+    print(f"프로필 {args.profile}, 재연결 {args.reconnects}회 (첫 연결 제외 평균)")
+    print(f"{'설정':<14} {'첫 연결 구독/첫 알림':>20} {'재연결 구독':>12} {'재연결 첫 알림':>14} {'캐시 사용':>9}")
+    for use_cache in (False, True):
+        command = [sys.executable, os.path.abspath(__file__), "--run", str(use_cache),
+                   "--reconnects", str(args.reconnects), "--profile", args.profile]
+        proc = subprocess.run(command, capture_output=True, text=True, timeout=TIMEOUT * (args.reconnects + 2))
+        lines = proc.stdout.strip().splitlines()
+        label = f"GATT_CACHE={use_cache}"
+        if not lines:
+            print(f"{label:<14} 실행 실패: {proc.stderr.strip()[-200:]}")
+            continue
+        result = json.loads(lines[-1])
+        runs = result["results"]
+        if len(runs) < 2:
+            print(f"{label:<14} 재연결 실패 {result['error'] or ''}")
+            continue
+        first, rest = runs[0], runs[1:]
+        ready = sum(r[0] for r in rest) / len(rest)
+        notify = sum(r[1] for r in rest) / len(rest)
+        hits = sum(1 for r in rest if r[2])
+        print(f"{label:<14} {first[0]:>10}ms / {first[1]}ms {ready:>10.0f}ms {notify:>12.0f}ms "
+              f"{hits:>5}/{len(rest)}")
+        if result["error"]:
+            print(f"  스크립트 오류: {result['error']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,163 @@
+"""BLE bt_irq 체류 시간과 타이머 지연 측정: 이벤트 대기열 전후 비교 (호스트 시뮬레이션)
+
+사용법: python host/bench_irq_defer.py [--baseline REV] [--reconnects 8]
+
+led_control/python_bluetooth 트랜스미터(묶음 전송)와 리시버를 host/sim에서
+실행하고, 리시버의 set_profile()로 연결을 끊고 다시 연결하기를 반복한다.
+리시버는 현재 작업 트리의 스크립트와, --baseline을 주면 그 git 리비전의
+스크립트(예: 이벤트 대기열 이전 커밋)를 각각 실행해서 비교한다.
+
+- bt_irq 체류: ble.irq()에 등록된 콜백이 한 번 호출되어 돌아오기까지 (us).
+  스크립트 밖에서 감싸서 재므로 두 버전을 같은 방법으로 잰다
+- 슬루 타이머 최대 지터: 리시버의 500Hz 듀티 갱신 타이머 간격과 설정 주기의
+  최대 차이. 타이머 콜백은 bt_irq와 같은 순서로 처리되므로 bt_irq가 오래
+  머물면 그만큼 밀린다
+- 재연결 -> 구독 완료 평균 (ms)
+
+설정마다 별도 프로세스에서 실행한다.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import threading
+
+_here = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.join(_here, "..")
+sys.path.insert(0, os.path.join(ROOT, "lib"))
+sys.path.insert(0, os.path.join(_here, "sim"))
+
+import histogram  # noqa: E402
+from bench_ble_profiles import wait_for  # noqa: E402
+from bench_led_response import TX_MAC, override  # noqa: E402
+from ticks import ticks_us, ticks_diff  # noqa: E402
+
+TIMEOUT = 30.0  # 연결마다 구독 완료까지 기다리는 최대 시간 (초)
+FOLDER = os.path.join("led_control", "python_bluetooth")
+
+
+def load(rev, name):
+    """스크립트 소스 (rev: None이면 작업 트리, 아니면 git 리비전)"""
+    if rev is None:
+        with open(os.path.join(ROOT, FOLDER, name), encoding="utf-8") as f:
+            return f.read()
+    path = f"{FOLDER}/{name}"
+    return subprocess.run(["git", "show", f"{rev}:{path}"], cwd=ROOT, capture_output=True,
+                          text=True, encoding="utf-8", check=True).stdout
+
+
+def run_source(simcore, device, path, source, namespace):
+    """소스를 장치 스레드에서 실행"""
+    simcore.bind(device)
+    namespace.update({"__name__": "__main__", "__file__": path})
+    try:
+        exec(compile(source, path, "exec"), namespace)
+    except BaseException as e:  # noqa: B902 - 결과는 main()이 판단
+        namespace["_error"] = repr(e)
+
+
+def run_one(rev, reconnects):
+    """자식 프로세스: 재연결을 반복하고 리시버의 bt_irq 체류/타이머 지터/구독 시간을 JSON으로 출력"""
+    import simcore
+    simcore.install()
+    import bluetooth
+    import machine
+
+    # ble.irq()에 등록하는 콜백을 감싸서 장치별 체류 시간 기록
+    residency = {}
+    register = bluetooth.BLE.irq
+
+    def timed_irq(self, handler):
+        hist = residency.setdefault(simcore.current().name, histogram.Histogram(10000000))
+
+        def wrapper(event, data):
+            start = ticks_us()
+            try:
+                handler(event, data)
+            finally:
+                hist.record(ticks_diff(ticks_us(), start))
+        register(self, wrapper)
+
+    bluetooth.BLE.irq = timed_irq
+
+    real_stdout = sys.stdout
+    sys.stdout = open(os.devnull, "w")  # 스크립트 출력은 버림
+    fs = os.path.join(simcore.SIM_DIR, "fs")
+    os.makedirs(fs, exist_ok=True)
+    os.chdir(fs)
+
+    tx = simcore.Device("irqdefer-tx", bytes.fromhex(TX_MAC))
+    rx = simcore.Device("irqdefer-rx")
+    machine.set_adc(3, lambda t: 2048, tx)
+    tx_ns, rx_ns = {}, {}
+    tx_source = override(load(None, "transmitter.py"), {"STREAM": "True"})
+    rx_source = override(load(rev, "receiver.py"), {"STATS_INTERVAL": "600000"})
+    for device, name, source, ns in ((tx, "transmitter.py", tx_source, tx_ns),
+                                     (rx, "receiver.py", rx_source, rx_ns)):
+        path = os.path.join(ROOT, FOLDER, name)
+        threading.Thread(target=run_source, args=(simcore, device, path, source, ns),
+                         name=device.name, daemon=True).start()
+
+    ready = []
+    for i in range(reconnects + 1):
+        if i:
+            rx_ns["set_profile"](rx_ns["BLE_PROFILE"])  # 같은 프로필: 연결을 끊고 다시 연결
+            wait_for(lambda: not rx_ns["connected"], TIMEOUT)
+        if wait_for(lambda: rx_ns.get("connected") and rx_ns.get("ready_ms", -1) >= 0, TIMEOUT) is None:
+            break
+        if i == 0:
+            # 첫 연결(시작 대기, 캐시 없는 검색) 이후 구간만 비교
+            residency[rx.name].reset()
+            rx_ns["dimmer"].reset_stats()
+        else:
+            ready.append(rx_ns["ready_ms"])
+    count, low, avg, p50, p99, high, lost = residency[rx.name].stats()
+    result = {"ready": ready, "count": count, "avg": avg, "p99": p99, "max": high,
+              "jitter": rx_ns["dimmer"].max_jitter, "error": tx_ns.get("_error") or rx_ns.get("_error")}
+    events = rx_ns.get("events")
+    if events is not None:
+        result["queue"] = events.max_depth
+        result["latency"] = events.latency.max
+    real_stdout.write(json.dumps(result) + "\n")
+    real_stdout.flush()
+    for device in (tx, rx):
+        device.shutdown()
+    os._exit(0)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="BLE bt_irq 체류 시간과 타이머 지터 비교")
+    parser.add_argument("--baseline", help="비교할 리시버 git 리비전 (예: 이벤트 대기열 이전 커밋)")
+    parser.add_argument("--reconnects", type=int, default=8, help="재연결 횟수")
+    parser.add_argument("--run", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run:
+        run_one(None if args.run == "-" else args.run, args.reconnects)
+        return
+
+    print(f"LED 리시버, 재연결 {args.reconnects}회 (첫 연결 이후 구간)")
+    print(f"{'리시버':<14} {'bt_irq':>7} {'체류 평균':>9} {'p99':>9} {'최대':>9} "
+          f"{'타이머 지터':>11} {'구독 완료':>9} {'대기열/처리 지연':>16}")
+    for rev in ([args.baseline] if args.baseline else []) + ["-"]:
+        label = "작업 트리" if rev == "-" else rev
+        command = [sys.executable, os.path.abspath(__file__), "--run", rev, "--reconnects", str(args.reconnects)]
+        proc = subprocess.run(command, capture_output=True, text=True, timeout=TIMEOUT * (args.reconnects + 2))
+        lines = proc.stdout.strip().splitlines()
+        if not lines:
+            print(f"{label:<14} 실행 실패: {proc.stderr.strip()[-200:]}")
+            continue
+        r = json.loads(lines[-1])
+        if not r["ready"]:
+            print(f"{label:<14} 재연결 실패 {r['error'] or ''}")
+            continue
+        queue = f"{r['queue']} / {r['latency'] / 1000:.1f}ms" if "queue" in r else "-"
+        print(f"{label:<14} {r['count']:>6}회 {r['avg']:>7}us {r['p99']:>7}us {r['max']:>7}us "
+              f"{r['jitter'] / 1000:>9.1f}ms {sum(r['ready']) / len(r['ready']):>7.0f}ms {queue:>16}")
+        if r["error"]:
+            print(f"  스크립트 오류: {r['error']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,193 @@
+"""LED 제어 노브-LED 반응 지연과 전송량 측정 (호스트 시뮬레이션)
+
+사용법: python host/bench_led_response.py [--step 6] [--steps 5] [--link wifi bluetooth]
+
+led_control 트랜스미터/리시버를 host/sim에서 실행하고, 트랜스미터 ADC 입력을
+STEP초마다 LOW <-> HIGH로 바꾼다 (작은 잡음 포함). 리시버의 PWM 기록에서 각
+입력 변화 뒤 LED 듀티가 새 밝기 쪽으로 절반 이상 움직인 시각까지를 반응 지연으로
+잰다. 고정 간격 전송(SEND_ON_CHANGE = False), 변화 시 전송, 타이머 샘플링 묶음
+전송(STREAM = True), 묶음 전송 + 리시버 재생 지연(PLAYOUT_DELAY)을 비교한다.
+
+설정마다 별도 프로세스에서 실행한다 (스크립트는 끝나지 않는 루프이므로).
+"""
+import argparse
+import json
+import math
+import os
+import re
+import subprocess
+import sys
+import threading
+import time
+
+_here = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.join(_here, "..")
+
+LOW = 800
+HIGH = 3200
+NOISE = 15        # ADC 잡음 진폭
+WARMUP = 8.0      # 연결까지 기다리는 시간 (초)
+IDLE_AFTER = 1.0  # 입력 변화 후 이 시간이 지나면 유휴 구간으로 집계 (초)
+TX_MAC = "dc0675680b52"  # 리시버에 고정된 BLE 트랜스미터 주소
+
+# (이름, 트랜스미터 설정, 리시버 설정)
+MODES = (
+    ("고정 간격 5000ms", {"SEND_ON_CHANGE": "False"}, {}),
+    ("변화 시 전송 200Hz", {"SEND_ON_CHANGE": "True"}, {}),
+    ("묶음 전송 200Hz", {"STREAM": "True"}, {}),
+    ("묶음 + 재생 100ms", {"STREAM": "True"}, {"PLAYOUT_DELAY": "100"}),
+)
+
+
+def knob(t, step):
+    """시각 t(초)의 노브 입력: WARMUP 후 step초마다 LOW <-> HIGH"""
+    level = LOW
+    if t >= WARMUP and int((t - WARMUP) / step) % 2 == 0:
+        level = HIGH
+    return level + NOISE * math.sin(t * 377)
+
+
+def override(source, values):
+    """스크립트의 설정값 줄(NAME = ...)을 바꾼 소스"""
+    for name, value in values.items():
+        source, count = re.subn(rf"^{name} = [^#\n]*", f"{name} = {value} ", source, count=1, flags=re.M)
+        if count != 1:
+            raise ValueError(f"설정값을 찾을 수 없음: {name}")
+    return source
+
+
+def run_script(simcore, device, path, values, namespace):
+    """설정값을 바꾼 스크립트를 장치 스레드에서 실행"""
+    simcore.bind(device)
+    with open(path, encoding="utf-8") as f:
+        code = compile(override(f.read(), values), path, "exec")
+    namespace.update({"__name__": "__main__", "__file__": path})
+    try:
+        exec(code, namespace)
+    except BaseException as e:  # noqa: B902 - 결과는 부모 프로세스가 판단
+        namespace["_error"] = repr(e)
+
+
+def step_latencies(history, step_ticks, end_ticks, ticks_diff):
+    """입력 변화마다 (지연 ms 또는 None) 목록"""
+    results = []
+    for i, start in enumerate(step_ticks):
+        stop = step_ticks[i + 1] if i + 1 < len(step_ticks) else end_ticks
+        before = [d for t, d in history if ticks_diff(t, start) < 0]
+        during = [(t, d) for t, d in history if ticks_diff(t, start) >= 0 and ticks_diff(t, stop) < 0]
+        d0 = before[-1] if before else 0
+        d1 = during[-1][1] if during else d0
+        if abs(d1 - d0) < 1000:
+            results.append(None)  # 다음 변화 전까지 LED가 반응하지 않음
+            continue
+        half = abs(d1 - d0) / 2
+        for t, d in during:
+            if abs(d - d0) >= half:
+                results.append(ticks_diff(t, start))
+                break
+    return results
+
+
+def run_one(link, mode, step, steps):
+    """자식 프로세스: 설정 하나를 실행하고 결과를 JSON으로 출력"""
+    sys.path.insert(0, os.path.join(ROOT, "lib"))
+    sys.path.insert(0, os.path.join(_here, "sim"))
+    import simcore
+    simcore.install()
+    import machine
+    from ticks import ticks_diff
+
+    real_stdout = sys.stdout
+    sys.stdout = open(os.devnull, "w")  # 스크립트 출력은 버림
+    tx_values, rx_values = next(m[1:] for m in MODES if m[0] == mode)
+    os.makedirs(os.path.join(simcore.SIM_DIR, "fs"), exist_ok=True)
+    os.chdir(os.path.join(simcore.SIM_DIR, "fs"))
+
+    folder = os.path.join(ROOT, "led_control", f"python_{link}")
+    tx = simcore.Device(f"{link}-tx", bytes.fromhex(TX_MAC) if link == "bluetooth" else None)
+    rx = simcore.Device(f"{link}-rx")
+    machine.set_adc(3, lambda t: knob(t, step), tx)
+    tx_ns, rx_ns = {}, {}
+    threads = [
+        threading.Thread(target=run_script, args=(simcore, tx, os.path.join(folder, "transmitter.py"), tx_values, tx_ns),
+                         name=tx.name, daemon=True),
+        threading.Thread(target=run_script, args=(simcore, rx, os.path.join(folder, "receiver.py"), rx_values, rx_ns),
+                         name=rx.name, daemon=True),
+    ]
+    for thread in threads:
+        thread.start()
+
+    def wait_until(t):
+        time.sleep(max(0, tx.started + t - time.monotonic()))
+
+    def snapshot():
+        return tx_ns["adc"].reads, tx_ns.get("count", 0)
+
+    wait_until(WARMUP)
+    first = snapshot()
+    idle_packets = 0
+    idle_time = 0
+    for k in range(steps):
+        wait_until(WARMUP + k * step + IDLE_AFTER)
+        idle_start = snapshot()
+        wait_until(WARMUP + (k + 1) * step)
+        idle_packets += snapshot()[1] - idle_start[1]
+        idle_time += step - IDLE_AFTER
+    last = snapshot()
+    window = steps * step
+
+    step_ticks = [int((tx.started + WARMUP + k * step) * 1000) & ((1 << 30) - 1) for k in range(steps)]
+    end_ticks = int((tx.started + WARMUP + window) * 1000) & ((1 << 30) - 1)
+    history = list(rx_ns["led"].history) if "led" in rx_ns else []
+    result = {
+        "samples": (last[0] - first[0]) / window,
+        "packets": (last[1] - first[1]) / window,
+        "idle_packets": idle_packets / idle_time,
+        "latencies": step_latencies(history, step_ticks, end_ticks, ticks_diff),
+        "error": tx_ns.get("_error") or rx_ns.get("_error"),
+    }
+    real_stdout.write(json.dumps(result) + "\n")
+    real_stdout.flush()
+    for device in (tx, rx):
+        device.shutdown()
+    os._exit(0)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="LED 제어 노브-LED 반응 지연과 전송량 측정")
+    parser.add_argument("--step", type=float, default=6.0, help="입력을 바꾸는 간격 (초)")
+    parser.add_argument("--steps", type=int, default=5, help="입력 변화 횟수")
+    parser.add_argument("--link", nargs="+", default=["wifi", "bluetooth"], choices=["wifi", "bluetooth"])
+    parser.add_argument("--run", nargs=2, metavar=("LINK", "MODE"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run:
+        run_one(args.run[0], args.run[1], args.step, args.steps)
+        return
+
+    print(f"입력: {LOW} <-> {HIGH} (잡음 ±{NOISE}), {args.step}초마다 {args.steps}회 변화")
+    print(f"{'링크':<10} {'방식':<18} {'샘플/s':>8} {'전송/s':>8} {'유휴 전송/s':>11} "
+          f"{'평균 지연(ms)':>13} {'최대(ms)':>9} {'반응 없음':>9}")
+    for link in args.link:
+        for mode, _, _ in MODES:
+            timeout = WARMUP + args.step * args.steps + 30
+            proc = subprocess.run([sys.executable, os.path.abspath(__file__), "--run", link, mode,
+                                   "--step", str(args.step), "--steps", str(args.steps)],
+                                  capture_output=True, text=True, timeout=timeout)
+            lines = proc.stdout.strip().splitlines()
+            if not lines:
+                print(f"{link:<10} {mode:<18} 실행 실패: {proc.stderr.strip()[-200:]}")
+                continue
+            result = json.loads(lines[-1])
+            measured = [v for v in result["latencies"] if v is not None]
+            missed = len(result["latencies"]) - len(measured)
+            avg = f"{sum(measured) / len(measured):.0f}" if measured else "-"
+            worst = f"{max(measured)}" if measured else "-"
+            print(f"{link:<10} {mode:<18} {result['samples']:8.1f} {result['packets']:8.2f} "
+                  f"{result['idle_packets']:11.2f} {avg:>13} {worst:>9} {missed:>9}")
+            if result["error"]:
+                print(f"  스크립트 오류: {result['error']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,169 @@
+"""BLE 알림 전송 대기열: 메인 루프가 멈춘 뒤 몰린 알림의 손실과 지연 비교 (호스트 시뮬레이션)
+
+사용법: python host/bench_notify_queue.py [--baseline REV] [--duration 10] [--stall 200] [--txq 12]
+
+led_control/python_bluetooth 트랜스미터(묶음 전송 500Hz)와 리시버를 MTU 23(알림 20바이트,
+샘플 6개)으로 연결하고, 트랜스미터 메인 루프를 2초마다 --stall ms 동안 멈춘다 (GC, 플래시
+쓰기 등). 그동안 타이머가 쌓은 샘플은 루프가 돌아오면 알림 여러 개로 한꺼번에 나가므로
+BLE 전송 버퍼(--txq, 시뮬레이션 기본 12개)를 넘친다. 평균 알림 수(83/s)는 연결 간격(30ms)마다
+4개씩 보낼 수 있는 양보다 적으므로, 알림을 보관했다가 다시 보내면 손실이 없어야 한다.
+
+- 트랜스미터는 현재 작업 트리의 스크립트와, --baseline을 주면 그 git 리비전의
+  스크립트(예: 알림 대기열 이전 커밋)를 각각 실행
+- 작업 트리는 NOTIFY_QUEUE/NOTIFY_POLICY를 바꿔 가며 실행
+- 샘플 손실: 리시버 SeqTracker가 센 묶음 샘플 인덱스의 빈틈
+- 지연: 리시버 [통계]와 같은 TransitHistogram (알림의 마지막 샘플 시각 -> 수신, 최소 대비)
+
+설정마다 별도 프로세스에서 실행한다.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+
+_here = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.join(_here, "..")
+sys.path.insert(0, os.path.join(ROOT, "lib"))
+sys.path.insert(0, os.path.join(_here, "sim"))
+
+from bench_ble_profiles import wait_for  # noqa: E402
+from bench_irq_defer import FOLDER, load, run_source  # noqa: E402
+from bench_led_response import TX_MAC, override  # noqa: E402
+
+TIMEOUT = 30.0  # 첫 알림까지 기다리는 최대 시간 (초)
+WARMUP = 1.0  # 첫 알림 후 측정 시작까지 (초)
+STREAM_VALUES = {"STREAM": "True", "STREAM_RATE": "500"}
+STALL_EVERY = 2.0  # 메인 루프를 멈추는 주기 (초)
+
+# (이름, 작업 트리 트랜스미터 설정)
+CONFIGS = [
+    ("대기열 8, COALESCE", {}),
+    ("대기열 2, DROP_OLDEST", {"NOTIFY_QUEUE": "2", "NOTIFY_POLICY": "notifyqueue.DROP_OLDEST"}),
+    ("대기열 2, DROP_NEWEST", {"NOTIFY_QUEUE": "2", "NOTIFY_POLICY": "notifyqueue.DROP_NEWEST"}),
+]
+
+
+def stall_loop(log, stall_ms):
+    """트랜스미터 메인 루프가 부르는 log.flush()를 감싸 STALL_EVERY마다 stall_ms 동안 멈춤"""
+    flush = log.flush
+    state = {"next": time.monotonic() + STALL_EVERY}
+
+    def stalled():
+        now = time.monotonic()
+        if now >= state["next"]:
+            state["next"] = now + STALL_EVERY
+            time.sleep(stall_ms / 1000)
+        return flush()
+    log.flush = stalled
+
+
+def run_one(rev, index, duration, stall_ms, txq):
+    """자식 프로세스: 샘플 손실/지연/대기열 통계를 JSON으로 출력"""
+    import simcore
+    simcore.install()
+    import bluetooth
+    import machine
+
+    if txq:
+        bluetooth.TX_QUEUE = txq
+    real_stdout = sys.stdout
+    sys.stdout = open(os.devnull, "w")  # 스크립트 출력은 버림
+    fs = os.path.join(simcore.SIM_DIR, "fs")
+    os.makedirs(fs, exist_ok=True)
+    os.chdir(fs)
+
+    tx = simcore.Device("notifyq-tx", bytes.fromhex(TX_MAC))
+    rx = simcore.Device("notifyq-rx")
+    machine.set_adc(3, lambda t: 2048 + 1500 * ((t * 0.5) % 2 - 1), tx)  # 2초 주기 톱니파
+    tx_ns, rx_ns = {}, {}
+    tx_values = dict(STREAM_VALUES, LOG_LEVEL="rlog.INFO", STATS_INTERVAL="600000")
+    if rev is None:
+        tx_values.update(CONFIGS[index][1])
+    tx_source = override(load(rev, "transmitter.py"), tx_values)
+    rx_source = override(load(None, "receiver.py"), {"BLE_MTU": "23", "STATS_INTERVAL": "600000",
+                                                     "LOG_LEVEL": "rlog.INFO"})
+    for device, name, source, ns in ((tx, "transmitter.py", tx_source, tx_ns),
+                                     (rx, "receiver.py", rx_source, rx_ns)):
+        path = os.path.join(ROOT, FOLDER, name)
+        threading.Thread(target=run_source, args=(simcore, device, path, source, ns),
+                         name=device.name, daemon=True).start()
+
+    result = {"error": None}
+    if wait_for(lambda: rx_ns.get("connected") and rx_ns["transit"].count, TIMEOUT) is None:
+        result["error"] = tx_ns.get("_error") or rx_ns.get("_error") or "연결 시간 초과"
+    else:
+        time.sleep(WARMUP)
+        stall_loop(tx_ns["log"], stall_ms)
+        time.sleep(STALL_EVERY)
+        seqs, transit = rx_ns["seqs"], rx_ns["transit"]
+        seqs.reset_stats()
+        transit.reset()
+        notifies = rx_ns["notifies"]
+        failures = tx_ns["link"].failures
+        time.sleep(duration)
+        count, low, avg, p50, p99, high, lost = transit.stats()
+        result.update({
+            "lost": seqs.lost, "rate": (rx_ns["notifies"] - notifies) / duration,
+            "p99": p99, "max": high, "failures": tx_ns["link"].failures - failures,
+            "error": tx_ns.get("_error") or rx_ns.get("_error"),
+        })
+        notifier = tx_ns.get("notifier")
+        if notifier is not None:
+            result["queue"] = (notifier.max_depth, notifier.size, notifier.queued, notifier.dropped)
+    real_stdout.write(json.dumps(result) + "\n")
+    real_stdout.flush()
+    for device in (tx, rx):
+        device.shutdown()
+    os._exit(0)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="BLE 알림 전송 대기열 비교 (작은 전송 버퍼)")
+    parser.add_argument("--baseline", help="비교할 트랜스미터 git 리비전 (예: 알림 대기열 이전 커밋)")
+    parser.add_argument("--duration", type=float, default=10.0, help="설정마다 측정 시간 (초)")
+    parser.add_argument("--stall", type=int, default=200, help="트랜스미터 메인 루프를 멈추는 시간 (ms)")
+    parser.add_argument("--txq", type=int, help="시뮬레이션 BLE 전송 대기 패킷 한도 (기본: 시뮬레이션 기본값)")
+    parser.add_argument("--run", help=argparse.SUPPRESS)
+    parser.add_argument("--index", type=int, default=0, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run:
+        run_one(None if args.run == "-" else args.run, args.index, args.duration, args.stall, args.txq)
+        return
+
+    runs = [(args.baseline, 0, args.baseline)] if args.baseline else []
+    runs += [("-", i, name) for i, (name, values) in enumerate(CONFIGS)]
+    txq = f"전송 대기 패킷 {args.txq}개" if args.txq else "전송 대기 패킷 기본값"
+    print(f"LED 묶음 전송 500Hz, MTU 23, {STALL_EVERY:g}초마다 메인 루프 {args.stall}ms 멈춤, {txq}, "
+          f"{args.duration:g}초")
+    print(f"{'트랜스미터':<22} {'알림/s':>7} {'샘플 손실':>9} {'지연 p99':>9} {'최대':>8} "
+          f"{'대기열 최대/보관/버림':>20} {'연결 실패':>9}")
+    for rev, index, label in runs:
+        command = [sys.executable, os.path.abspath(__file__), "--run", rev, "--index", str(index),
+                   "--duration", str(args.duration), "--stall", str(args.stall)]
+        if args.txq:
+            command += ["--txq", str(args.txq)]
+        proc = subprocess.run(command, capture_output=True, text=True, timeout=TIMEOUT + args.duration + 30)
+        lines = proc.stdout.strip().splitlines()
+        if not lines:
+            print(f"{label:<22} 실행 실패: {proc.stderr.strip()[-200:]}")
+            continue
+        r = json.loads(lines[-1])
+        if "lost" not in r:
+            print(f"{label:<22} 실행 실패: {r['error']}")
+            continue
+        queue = "-"
+        if "queue" in r:
+            depth, size, queued, dropped = r["queue"]
+            queue = f"{depth}/{size} {queued} {dropped}"
+        print(f"{label:<22} {r['rate']:>7.1f} {r['lost']:>9} {r['p99'] / 1000:>7.1f}ms {r['max'] / 1000:>6.1f}ms "
+              f"{queue:>20} {r['failures']:>9}")
+        if r["error"]:
+            print(f"  스크립트 오류: {r['error']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+"""요청 윈도우 크기별 처리량 측정 (호스트 PC에서 실행)
+
+사용법: python host/bench_pipeline.py [--requests N] [--delay-ms D]
+
+루프백 TCP 위에 리시버를 흉내내는 에코 서버를 띄우고, 각 응답을 D ms 늦게
+돌려보내 무선 구간의 지연을 모사한다. 트랜스미터와 같은 방식(RequestWindow +
+시퀀스 태그)으로 윈도우 크기 1, 4, 16에서 초당 요청 수를 측정한다.
+"""
+import argparse
+import heapq
+import os
+import select
+import socket
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "lib"))
+
+import framing  # noqa: E402
+import histogram  # noqa: E402
+import pipeline  # noqa: E402
+
+WINDOW_SIZES = (1, 4, 16)
+REQUEST_TIMEOUT = 5000
+
+
+def echo_server(server, delay):
+    """리시버 역할: 요청 태그를 유지한 채 '<메시지> world'를 delay초 후 응답"""
+    conn, _ = server.accept()
+    conn.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)  # 응답을 Nagle/지연 ACK로 묶지 않음
+    reader = framing.FrameReader()
+    pending = []  # (응답 시각, 순번, 프레임)
+    order = 0
+    while True:
+        timeout = None
+        if pending:
+            timeout = max(0.0, pending[0][0] - time.perf_counter())
+        readable, _, _ = select.select([conn], [], [], timeout)
+        if readable:
+            data = conn.recv(1024)
+            if not data:
+                break
+            reader.feed(data)
+            while True:
+                payload = reader.read_frame()
+                if payload is None:
+                    break
+                tag = bytes(payload[:pipeline.TAG_SIZE])
+                response = bytes(payload[pipeline.TAG_SIZE:]) + b" world"
+                order += 1
+                heapq.heappush(pending, (time.perf_counter() + delay, order, framing.encode(tag + response)))
+        now = time.perf_counter()
+        while pending and pending[0][0] <= now:
+            conn.sendall(heapq.heappop(pending)[2])
+    conn.close()
+
+
+def run(window_size, requests, delay):
+    server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    server.bind(("127.0.0.1", 0))
+    server.listen(1)
+    thread = threading.Thread(target=echo_server, args=(server, delay))
+    thread.start()
+
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+    sock.connect(server.getsockname())
+    sock.settimeout(REQUEST_TIMEOUT / 1000)
+    reader = framing.FrameReader()
+    hist = histogram.Histogram()
+    window = pipeline.RequestWindow(window_size, REQUEST_TIMEOUT, hist)
+
+    count = 0
+    rtt_total = 0
+    start = time.perf_counter()
+    while window.completed + window.timeouts < requests:
+        window.expire()
+        while window.can_send() and count < requests:
+            count += 1
+            seq = count & pipeline.SEQ_MASK
+            sock.sendall(framing.encode(pipeline.make_tag(seq) + b"hello"))
+            window.add(seq)
+        try:
+            data = sock.recv(1024)
+        except socket.timeout:
+            continue  # 응답이 오지 않은 요청은 다음 window.expire()에서 타임아웃으로 집계
+        if not data:
+            break
+        reader.feed(data)
+        while True:
+            payload = reader.read_frame()
+            if payload is None:
+                break
+            rtt = window.complete(pipeline.read_tag(payload))
+            if rtt >= 0:
+                rtt_total += rtt
+    elapsed = time.perf_counter() - start
+
+    sock.close()
+    thread.join()
+    server.close()
+    return {
+        "window": window_size,
+        "req_per_s": window.completed / elapsed,
+        "avg_rtt": rtt_total / max(1, window.completed),
+        "p50": hist.percentile(50) / 1000,
+        "p99": hist.percentile(99) / 1000,
+        "completed": window.completed,
+        "timeouts": window.timeouts,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="요청 윈도우 크기별 처리량 측정")
+    parser.add_argument("--requests", type=int, default=2000, help="윈도우 크기별 요청 수")
+    parser.add_argument("--delay-ms", type=float, default=5.0, help="모사할 응답 지연 (ms)")
+    args = parser.parse_args()
+
+    print(f"응답 지연 {args.delay_ms}ms, 요청 {args.requests}개")
+    print(f"{'윈도우':>6} {'요청/s':>10} {'평균 RTT(ms)':>12} {'p50(ms)':>8} {'p99(ms)':>8} {'완료':>6} {'타임아웃':>8}")
+    for size in WINDOW_SIZES:
+        r = run(size, args.requests, args.delay_ms / 1000)
+        print(f"{r['window']:>6} {r['req_per_s']:>10.0f} {r['avg_rtt']:>12.1f} {r['p50']:>8.1f} {r['p99']:>8.1f} "
+              f"{r['completed']:>6} {r['timeouts']:>8}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""재연결 정책별 평균 복구 시간(MTTR) 비교 (호스트 PC에서 실행)
+
+사용법: python host/bench_supervisor.py [--outages 1000] [--seed 1]
+
+가상 시계 위에서 연결 끊김(장애)을 반복해서 발생시키고, 장애가 끝난 뒤 다시
+연결될 때까지 걸린 시간을 정책별로 비교한다.
+
+- 기존 방식: 5초마다 재시도, 5회 실패하면 장치 재시작 (재시작 비용 포함)
+- lib/supervisor.py: 0.5초부터 2배씩 늘어나는 백오프(최대 10초, ±25% 편차),
+  연속 10회 실패 시에만 재시작
+
+장애 시간은 대부분 짧고(평균 2초) 가끔 길게(평균 40초) 발생하도록 만든다.
+"""
+import argparse
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "lib"))
+
+import supervisor  # noqa: E402
+
+ATTEMPT_MS = 300       # 연결 시도 한 번에 걸리는 시간
+REBOOT_MS = 4000       # 재시작 비용 (시작 대기 1초 + WiFi/BLE 초기화)
+LONG_OUTAGE_RATIO = 0.1
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0
+
+    def __call__(self):
+        return self.now
+
+
+def outage_lengths(count, rng):
+    """장애 지속 시간 목록 (ms)"""
+    lengths = []
+    for _ in range(count):
+        mean = 40000 if rng.random() < LONG_OUTAGE_RATIO else 2000
+        lengths.append(int(rng.expovariate(1 / mean)))
+    return lengths
+
+
+def legacy_recovery(outage, clock):
+    """기존 방식: RETRY_INTERVAL마다 재시도, MAX_RETRY_COUNT회 실패 시 재시작"""
+    start = clock.now
+    retry_count = 0
+    resets = 0
+    while True:
+        clock.now += ATTEMPT_MS
+        if clock.now - start >= outage:
+            return clock.now - start, resets
+        retry_count += 1
+        if retry_count >= 5:
+            clock.now += REBOOT_MS
+            retry_count = 0
+            resets += 1
+        else:
+            clock.now += 5000
+
+
+def supervisor_recovery(outage, clock, sup):
+    """상태 머신: 실패할 때마다 백오프, 연속 실패가 쌓였을 때만 재시작"""
+    start = clock.now
+    sup.fail("연결 끊김")
+    while True:
+        clock.now += sup.remaining()
+        sup.begin()
+        clock.now += ATTEMPT_MS
+        if clock.now - start >= outage:
+            sup.up()
+            return clock.now - start
+        resets = sup.resets
+        sup.fail("연결 실패")
+        if sup.resets != resets:
+            clock.now += REBOOT_MS
+
+
+def percentile(samples, ratio):
+    return samples[min(len(samples) - 1, int(len(samples) * ratio))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="재연결 정책별 평균 복구 시간 비교")
+    parser.add_argument("--outages", type=int, default=1000, help="장애 발생 횟수")
+    parser.add_argument("--seed", type=int, default=1, help="난수 시드")
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    lengths = outage_lengths(args.outages, rng)
+
+    clock = Clock()
+    legacy = []
+    legacy_resets = 0
+    for outage in lengths:
+        elapsed, resets = legacy_recovery(outage, clock)
+        legacy.append(elapsed)
+        legacy_resets += resets
+
+    clock = Clock()
+    sup = supervisor.Supervisor("sim", verbose=False, clock=clock, rand=rng.random)
+    sup.on_reset = lambda: setattr(sup, "failures", 0)  # 재시작하면 실패 횟수도 처음부터
+    sup.begin()
+    sup.up()
+    managed = [supervisor_recovery(outage, clock, sup) for outage in lengths]
+
+    print(f"장애 {args.outages}회 (짧은 장애 평균 2초, {LONG_OUTAGE_RATIO:.0%}는 평균 40초)")
+    print(f"{'정책':<20} {'MTTR(ms)':>9} {'p50(ms)':>9} {'p99(ms)':>9} {'재시작':>6}")
+    for name, samples, resets in (("5초 간격 + 5회 재시작", legacy, legacy_resets),
+                                  ("백오프 상태 머신", managed, sup.resets)):
+        ordered = sorted(samples)
+        mttr = sum(samples) / len(samples)
+        print(f"{name:<20} {mttr:>9.0f} {percentile(ordered, 0.5):>9} {percentile(ordered, 0.99):>9} {resets:>6}")
+    print(f"상태 머신 기록: 평균 복구 {sup.mttr()}ms | 최대 복구 {sup.recovery_max}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""asyncio 스트림 서버 부하 테스트 (호스트 PC에서 실행)
+
+사용법: python host/load_async_server.py [--clients 50] [--seconds 5]
+
+lib/hello_server.py 서버를 루프백에 띄우고 리시버 역할의 클라이언트 N개를
+동시에 연결한다. 각 클라이언트는 받은 요청의 태그를 유지한 채 "hello world"로
+응답한다. 서버가 기록한 왕복 시간으로 전체 초당 왕복 수와 p99 지연을 출력한다.
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "lib"))
+
+import framing  # noqa: E402
+import hello_server  # noqa: E402
+import pipeline  # noqa: E402
+
+
+async def receiver(port, stop, writers):
+    """리시버 흉내: 요청마다 같은 태그로 '<메시지> world' 응답"""
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    writers.append(writer)
+    frames = framing.FrameReader()
+    while not stop.is_set():
+        data = await reader.read(1024)
+        if not data:
+            break
+        frames.feed(data)
+        while True:
+            payload = frames.read_frame()
+            if payload is None:
+                break
+            tag = bytes(payload[:pipeline.TAG_SIZE])
+            writer.write(framing.encode(tag + bytes(payload[pipeline.TAG_SIZE:]) + b" world"))
+        await writer.drain()
+    writer.close()
+
+
+async def run(clients, seconds):
+    config = hello_server.ServerConfig(send_interval=0, verbose=False)
+    stats = hello_server.ServerStats()
+    rtts = []
+    config.on_rtt = rtts.append
+    server = await hello_server.start("127.0.0.1", 0, config, stats, backlog=clients)
+    port = server.sockets[0].getsockname()[1]
+
+    stop = asyncio.Event()
+    writers = []
+    tasks = [asyncio.ensure_future(receiver(port, stop, writers)) for _ in range(clients)]
+    await asyncio.sleep(0.5)  # 모든 클라이언트 연결 대기
+    connected = stats.clients
+    start_trips = stats.round_trips
+    del rtts[:]
+    start = time.perf_counter()
+    await asyncio.sleep(seconds)
+    elapsed = time.perf_counter() - start
+    trips = stats.round_trips - start_trips
+    samples = sorted(rtts)
+
+    # 클라이언트 연결을 닫고 서버 코루틴이 모두 끝날 때까지 대기
+    stop.set()
+    for writer in writers:
+        writer.close()
+    for _ in range(100):
+        if stats.clients == 0:
+            break
+        await asyncio.sleep(0.02)
+    server.close()
+    await server.wait_closed()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    return connected, trips / elapsed, samples, stats.timeouts
+
+
+def main():
+    parser = argparse.ArgumentParser(description="asyncio 스트림 서버 동시 접속 부하 테스트")
+    parser.add_argument("--clients", type=int, default=50, help="동시 연결 클라이언트 수")
+    parser.add_argument("--seconds", type=float, default=5.0, help="측정 시간 (초)")
+    args = parser.parse_args()
+
+    # 서버의 연결/종료 메시지는 클라이언트 수만큼 반복되므로 출력하지 않음
+    with contextlib.redirect_stdout(io.StringIO()):
+        connected, rate, samples, timeouts = asyncio.run(run(args.clients, args.seconds))
+    if not samples:
+        print("완료된 왕복이 없습니다.")
+        sys.exit(1)
+    p50 = samples[len(samples) // 2] / 1000
+    p99 = samples[min(len(samples) - 1, int(len(samples) * 0.99))] / 1000
+    print(f"동시 연결: {connected}/{args.clients}")
+    print(f"전체 왕복: {rate:.0f}회/s ({args.seconds:.0f}초간 {len(samples)}회)")
+    print(f"왕복 지연: p50 {p50:.2f}ms | p99 {p99:.2f}ms | 최대 {samples[-1] / 1000:.2f}ms")
+    print(f"응답 타임아웃: {timeouts}건")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,169 @@
+"""rlog 바이너리 기록을 한글 메시지로 복원 (호스트 PC에서 실행)
+
+사용법:
+    python host/rlog_decode.py --port COM6 [--reset]      # 보드 시리얼 출력 모니터
+    python host/rlog_decode.py serial.log                 # 저장한 출력 파일
+    python host/run_sim.py ... | python host/rlog_decode.py
+
+"~"로 시작하는 16진수 줄(lib/rlog.py의 기록)은 lib/logcodes.py 주석의 메시지
+형식으로 복원하고, 나머지 줄(일반 print() 출력)은 그대로 출력한다. 시뮬레이션의
+"[장치 이름] " 접두어는 유지한다. 순번이 건너뛰면 UART 출력 유실로 표시한다.
+"""
+import argparse
+import os
+import re
+import sys
+import uuid as uuidlib
+
+_here = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(_here, "..", "lib"))
+
+import rlog  # noqa: E402
+
+LOGCODES = os.path.join(_here, "..", "lib", "logcodes.py")
+LEVEL_NAMES = ("D", "I", "W", "E")
+
+_CODE_LINE = re.compile(r"^([A-Z][A-Z0-9_]*)\s*=\s*(\d+)\s*#\s?(.*)$")
+_RECORD = re.compile(r"^(.*?)~([0-9a-f]+)\s*$")
+
+
+def load_messages(path=LOGCODES):
+    """logcodes.py에서 {코드: (이름, 메시지 형식)} 읽기"""
+    messages = {}
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            match = _CODE_LINE.match(line.strip())
+            if match:
+                name, code, text = match.groups()
+                messages[int(code)] = (name, text.rstrip())
+    return messages
+
+
+def format_uuid(raw):
+    """리틀 엔디언 128비트 UUID 바이트를 문자열로 (MicroPython의 UUID 출력과 동일)"""
+    if len(raw) == 16:
+        return str(uuidlib.UUID(bytes=bytes(reversed(raw))))
+    if len(raw) == 2:
+        return f"0x{int.from_bytes(raw, 'little'):04x}"
+    return raw.hex()
+
+
+def parse_record(data):
+    """기록 바이트 -> (코드, 레벨, 순번, ticks_ms, 정수 인자 목록, 바이트 인자)"""
+    code, flags, length, seq = data[0], data[1], data[2], data[3]
+    ints = flags >> 4
+    ticks = int.from_bytes(data[4:8], "little")
+    args = []
+    pos = rlog.HEADER_SIZE
+    for _ in range(ints):
+        args.append(int.from_bytes(data[pos:pos + 4], "little", signed=True))
+        pos += 4
+    raw = bytes(data[pos:pos + length])
+    if pos + length != len(data):
+        raise ValueError("기록 길이 불일치")
+    return code, flags & 0x0F, seq, ticks, args, raw
+
+
+def format_record(messages, code, args, raw):
+    """메시지 형식에 인자를 넣어 문자열로"""
+    entry = messages.get(code)
+    values = dict(zip("abc", args))
+    if entry is None:
+        return f"[알 수 없는 코드 {code}] 인자={args} 데이터={raw.hex()}"
+    name, text = entry
+    env = {"s": raw.decode("utf-8", "replace"), "raw": raw, "uuid": format_uuid}
+    env.update(values)
+    try:
+        return eval("f" + repr(text), {"__builtins__": {}}, env)
+    except Exception as e:
+        return f"[{name} 형식 오류: {e}] 인자={args} 데이터={raw.hex()}"
+
+
+class Decoder:
+    """출력 줄 단위 디코더 (출처별로 순번 추적)"""
+
+    def __init__(self, messages, show_time=False, show_level=False):
+        self.messages = messages
+        self.show_time = show_time
+        self.show_level = show_level
+        self.last_seq = {}
+        self.missing = 0
+
+    def decode_line(self, line):
+        """한 줄 -> 출력할 줄 목록"""
+        match = _RECORD.match(line)
+        if not match:
+            return [line]
+        prefix, hexdata = match.groups()
+        try:
+            code, level, seq, ticks, args, raw = parse_record(bytes.fromhex(hexdata))
+        except ValueError:
+            return [line]  # 기록이 아닌 "~"로 시작하는 출력
+        out = []
+        last = self.last_seq.get(prefix)
+        if last is not None and seq != (last + 1) & 0xFF:
+            gap = (seq - last - 1) & 0xFF
+            self.missing += gap
+            out.append(f"{prefix}[rlog] 기록 {gap}개 누락 (출력 유실 또는 보드 재시작)")
+        self.last_seq[prefix] = seq
+        text = format_record(self.messages, code, args, raw)
+        head = prefix
+        if self.show_time:
+            head += f"[{ticks / 1000:10.3f}] "
+        if self.show_level:
+            head += f"{LEVEL_NAMES[level] if level < len(LEVEL_NAMES) else level} "
+        out.append(head + text)
+        return out
+
+
+def read_serial(port, baud, reset):
+    """시리얼 포트에서 줄 단위로 읽기 (pyserial 필요, mpremote 설치 시 함께 설치됨)"""
+    try:
+        import serial
+    except ImportError:
+        sys.exit("pyserial이 필요합니다: pip install pyserial")
+    with serial.Serial(port, baud, timeout=0.5) as ser:
+        if reset:
+            ser.write(b"\x03\x03\x04")  # 실행 중인 스크립트 중단 후 소프트 리셋 (main.py 다시 실행)
+        pending = b""
+        while True:
+            pending += ser.read(ser.in_waiting or 1)
+            while b"\n" in pending:
+                line, pending = pending.split(b"\n", 1)
+                yield line.decode("utf-8", "replace").rstrip("\r")
+
+
+def read_lines(stream):
+    for line in stream:
+        yield line.rstrip("\r\n")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="rlog 기록을 메시지로 복원")
+    parser.add_argument("file", nargs="?", help="저장한 시리얼 출력 (생략 시 표준 입력)")
+    parser.add_argument("--port", help="보드 시리얼 포트 (예: COM6, /dev/ttyACM0)")
+    parser.add_argument("--baud", type=int, default=115200)
+    parser.add_argument("--reset", action="store_true", help="연결 후 소프트 리셋으로 스크립트 다시 실행")
+    parser.add_argument("--time", action="store_true", help="기록 시각(ticks_ms, 초) 표시")
+    parser.add_argument("--level", action="store_true", help="레벨(D/I/W/E) 표시")
+    args = parser.parse_args()
+
+    decoder = Decoder(load_messages(), args.time, args.level)
+    if args.port:
+        lines = read_serial(args.port, args.baud, args.reset)
+    elif args.file:
+        lines = read_lines(open(args.file, encoding="utf-8", errors="replace"))
+    else:
+        lines = read_lines(sys.stdin)
+    try:
+        for line in lines:
+            for out in decoder.decode_line(line):
+                print(out, flush=True)
+    except KeyboardInterrupt:
+        pass
+    if decoder.missing:
+        print(f"[rlog] 누락된 기록: {decoder.missing}개", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,184 @@
+"""보드 스크립트를 수정 없이 호스트 PC에서 실행 (시뮬레이션)
+
+사용법:
+    python host/run_sim.py hello_world/python_wifi/transmitter.py hello_world/python_wifi/receiver.py
+    python host/run_sim.py hello_world/python_bluetooth/transmitter.py@dc0675680b52 \\
+                           hello_world/python_bluetooth/receiver.py --duration 30
+
+스크립트 하나가 가상 보드 하나이며 각자의 스레드에서 실행된다. host/sim/의
+network, machine, bluetooth, micropython 대체 모듈을 사용한다.
+
+- WiFi: 실제 루프백 TCP/UDP 소켓 (AP별 루프백 대역 127.a.b.x). AP 정보는
+  SIM_DIR에 기록되므로 트랜스미터와 리시버를 별도의 run_sim.py 프로세스로
+  실행해도 연결된다. UDP 브로드캐스트는 같은 프로세스에서 바인드한 소켓마다 전달한다.
+- BLE: 같은 프로세스 안의 GATT 버스 (트랜스미터와 리시버를 한 번에 실행)
+- `스크립트@MAC`: 장치 MAC 주소 지정 (리시버에 고정된 트랜스미터 주소 등)
+- 출력 줄 앞에 [장치 이름]이 붙는다. machine.reset()은 스크립트를 다시 실행한다.
+"""
+import argparse
+import math
+import os
+import runpy
+import sys
+import threading
+import time
+import traceback
+
+_here = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(_here, "..", "lib"))
+sys.path.insert(0, os.path.join(_here, "sim"))
+
+import simcore  # noqa: E402
+
+
+class PrefixWriter:
+    """스레드가 속한 장치 이름을 줄 앞에 붙여서 출력"""
+
+    def __init__(self, stream):
+        self.stream = stream
+        self.lock = threading.Lock()
+        self.partial = {}
+
+    def write(self, text):
+        name = threading.current_thread().name.split("-irq")[0]
+        if name == "MainThread":
+            name = "sim"
+        with self.lock:
+            buf = self.partial.get(name, "") + text
+            lines = buf.split("\n")
+            self.partial[name] = lines.pop()
+            for line in lines:
+                self.stream.write(f"[{name}] {line}\n")
+            self.stream.flush()
+        return len(text)
+
+    def flush(self):
+        self.stream.flush()
+
+
+def device_name(path, taken):
+    """스크립트 경로에서 장치 이름 생성 (예: wifi-tx, bluetooth-rx)"""
+    base = os.path.splitext(os.path.basename(path))[0]
+    short = {"transmitter": "tx", "receiver": "rx"}.get(base, base)
+    parent = os.path.basename(os.path.dirname(os.path.abspath(path))).replace("python_", "")
+    name = f"{parent}-{short}"
+    index = 2
+    while name in taken:
+        name = f"{parent}-{short}{index}"
+        index += 1
+    return name
+
+
+def run_device(device, path, stop):
+    """스크립트 실행 (reset() 호출 시 처음부터 다시 실행)"""
+    simcore.bind(device)
+    while not stop.is_set():
+        try:
+            runpy.run_path(path, run_name="__main__")
+            print("스크립트 종료")
+            return
+        except simcore.Reset:
+            print("[sim] machine.reset() - 스크립트 재시작")
+            device.shutdown()
+        except KeyboardInterrupt:
+            return
+        except BaseException:
+            traceback.print_exc(file=sys.stdout)
+            return
+
+
+def parse_adc(spec):
+    """--adc 옵션: 핀=값 또는 핀=t(초)에 대한 식 (예: 3=2048+2000*sin(t))"""
+    pin, expr = spec.split("=", 1)
+    code = compile(expr, "<adc>", "eval")
+    env = {name: getattr(math, name) for name in dir(math) if not name.startswith("_")}
+    return int(pin), (lambda t: eval(code, env, {"t": t}))
+
+
+def write_pwm_log(path, devices):
+    """장치별 PWM 듀티 기록을 CSV로 저장"""
+    with open(path, "w") as f:
+        f.write("device,pin,ticks_ms,duty_u16\n")
+        for device in devices:
+            for pwm in device.pwms:
+                for ticks, duty in pwm.history:
+                    f.write(f"{device.name},{pwm.pin()},{ticks},{duty}\n")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="보드 스크립트를 호스트에서 실행")
+    parser.add_argument("scripts", nargs="+", help="실행할 스크립트 (스크립트@MAC 형식으로 MAC 지정)")
+    parser.add_argument("--duration", type=float, default=0, help="실행 시간 (초, 0이면 Ctrl+C까지)")
+    parser.add_argument("--adc", action="append", default=[], help="ADC 입력 (예: 3=2000, 3=2048+2000*sin(t))")
+    parser.add_argument("--pwm-log", help="종료 시 PWM 듀티 기록을 저장할 CSV 경로")
+    parser.add_argument("--ble-interval", type=float, help="BLE 기본 연결 간격 (ms)")
+    parser.add_argument("--ble-packets", type=int, help="연결 이벤트당 방향별 패킷 수")
+    parser.add_argument("--ble-txq", type=int, help="BLE 전송 대기 패킷 한도")
+    parser.add_argument("--wifi-scan-ms", type=int, help="WiFi 채널 스캔 시간 (ms)")
+    parser.add_argument("--wifi-dhcp-ms", type=int, help="WiFi DHCP 시간 (ms)")
+    parser.add_argument("--trace-mem", action="store_true", help="gc.mem_alloc()을 tracemalloc으로 측정")
+    args = parser.parse_args()
+
+    simcore.install()
+    import bluetooth
+    import machine
+    import network
+    if args.ble_interval is not None:
+        bluetooth.CONN_INTERVAL_MS = args.ble_interval
+    if args.ble_packets is not None:
+        bluetooth.PACKETS_PER_EVENT = args.ble_packets
+    if args.ble_txq is not None:
+        bluetooth.TX_QUEUE = args.ble_txq
+    if args.wifi_scan_ms is not None:
+        network.SCAN_MS = args.wifi_scan_ms
+    if args.wifi_dhcp_ms is not None:
+        network.DHCP_MS = args.wifi_dhcp_ms
+    if args.trace_mem:
+        import tracemalloc
+        tracemalloc.start()
+
+    # 보드의 파일 시스템 (wifi_cache.json 등)
+    fs = os.path.join(simcore.SIM_DIR, "fs")
+    os.makedirs(fs, exist_ok=True)
+    scripts = []
+    for spec in args.scripts:
+        path, _, mac = spec.partition("@")
+        scripts.append((os.path.abspath(path), bytes.fromhex(mac.replace(":", "")) if mac else None))
+    os.chdir(fs)
+
+    sys.stdout = PrefixWriter(sys.stdout)
+    stop = threading.Event()
+    devices = []
+    threads = []
+    for path, mac in scripts:
+        device = simcore.Device(device_name(path, [d.name for d in devices]), mac)
+        for spec in args.adc:
+            pin, source = parse_adc(spec)
+            machine.set_adc(pin, source, device)
+        devices.append(device)
+        thread = threading.Thread(target=run_device, args=(device, path, stop), name=device.name, daemon=True)
+        threads.append(thread)
+        print(f"{device.name}: {os.path.relpath(path, os.path.join(_here, '..'))} (MAC {device.mac.hex()})")
+
+    for thread in threads:
+        thread.start()
+    try:
+        deadline = time.monotonic() + args.duration if args.duration > 0 else None
+        while any(t.is_alive() for t in threads):
+            if deadline is not None and time.monotonic() >= deadline:
+                break
+            time.sleep(0.1)
+    except KeyboardInterrupt:
+        pass
+    stop.set()
+    if args.pwm_log:
+        write_pwm_log(args.pwm_log, devices)
+        print(f"PWM 기록 저장: {args.pwm_log}")
+    for device in devices:
+        device.shutdown()  # 다른 프로세스가 꺼진 AP에 연결하지 않도록 AP 기록 삭제
+    sys.stdout.flush()
+    os._exit(0)  # 무한 루프 중인 스크립트 스레드는 기다리지 않음
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,561 @@
+"""MicroPython bluetooth 모듈 대체 (호스트 시뮬레이션, 프로세스 내 GATT 버스)
+
+같은 프로세스의 장치끼리 광고/스캔/연결/GATT 이벤트를 주고받는다. 연결은
+연결 간격(connection interval)마다 방향별로 PACKETS_PER_EVENT개의 패킷만
+전달하므로 지연과 처리량이 실제 링크와 비슷하게 제한되고, 전송 대기열이
+TX_QUEUE개를 넘으면 gatts_notify/gattc_write가 ENOMEM을 낸다.
+
+IRQ 이벤트 번호와 데이터 형식은 MicroPython 문서와 같다.
+"""
+import errno
+import random
+import threading
+import time
+
+import simcore
+
+FLAG_BROADCAST = 0x0001
+FLAG_READ = 0x0002
+FLAG_WRITE_NO_RESPONSE = 0x0004
+FLAG_WRITE = 0x0008
+FLAG_NOTIFY = 0x0010
+FLAG_INDICATE = 0x0020
+
+# 링크 모델 (run_sim.py 옵션으로 변경 가능)
+CONN_INTERVAL_MS = 30    # 기본 연결 간격 (gap_connect에 간격을 주지 않았을 때)
+PACKETS_PER_EVENT = 4    # 연결 이벤트 한 번에 방향별로 보낼 수 있는 패킷 수
+TX_QUEUE = 12            # 전송 대기 패킷 한도 (넘으면 ENOMEM)
+DEFAULT_MTU = 23
+
+_IRQ_CENTRAL_CONNECT = 1
+_IRQ_CENTRAL_DISCONNECT = 2
+_IRQ_GATTS_WRITE = 3
+_IRQ_SCAN_RESULT = 5
+_IRQ_SCAN_DONE = 6
+_IRQ_PERIPHERAL_CONNECT = 7
+_IRQ_PERIPHERAL_DISCONNECT = 8
+_IRQ_GATTC_SERVICE_RESULT = 9
+_IRQ_GATTC_SERVICE_DONE = 10
+_IRQ_GATTC_CHARACTERISTIC_RESULT = 11
+_IRQ_GATTC_CHARACTERISTIC_DONE = 12
+_IRQ_GATTC_DESCRIPTOR_RESULT = 13
+_IRQ_GATTC_DESCRIPTOR_DONE = 14
+_IRQ_GATTC_READ_RESULT = 15
+_IRQ_GATTC_READ_DONE = 16
+_IRQ_GATTC_WRITE_DONE = 17
+_IRQ_GATTC_NOTIFY = 18
+_IRQ_GATTC_INDICATE = 19
+_IRQ_GATTS_INDICATE_DONE = 20
+_IRQ_MTU_EXCHANGED = 21
+
+_ADV_IND = 0
+_ADV_NONCONN_IND = 3
+_SCAN_RSP = 4
+
+_CCCD_UUID = 0x2902
+_bus_lock = threading.RLock()
+_radios = []            # 활성화된 BLE 인스턴스
+_next_conn = [0]
+
+
+class UUID:
+    """16비트 또는 128비트 UUID"""
+
+    def __init__(self, value):
+        if isinstance(value, UUID):
+            self._bytes = value._bytes
+        elif isinstance(value, int):
+            self._bytes = value.to_bytes(2 if value <= 0xFFFF else 4, "little")
+        elif isinstance(value, str):
+            digits = value.replace("-", "")
+            if value.startswith("0x"):
+                self._bytes = int(value, 16).to_bytes(2, "little")
+            elif len(digits) != 32:
+                raise ValueError("invalid UUID")
+            else:
+                self._bytes = bytes.fromhex(digits)[::-1]
+        else:
+            data = bytes(value)
+            if len(data) not in (2, 4, 16):
+                raise ValueError("invalid UUID")
+            self._bytes = data
+
+    def __bytes__(self):
+        return self._bytes
+
+    def __len__(self):
+        return len(self._bytes)
+
+    def __eq__(self, other):
+        return isinstance(other, UUID) and other._bytes == self._bytes
+
+    def __hash__(self):
+        return hash(self._bytes)
+
+    def __str__(self):
+        if len(self._bytes) <= 4:
+            return f"0x{int.from_bytes(self._bytes, 'little'):04x}"
+        h = self._bytes[::-1].hex()
+        return f"{h[:8]}-{h[8:12]}-{h[12:16]}-{h[16:20]}-{h[20:]}"
+
+    def __repr__(self):
+        if len(self._bytes) <= 4:
+            return f"UUID({str(self)})"
+        return f"UUID('{self}')"
+
+
+class _Attr:
+    def __init__(self, uuid, flags, kind):
+        self.uuid = uuid
+        self.flags = flags
+        self.kind = kind          # "service", "char", "value", "cccd", "desc"
+        self.value = b""
+        self.max_len = 20
+        self.append = False
+        self.end = 0              # 서비스: 마지막 핸들
+
+
+class _Conn:
+    """central과 peripheral 사이의 연결 (연결 간격마다 대기 패킷 전달)"""
+
+    def __init__(self, central, peripheral, interval_ms):
+        _next_conn[0] += 1
+        self.handle = _next_conn[0] & 0xFFF
+        self.central = central
+        self.peripheral = peripheral
+        self.interval = interval_ms / 1000
+        self.anchor = time.monotonic()
+        self.mtu = DEFAULT_MTU
+        self.queues = {central: [], peripheral: []}  # 보내는 쪽별 대기 패킷
+        self.scheduled = False
+        self.open = True
+
+    def other(self, radio):
+        return self.peripheral if radio is self.central else self.central
+
+    def send(self, sender, deliver, limited=True):
+        """패킷을 대기열에 넣고 다음 연결 이벤트에 deliver() 실행"""
+        with _bus_lock:
+            if not self.open:
+                raise OSError(errno.ENOTCONN)
+            queue = self.queues[sender]
+            if limited and len(queue) >= TX_QUEUE:
+                raise OSError(errno.ENOMEM)
+            queue.append(deliver)
+            self._schedule()
+
+    def _schedule(self):
+        if self.scheduled:
+            return
+        self.scheduled = True
+        elapsed = time.monotonic() - self.anchor
+        events = int(elapsed / self.interval) + 1
+        simcore.scheduler.call_later(self.anchor + events * self.interval - time.monotonic(), self._event)
+
+    def _event(self):
+        with _bus_lock:
+            self.scheduled = False
+            if not self.open:
+                return
+            batch = []
+            for queue in self.queues.values():
+                batch.extend(queue[:PACKETS_PER_EVENT])
+                del queue[:PACKETS_PER_EVENT]
+            if any(self.queues.values()):
+                self._schedule()
+        for deliver in batch:
+            deliver()
+
+    def pending(self, sender):
+        return len(self.queues[sender])
+
+
+def _radio_by_addr(addr):
+    for radio in _radios:
+        if radio._device.mac == addr:
+            return radio
+    return None
+
+
+class BLE:
+    """장치별 BLE 인스턴스 (같은 장치에서는 같은 객체)"""
+
+    def __new__(cls):
+        device = simcore.current()
+        if device.ble is None:
+            radio = super().__new__(cls)
+            radio._init(device)
+            device.ble = radio
+        return device.ble
+
+    def _init(self, device):
+        self._device = device
+        self._active = False
+        self._handler = None
+        self._mtu = DEFAULT_MTU
+        self._gap_name = b"MPY ESP32"
+        self._attrs = {}
+        self._adv = None        # (간격 s, adv_data, resp_data, connectable)
+        self._adv_gen = 0
+        self._scan = None       # (시작 시각, 간격 s, 윈도우 s, active)
+        self._scan_gen = 0
+        self._connecting = None  # (대상 주소, 시작 시각, 만료 시각, 간격 ms)
+        self._conns = {}        # conn_handle -> _Conn
+
+    # --- 공통 ---
+
+    def active(self, is_active=None):
+        if is_active is None:
+            return self._active
+        is_active = bool(is_active)
+        with _bus_lock:
+            if is_active and not self._active:
+                _radios.append(self)
+            elif not is_active and self._active:
+                self._adv = None
+                self._scan = None
+                self._connecting = None
+                for conn in list(self._conns.values()):
+                    self._drop(conn)
+                _radios.remove(self)
+                self._attrs = {}
+            self._active = is_active
+        return None
+
+    def config(self, *args, **kwargs):
+        if args:
+            name = args[0]
+            if name == "mac":
+                return (0, self._device.mac)
+            if name == "mtu":
+                return self._mtu
+            if name in ("gap_name", "addr_mode", "rxbuf"):
+                return {"gap_name": self._gap_name, "addr_mode": 0, "rxbuf": 256}[name]
+            raise ValueError("unknown config param")
+        for key, value in kwargs.items():
+            if key == "mtu":
+                self._mtu = max(DEFAULT_MTU, min(512, value))
+            elif key == "gap_name":
+                self._gap_name = bytes(value, "utf-8") if isinstance(value, str) else bytes(value)
+            elif key not in ("rxbuf", "addr_mode", "bond", "io", "le_secure", "mitm"):
+                raise ValueError("unknown config param")
+        return None
+
+    def irq(self, handler):
+        self._handler = handler
+
+    def _post(self, event, data):
+        if self._handler is not None and self._active:
+            self._device.post_irq(self._handler, event, data)
+
+    def _require_active(self):
+        if not self._active:
+            raise OSError(errno.EPERM)
+
+    # --- 광고 / 스캔 ---
+
+    def gap_advertise(self, interval_us, adv_data=None, *, resp_data=None, connectable=True):
+        self._require_active()
+        with _bus_lock:
+            self._adv_gen += 1
+            if interval_us is None:
+                self._adv = None
+                return
+            old = self._adv
+            adv = bytes(adv_data) if adv_data is not None else (old[1] if old else b"")
+            resp = bytes(resp_data) if resp_data is not None else (old[2] if old else b"")
+            self._adv = (max(0.02, interval_us / 1000000), adv, resp, connectable)
+            generation = self._adv_gen
+        simcore.scheduler.call_later(random.random() * 0.01, self._adv_event, generation)
+
+    def _adv_event(self, generation):
+        """광고 패킷 한 번 송출 (스캔 윈도우 안에 있는 스캐너만 수신)"""
+        with _bus_lock:
+            if generation != self._adv_gen or self._adv is None or not self._active:
+                return
+            interval, adv, resp, connectable = self._adv
+            now = time.monotonic()
+            for radio in _radios:
+                if radio is self:
+                    continue
+                radio._hear(self, adv, resp, connectable, now)
+        # 규격대로 광고 간격에 0~10ms 임의 지연 추가
+        simcore.scheduler.call_later(interval + random.random() * 0.01, self._adv_event, generation)
+
+    def _hear(self, advertiser, adv, resp, connectable, now):
+        target = self._connecting
+        if target is not None and target[0] == advertiser._device.mac and connectable:
+            self._connecting = None
+            self._establish(advertiser, target[3])
+            return
+        if self._scan is None:
+            return
+        start, interval, window, active = self._scan
+        if (now - start) % interval > window:
+            return
+        addr = memoryview(advertiser._device.mac)
+        rssi = -40 - random.randint(0, 10)
+        adv_type = _ADV_IND if connectable else _ADV_NONCONN_IND
+        self._post(_IRQ_SCAN_RESULT, (0, addr, adv_type, rssi, memoryview(adv)))
+        if active:
+            self._post(_IRQ_SCAN_RESULT, (0, addr, _SCAN_RSP, rssi, memoryview(resp)))
+
+    def gap_scan(self, duration_ms, interval_us=1280000, window_us=11250, active=False):
+        self._require_active()
+        with _bus_lock:
+            self._scan_gen += 1
+            if duration_ms is None:
+                if self._scan is not None:
+                    self._scan = None
+                    self._post(_IRQ_SCAN_DONE, ())
+                return
+            self._scan = (time.monotonic(), interval_us / 1000000, window_us / 1000000, active)
+            generation = self._scan_gen
+        if duration_ms > 0:
+            simcore.scheduler.call_later(duration_ms / 1000, self._scan_done, generation)
+
+    def _scan_done(self, generation):
+        with _bus_lock:
+            if generation != self._scan_gen or self._scan is None:
+                return
+            self._scan = None
+        self._post(_IRQ_SCAN_DONE, ())
+
+    # --- 연결 ---
+
+    def gap_connect(self, addr_type, addr=None, scan_duration_ms=2000,
+                    min_conn_interval_us=None, max_conn_interval_us=None):
+        self._require_active()
+        with _bus_lock:
+            if addr_type is None:
+                # 진행 중인 연결 요청 취소
+                target = self._connecting
+                self._connecting = None
+                if target is not None:
+                    self._post(_IRQ_PERIPHERAL_DISCONNECT, (0xFFFF, 0, memoryview(target[0])))
+                return True
+            if self._connecting is not None:
+                raise OSError(errno.EALREADY)
+            interval_ms = CONN_INTERVAL_MS
+            if min_conn_interval_us is not None:
+                interval_ms = max(7.5, min_conn_interval_us / 1000)
+            now = time.monotonic()
+            self._connecting = (bytes(addr), now, now + scan_duration_ms / 1000, interval_ms)
+            target = self._connecting
+        simcore.scheduler.call_later(scan_duration_ms / 1000, self._connect_timeout, target)
+        return True
+
+    def _connect_timeout(self, target):
+        with _bus_lock:
+            if self._connecting is not target:
+                return
+            self._connecting = None
+        self._post(_IRQ_PERIPHERAL_DISCONNECT, (0xFFFF, 0, memoryview(target[0])))
+
+    def _establish(self, peripheral, interval_ms):
+        conn = _Conn(self, peripheral, interval_ms)
+        self._conns[conn.handle] = conn
+        peripheral._conns[conn.handle] = conn
+        peripheral._adv = None  # 연결되면 광고 중지
+        peripheral._adv_gen += 1
+        self._post(_IRQ_PERIPHERAL_CONNECT, (conn.handle, 0, memoryview(peripheral._device.mac)))
+        peripheral._post(_IRQ_CENTRAL_CONNECT, (conn.handle, 0, memoryview(self._device.mac)))
+
+    def _drop(self, conn):
+        """연결 종료 후 양쪽에 이벤트 전달"""
+        with _bus_lock:
+            if not conn.open:
+                return
+            conn.open = False
+            conn.central._conns.pop(conn.handle, None)
+            conn.peripheral._conns.pop(conn.handle, None)
+        conn.central._post(_IRQ_PERIPHERAL_DISCONNECT,
+                           (conn.handle, 0, memoryview(conn.peripheral._device.mac)))
+        conn.peripheral._post(_IRQ_CENTRAL_DISCONNECT,
+                              (conn.handle, 0, memoryview(conn.central._device.mac)))
+
+    def _conn(self, conn_handle):
+        conn = self._conns.get(conn_handle)
+        if conn is None:
+            raise OSError(errno.ENOTCONN)
+        return conn
+
+    def gap_disconnect(self, conn_handle):
+        conn = self._conns.get(conn_handle)
+        if conn is None:
+            return False
+        simcore.scheduler.call_later(conn.interval, self._drop, conn)
+        return True
+
+    def gattc_exchange_mtu(self, conn_handle):
+        conn = self._conn(conn_handle)
+
+        def deliver():
+            conn.mtu = min(conn.central._mtu, conn.peripheral._mtu)
+            conn.central._post(_IRQ_MTU_EXCHANGED, (conn.handle, conn.mtu))
+            conn.peripheral._post(_IRQ_MTU_EXCHANGED, (conn.handle, conn.mtu))
+        conn.send(self, deliver, limited=False)
+
+    # --- GATT 서버 ---
+
+    def gatts_register_services(self, services):
+        self._require_active()
+        self._attrs = {}
+        handle = 1
+        result = []
+        for service_uuid, chars in services:
+            service = _Attr(service_uuid, 0, "service")
+            self._attrs[handle] = service
+            handle += 1
+            handles = []
+            for char in chars:
+                uuid, flags = char[0], char[1]
+                self._attrs[handle] = _Attr(uuid, flags, "char")
+                self._attrs[handle + 1] = _Attr(uuid, flags, "value")
+                handles.append(handle + 1)
+                handle += 2
+                if flags & (FLAG_NOTIFY | FLAG_INDICATE):
+                    cccd = _Attr(UUID(_CCCD_UUID), FLAG_READ | FLAG_WRITE, "cccd")
+                    cccd.value = b"\x00\x00"
+                    self._attrs[handle] = cccd
+                    handle += 1
+                for desc_uuid, desc_flags in (char[2] if len(char) > 2 else ()):
+                    self._attrs[handle] = _Attr(desc_uuid, desc_flags, "desc")
+                    handles.append(handle)
+                    handle += 1
+            service.end = handle - 1
+            result.append(tuple(handles))
+        return tuple(result)
+
+    def gatts_read(self, value_handle):
+        attr = self._attrs[value_handle]
+        value = bytes(attr.value)
+        if attr.append:
+            attr.value = b""  # 이어 쓰기 버퍼는 읽으면 비워짐 (MicroPython과 같음)
+        return value
+
+    def gatts_write(self, value_handle, data, send_update=False):
+        attr = self._attrs[value_handle]
+        attr.value = bytes(data)
+        if send_update:
+            for conn in list(self._conns.values()):
+                cccd = self._attrs.get(value_handle + 1)
+                if cccd is not None and cccd.kind == "cccd":
+                    if cccd.value[:1] == b"\x01":
+                        self.gatts_notify(conn.handle, value_handle)
+                    elif cccd.value[:1] == b"\x02":
+                        self.gatts_indicate(conn.handle, value_handle)
+
+    def gatts_set_buffer(self, value_handle, length, append=False):
+        attr = self._attrs[value_handle]
+        attr.max_len = length
+        attr.append = append
+
+    def gatts_notify(self, conn_handle, value_handle, data=None):
+        conn = self._conn(conn_handle)
+        payload = bytes(self._attrs[value_handle].value if data is None else data)[:conn.mtu - 3]
+        central = conn.central
+        conn.send(self, lambda: central._post(_IRQ_GATTC_NOTIFY, (conn.handle, value_handle, memoryview(payload))))
+
+    def gatts_indicate(self, conn_handle, value_handle, data=None):
+        conn = self._conn(conn_handle)
+        payload = bytes(self._attrs[value_handle].value if data is None else data)[:conn.mtu - 3]
+
+        def deliver():
+            conn.central._post(_IRQ_GATTC_INDICATE, (conn.handle, value_handle, memoryview(payload)))
+            # 확인 응답은 다음 연결 이벤트에 도착
+            conn.send(conn.central, lambda: self._post(_IRQ_GATTS_INDICATE_DONE, (conn.handle, value_handle, 0)),
+                      limited=False)
+        conn.send(self, deliver)
+
+    def _write_local(self, conn, value_handle, data):
+        """central이 쓴 값을 속성에 반영하고 GATTS_WRITE 이벤트 전달"""
+        attr = self._attrs.get(value_handle)
+        if attr is None:
+            return 0x01  # 잘못된 핸들
+        if attr.kind == "cccd":
+            attr.value = bytes(data[:2])
+            return 0
+        # 버퍼(gatts_set_buffer, 기본 20바이트)를 넘는 부분은 버려짐 (MicroPython과 같음)
+        if attr.append:
+            attr.value = (attr.value + bytes(data))[:attr.max_len]
+        else:
+            attr.value = bytes(data[:attr.max_len])
+        self._post(_IRQ_GATTS_WRITE, (conn.handle, value_handle))
+        return 0
+
+    # --- GATT 클라이언트 ---
+
+    def _respond(self, conn, events):
+        """요청을 보내고 다음 연결 이벤트에 peripheral이 응답 (왕복 두 이벤트)"""
+        def reply():
+            conn.send(conn.peripheral, lambda: [self._post(e, d) for e, d in events()], limited=False)
+        conn.send(self, reply, limited=False)
+
+    def gattc_discover_services(self, conn_handle, uuid=None):
+        conn = self._conn(conn_handle)
+
+        def events():
+            out = []
+            attrs = conn.peripheral._attrs
+            for handle in sorted(attrs):
+                attr = attrs[handle]
+                if attr.kind == "service" and (uuid is None or attr.uuid == uuid):
+                    out.append((_IRQ_GATTC_SERVICE_RESULT, (conn.handle, handle, attr.end, attr.uuid)))
+            out.append((_IRQ_GATTC_SERVICE_DONE, (conn.handle, 0)))
+            return out
+        self._respond(conn, events)
+
+    def gattc_discover_characteristics(self, conn_handle, start_handle, end_handle, uuid=None):
+        conn = self._conn(conn_handle)
+
+        def events():
+            out = []
+            attrs = conn.peripheral._attrs
+            for handle in range(start_handle, end_handle + 1):
+                attr = attrs.get(handle)
+                if attr is not None and attr.kind == "char" and (uuid is None or attr.uuid == uuid):
+                    out.append((_IRQ_GATTC_CHARACTERISTIC_RESULT,
+                                (conn.handle, handle, handle + 1, attr.flags, attr.uuid)))
+            out.append((_IRQ_GATTC_CHARACTERISTIC_DONE, (conn.handle, 0)))
+            return out
+        self._respond(conn, events)
+
+    def gattc_discover_descriptors(self, conn_handle, start_handle, end_handle):
+        conn = self._conn(conn_handle)
+
+        def events():
+            out = []
+            attrs = conn.peripheral._attrs
+            for handle in range(start_handle, end_handle + 1):
+                attr = attrs.get(handle)
+                if attr is not None and attr.kind in ("cccd", "desc"):
+                    out.append((_IRQ_GATTC_DESCRIPTOR_RESULT, (conn.handle, handle, attr.uuid)))
+            out.append((_IRQ_GATTC_DESCRIPTOR_DONE, (conn.handle, 0)))
+            return out
+        self._respond(conn, events)
+
+    def gattc_read(self, conn_handle, value_handle):
+        conn = self._conn(conn_handle)
+
+        def events():
+            attr = conn.peripheral._attrs.get(value_handle)
+            if attr is None:
+                return [(_IRQ_GATTC_READ_DONE, (conn.handle, value_handle, 0x01))]
+            return [(_IRQ_GATTC_READ_RESULT, (conn.handle, value_handle, memoryview(bytes(attr.value)))),
+                    (_IRQ_GATTC_READ_DONE, (conn.handle, value_handle, 0))]
+        self._respond(conn, events)
+
+    def gattc_write(self, conn_handle, value_handle, data, mode=0):
+        conn = self._conn(conn_handle)
+        payload = bytes(data)
+        if mode == 0:
+            payload = payload[:conn.mtu - 3]
+        peripheral = conn.peripheral
+
+        def deliver():
+            status = peripheral._write_local(conn, value_handle, payload)
+            if mode == 1:
+                conn.send(peripheral, lambda: self._post(_IRQ_GATTC_WRITE_DONE, (conn.handle, value_handle, status)),
+                          limited=False)
+        conn.send(self, deliver, limited=(mode == 0))
@@ -0,0 +1,245 @@
+"""MicroPython machine 모듈 대체 (호스트 시뮬레이션)
+
+ADC 입력은 장치별로 지정한 값이나 시간 함수에서 읽고(set_adc), PWM은 출력한
+듀티를 시각과 함께 기록한다(PWM.history). Timer 콜백과 Pin IRQ는 장치의 IRQ
+디스패처에서 실행된다.
+"""
+import collections
+import time
+
+import simcore
+from ticks import ticks_ms
+
+
+def _pin_id(pin):
+    return pin.id() if isinstance(pin, Pin) else pin
+
+
+def set_adc(pin, source, device=None):
+    """ADC 입력 지정: 0~4095 값 또는 경과 시간(초)을 받아 값을 돌려주는 함수"""
+    (device or simcore.current()).adc_sources[_pin_id(pin)] = source
+
+
+class Pin:
+    IN = 1
+    OUT = 3
+    OPEN_DRAIN = 7
+    PULL_UP = 2
+    PULL_DOWN = 1
+    IRQ_RISING = 1
+    IRQ_FALLING = 2
+
+    def __init__(self, id, mode=-1, pull=-1, value=None):
+        self._id = id
+        self._value = 0 if value is None else int(bool(value))
+        self._handler = None
+        self._trigger = 0
+        self._device = simcore.current()
+
+    def id(self):
+        return self._id
+
+    def init(self, mode=-1, pull=-1, value=None):
+        if value is not None:
+            self.value(value)
+
+    def value(self, x=None):
+        if x is None:
+            return self._value
+        old, self._value = self._value, int(bool(x))
+        if self._handler and old != self._value:
+            edge = self.IRQ_RISING if self._value else self.IRQ_FALLING
+            if self._trigger & edge:
+                self._device.post_irq(self._handler, self)
+        return None
+
+    __call__ = value
+
+    def on(self):
+        self.value(1)
+
+    def off(self):
+        self.value(0)
+
+    def irq(self, handler=None, trigger=IRQ_FALLING | IRQ_RISING, hard=False):
+        self._handler = handler
+        self._trigger = trigger
+
+
+class ADC:
+    ATTN_0DB = 0
+    ATTN_2_5DB = 1
+    ATTN_6DB = 2
+    ATTN_11DB = 3
+    WIDTH_9BIT = 0
+    WIDTH_10BIT = 1
+    WIDTH_11BIT = 2
+    WIDTH_12BIT = 3
+
+    def __init__(self, pin, atten=None):
+        self._pin = _pin_id(pin)
+        self._device = simcore.current()
+        self._bits = 12
+        self.reads = 0
+
+    def atten(self, atten):
+        pass
+
+    def width(self, width):
+        self._bits = 9 + width
+
+    def _sample(self):
+        self.reads += 1
+        source = self._device.adc_sources.get(self._pin, 0)
+        value = source(self._device.uptime()) if callable(source) else source
+        return max(0, min(4095, int(value)))
+
+    def read(self):
+        return self._sample() >> (12 - self._bits)
+
+    def read_u16(self):
+        value = self._sample()
+        return (value << 4) | (value >> 8)
+
+    def read_uv(self):
+        return self._sample() * 3300000 // 4095
+
+
+class PWM:
+    HISTORY = 10000  # 최근 듀티 변경 기록 개수
+
+    def __init__(self, pin, freq=None, duty=None, duty_u16=None, duty_ns=None):
+        self._pin = _pin_id(pin)
+        self._freq = 5000
+        self._duty = 0
+        self.writes = 0
+        self.history = collections.deque(maxlen=self.HISTORY)  # (ticks_ms, duty_u16)
+        simcore.current().pwms.append(self)
+        if freq is not None:
+            self._freq = freq
+        if duty is not None:
+            self.duty(duty)
+        if duty_u16 is not None:
+            self.duty_u16(duty_u16)
+        if duty_ns is not None:
+            self.duty_ns(duty_ns)
+
+    def pin(self):
+        return self._pin
+
+    def _set(self, value):
+        self._duty = max(0, min(65535, int(value)))
+        self.writes += 1
+        self.history.append((ticks_ms(), self._duty))
+
+    def freq(self, value=None):
+        if value is None:
+            return self._freq
+        self._freq = value
+        return None
+
+    def duty(self, value=None):
+        """10비트 듀티 (0~1023)"""
+        if value is None:
+            return self._duty >> 6
+        self._set(min(1023, value) * 65535 // 1023)
+        return None
+
+    def duty_u16(self, value=None):
+        if value is None:
+            return self._duty
+        self._set(value)
+        return None
+
+    def duty_ns(self, value=None):
+        period_ns = 1000000000 // self._freq
+        if value is None:
+            return self._duty * period_ns // 65535
+        self._set(value * 65535 // period_ns)
+        return None
+
+    def deinit(self):
+        self._set(0)
+
+
+class Timer:
+    ONE_SHOT = 0
+    PERIODIC = 1
+
+    def __init__(self, id=-1, **kwargs):
+        self._id = id
+        self._device = simcore.current()
+        self._generation = 0
+        if kwargs:
+            self.init(**kwargs)
+
+    def init(self, mode=PERIODIC, period=-1, freq=-1, callback=None):
+        self.deinit()
+        self._mode = mode
+        self._period = 1 / freq if freq > 0 else period / 1000
+        self._callback = callback
+        self._next = time.monotonic() + self._period
+        self._device.timers.append(self)
+        simcore.scheduler.call_later(self._period, self._fire, self._generation)
+
+    def _fire(self, generation):
+        if generation != self._generation:
+            return
+        if self._callback:
+            self._device.post_irq(self._callback, self)
+        if self._mode == self.PERIODIC:
+            # 콜백 지연과 무관하게 일정한 간격 유지
+            self._next += self._period
+            simcore.scheduler.call_later(max(0, self._next - time.monotonic()), self._fire, generation)
+
+    def deinit(self):
+        self._generation += 1
+        if self in self._device.timers:
+            self._device.timers.remove(self)
+
+
+class WDT:
+    def __init__(self, id=0, timeout=5000):
+        pass
+
+    def feed(self):
+        pass
+
+
+def reset():
+    raise simcore.Reset()
+
+
+soft_reset = reset
+
+
+def unique_id():
+    return simcore.current().mac
+
+
+def freq(hz=None):
+    return 160000000 if hz is None else None
+
+
+def idle():
+    time.sleep(0.001)
+
+
+def lightsleep(ms=None):
+    time.sleep((ms or 0) / 1000)
+
+
+deepsleep = lightsleep
+
+
+def disable_irq():
+    """IRQ 디스패처를 멈춤 (enable_irq까지 콜백이 실행되지 않음)"""
+    simcore.current().irq_lock.acquire()
+    return 1
+
+
+def enable_irq(state=1):
+    try:
+        simcore.current().irq_lock.release()
+    except RuntimeError:
+        pass
@@ -0,0 +1,60 @@
+"""MicroPython micropython 모듈 대체 (호스트 시뮬레이션)
+
+native/viper 데코레이터는 함수를 그대로 돌려주므로 결과는 같고 속도만 다르다.
+schedule()은 보드처럼 대기열이 8개로 제한된다.
+"""
+import simcore
+
+SCHEDULE_DEPTH = 8
+_pending = {}
+
+
+def const(value):
+    return value
+
+
+def native(func):
+    return func
+
+
+viper = native
+asm_thumb = native
+
+
+def alloc_emergency_exception_buf(size):
+    pass
+
+
+def opt_level(level=None):
+    return 0 if level is None else None
+
+
+def heap_lock():
+    return 0
+
+
+def heap_unlock():
+    return 0
+
+
+def kbd_intr(chr):
+    pass
+
+
+def mem_info(verbose=False):
+    import gc
+    print(f"mem: total={gc.mem_alloc() + gc.mem_free()}, current={gc.mem_alloc()}")
+
+
+def schedule(func, arg):
+    """IRQ에서 나중에 실행할 함수 등록 (대기열이 가득 차면 RuntimeError)"""
+    device = simcore.current()
+    if _pending.get(device, 0) >= SCHEDULE_DEPTH:
+        raise RuntimeError("schedule queue full")
+    _pending[device] = _pending.get(device, 0) + 1
+
+    def run(arg):
+        _pending[device] -= 1
+        func(arg)
+
+    device.post_irq(run, arg)
@@ -0,0 +1,277 @@
+"""MicroPython network 모듈 대체 (호스트 시뮬레이션)
+
+AP를 켜면 SIM_DIR/aps/에 SSID 정보를 기록하고, 다른 장치(같은 프로세스의
+스레드 또는 다른 프로세스)의 스테이션이 그 기록을 보고 연결한다. 연결 후 소켓
+주소 192.168.4.x는 SSID별 루프백 대역으로 바뀌므로 실제 TCP/UDP로 통신한다.
+
+연결에 걸리는 시간은 실제 보드와 비슷한 비율로 흉내낸다: 채널 스캔,
+연결(association), DHCP. 캐시된 BSSID/채널이나 고정 IP를 쓰면 해당 단계가 빠진다.
+"""
+import atexit
+import json
+import os
+import time
+
+import simcore
+
+STA_IF = 0
+AP_IF = 1
+
+STAT_IDLE = 1000
+STAT_CONNECTING = 1001
+STAT_GOT_IP = 1010
+STAT_BEACON_TIMEOUT = 200
+STAT_NO_AP_FOUND = 201
+STAT_WRONG_PASSWORD = 202
+STAT_ASSOC_FAIL = 203
+STAT_CONNECT_FAIL = 203
+STAT_HANDSHAKE_TIMEOUT = 204
+
+AUTH_OPEN = 0
+AUTH_WEP = 1
+AUTH_WPA_PSK = 2
+AUTH_WPA2_PSK = 3
+AUTH_WPA_WPA2_PSK = 4
+
+# 연결 단계별 소요 시간 (ms, run_sim.py 옵션으로 변경 가능)
+SCAN_MS = 1200    # 전체 채널 스캔 (채널을 모를 때)
+ASSOC_MS = 120    # 인증 + 연결
+DHCP_MS = 600     # DHCP 주소 할당 (고정 IP면 생략)
+
+_AP_DIR = os.path.join(simcore.SIM_DIR, "aps")
+_owned = set()
+
+
+def _ap_path(ssid):
+    return os.path.join(_AP_DIR, ssid.replace("/", "_") + ".json")
+
+
+def _publish(ssid, info):
+    os.makedirs(_AP_DIR, exist_ok=True)
+    tmp = _ap_path(ssid) + f".{os.getpid()}"
+    with open(tmp, "w") as f:
+        json.dump(info, f)
+    os.replace(tmp, _ap_path(ssid))
+    _owned.add(ssid)
+
+
+def _withdraw(ssid):
+    if ssid in _owned:
+        _owned.discard(ssid)
+        try:
+            os.remove(_ap_path(ssid))
+        except OSError:
+            pass
+
+
+@atexit.register
+def _cleanup():
+    for ssid in list(_owned):
+        _withdraw(ssid)
+
+
+def _alive(pid):
+    try:
+        os.kill(pid, 0)
+        return True
+    except OSError:
+        return False
+
+
+def _find_ap(ssid):
+    """켜져 있는 AP 정보 (없으면 None)"""
+    try:
+        with open(_ap_path(ssid)) as f:
+            info = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if not _alive(info["pid"]):
+        return None
+    return info
+
+
+def _all_aps():
+    try:
+        names = os.listdir(_AP_DIR)
+    except OSError:
+        return []
+    aps = []
+    for name in names:
+        if name.endswith(".json"):
+            info = _find_ap(name[:-5])
+            if info:
+                aps.append(info)
+    return aps
+
+
+class WLAN:
+    """장치별 인터페이스 (같은 장치에서 같은 인터페이스는 같은 객체)"""
+
+    def __new__(cls, interface=STA_IF):
+        device = simcore.current()
+        wlan = device.wlans.get(interface)
+        if wlan is None:
+            wlan = super().__new__(cls)
+            wlan._init(device, interface)
+            device.wlans[interface] = wlan
+        return wlan
+
+    def _init(self, device, interface):
+        self._device = device
+        self._if = interface
+        self._active = False
+        self._status = STAT_IDLE
+        self._static = None
+        self._ssid = None
+        self._attempt = 0
+        self._channel_hint = False  # 스테이션에 채널을 지정했는지 (지정한 채널만 스캔)
+        self._config = {
+            "essid": "ESP32_" + device.mac[3:].hex().upper() if interface == AP_IF else "",
+            "password": "",
+            "authmode": AUTH_OPEN,
+            "channel": 1,
+            "hostname": "esp32",
+            "mac": device.mac if interface == STA_IF else device.mac[:5] + bytes(((device.mac[5] + 1) & 0xFF,)),
+            "txpower": 20,
+            "pm": 0,
+            "reconnects": -1,
+        }
+
+    def active(self, is_active=None):
+        if is_active is None:
+            return self._active
+        is_active = bool(is_active)
+        if is_active == self._active:
+            return None
+        self._active = is_active
+        if self._if == AP_IF:
+            if is_active:
+                self._publish()
+            else:
+                _withdraw(self._config["essid"])
+                self._device.net = None
+                self._device.net_is_ap = False
+        elif not is_active:
+            self.disconnect()
+        return None
+
+    def _publish(self):
+        essid = self._config["essid"]
+        _publish(essid, {
+            "ssid": essid,
+            "password": self._config["password"],
+            "authmode": self._config["authmode"],
+            "channel": self._config["channel"],
+            "bssid": self._config["mac"].hex(),
+            "pid": os.getpid(),
+        })
+        self._device.net = simcore.loopback_net(essid)
+        self._device.net_is_ap = True
+
+    def config(self, *args, **kwargs):
+        if args:
+            key = "essid" if args[0] == "ssid" else args[0]
+            if key not in self._config:
+                raise ValueError("unknown config param")
+            return self._config[key]
+        old_essid = self._config["essid"]
+        for key, value in kwargs.items():
+            if key == "ssid":
+                key = "essid"
+            if key == "key":
+                key = "password"
+            if key not in self._config:
+                raise ValueError("unknown config param")
+            self._config[key] = value
+            if key == "channel" and self._if == STA_IF:
+                self._channel_hint = True
+        if self._if == AP_IF and self._active:
+            if old_essid != self._config["essid"]:
+                _withdraw(old_essid)
+            self._publish()
+        return None
+
+    def connect(self, ssid=None, key=None, *, bssid=None):
+        if self._if != STA_IF:
+            raise OSError("AP interface cannot connect")
+        if not self._active:
+            raise OSError("Wifi Not Started")
+        self.disconnect()
+        self._ssid = ssid
+        self._status = STAT_CONNECTING
+        self._attempt += 1
+        attempt = self._attempt
+
+        ap = _find_ap(ssid) if ssid else None
+        # 지정한 채널에 AP가 있으면 그 채널만 스캔 (BSSID도 주면 그 AP와 같아야 함)
+        known = (ap is not None and self._channel_hint and self._config["channel"] == ap["channel"]
+                 and (bssid is None or bytes(bssid).hex() == ap["bssid"]))
+        delay = ASSOC_MS + (0 if known else SCAN_MS)
+        if ap is None:
+            result = STAT_NO_AP_FOUND
+        elif ap["authmode"] != AUTH_OPEN and ap["password"] != (key or ""):
+            result = STAT_WRONG_PASSWORD
+        else:
+            result = STAT_GOT_IP
+            if self._static is None:
+                delay += DHCP_MS
+        simcore.scheduler.call_later(delay / 1000, self._finish, attempt, result)
+
+    def _finish(self, attempt, result):
+        if attempt != self._attempt or self._status != STAT_CONNECTING:
+            return
+        self._status = result
+        if result == STAT_GOT_IP:
+            self._device.net = simcore.loopback_net(self._ssid)
+            self._device.net_is_ap = False
+            if self._static is not None:
+                self._device.host = int(self._static[0].rsplit(".", 1)[-1])
+            else:
+                self._device.host = simcore.lease(self._device.net, self._device)
+            ap = _find_ap(self._ssid)
+            if ap:
+                self._config["channel"] = ap["channel"]
+
+    def disconnect(self):
+        self._attempt += 1
+        if self._if == STA_IF and not self._device.net_is_ap:
+            self._device.net = None
+        self._status = STAT_IDLE
+
+    def isconnected(self):
+        if self._if == AP_IF:
+            return self._active
+        if self._status == STAT_GOT_IP and _find_ap(self._ssid) is None:
+            self._status = STAT_BEACON_TIMEOUT  # AP가 꺼짐
+            self._device.net = None
+        return self._status == STAT_GOT_IP
+
+    def status(self, param=None):
+        if param == "rssi":
+            return -40
+        if param == "stations":
+            return []
+        if param is not None:
+            raise ValueError("unknown status param")
+        self.isconnected()
+        return self._status
+
+    def ifconfig(self, config=None):
+        if config is not None:
+            if self._if == STA_IF:
+                self._static = tuple(config)
+            return None
+        if self._if == AP_IF:
+            return ("192.168.4.1", "255.255.255.0", "192.168.4.1", "192.168.4.1")
+        if self._status != STAT_GOT_IP:
+            return ("0.0.0.0", "0.0.0.0", "0.0.0.0", "0.0.0.0")
+        if self._static is not None:
+            return self._static
+        return (f"192.168.4.{self._device.host}", "255.255.255.0", "192.168.4.1", "192.168.4.1")
+
+    def scan(self):
+        if not self._active:
+            raise OSError("Wifi Not Started")
+        time.sleep(SCAN_MS / 1000)
+        return [(ap["ssid"].encode(), bytes.fromhex(ap["bssid"]), ap["channel"], -40, ap["authmode"], False)
+                for ap in _all_aps()]
@@ -0,0 +1,296 @@
+"""호스트 시뮬레이션 공통 부분: 가상 장치, 이벤트 스케줄러, 주소 변환
+
+스크립트 하나가 장치(Device) 하나이며 각자의 스레드에서 실행된다. machine,
+network, bluetooth 가짜 모듈은 현재 스레드의 장치를 찾아 장치별 상태를 쓴다.
+IRQ 콜백은 장치마다 하나인 디스패처 스레드에서 순서대로 호출되므로 실제
+보드처럼 메인 루프와 번갈아 실행되고, 같은 장치의 콜백끼리는 겹치지 않는다.
+"""
+import errno
+import heapq
+import itertools
+import os
+import socket
+import sys
+import tempfile
+import threading
+import time
+
+_lib = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "lib")
+if _lib not in sys.path:
+    sys.path.insert(0, _lib)
+
+import ticks  # noqa: E402
+
+# 보드 IP 대역(192.168.4.x)을 장치마다 다른 루프백 대역(127.a.b.x)으로 바꿔서
+# 여러 AP가 같은 포트(8080)를 동시에 열 수 있게 한다
+BOARD_NET = "192.168.4."
+SIM_DIR = os.environ.get("SIM_DIR", os.path.join(tempfile.gettempdir(), "esp32_sim"))
+
+
+class Reset(BaseException):
+    """machine.reset() 호출 (러너가 스크립트를 처음부터 다시 실행)"""
+
+
+class Scheduler:
+    """시각 순서대로 콜백을 실행하는 스레드 (BLE 무선 구간 지연 모사)"""
+
+    def __init__(self):
+        self._heap = []
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._thread = None
+
+    def call_later(self, delay_s, func, *args):
+        with self._cond:
+            heapq.heappush(self._heap, (time.monotonic() + delay_s, next(self._seq), func, args))
+            self._cond.notify()
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="sim-scheduler", daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._heap or self._heap[0][0] > time.monotonic():
+                    timeout = self._heap[0][0] - time.monotonic() if self._heap else None
+                    self._cond.wait(timeout)
+                _, _, func, args = heapq.heappop(self._heap)
+            try:
+                func(*args)
+            except Exception as e:  # 스케줄러가 멈추지 않도록 출력만
+                print(f"[sim] 스케줄러 콜백 오류: {e!r}", file=sys.__stderr__)
+
+
+scheduler = Scheduler()
+
+
+class Device:
+    """가상 보드 하나 (MAC 주소, IRQ 디스패처, 장치별 하드웨어 상태)"""
+
+    def __init__(self, name, mac=None):
+        self.name = name
+        if mac is None:
+            # 이름에서 만든 로컬 관리 주소 (실행할 때마다 같은 값)
+            h = 0
+            for c in name.encode():
+                h = (h * 131 + c) & 0xFFFFFFFFFF
+            mac = bytes((0x02,)) + h.to_bytes(5, "big")
+        self.mac = mac
+        self.ble = None          # bluetooth.BLE 인스턴스
+        self.wlans = {}          # 인터페이스별 network.WLAN 인스턴스
+        self.net = None          # 루프백 대역 (AP를 켰거나 AP에 연결된 경우)
+        self.net_is_ap = False   # 이 장치가 대역의 AP(.1)인지 여부
+        self.host = 0            # 스테이션 주소의 마지막 자리 (192.168.4.x, 0: 없음)
+        self.adc_sources = {}    # 핀 번호별 ADC 입력 (값 또는 t(초) -> 값 함수)
+        self.pwms = []           # 생성된 PWM 목록 (출력 기록 확인용)
+        self.timers = []         # 동작 중인 machine.Timer 목록
+        self.reset_pending = False
+        self.irq_lock = threading.RLock()  # machine.disable_irq() 동안 IRQ 콜백 보류
+        self.started = time.monotonic()
+        self._irq_cond = threading.Condition()
+        self._irq_queue = []
+        self._irq_thread = None
+
+    def post_irq(self, handler, *args):
+        """IRQ 콜백을 디스패처 큐에 추가"""
+        with self._irq_cond:
+            self._irq_queue.append((handler, args))
+            self._irq_cond.notify()
+            if self._irq_thread is None:
+                self._irq_thread = threading.Thread(target=self._dispatch, daemon=True,
+                                                    name=f"{self.name}-irq")
+                self._irq_thread.start()
+
+    def _dispatch(self):
+        bind(self)
+        while True:
+            with self._irq_cond:
+                while not self._irq_queue:
+                    self._irq_cond.wait()
+                handler, args = self._irq_queue.pop(0)
+            try:
+                with self.irq_lock:
+                    handler(*args)
+            except Reset:
+                self.reset_pending = True
+            except Exception as e:
+                print(f"[sim] IRQ 처리 중 예외: {e!r}")
+
+    def shutdown(self):
+        """재시작 전 하드웨어 상태 정리"""
+        for timer in list(self.timers):
+            timer.deinit()
+        if self.ble is not None:
+            self.ble.active(False)
+        for wlan in self.wlans.values():
+            wlan.active(False)
+        with self._irq_cond:
+            self._irq_queue.clear()
+        self.reset_pending = False
+
+    def uptime(self):
+        return time.monotonic() - self.started
+
+
+_local = threading.local()
+_default = None
+
+
+def bind(device):
+    """현재 스레드를 장치에 연결"""
+    _local.device = device
+
+
+def current():
+    """현재 스레드의 장치 (없으면 프로세스 기본 장치)"""
+    global _default
+    device = getattr(_local, "device", None)
+    if device is not None:
+        return device
+    if _default is None:
+        _default = Device("board")
+    return _default
+
+
+def check_reset():
+    """IRQ에서 reset()이 호출됐으면 메인 스레드에서 재시작"""
+    device = getattr(_local, "device", None)
+    if device is not None and device.reset_pending and threading.current_thread().name == device.name:
+        raise Reset()
+
+
+def loopback_net(ssid):
+    """SSID별 루프백 대역 접두사 (예: 127.23.145.)"""
+    h = 0
+    for c in ssid.encode():
+        h = (h * 31 + c) & 0xFFFF
+    return f"127.{(h >> 8) or 1}.{h & 0xFF}."
+
+
+_leases = {}  # 대역별 {장치 이름: 주소 마지막 자리}
+_lease_lock = threading.Lock()
+
+
+def lease(net, device):
+    """대역에서 장치의 DHCP 주소 마지막 자리 (같은 장치는 같은 주소, 2부터)"""
+    with _lease_lock:
+        hosts = _leases.setdefault(net, {})
+        if device.name not in hosts:
+            hosts[device.name] = len(hosts) + 2
+        return hosts[device.name]
+
+
+def map_host(host):
+    """보드 주소를 현재 장치의 루프백 주소로 변환"""
+    net = current().net
+    if net is None:
+        return host
+    if host in ("0.0.0.0", ""):
+        return net + "1" if current().net_is_ap else host
+    if host.startswith(BOARD_NET):
+        return net + host[len(BOARD_NET):]
+    return host
+
+
+_RealSocket = socket.socket
+_udp_bound = {}  # (대역, 포트)별 바인드된 UDP 소켓 (브로드캐스트 전달용)
+_udp_lock = threading.Lock()
+
+
+def _is_broadcast(host, net):
+    return host == "255.255.255.255" or (net is not None and host == net + "255")
+
+
+class SimSocket(_RealSocket):
+    """주소만 루프백으로 바꾸는 실제 소켓
+
+    UDP 브로드캐스트(192.168.4.255, 255.255.255.255)는 루프백에서 동작하지
+    않으므로 같은 대역, 같은 포트에 바인드한 UDP 소켓마다 한 번씩 보낸다.
+    ESP-IDF lwIP처럼 보내는 쪽과 받는 쪽 모두 SO_BROADCAST가 켜져 있어야 한다.
+    """
+
+    _udp_key = None
+
+    def bind(self, address):
+        device = current()
+        host = map_host(address[0])
+        if self.type == socket.SOCK_DGRAM and device.net is not None:
+            if host in ("0.0.0.0", "") and device.host:
+                host = device.net + str(device.host)  # 스테이션마다 다른 루프백 주소
+            result = super().bind((host, address[1]))
+            self._udp_key = (device.net, address[1])
+            with _udp_lock:
+                _udp_bound.setdefault(self._udp_key, []).append(self)
+            return result
+        return super().bind((host, address[1]))
+
+    def close(self):
+        if self._udp_key is not None:
+            with _udp_lock:
+                bound = _udp_bound.get(self._udp_key, [])
+                if self in bound:
+                    bound.remove(self)
+            self._udp_key = None
+        return super().close()
+
+    def connect(self, address):
+        return super().connect((map_host(address[0]), address[1]))
+
+    def connect_ex(self, address):
+        return super().connect_ex((map_host(address[0]), address[1]))
+
+    def sendto(self, data, *args):
+        address = args[-1]
+        net = current().net
+        host = map_host(address[0])
+        if not _is_broadcast(host, net):
+            return super().sendto(data, *args[:-1], (host, address[1]))
+        if not self.getsockopt(socket.SOL_SOCKET, socket.SO_BROADCAST):
+            raise OSError(errno.EACCES, "SO_BROADCAST not set")
+        with _udp_lock:
+            targets = list(_udp_bound.get((net, address[1]), ()))
+        for sock in targets:
+            try:
+                if sock is not self and sock.getsockopt(socket.SOL_SOCKET, socket.SO_BROADCAST):
+                    super().sendto(data, *args[:-1], sock.getsockname())
+            except OSError:
+                pass  # 닫히는 중인 소켓
+        return len(data)
+
+
+def _getaddrinfo(host, port, *args, **kwargs):
+    return _real_getaddrinfo(map_host(host), port, *args, **kwargs)
+
+
+_real_getaddrinfo = socket.getaddrinfo
+
+
+def install():
+    """MicroPython 전용 time/socket/gc 함수를 CPython 모듈에 추가"""
+    time.ticks_ms = ticks.ticks_ms
+    time.ticks_us = ticks.ticks_us
+    time.ticks_diff = ticks.ticks_diff
+    time.ticks_add = ticks.ticks_add
+    time.ticks_cpu = ticks.ticks_us
+
+    real_sleep = time.sleep
+
+    def sleep(seconds):
+        check_reset()
+        real_sleep(seconds)
+        check_reset()
+
+    time.sleep = sleep
+    time.sleep_ms = lambda ms: sleep(ms / 1000)
+    time.sleep_us = lambda us: sleep(us / 1000000)
+
+    socket.socket = SimSocket
+    socket.getaddrinfo = _getaddrinfo
+
+    import gc
+    import tracemalloc
+    if not hasattr(gc, "mem_alloc"):
+        # tracemalloc이 켜져 있을 때만 의미 있는 값 (run_sim.py --trace-mem)
+        gc.mem_alloc = lambda: tracemalloc.get_traced_memory()[0] if tracemalloc.is_tracing() else 0
+        gc.mem_free = lambda: 256 * 1024 - gc.mem_alloc()
+        gc.threshold = lambda *args: -1
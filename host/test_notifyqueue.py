@@ -0,0 +1,89 @@
+"""NotifyQueue 합침(COALESCE)과 LED 값 알림 순번 확인 (호스트 PC에서 실행)
+
+사용법: python host/test_notifyqueue.py (또는 python -m pytest host/test_notifyqueue.py)
+
+전송 버퍼가 가득 찬 동안 LED 트랜스미터처럼 값 알림을 합쳐 보내고, 리시버의
+Decoder/SeqTracker로 받아서 합쳐진 알림이 손실로 세어지지 않는지 확인한다.
+"""
+import errno
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "lib"))
+
+import ledproto  # noqa: E402
+import notifyqueue  # noqa: E402
+
+_VALUE_KEY = 0
+
+
+class FakeBLE:
+    """gatts_notify()만 흉내냄: 전송 버퍼(capacity개)가 차면 ENOMEM"""
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.buffer = []
+
+    def gatts_notify(self, conn_handle, value_handle, data):
+        if len(self.buffer) >= self.capacity:
+            raise OSError(errno.ENOMEM)
+        self.buffer.append(bytes(data))
+
+    def drain(self):
+        """연결 이벤트 한 번: 버퍼의 알림을 모두 보내고 반환"""
+        sent, self.buffer = self.buffer, []
+        return sent
+
+
+def send_values(bursts, capacity=2, size=4):
+    """버퍼가 찬 상태에서 값을 몰아서 보냄 (bursts: 연결 이벤트 사이에 보낼 값 수 목록)
+
+    (대기열, 리시버 SeqTracker, 받은 값) 반환
+    """
+    ble = FakeBLE(capacity)
+    queue = notifyqueue.NotifyQueue(ble, size, ledproto.STAMPED_SIZE, notifyqueue.COALESCE)
+    queue.bind(0, 1)
+    stamped = ledproto.StampedWriter()
+    seqs = ledproto.SeqTracker()
+    values = []
+
+    def on_sample(value, seq, stamp):
+        if seqs.update(seq):
+            values.append(value)
+    decoder = ledproto.Decoder(on_sample)
+
+    value = 0
+    for count in bursts:
+        for _ in range(count):
+            # led_control/python_bluetooth/transmitter.py와 같은 순서
+            resend = queue.will_coalesce(_VALUE_KEY)
+            assert queue.send(stamped.pack(value, value, resend), _VALUE_KEY)
+            value += 1
+        while queue.pending() or ble.buffer:
+            for packet in ble.drain():
+                decoder.feed(packet)
+            queue.flush()
+    return queue, seqs, values
+
+
+def test_coalesced_values_are_not_lost():
+    count = 20
+    queue, seqs, values = send_values([count])
+    assert queue.coalesced == count - 3  # 버퍼 2개 + 대기열 1개 뒤로는 모두 합침
+    assert queue.dropped == 0
+    assert seqs.lost == 0
+    assert seqs.reordered == 0
+    assert values == [0, 1, count - 1]  # 마지막 값은 반드시 도착
+
+
+def test_sequence_continues_after_coalescing():
+    queue, seqs, values = send_values([10, 1, 10])
+    assert queue.coalesced == 2 * (10 - 3)
+    assert seqs.lost == 0
+    assert values == [0, 1, 9, 10, 11, 12, 20]
+
+
+if __name__ == "__main__":
+    test_coalesced_values_are_not_lost()
+    test_sequence_continues_after_coalescing()
+    print("통과")
@@ -2,8 +2,20 @@ import bluetooth
 from micropython import const
 import struct
 import time
-from machine import Pin, PWM
+from machine import Pin, PWM, reset
 import array
+import ledcurve
+import histogram
+import ledproto
+import bleevents
+import bleprofile
+import advdata
+import gattcache
+import logcodes
+import playout
+import rlog
+import slew
+import supervisor
 
 # 시작 시 1초 딜레이
 print("리시버 시작 대기 중...")
@@ -11,28 +23,36 @@ time.sleep(1)
 print("리시버 시작!")
 
 # PWM 설정
-led = PWM(Pin(3), freq=5000, duty=0)  # GPIO 3번 핀, 5kHz 주파수
-PWM_RESOLUTION = 8  # 8비트 PWM 해상도
-PWM_MAX = 255  # 최대 PWM 값
-PWM_MIN = 0  # 최소 PWM 값
-PWM_THRESHOLD = 10  # PWM 값 변화 임계값
+led = PWM(Pin(3), freq=5000, duty_u16=0)  # GPIO 3번 핀, 5kHz 주파수, 16비트 듀티
+PWM_CURVE = "gamma"  # ADC 값 -> 밝기 곡선: linear(기존), gamma(2.2), cie(CIE 1931 명도)
+PWM_MAX = 255  # 노이즈 임계값 단위 (밝기 255단계 기준, 트랜스미터의 DEADBAND와 같은 기준)
+PWM_THRESHOLD = 10  # 밝기 변화 임계값 (255단계 중)
+ADC_THRESHOLD = PWM_THRESHOLD * ledcurve.ADC_MAX // PWM_MAX  # 같은 임계값의 ADC 단위 (약 160)
+
+# ADC 값 -> duty_u16 변환표 (시작 시 한 번 계산, 수신 경로에는 부동소수점 연산 없음)
+build_start = time.ticks_ms()
+duty_table = ledcurve.build(PWM_CURVE)
+print(f"밝기 곡선: {PWM_CURVE} (변환표 {len(duty_table)}칸, {time.ticks_diff(time.ticks_ms(), build_start)}ms)")
 
 # PWM 노이즈 필터링
-last_pwm_value = 0  # 마지막 PWM 값
+last_value = 0  # 마지막으로 적용한 ADC 값 (0: LED 꺼짐)
+
+# PWM 슬루 설정 (타이머 IRQ가 목표 듀티까지 일정한 속도로 이동, 패킷 도착 간격이 고르지 않아도 계단처럼 보이지 않음)
+SLEW_FREQ = 500     # 듀티 갱신 주파수 (Hz)
+SLEW_RAMP_MS = 100  # 전체 밝기 범위를 이동하는 시간 (ms, 0: 새 값을 바로 적용)
+SLEW_TAU_MS = 0     # 0이 아니면 일정 속도 대신 시간 상수(ms)로 지수 접근
+dimmer = slew.Slew(led, SLEW_FREQ, SLEW_RAMP_MS, SLEW_TAU_MS)
+dimmer.start()
 
 # 재시도 설정
-MAX_RETRY_COUNT = 5  # 최대 재시도 횟수
-RETRY_INTERVAL = 5000  # 재시도 간격 (ms)
-retry_count = 0  # 현재 재시도 횟수
-last_retry_time = 0  # 마지막 재시도 시간
+RETRY_BASE_DELAY = 500  # 첫 재시도 대기 시간 (ms, 실패할 때마다 2배)
+RETRY_MAX_DELAY = 10000  # 최대 재시도 대기 시간 (ms)
+RESET_AFTER = 10  # 연속 실패가 이 횟수에 도달하면 재시작 (최후의 수단)
+CONNECT_TIMEOUT = 5000  # 연결 요청 후 응답 대기 시간 (ms)
 
 # 트랜스미터 MAC 주소 정의 (바이트 형식)
-TRANSMITTER_MAC = bytes.fromhex('dc0675680b52')  # 트랜스미터 MAC 주소
-
-# LED 설정 (PWM)
-led = PWM(Pin(3))  # GPIO 3번 핀 (led_control_rules에 정의된 대로)
-led.freq(1000)     # PWM 주파수 1kHz
-led.duty_u16(0)    # 초기 밝기 0
+# 트랜스미터 선택: 서비스 UUID를 광고하는 보드를 찾음 (보드마다 MAC을 고칠 필요 없음)
+TRANSMITTER_MAC = None  # 특정 보드만 연결하려면 MAC 주소 (예: bytes.fromhex('dc0675680b52'))
 
 # 블루투스 이벤트 상수
 _IRQ_SCAN_RESULT = const(5)
@@ -43,7 +63,13 @@ _IRQ_GATTC_SERVICE_RESULT = const(9)
 _IRQ_GATTC_SERVICE_DONE = const(10)
 _IRQ_GATTC_CHARACTERISTIC_RESULT = const(11)
 _IRQ_GATTC_CHARACTERISTIC_DONE = const(12)
+_IRQ_GATTC_WRITE_DONE = const(17)
 _IRQ_GATTC_NOTIFY = const(18)
+_IRQ_MTU_EXCHANGED = const(21)
+_IRQ_CONNECTION_UPDATE = const(27)
+
+# 스캔 결과 종류
+_SCAN_RSP = const(4)
 
 # 서비스 및 특성 UUID
 _ESP32_SERVICE_UUID = bluetooth.UUID('6E400001-B5A3-F393-E0A9-E50E24DCCA9E')
@@ -55,6 +81,12 @@ ble.active(False)  # 먼저 비활성화
 time.sleep(0.1)    # 잠시 대기
 ble.active(True)   # 다시 활성화
 time.sleep(0.1)    # 활성화 대기
+BLE_MTU = 247      # 요청할 ATT MTU (23~512, 연결 직후 교환 요청, 두 장치 중 작은 값으로 정해짐)
+ble.config(mtu=BLE_MTU)
+
+# 링 버퍼 로거 (bt_irq 안에서는 print() 대신 기록만 하고 메인 루프에서 UART로 출력)
+LOG_LEVEL = rlog.DEBUG  # 기록할 최소 레벨 (rlog.INFO: 값마다 남기는 기록 생략)
+log = rlog.RingLog(level=LOG_LEVEL)
 
 # 연결 상태
 connected = False
@@ -63,12 +95,69 @@ char_handle = None
 count = 0
 scanning = False  # 스캔 상태 추적
 last_scan_time = 0  # 마지막 스캔 시작 시간
-SCAN_INTERVAL = 1000  # 스캔 간격 (ms)
-SCAN_WINDOW = 500  # 스캔 윈도우 (ms)
+ACTIVE_SCAN = False  # True: 스캔 요청을 보내 스캔 응답(트랜스미터 이름)도 받음 (서비스 UUID는 광고에 있으므로 찾는 데는 불필요)
+scan_started = 0  # 스캔을 실제로 시작한 시각 (ms)
+discover_ms = -1  # 스캔 시작 -> 트랜스미터 발견 (ms)
+SCAN_INTERVAL = 1000  # 스캔 재시작 최소 간격 (ms)
 SCAN_DURATION = 10000  # 스캔 지속 시간 (ms)
+CONNECT_SCAN_DURATION = 2000  # 연결 요청 중 트랜스미터를 찾는 시간 (ms)
+CONNECT_DELAY = 200  # 스캔 중지 후 연결 요청까지 대기 (ms, 메인 루프에서 시각을 확인)
+connect_target = None  # 연결 요청할 (주소 종류, 주소), None: 대기 중인 요청 없음
+connect_at = 0  # 연결 요청 시각 (ms)
+
+# BLE 이벤트 대기열 (bt_irq는 이벤트를 복사만 하고 메인 루프가 처리, 알림만 bt_irq 안에서 바로 처리)
+EVENT_QUEUE = 16  # 대기열 크기 (2의 거듭제곱)
+
+# GATT 핸들 캐시 (트랜스미터 광고의 GATT 버전이 같으면 재연결 시 검색 없이 바로 구독)
+GATT_CACHE = True  # False: 연결할 때마다 서비스/특성 검색
+gatt_cache = gattcache.GattCache()
+peer_addr = b""  # 연결할 트랜스미터 주소 (스캔 결과)
+peer_version = -1  # 광고의 GATT 버전 (-1: 없음)
+service_range = None  # 서비스 검색으로 찾은 (시작 핸들, 끝 핸들)
+cccd_handle = None  # 알림 구독 설정(CCCD) 핸들
+cached = False  # 이번 연결에서 캐시한 핸들 사용
+ready = False  # 알림 구독 완료
+connect_time = 0  # 연결된 시각 (ms)
+ready_ms = -1  # 연결 -> 구독 완료 (ms)
+first_notify_ms = -1  # 연결 -> 구독 후 첫 알림 (ms)
+
+# 연결 프로필 (스캔/연결 간격, lib/bleprofile.py): low-latency, balanced, low-power
+BLE_PROFILE = "balanced"
+profile = bleprofile.get(BLE_PROFILE)
+STATS_INTERVAL = 10000  # 슬루/재생 통계 출력 간격 (ms)
+connecting = False  # 연결 요청 후 응답 대기 중
+mtu = 23  # 현재 연결의 ATT MTU (교환 전 기본값)
+notifies = 0  # 통계 구간에 받은 알림 수
+notify_bytes = 0  # 통계 구간에 받은 알림 바이트 수
+transit = histogram.TransitHistogram()  # 알림 지연: 알림의 마지막 샘플 시각 -> bt_irq에서 받은 시각
+last_stamp = -1  # 알림에서 꺼낸 마지막 샘플 시각 (-1: 시각 없는 값)
+
+# 재생 지연 (트랜스미터가 붙인 샘플 시각 + PLAYOUT_DELAY에 적용, 도착 간격이 흔들려도 샘플 간격 그대로 재생)
+PLAYOUT_DELAY = 0  # ms, 0: 재생 큐 없이 알림마다 마지막 값 바로 적용
+PLAYOUT_POLL = 10  # 재생 지연 사용 시 메인 루프 최대 대기 시간 (ms)
+player = playout.Playout(PLAYOUT_DELAY) if PLAYOUT_DELAY else None
+seqs = ledproto.SeqTracker()  # 순번으로 손실/역순 도착 집계 (bt_irq만 변경)
+
+# bt_irq에서 꺼낸 시각 값 (bt_irq만 쓰고 메인 루프만 읽으므로 재생 큐를 두 곳에서 건드리지 않음)
+PENDING_SIZE = 64  # 2의 거듭제곱
+pending = array.array('i', bytes(12 * PENDING_SIZE))  # (값, 샘플 시각, 수신 시각) x PENDING_SIZE
+pending_head = 0  # 다음에 쓸 위치 (bt_irq만 변경)
+pending_tail = 0  # 다음에 읽을 위치 (메인 루프만 변경)
+
+def reset_device():
+    """LED를 끄고 장치 재시작 (연속 실패 시 최후의 수단)"""
+    dimmer.stop()
+    led.duty_u16(0)
+    time.sleep(1)
+    reset()
+
+# 연결 상태 머신 (스캔 재시작 시점과 재시작 여부 관리)
+link = supervisor.Supervisor("BLE 클라이언트", RETRY_BASE_DELAY, RETRY_MAX_DELAY,
+                             connect_timeout=CONNECT_TIMEOUT, reset_after=RESET_AFTER,
+                             on_reset=reset_device)
 
 def start_scan():
-    global scanning, last_scan_time
+    global scanning, last_scan_time, scan_started
     current_time = time.ticks_ms()
     
     # 이전 스캔으로부터 충분한 시간이 지났는지 확인
@@ -79,14 +168,16 @@ def start_scan():
             time.sleep(0.2)  # 스캔 중지 대기 시간 증가
             
             # 새 스캔 시작
-            ble.gap_scan(SCAN_DURATION, SCAN_INTERVAL, SCAN_WINDOW)
+            ble.gap_scan(SCAN_DURATION, profile.scan_interval_us, profile.scan_window_us, ACTIVE_SCAN)
+            scan_started = time.ticks_ms()
             scanning = True
             last_scan_time = current_time
+            link.begin("스캔")
             print("스캔 시작...")
         except Exception as e:
             print(f"스캔 시작 실패: {e}")
             scanning = False
-            time.sleep(0.2)  # 실패 시 대기 시간 증가
+            link.fail("스캔 시작 실패")
             return False
     return True
 
@@ -96,168 +187,346 @@ def stop_scan():
         try:
             ble.gap_scan(None)
             scanning = False
-            print("스캔 중지...")
-            time.sleep(0.2)  # 스캔 중지 대기 시간 증가
+            log.info(logcodes.BLE_SCAN_STOP)
         except Exception as e:
-            print(f"스캔 중지 실패: {e}")
+            log.warn(logcodes.BLE_SCAN_STOP_FAIL, data=str(e))
 
 def set_pwm_value(value):
     """PWM 값 설정 (노이즈 필터링 포함)"""
-    global last_pwm_value
+    global last_value
     
-    # ADC 값을 PWM 값으로 변환 (0-4095 -> 0-255)
-    pwm_value = int((value / 4095) * PWM_MAX)
+    # 값 범위 제한
+    if value > ledcurve.ADC_MAX:
+        value = ledcurve.ADC_MAX
     
     # 노이즈 필터링: 임계값보다 작은 변화는 무시
-    if abs(pwm_value - last_pwm_value) < PWM_THRESHOLD:
+    if abs(value - last_value) < ADC_THRESHOLD:
         return
-        
-    # PWM 값 범위 제한
-    pwm_value = max(PWM_MIN, min(PWM_MAX, pwm_value))
     
-    # PWM 값 업데이트
-    led.duty(pwm_value)
-    last_pwm_value = pwm_value
-    print(f"PWM 값 설정: {pwm_value}")
-
-def check_retry_limit():
-    """재시도 제한 확인"""
-    global retry_count
-    if retry_count >= MAX_RETRY_COUNT:
-        print("최대 재시도 횟수 초과. 장치를 재시작합니다.")
-        led.duty(0)  # LED 끄기
-        time.sleep(1)
-        import machine
-        machine.reset()
-        return True
-    return False
-
-def cleanup_connection():
-    """연결 정리"""
-    global connected, conn_handle, retry_count
+    # 변환표에서 듀티를 읽어 목표 듀티로 설정 (슬루 타이머가 서서히 이동)
+    duty = duty_table[value]
+    dimmer.set(duty)
+    last_value = value
+    log.debug(logcodes.LED_DUTY, duty)
+
+def on_sample(value, seq, stamp):
+    """수신한 값 하나 기록 (seq: 순번 또는 샘플 인덱스, stamp: 샘플 시각, 기존 단일 값은 둘 다 -1)"""
+    global latest, pending_head, last_stamp
+    last_stamp = stamp
+    fresh = True
+    if seq >= 0:
+        if decoder.batch_start:
+            log.debug(logcodes.LED_BATCH_RECV, decoder.batches, decoder.size, seq)
+        fresh = seqs.update(seq)
+    if player and stamp >= 0:
+        # 재생 지연: 메인 루프가 재생 큐로 옮김 (가득 차면 버림)
+        if (pending_head - pending_tail) & 0xFFFF >= PENDING_SIZE:
+            player.overflow += 1
+            return
+        i = (pending_head & (PENDING_SIZE - 1)) * 3
+        pending[i] = value
+        pending[i + 1] = stamp
+        pending[i + 2] = time.ticks_ms()
+        pending_head = (pending_head + 1) & 0xFFFF
+        return
+    if fresh:
+        latest = value  # 알림마다 마지막 값만 LED에 적용 (더 새로운 순번을 이미 받았으면 버림)
+
+def play_pending():
+    """bt_irq가 꺼낸 값을 재생 큐로 옮기고 재생 시각이 된 값 적용, 다음 재생까지 대기할 ms 반환"""
+    global pending_tail, count
+    while pending_tail != pending_head:
+        i = (pending_tail & (PENDING_SIZE - 1)) * 3
+        player.push(pending[i], pending[i + 1], pending[i + 2])
+        pending_tail = (pending_tail + 1) & 0xFFFF
+    value = player.pop()
+    if value >= 0:
+        count += 1
+        set_pwm_value(value)
+    wait = player.wait()
+    return PLAYOUT_POLL if wait < 0 else min(wait, PLAYOUT_POLL)
+
+# 알림 디코더 (단일 값 또는 묶음 패킷, 알림 하나를 통째로 처리하므로 수신 버퍼 없음)
+decoder = ledproto.Decoder(on_sample, 0)
+latest = -1  # 알림에서 꺼낸 마지막 값 (-1: 없음)
+
+def request_connect():
+    """스캔에서 찾은 트랜스미터에 연결 요청 (메인 루프에서 CONNECT_DELAY 뒤에 호출)"""
+    global connect_target
+    addr_type, addr = connect_target
+    connect_target = None
+    try:
+        ble.gap_connect(addr_type, addr, CONNECT_SCAN_DURATION,
+                        profile.min_conn_us, profile.max_conn_us)
+        log.info(logcodes.BLE_CONNECTING)
+    except Exception as e:
+        log.warn(logcodes.BLE_CONNECT_FAIL, data=str(e))
+        cleanup_connection("연결 요청 실패")
+
+def cleanup_connection(reason=""):
+    """연결 정리 (백오프 후 메인 루프에서 재스캔)"""
+    global connected, conn_handle, connecting, last_value, ready, connect_target
     connected = False
+    connecting = False
+    connect_target = None
+    ready = False
     conn_handle = None
-    retry_count = 0  # 재시도 횟수 초기화
-    led.duty(0)  # LED 끄기
+    dimmer.jump(0)  # LED 바로 끄기
+    last_value = 0  # 다시 연결되면 현재 밝기를 바로 적용
+    if link.state != supervisor.BACKOFF:  # 연결 시간 초과로 이미 실패 처리된 경우 제외
+        link.fail(reason)
+
+def set_profile(name):
+    """연결 프로필 변경 (연결 중이면 끊고 새 간격으로 다시 연결, MicroPython에는 연결 파라미터 갱신 함수가 없음)"""
+    global profile
+    profile = bleprofile.get(name)
+    print(f"연결 프로필: {profile.format()}")
+    if connected:
+        ble.gap_disconnect(conn_handle)
+
+def start_gatt():
+    """알림 구독 시작: 캐시한 핸들이 있으면 바로 구독, 없으면 서비스 검색"""
+    global char_handle, cccd_handle, cached, service_range
+    handles = gatt_cache.get(peer_addr, _ESP32_SERVICE_UUID, peer_version) if GATT_CACHE else None
+    cached = handles is not None
+    if cached:
+        char_handle, cccd_handle = handles
+        subscribe()
+    else:
+        char_handle = None
+        service_range = None
+        ble.gattc_discover_services(conn_handle)
+
+def subscribe():
+    """CCCD에 써서 알림 구독 (응답은 _IRQ_GATTC_WRITE_DONE)"""
+    ble.gattc_write(conn_handle, cccd_handle, b"\x01\x00", 1)
 
 def bt_irq(event, data):
-    """블루투스 이벤트 처리"""
-    global connected, conn_handle, retry_count
+    """블루투스 이벤트 처리 (알림은 bt_irq 안에서, 나머지는 메인 루프의 events.dispatch()에서 호출)"""
+    global connected, conn_handle, scanning, connecting, count, latest, pending_tail, mtu, notifies, notify_bytes, last_stamp
+    global char_handle, cccd_handle, cached, service_range, peer_addr, peer_version, ready, connect_time, ready_ms, first_notify_ms
+    global connect_target, connect_at, discover_ms
     try:
         if event == _IRQ_SCAN_RESULT:
-            # 스캔 결과 처리
+            # 스캔 결과 처리 (주소와 광고 데이터는 대기열이 bytes로 복사해 둠)
             addr_type, addr, adv_type, rssi, adv_data = data
-            addr = bytes(addr)
             
-            # 트랜스미터 MAC 주소와 일치하는지 확인
-            if addr == TRANSMITTER_MAC:
-                print(f"트랜스미터 발견! RSSI: {rssi}")
-                if not connected:  # 연결 중이 아닐 때만 연결 시도
-                    # 스캔 중지 후 연결 시도
+            if adv_type == _SCAN_RSP:
+                # 액티브 스캔의 스캔 응답: 찾은 트랜스미터의 이름
+                if addr == peer_addr:
+                    log.info(logcodes.BLE_SCAN_NAME, data=advdata.find(adv_data, advdata.COMPLETE_NAME) or b"")
+            elif (advdata.has_service(adv_data, _ESP32_SERVICE_UUID)
+                  and (TRANSMITTER_MAC is None or addr == TRANSMITTER_MAC)):
+                # 서비스 UUID를 광고하는 트랜스미터
+                if not connected and not connecting:  # 연결 중이 아닐 때만 연결 시도
+                    discover_ms = time.ticks_diff(time.ticks_ms(), scan_started)
+                    log.info(logcodes.BLE_DISCOVERED, discover_ms, rssi, data=addr)
+                    peer_addr = addr
+                    peer_version = gattcache.adv_version(adv_data)
+                    # 스캔 중지 후 CONNECT_DELAY 뒤에 메인 루프에서 연결 요청 (기다리는 동안 다른 이벤트 처리)
                     stop_scan()
-                    time.sleep(0.2)  # 연결 전 대기 시간 증가
-                    try:
-                        ble.gap_connect(addr_type, addr)
-                        print("트랜스미터 연결 시도 중...")
-                    except Exception as e:
-                        print(f"연결 시도 실패: {e}")
-                        time.sleep(0.2)
-                        start_scan()
+                    connecting = True
+                    link.begin("연결 요청")  # 연결 시간 초과는 스캔 시작이 아니라 여기부터
+                    connect_target = (addr_type, addr)
+                    connect_at = time.ticks_add(time.ticks_ms(), CONNECT_DELAY)
             else:
                 # 디버깅용: 다른 장치 발견 시 로그
                 if rssi > -50:  # RSSI가 -50dBm보다 강한 경우만 출력
-                    print(f"다른 장치 발견: {addr.hex()} (RSSI: {rssi})")
+                    log.debug(logcodes.BLE_OTHER_DEVICE, rssi, data=addr)
                 
         elif event == _IRQ_SCAN_DONE:
-            # 스캔 완료 후 재시작 (연결되지 않은 경우에만)
+            # 트랜스미터를 찾지 못하고 스캔이 끝나면 백오프 후 메인 루프에서 재스캔
+            # (연결하려고 stop_scan()으로 멈춘 스캔은 제외, 연결 시간 초과는 메인 루프가 이미 실패 처리)
+            stopped = not scanning
             scanning = False
-            if not connected:
-                print("스캔 완료, 재시작...")
-                time.sleep(0.2)  # 재스캔 전 대기 시간 증가
-                start_scan()
+            if stopped or connected or connecting:
+                log.info(logcodes.BLE_SCAN_DONE_BUSY)
             else:
-                print("스캔 완료 (연결 유지 중)")
+                log.info(logcodes.BLE_SCAN_DONE_MISS)
+                link.fail("트랜스미터 없음")
                 
         elif event == _IRQ_PERIPHERAL_CONNECT:
             # 서버 연결
             conn_handle, addr_type, addr = data
             connected = True
-            retry_count = 0  # 연결 성공 시 재시도 횟수 초기화
-            print(f"서버 연결됨: {bytes(addr).hex()}")
+            connecting = False
+            seqs.reset()
+            seqs.reset_stats()
+            if player:
+                pending_tail = pending_head  # 이전 연결에서 남은 값 버림
+                player.reset()
+                player.reset_stats()
+            mtu = 23
+            notifies = 0
+            notify_bytes = 0
+            transit.rebase()  # 새 연결: 트랜스미터 시계 기준을 다시 잡음
+            transit.reset()
+            ready = False
+            connect_time = time.ticks_ms()
+            ready_ms = -1
+            first_notify_ms = -1
+            link.up(bytes(addr).hex())
+            log.info(logcodes.BLE_SERVER_CONNECT, data=addr)
+            # 큰 알림을 받을 수 있도록 MTU 교환 요청 (결과는 _IRQ_MTU_EXCHANGED, 끝나면 구독 시작)
+            try:
+                ble.gattc_exchange_mtu(conn_handle)
+            except Exception as e:
+                log.warn(logcodes.BLE_MTU_FAIL, data=str(e))
+                start_gatt()
             
         elif event == _IRQ_PERIPHERAL_DISCONNECT:
             # 서버 연결 해제
             conn_handle, addr_type, addr = data
-            cleanup_connection()
-            print("서버 연결 해제")
+            cleanup_connection("연결 해제")
+            log.info(logcodes.BLE_SERVER_DISCONNECT)
+            
+        elif event == _IRQ_MTU_EXCHANGED:
+            # MTU 교환 완료 (트랜스미터가 알림을 MTU - 3바이트까지 채움)
+            conn_handle, mtu = data
+            log.info(logcodes.BLE_MTU_EXCHANGED, mtu)
+            if not ready:
+                start_gatt()  # GATT 요청은 하나씩 (MTU 교환 -> 구독)
+            
+        elif event == _IRQ_CONNECTION_UPDATE:
+            # 트랜스미터가 연결 파라미터를 바꿈 (간격 단위 1.25ms)
+            conn_handle, conn_interval, conn_latency, supervision_timeout, status = data
+            log.info(logcodes.BLE_CONN_UPDATE, conn_interval, conn_latency, supervision_timeout)
             
         elif event == _IRQ_GATTC_SERVICE_RESULT:
             # 서비스 검색 결과
             conn_handle, start_handle, end_handle, uuid = data
             if uuid == _ESP32_SERVICE_UUID:
-                print(f"서비스 발견: {uuid}")
-                # 특성 검색
-                ble.gattc_discover_characteristics(conn_handle, start_handle, end_handle)
+                log.info(logcodes.BLE_SERVICE_UUID, data=bytes(uuid))
+                service_range = (start_handle, end_handle)
+                
+        elif event == _IRQ_GATTC_SERVICE_DONE:
+            # 서비스 검색 완료: 특성 검색
+            if service_range:
+                ble.gattc_discover_characteristics(conn_handle, service_range[0], service_range[1])
                 
         elif event == _IRQ_GATTC_CHARACTERISTIC_RESULT:
             # 특성 검색 결과
             conn_handle, def_handle, value_handle, properties, uuid = data
             if uuid == _ESP32_CHAR_UUID:
-                print(f"특성 발견: {uuid}")
+                log.info(logcodes.BLE_CHAR_UUID, data=bytes(uuid))
                 char_handle = value_handle
-                # 알림 활성화
-                ble.gattc_write(conn_handle, value_handle + 1, bytes([0x01, 0x00]), 1)
-                print("알림 활성화됨")
+                cccd_handle = value_handle + 1  # 알림 특성의 CCCD는 값 바로 다음 핸들
+                
+        elif event == _IRQ_GATTC_CHARACTERISTIC_DONE:
+            # 특성 검색 완료: 알림 구독
+            if char_handle is not None:
+                subscribe()
+                
+        elif event == _IRQ_GATTC_WRITE_DONE:
+            # 구독(CCCD 쓰기) 결과
+            conn_handle, value_handle, status = data
+            if value_handle == cccd_handle and not ready:
+                if status == 0:
+                    ready = True
+                    ready_ms = time.ticks_diff(time.ticks_ms(), connect_time)
+                    log.info(logcodes.BLE_NOTIFY_ON)
+                    log.info(logcodes.BLE_READY, ready_ms, cached)
+                    if GATT_CACHE and not cached:
+                        gatt_cache.put(peer_addr, _ESP32_SERVICE_UUID, peer_version, char_handle, cccd_handle)
+                elif cached:
+                    # 트랜스미터의 서비스 구성이 바뀜 (버전을 올리지 않음): 캐시를 버리고 검색
+                    log.warn(logcodes.BLE_CACHE_STALE, status)
+                    gatt_cache.forget(peer_addr, _ESP32_SERVICE_UUID)
+                    cached = False
+                    char_handle = None
+                    service_range = None
+                    ble.gattc_discover_services(conn_handle)
+                else:
+                    log.warn(logcodes.BLE_SUBSCRIBE_FAIL, status)
                 
         elif event == _IRQ_GATTC_NOTIFY:
             # 서버로부터 데이터 수신
             conn_handle, value_handle, notify_data = data
+            notifies += 1
+            notify_bytes += len(notify_data)
+            if ready and first_notify_ms < 0:
+                first_notify_ms = time.ticks_diff(time.ticks_ms(), connect_time)
             if conn_handle == conn_handle:  # 연결된 서버로부터의 데이터인지 확인
                 try:
-                    # 2바이트 정수로 데이터 파싱
-                    value = struct.unpack("<H", notify_data)[0]
-                    set_pwm_value(value)
+                    # 알림 하나가 패킷 하나이므로 이전 알림의 상태는 버리고 파싱
+                    decoder.reset()
+                    last_stamp = -1
+                    decoder.feed(notify_data)
+                    if last_stamp >= 0:
+                        transit.arrive(last_stamp, time.ticks_ms())
+                    if latest >= 0:
+                        count += 1
+                        set_pwm_value(latest)
+                        latest = -1
                 except Exception as e:
-                    print(f"데이터 파싱 오류: {e}")
+                    log.warn(logcodes.BLE_PARSE_FAIL, data=str(e))
     except Exception as e:
-        print(f"이벤트 처리 중 오류 발생: {e}")
+        log.error(logcodes.IRQ_ERROR, data=str(e))
 
-# 블루투스 이벤트 핸들러 등록
-ble.irq(bt_irq)
+# 블루투스 이벤트 핸들러 등록 (bt_irq는 대기열을 거쳐 메인 루프에서 호출)
+events = bleevents.EventQueue(bt_irq, EVENT_QUEUE, inline=(_IRQ_GATTC_NOTIFY,))
+ble.irq(events.irq)
 
 print("리시버 준비 완료!")
 print("트랜스미터 스캔 중...")
+print(f"연결 프로필: {profile.format()}")
 
 # 스캔 시작
 start_scan()
 
 # 메인 루프
 while True:
-    current_time = time.ticks_ms()
+    # bt_irq가 쌓은 이벤트 처리
+    events.dispatch()
     
-    # 연결이 끊어진 경우 재연결 시도
-    if not connected:
-        if check_retry_limit():
-            continue
-            
-        # 재시도 간격 확인
-        if time.ticks_diff(current_time, last_retry_time) < RETRY_INTERVAL:
-            continue
-            
-        retry_count += 1
-        last_retry_time = current_time
-        print(f"연결 시도 실패 (시도 {retry_count}/{MAX_RETRY_COUNT})")
-        
-        # 서버 스캔 및 연결 시도
+    # bt_irq에서 쌓인 기록 출력, 새로 검색한 GATT 핸들 저장 (플래시 쓰기는 bt_irq 밖에서)
+    log.flush()
+    gatt_cache.save()
+    
+    # 스캔 중지 후 CONNECT_DELAY가 지났으면 연결 요청
+    if connect_target and time.ticks_diff(time.ticks_ms(), connect_at) >= 0:
+        request_connect()
+    
+    # 연결 요청에 응답이 없으면 취소 (연결 해제 이벤트에서 실패 처리)
+    if connecting and link.check_timeout():
+        connecting = False
+        connect_target = None
         try:
-            scan_result = ble.gap_scan(2000, 30000, 30000)
-            if scan_result:
-                addr_type, addr, adv_type, rssi, adv_data = scan_result
-                if b"ESP32_LED_BLE" in adv_data:
-                    print(f"서버 발견: {bytes(addr).hex()}")
-                    ble.gap_connect(addr_type, addr)
+            ble.gap_connect(None)
+        except Exception:
+            pass
+    
+    # 연결되지 않은 상태에서 백오프가 끝났으면 재스캔 (스캔 결과는 bt_irq에서 처리)
+    if not connected and not scanning and not connecting and link.ready():
+        start_scan()
+    
+    # 재생 지연: 다음 재생 시각까지만 대기
+    sleep_ms = 100  # CPU 부하 감소
+    if player and connected:
+        try:
+            sleep_ms = play_pending()
         except Exception as e:
-            print(f"스캔/연결 시도 중 오류 발생: {e}")
-            cleanup_connection()
+            log.warn(logcodes.LED_DATA_FAIL, data=str(e))
+    
+    # 알림/슬루/순번/재생/이벤트 통계 (알림 수와 크기, 프로필별 알림 지연, 갱신 주파수와 타이머 지터, 손실/역순, 늦음,
+    # bt_irq 체류 시간과 대기열)
+    if connected and time.ticks_diff(time.ticks_ms(), dimmer.stats_from) >= STATS_INTERVAL:
+        log.flush()  # 앞선 기록을 먼저 출력해서 순서 유지
+        elapsed = time.ticks_diff(time.ticks_ms(), dimmer.stats_from) / 1000
+        print(f"[통계] 알림 {notifies / elapsed:.1f}/s | 평균 {notify_bytes / max(1, notifies):.1f}바이트 "
+              f"(최대 {mtu - 3}, MTU {mtu})")
+        print(f"[통계] 프로필 {profile.name} | {transit.format()}")
+        transit.reset()
+        notifies = 0
+        notify_bytes = 0
+        print(f"[통계] {dimmer.format()}")
+        dimmer.reset_stats()
+        print(f"[통계] 순번 손실 {seqs.lost} 역순 {seqs.reordered}")
+        seqs.reset_stats()
+        if player:
+            print(f"[통계] {player.format()}")
+            player.reset_stats()
+        print(f"[통계] {events.format()}")
+        events.reset_stats()
     
-    time.sleep(0.1)  # CPU 부하 감소 
\ No newline at end of file
+    events.wait(sleep_ms)  # 새 이벤트가 오면 바로 깨어남
\ No newline at end of file
@@ -1,9 +1,18 @@
 import bluetooth
 from micropython import const
-import struct
 import time
-from machine import Pin, ADC
-import array
+from machine import Pin, ADC, reset
+import adcfilter
+import adcsampler
+import advdata
+import bleevents
+import gattcache
+import ledproto
+import logcodes
+import notifyqueue
+import rlog
+import sendonchange
+import supervisor
 
 # 시작 시 1초 딜레이
 print("트랜스미터 시작 대기 중...")
@@ -15,16 +24,21 @@ adc = ADC(Pin(3))  # GPIO 3번 핀
 adc.atten(ADC.ATTN_11DB)  # 0-3.3V 범위
 adc.width(ADC.WIDTH_12BIT)  # 12비트 해상도
 
-# ADC 필터링 설정
-ADC_SAMPLES = 5  # 이동 평균 샘플 수
-adc_values = array.array('i', [0] * ADC_SAMPLES)  # ADC 값 저장 배열
-adc_index = 0  # 현재 ADC 샘플 인덱스
+# ADC 필터링 설정 (샘플당 연산량이 창 크기와 무관, host/bench_adcfilter.py로 비교)
+ADC_FILTER = "average"  # average(이동 평균), ema(지수 이동 평균), median(중앙값, 튀는 값 제거), none
+ADC_SAMPLES = 5  # 필터 창 크기 (샘플 수)
+adc_filter = adcfilter.create(ADC_FILTER, ADC_SAMPLES)
 
 # 재시도 설정
-MAX_RETRY_COUNT = 5  # 최대 재시도 횟수
-RETRY_INTERVAL = 5000  # 재시도 간격 (ms)
-retry_count = 0  # 현재 재시도 횟수
-last_retry_time = 0  # 마지막 재시도 시간
+RETRY_BASE_DELAY = 500  # 첫 재시도 대기 시간 (ms, 실패할 때마다 2배)
+RETRY_MAX_DELAY = 10000  # 최대 재시도 대기 시간 (ms)
+RESET_AFTER = 10  # 연속 실패가 이 횟수에 도달하면 재시작 (최후의 수단)
+ADV_INTERVAL = 100000  # 광고 간격 (us)
+ADV_FAST_INTERVAL = 20000  # 광고 시작 후 ADV_FAST_TIME 동안의 광고 간격 (us, BLE 최소 20ms: 리시버가 빨리 찾음)
+ADV_FAST_TIME = 30000  # 빠른 광고 유지 시간 (ms)
+adv_fast = False  # 빠른 간격으로 광고 중
+adv_started = 0  # 광고 시작 시각 (ms)
+GATT_VERSION = 1  # 서비스 구성(특성 순서/종류)을 바꾸면 올림 (리시버의 GATT 핸들 캐시 무효화)
 
 # BLE 이벤트 상수
 _IRQ_CENTRAL_CONNECT = const(1)
@@ -42,88 +56,187 @@ _IRQ_GATTC_READ_RESULT = const(15)
 _IRQ_GATTC_READ_DONE = const(16)
 _IRQ_GATTC_WRITE_DONE = const(17)
 _IRQ_GATTC_NOTIFY = const(18)
+_IRQ_MTU_EXCHANGED = const(21)
 
 # BLE 서비스와 특성 UUID (UUID 클래스 사용)
 SERVICE_UUID = bluetooth.UUID('6E400001-B5A3-F393-E0A9-E50E24DCCA9E')
 CHARACTERISTIC_UUID = bluetooth.UUID('6E400002-B5A3-F393-E0A9-E50E24DCCA9E')
 
+# 광고: 플래그 + 서비스 UUID + GATT 버전 (리시버는 서비스 UUID로 찾음), 이름은 스캔 응답에
+adv_payload = advdata.build(services=(SERVICE_UUID,), manufacturer=gattcache.manufacturer(GATT_VERSION))
+resp_payload = advdata.build(name="ESP32_LED_BLE", flags=False)
+
 # BLE 서버 설정
 ble = bluetooth.BLE()
 ble.active(False)  # 먼저 비활성화
 time.sleep(0.1)    # 잠시 대기
 ble.active(True)   # 다시 활성화
 time.sleep(0.1)    # 활성화 대기
+BLE_MTU = 247      # 요청할 ATT MTU (23~512, 연결 후 리시버가 교환 요청, 알림 최대 MTU - 3바이트)
+ble.config(mtu=BLE_MTU)
+
+# 링 버퍼 로거 (bt_irq 안에서는 print() 대신 기록만 하고 메인 루프에서 UART로 출력)
+LOG_LEVEL = rlog.DEBUG  # 기록할 최소 레벨 (rlog.INFO: 값마다 남기는 기록 생략)
+log = rlog.RingLog(level=LOG_LEVEL)
 
 # 연결 상태
 connected = False
 conn_handle = None
 char_handle = None
 count = 0
-last_send_time = 0  # 마지막 메시지 전송 시간
-SEND_INTERVAL = 5000  # 메시지 전송 간격 (ms) - WiFi 버전과 동일하게 5초
+advertising = False
+
+# 전송 설정
+SEND_ON_CHANGE = True     # True: 빠르게 샘플링하고 값이 바뀔 때만 전송, False: SEND_INTERVAL마다 전송
+SAMPLE_INTERVAL = 5       # 샘플링 간격 (ms, 200Hz)
+SEND_INTERVAL = 5000      # 고정 간격 전송 모드의 전송 간격 (ms) - WiFi 버전과 동일하게 5초
+KEEPALIVE_INTERVAL = 1000 # 값이 그대로일 때 재전송 간격 (ms)
+MIN_SEND_INTERVAL = 30    # 연속 알림 사이 최소 간격 (ms, 연결 간격보다 자주 보내면 쌓이기만 함)
+STATS_INTERVAL = 10000    # 샘플/전송률 통계 출력 간격 (ms)
+last_sample_time = 0      # 마지막 샘플링 시간 (묶음 전송 모드: 마지막 묶음 전송 시간)
+
+# 묶음 전송 설정 (STREAM = True면 SEND_ON_CHANGE 대신 사용)
+STREAM = False            # True: 타이머 IRQ로 일정 간격 샘플링, 쌓인 샘플을 묶음 알림으로 전송
+STREAM_RATE = 200         # 타이머 샘플링 주파수 (Hz)
+STREAM_INTERVAL = 35      # 묶음 전송 간격 (ms, 200Hz면 알림당 샘플 7개)
+NOTIFY_PAYLOAD = 20       # MTU 교환 전 알림 한 번의 최대 크기 (바이트, 기본 MTU 23 - 3)
+
+# 알림 전송 대기열 (BLE 전송 버퍼가 가득 차면(ENOMEM) 보관했다가 메인 루프에서 다시 전송)
+NOTIFY_QUEUE = 8  # 보관할 알림 수 (2의 거듭제곱, 알림 하나당 BLE_MTU - 3바이트 미리 할당)
+NOTIFY_POLICY = notifyqueue.COALESCE  # 가득 찼을 때: DROP_OLDEST, DROP_NEWEST, COALESCE(대기 중인 값 알림을 새 값으로 교체)
+_VALUE_KEY = const(0)  # 변화 시/고정 간격 모드의 값 알림 (마지막 값만 의미 있으므로 합침)
+
+# 리시버와 같은 PWM 설정 (리시버가 무시하는 변화는 보내지 않음)
+PWM_MAX = 255
+PWM_THRESHOLD = 10
+DEADBAND = PWM_THRESHOLD * 4095 // PWM_MAX  # 전송 생략 범위 (ADC 단위, 약 160)
+
+# 전송 판단 (고정 간격 모드는 deadband -1: 모든 샘플 전송)
+if SEND_ON_CHANGE:
+    feed = sendonchange.SendOnChange(DEADBAND, KEEPALIVE_INTERVAL, MIN_SEND_INTERVAL)
+else:
+    feed = sendonchange.SendOnChange(-1)
+
+# 타이머 샘플러와 묶음 패킷 버퍼 (묶음 전송 모드에서만 타이머 사용)
+sampler = adcsampler.TimerSampler(adc, STREAM_RATE) if STREAM else None
+# 묶음 버퍼는 BLE_MTU 크기로 할당하고, 연결마다 교환한 MTU에 맞춰 알림을 채움
+batch = ledproto.BatchWriter(ledproto.batch_capacity(BLE_MTU - 3))
+payload_size = NOTIFY_PAYLOAD  # 현재 연결의 알림 최대 크기 (MTU 교환 후 MTU - 3)
+batch.set_payload(payload_size)
+stamped = ledproto.StampedWriter()  # 변화 시/고정 간격 모드: 순번과 샘플 시각을 붙여 전송
+notifier = notifyqueue.NotifyQueue(ble, NOTIFY_QUEUE, BLE_MTU - 3, NOTIFY_POLICY)
+streamed = 0  # 통계 구간에 묶음으로 전송한 샘플 수
+stream_packets = 0  # 통계 구간 시작 시점의 전송 횟수
+notify_bytes = 0  # 통계 구간에 알림으로 보낸 바이트 수
+
+# 연결 상태 머신 (광고 재시작 시점과 재시작 여부 관리)
+link = supervisor.Supervisor("BLE 서버", RETRY_BASE_DELAY, RETRY_MAX_DELAY,
+                             reset_after=RESET_AFTER, on_reset=reset)
 
 def get_filtered_adc():
-    """ADC 값 필터링 (이동 평균)"""
-    global adc_index
-    
-    # 새로운 ADC 값 읽기
-    adc_values[adc_index] = adc.read()
-    adc_index = (adc_index + 1) % ADC_SAMPLES
-    
-    # 이동 평균 계산
-    return sum(adc_values) // ADC_SAMPLES
-
-def check_retry_limit():
-    """재시도 제한 확인"""
-    global retry_count
-    if retry_count >= MAX_RETRY_COUNT:
-        print("최대 재시도 횟수 초과. 장치를 재시작합니다.")
-        time.sleep(1)
-        import machine
-        machine.reset()
-        return True
-    return False
-
-def cleanup_connection():
-    """연결 정리"""
-    global connected, conn_handle, char_handle, retry_count
+    """ADC 값 필터링 (ADC_FILTER)"""
+    return adc_filter.update(adc.read())
+
+def cleanup_connection(reason=""):
+    """연결 정리 (백오프 후 메인 루프에서 광고 재시작)"""
+    global connected, conn_handle
     connected = False
-    conn_handle = None
-    char_handle = None
-    retry_count = 0  # 재시도 횟수 초기화
+    conn_handle = None  # 특성 핸들(char_handle)은 서비스 등록 시 정해지므로 유지
+    notifier.clear()
+    if sampler:
+        sampler.stop()
+    link.fail(reason)
+
+def start_advertising():
+    """광고 시작 (연결되면 자동으로 중지됨, 처음 ADV_FAST_TIME 동안은 빠른 간격)"""
+    global advertising, adv_fast, adv_started
+    try:
+        ble.gap_advertise(ADV_FAST_INTERVAL, adv_payload, resp_data=resp_payload)
+        advertising = True
+        adv_fast = True
+        adv_started = time.ticks_ms()
+        link.begin("광고 중")
+    except Exception as e:
+        print(f"광고 시작 실패: {e}")
+        link.fail("광고 시작 실패")
+
+def notify(data, key=None):
+    """알림 하나 전송 (전송 버퍼가 가득 차면 대기열에 보관, 전송량 집계)"""
+    global count, notify_bytes
+    if notifier.send(data, key):
+        count += 1
+        notify_bytes += len(data)
+
+def send_batches(partial):
+    """타이머가 쌓은 샘플을 알림 크기(MTU - 3)만큼씩 묶어서 전송 (partial: 덜 찬 묶음도 전송)"""
+    global streamed
+    while True:
+        available = sampler.available()
+        if not available or (available < batch.max_samples and not partial):
+            break
+        first = sampler.tail
+        batch.begin(first, STREAM_RATE, sampler.stamp())
+        while sampler.available() and not batch.add(sampler.pop()):
+            pass
+        streamed += batch.count
+        log.debug(logcodes.LED_BATCH_SEND, count + 1, batch.count, first & ledproto.INDEX_MASK)
+        notify(batch.finish())
+
+def reset_send_stats():
+    """전송 통계 구간 시작"""
+    global streamed, stream_packets, notify_bytes
+    streamed = 0
+    stream_packets = count
+    notify_bytes = 0
+    notifier.reset_stats()
 
 def bt_irq(event, data):
-    """블루투스 이벤트 처리"""
-    global connected, conn_handle, char_handle, count, retry_count, last_retry_time
+    """블루투스 이벤트 처리 (메인 루프의 events.dispatch()에서 호출)"""
+    global connected, conn_handle, char_handle, count, advertising, payload_size
     try:
         if event == _IRQ_CENTRAL_CONNECT:
             # 클라이언트 연결
             conn_handle, addr_type, addr = data
             connected = True
-            retry_count = 0  # 연결 성공 시 재시도 횟수 초기화
-            print(f"클라이언트 연결됨: {bytes(addr).hex()}")
+            advertising = False
+            link.up(bytes(addr).hex())
+            log.info(logcodes.BLE_CLIENT_CONNECT, data=addr)
+            notifier.bind(conn_handle, char_handle)
+            feed.reset()  # 새 연결: 첫 샘플은 바로 전송
+            feed.reset_stats()
+            stamped.reset()
+            payload_size = NOTIFY_PAYLOAD  # MTU 교환 전까지 기본 크기
+            batch.set_payload(payload_size)
+            reset_send_stats()
+            if sampler:
+                sampler.start()
             
         elif event == _IRQ_CENTRAL_DISCONNECT:
             # 클라이언트 연결 해제
             conn_handle, addr_type, addr = data
-            cleanup_connection()
-            print("클라이언트 연결 해제")
-            # 연결 해제 후 광고 재시작
-            time.sleep(0.1)
-            ble.gap_advertise(100000, b"ESP32_LED_BLE")
+            cleanup_connection("연결 해제")
+            log.info(logcodes.BLE_CLIENT_DISCONNECT)
+            
+        elif event == _IRQ_MTU_EXCHANGED:
+            # 리시버가 요청한 MTU 교환 완료: 이후 알림은 MTU - 3바이트까지 채움
+            conn_handle, mtu = data
+            payload_size = mtu - 3
+            batch.set_payload(payload_size)
+            log.info(logcodes.BLE_MTU_EXCHANGED, mtu)
             
         elif event == _IRQ_GATTS_WRITE:
             # 클라이언트로부터 데이터 수신 (필요한 경우)
             conn_handle, attr_handle = data
             if attr_handle == char_handle:
-                received_data = ble.gatts_read(char_handle)
-                print(f"데이터 수신됨: {received_data}")
+                log.info(logcodes.BLE_DATA_RECV, data=ble.gatts_read(char_handle))
                 
     except Exception as e:
-        print(f"이벤트 처리 중 오류 발생: {e}")
+        log.error(logcodes.IRQ_ERROR, data=str(e))
 
-# BLE 콜백 설정
-ble.irq(bt_irq)
+# BLE 콜백 설정 (bt_irq는 이벤트를 대기열에 복사만 하고 메인 루프가 처리)
+EVENT_QUEUE = 8  # 대기열 크기 (2의 거듭제곱)
+events = bleevents.EventQueue(bt_irq, EVENT_QUEUE)
+ble.irq(events.irq)
 
 # 서비스와 특성 생성
 services = (
@@ -138,46 +251,91 @@ print(f"서비스 등록됨 (특성 핸들: {char_handle})")
 
 # 광고 시작
 print("블루투스 광고 시작...")
-ble.gap_advertise(100000, b"ESP32_LED_BLE")
+start_advertising()
 
 print("트랜스미터 준비 완료!")
 print("클라이언트 연결 대기 중...")
 
+print(f"ADC 필터: {ADC_FILTER} (창 {ADC_SAMPLES}개, {'viper' if adcfilter.using_viper() else '파이썬'} 구현)")
+if STREAM:
+    print(f"묶음 전송: 타이머 {STREAM_RATE}Hz 샘플링, {STREAM_INTERVAL}ms마다 "
+          f"알림당 최대 {batch.max_samples}개 (MTU 교환 후 최대 {batch.capacity}개)")
+elif SEND_ON_CHANGE:
+    print(f"변화 시 전송: {1000 // SAMPLE_INTERVAL}Hz 샘플링, ADC 변화 {DEADBAND} 초과 시 전송 (유지 {KEEPALIVE_INTERVAL}ms)")
+else:
+    print(f"고정 간격 전송: {SEND_INTERVAL}ms")
+
 # 메인 루프
 while True:
+    # bt_irq가 쌓은 이벤트 처리, 쌓인 기록 출력
+    events.dispatch()
+    log.flush()
     current_time = time.ticks_ms()
     
-    # 연결이 끊어진 경우 재연결 시도
-    if not connected:
-        if check_retry_limit():
-            continue
-            
-        # 재시도 간격 확인
-        if time.ticks_diff(current_time, last_retry_time) < RETRY_INTERVAL:
-            continue
-            
-        retry_count += 1
-        last_retry_time = current_time
-        print(f"연결 시도 실패 (시도 {retry_count}/{MAX_RETRY_COUNT})")
-        continue
+    # 연결이 끊어진 경우 백오프가 끝난 뒤 광고 재시작
+    if not connected and not advertising and link.ready():
+        start_advertising()
+
+    # 빠른 광고 시간이 지나도록 연결되지 않으면 기본 간격으로 (리시버가 없을 때 전력 절약)
+    if advertising and adv_fast and time.ticks_diff(current_time, adv_started) >= ADV_FAST_TIME:
+        adv_fast = False
+        try:
+            ble.gap_advertise(ADV_INTERVAL, adv_payload, resp_data=resp_payload)
+        except Exception as e:
+            print(f"광고 간격 변경 실패: {e}")
     
-    # 5초마다 ADC 값 전송
-    if connected and time.ticks_diff(current_time, last_send_time) > SEND_INTERVAL:
+    # 대기열에 보관한 알림 다시 전송 (전송 버퍼가 비면 순서대로)
+    if connected and notifier.pending():
         try:
-            # 필터링된 ADC 값 읽기
-            value = get_filtered_adc()
-            voltage = value / 4095 * 3.3  # ADC 값을 전압으로 변환
-            count += 1
-            print(f"[반복:{count}] 전송: ADC={value:4d} (전압: {voltage:.2f}V)")
-            
-            # 값 전송 (2바이트 정수로)
-            ble.gatts_notify(conn_handle, char_handle, struct.pack("<H", value))
-            last_send_time = current_time
+            notifier.flush()
+        except Exception as e:
+            log.warn(logcodes.LED_SEND_FAIL, data=str(e))  # 연결 해제 이벤트가 오면 상태 머신이 처리
+    
+    # 묶음 전송 (샘플링은 타이머 IRQ가 하고 여기서는 쌓인 샘플만 전송)
+    # 알림 하나가 가득 차면 바로, 덜 찬 묶음은 STREAM_INTERVAL마다 전송
+    due = time.ticks_diff(current_time, last_sample_time) >= STREAM_INTERVAL
+    if STREAM and connected and (due or sampler.available() >= batch.max_samples):
+        last_sample_time = current_time
+        try:
+            send_batches(due)
         except Exception as e:
-            print(f"값 전송 실패: {e}")
-            cleanup_connection()
+            log.warn(logcodes.LED_SEND_FAIL, data=str(e))  # 연결 해제 이벤트가 오면 상태 머신이 처리
+    
+    # ADC 샘플링 (변화 시 전송 모드는 SAMPLE_INTERVAL마다, 고정 간격 모드는 SEND_INTERVAL마다)
+    interval = SAMPLE_INTERVAL if SEND_ON_CHANGE else SEND_INTERVAL
+    if not STREAM and connected and time.ticks_diff(current_time, last_sample_time) >= interval:
+        last_sample_time = current_time
+        value = get_filtered_adc()
+        if feed.update(value, current_time):
+            try:
+                log.debug(logcodes.LED_SEND, count + 1, value)  # 전압은 디코더가 ADC 값으로 계산
+                
+                # 값 전송 (순번, 샘플 시각, 값: 6바이트, 바뀐 값은 묶지 않고 바로 전송)
+                # 대기 중인 값 알림을 바꿀 때는 그 알림의 순번을 다시 씀 (보내지 않은 순번이 손실로 세어지지 않도록)
+                resend = notifier.will_coalesce(_VALUE_KEY)
+                notify(stamped.pack(current_time, value, resend), _VALUE_KEY)
+            except Exception as e:
+                log.warn(logcodes.LED_SEND_FAIL, data=str(e))  # 연결 해제 이벤트가 오면 상태 머신이 처리
+    
+    # 샘플/전송률 통계 (알림 수와 실제 알림 크기 포함)
+    if connected and time.ticks_diff(current_time, feed.stats_from) >= STATS_INTERVAL:
+        log.flush()  # 앞선 기록을 먼저 출력해서 순서 유지
+        elapsed = time.ticks_diff(current_time, feed.stats_from) / 1000
+        notifies = count - stream_packets
+        if STREAM:
+            print(f"[통계] 샘플 {streamed / elapsed:.1f}/s | 전송 {notifies / elapsed:.1f}/s "
+                  f"(묶음당 {streamed / max(1, notifies):.1f}개) | 유실 {sampler.overruns}개")
+        else:
+            print(f"[통계] {feed.format()}")
+        print(f"[통계] 알림 {notifies / elapsed:.1f}/s | 평균 {notify_bytes / max(1, notifies):.1f}바이트 "
+              f"(최대 {payload_size}, MTU {payload_size + 3})")
+        print(f"[통계] {notifier.format()}")
+        print(f"[통계] {events.format()}")
+        reset_send_stats()
+        feed.reset_stats()
+        events.reset_stats()
     
-    time.sleep(0.1)  # CPU 부하 감소
+    events.wait(SAMPLE_INTERVAL if connected else 100)  # 연결 전에는 CPU 부하 감소 (새 이벤트가 오면 바로 깨어남)
 
 if __name__ == "__main__":
     main() 
\ No newline at end of file
@@ -1,8 +1,18 @@
+import errno
 import network
 import socket
 import time
-from machine import Pin, PWM
+from machine import Pin, PWM, reset
 import array
+import evloop
+import fastwifi
+import ledcurve
+import ledproto
+import logcodes
+import playout
+import rlog
+import slew
+import supervisor
 
 # 시작 시 1초 딜레이
 print("리시버 시작 대기 중...")
@@ -10,14 +20,26 @@ time.sleep(1)
 print("리시버 시작!")
 
 # PWM 설정
-led = PWM(Pin(3), freq=5000, duty=0)  # GPIO 3번 핀, 5kHz 주파수
-PWM_RESOLUTION = 8  # 8비트 PWM 해상도
-PWM_MAX = 255  # 최대 PWM 값
-PWM_MIN = 0  # 최소 PWM 값
-PWM_THRESHOLD = 10  # PWM 값 변화 임계값
+led = PWM(Pin(3), freq=5000, duty_u16=0)  # GPIO 3번 핀, 5kHz 주파수, 16비트 듀티
+PWM_CURVE = "gamma"  # ADC 값 -> 밝기 곡선: linear(기존), gamma(2.2), cie(CIE 1931 명도)
+PWM_MAX = 255  # 노이즈 임계값 단위 (밝기 255단계 기준, 트랜스미터의 DEADBAND와 같은 기준)
+PWM_THRESHOLD = 10  # 밝기 변화 임계값 (255단계 중)
+ADC_THRESHOLD = PWM_THRESHOLD * ledcurve.ADC_MAX // PWM_MAX  # 같은 임계값의 ADC 단위 (약 160)
+
+# ADC 값 -> duty_u16 변환표 (시작 시 한 번 계산, 수신 경로에는 부동소수점 연산 없음)
+build_start = time.ticks_ms()
+duty_table = ledcurve.build(PWM_CURVE)
+print(f"밝기 곡선: {PWM_CURVE} (변환표 {len(duty_table)}칸, {time.ticks_diff(time.ticks_ms(), build_start)}ms)")
 
 # PWM 노이즈 필터링
-last_pwm_value = 0  # 마지막 PWM 값
+last_value = 0  # 마지막으로 적용한 ADC 값 (0: LED 꺼짐)
+
+# PWM 슬루 설정 (타이머 IRQ가 목표 듀티까지 일정한 속도로 이동, 패킷 도착 간격이 고르지 않아도 계단처럼 보이지 않음)
+SLEW_FREQ = 500     # 듀티 갱신 주파수 (Hz)
+SLEW_RAMP_MS = 100  # 전체 밝기 범위를 이동하는 시간 (ms, 0: 새 값을 바로 적용)
+SLEW_TAU_MS = 0     # 0이 아니면 일정 속도 대신 시간 상수(ms)로 지수 접근
+dimmer = slew.Slew(led, SLEW_FREQ, SLEW_RAMP_MS, SLEW_TAU_MS)
+dimmer.start()
 
 # WiFi 설정
 SSID = "ESP32_LED_AP"
@@ -25,64 +47,194 @@ PASSWORD = "12345678"
 HOST = "192.168.4.1"  # AP의 기본 IP 주소
 PORT = 8080
 
+# UDP 브로드캐스트 수신 (트랜스미터의 BROADCAST와 같게 설정, 리시버 여러 대가 같은 패킷을 받음)
+BROADCAST = False
+RECV_TIMEOUT = 10000  # 브로드캐스트 모드: 이 시간 동안 받은 패킷이 없으면 다시 연결 (ms)
+
+# 빠른 재연결 설정 (고정 IP + 캐시된 BSSID/채널, 10ms 간격 상태 확인)
+FAST_RECONNECT = True
+STATIC_IP = ("192.168.4.2", "255.255.255.0", HOST, HOST)  # (IP, 마스크, 게이트웨이, DNS), BROADCAST로 여러 대를 쓰면 보드마다 다른 IP 또는 None(DHCP)
+WIFI_TIMEOUT = 10000  # WiFi 연결 대기 시간 (ms)
+
 # 재시도 설정
-MAX_RETRY_COUNT = 5  # 최대 재시도 횟수
-RETRY_INTERVAL = 5000  # 재시도 간격 (ms)
-retry_count = 0  # 현재 재시도 횟수
-last_retry_time = 0  # 마지막 재시도 시간
+RETRY_BASE_DELAY = 500  # 첫 재시도 대기 시간 (ms, 실패할 때마다 2배)
+RETRY_MAX_DELAY = 10000  # 최대 재시도 대기 시간 (ms)
+RESET_AFTER = 10  # 연속 실패가 이 횟수에 도달하면 재시작 (최후의 수단)
+
+# 수신 설정
+RECV_BUFFER = 256  # 한 번에 받는 최대 바이트 수 (값 128개)
+STATS_INTERVAL = 10000  # 수신/적용 통계 출력 간격 (ms)
+
+# 재생 지연 (트랜스미터가 붙인 샘플 시각 + PLAYOUT_DELAY에 적용, 도착 간격이 흔들려도 샘플 간격 그대로 재생)
+PLAYOUT_DELAY = 0  # ms, 0: 재생 큐 없이 받은 즉시 마지막 값 적용
+player = playout.Playout(PLAYOUT_DELAY) if PLAYOUT_DELAY else None
+seqs = ledproto.SeqTracker()  # 순번으로 손실/역순 도착 집계
+
+# 링 버퍼 로거 (값마다 남기는 기록은 유휴 시간에 UART로 출력, host/rlog_decode.py로 복원)
+LOG_LEVEL = rlog.DEBUG  # 기록할 최소 레벨 (rlog.INFO: 값마다 남기는 기록 생략)
+log = rlog.RingLog(level=LOG_LEVEL)
+
+# 연결 상태
+sock = None
+count = 0  # LED에 적용한 값 수
+latest = -1  # 이번 수신 이벤트에서 받은 마지막 값 (-1: 없음)
+skipped = 0  # 더 새로운 값에 밀려 적용하지 않은 값 수
+stats_values = 0  # 통계 구간 시작 시점의 수신 값 수
+stats_count = 0   # 통계 구간 시작 시점의 적용 값 수
+stats_from = 0    # 통계 구간 시작 시각
+
+# WiFi 스테이션 모드 설정
+wlan = network.WLAN(network.STA_IF)
+wlan.active(True)
+fast_link = fastwifi.FastLink(wlan, SSID, PASSWORD, STATIC_IP)
+
+def reset_device():
+    """LED를 끄고 장치 재시작 (연속 실패 시 최후의 수단)"""
+    dimmer.stop()
+    led.duty_u16(0)
+    time.sleep(1)
+    reset()
+
+# 연결 상태 머신 (재시도 간격과 재시작 시점 관리)
+link = supervisor.Supervisor("WiFi 리시버", RETRY_BASE_DELAY, RETRY_MAX_DELAY,
+                             reset_after=RESET_AFTER, on_reset=reset_device)
+
+# 이벤트 루프와 타이머 (소켓 이벤트나 타이머 마감 시각에만 깨어남)
+loop = evloop.EventLoop()
+loop.idle = log.drain
+connect_timer = None  # 서버 재연결 타이머
+stats_timer = None  # 통계 출력 타이머
+playout_timer = None  # 다음 재생 시각 타이머 (재생 지연 사용 시)
+silence_timer = None  # 브로드캐스트 수신 감시 타이머
 
 def set_pwm_value(value):
     """PWM 값 설정 (노이즈 필터링 포함)"""
-    global last_pwm_value
+    global last_value
     
-    # ADC 값을 PWM 값으로 변환 (0-4095 -> 0-255)
-    pwm_value = int((value / 4095) * PWM_MAX)
+    # 값 범위 제한
+    if value > ledcurve.ADC_MAX:
+        value = ledcurve.ADC_MAX
     
     # 노이즈 필터링: 임계값보다 작은 변화는 무시
-    if abs(pwm_value - last_pwm_value) < PWM_THRESHOLD:
+    if abs(value - last_value) < ADC_THRESHOLD:
         return
-        
-    # PWM 값 범위 제한
-    pwm_value = max(PWM_MIN, min(PWM_MAX, pwm_value))
     
-    # PWM 값 업데이트
-    led.duty(pwm_value)
-    last_pwm_value = pwm_value
-    print(f"PWM 값 설정: {pwm_value}")
-
-def check_retry_limit():
-    """재시도 제한 확인"""
-    global retry_count
-    if retry_count >= MAX_RETRY_COUNT:
-        print("최대 재시도 횟수 초과. 장치를 재시작합니다.")
-        led.duty(0)  # LED 끄기
-        time.sleep(1)
-        import machine
-        machine.reset()
-        return True
-    return False
+    # 변환표에서 듀티를 읽어 목표 듀티로 설정 (슬루 타이머가 서서히 이동)
+    duty = duty_table[value]
+    dimmer.set(duty)
+    last_value = value
+    log.debug(logcodes.LED_DUTY, duty)
 
-def cleanup_connection(sock):
+def on_sample(value, seq, stamp):
+    """수신한 값 하나 기록 (seq: 순번 또는 샘플 인덱스, stamp: 샘플 시각, 기존 단일 값은 둘 다 -1)
+
+    재생 지연을 쓰면 시각이 있는 값은 재생 큐에 넣는다. 그 밖에는 수신
+    이벤트마다 마지막 값만 적용하므로 여기서는 값만 덮어쓰고, 더 새로운
+    순번을 이미 받았으면 버린다.
+    """
+    global latest, skipped
+    fresh = True
+    if seq >= 0:
+        if decoder.batch_start:
+            log.debug(logcodes.LED_BATCH_RECV, decoder.batches, decoder.size, seq)
+        fresh = seqs.update(seq)
+    if player and stamp >= 0:
+        player.push(value, stamp)
+        return
+    if not fresh:
+        return
+    if latest >= 0:
+        skipped += 1
+    latest = value
+
+# 수신 데이터 디코더 (단일 값과 묶음 패킷, 2바이트 중간에서 끊긴 수신도 처리)
+decoder = ledproto.Decoder(on_sample, RECV_BUFFER)
+
+def apply_latest():
+    """이번 수신 이벤트의 마지막 값만 LED에 적용 (밀린 값은 건너뜀)"""
+    global latest, count
+    value = latest
+    latest = -1
+    count += 1
+    log.debug(logcodes.LED_RECV, count, value)  # 전압은 디코더가 ADC 값으로 계산
+    set_pwm_value(value)
+
+def play_due():
+    """재생 시각이 된 값을 LED에 적용 (재생 타이머에서 호출)"""
+    global count
+    value = player.pop()
+    if value >= 0:
+        count += 1
+        log.debug(logcodes.LED_RECV, count, value)
+        try:
+            set_pwm_value(value)
+        except Exception as e:
+            log.warn(logcodes.LED_DATA_FAIL, data=str(e))
+    schedule_playout()
+
+def schedule_playout():
+    """재생 큐의 다음 재생 시각에 재생 타이머 설정"""
+    wait = player.wait()
+    if wait >= 0:
+        loop.schedule(playout_timer, wait)
+
+if player:
+    playout_timer = evloop.Timer(play_due)
+
+def reset_stats():
+    """통계 구간 시작"""
+    global stats_values, stats_count, stats_from
+    stats_values = decoder.values
+    stats_count = count
+    stats_from = time.ticks_ms()
+    dimmer.reset_stats()
+
+def print_stats():
+    """수신/적용 통계 출력"""
+    log.flush()  # 앞선 기록을 먼저 출력해서 순서 유지
+    elapsed = time.ticks_diff(time.ticks_ms(), stats_from) / 1000
+    print(f"[통계] 수신 {(decoder.values - stats_values) / elapsed:.1f}/s | "
+          f"적용 {(count - stats_count) / elapsed:.1f}/s | 건너뜀 누적 {skipped}개 | "
+          f"손실 {seqs.lost} 역순 {seqs.reordered}")
+    seqs.reset_stats()
+    print(f"[통계] {dimmer.format()}")
+    if player:
+        print(f"[통계] {player.format()}")
+        player.reset_stats()
+    reset_stats()
+
+def cleanup_connection(reason=""):
     """연결 정리"""
-    global retry_count
-    try:
-        sock.close()
-    except:
-        pass
-    retry_count = 0  # 재시도 횟수 초기화
-    led.duty(0)  # LED 끄기
+    global sock, last_value
+    loop.cancel(stats_timer)
+    loop.cancel(playout_timer)
+    loop.cancel(silence_timer)
+    if sock:
+        loop.unregister(sock)
+        try:
+            sock.close()
+        except:
+            pass
+        sock = None
+    dimmer.jump(0)  # LED 바로 끄기
+    last_value = 0  # 다시 연결되면 현재 밝기를 바로 적용
+    # 백오프 후 서버 재연결 예약
+    loop.schedule(connect_timer, link.fail(reason))
 
 def connect_to_wifi():
     """WiFi 연결"""
-    wlan = network.WLAN(network.STA_IF)
-    wlan.active(True)
-    
-    if not wlan.isconnected():
+    if FAST_RECONNECT:
+        if not wlan.isconnected():
+            print(f"WiFi 빠른 연결 시도: {SSID}")
+            if fast_link.connect(WIFI_TIMEOUT):
+                links, last, fastest, avg, slowest = fast_link.stats()
+                print(f"WiFi 링크 연결: {last}ms (평균 {avg}ms | 최소 {fastest}ms | 최대 {slowest}ms | {links}회)")
+    elif not wlan.isconnected():
         print(f"WiFi 연결 시도: {SSID}")
         wlan.connect(SSID, PASSWORD)
         
         # 연결 대기
-        max_wait = 10
+        max_wait = WIFI_TIMEOUT // 1000
         while max_wait > 0:
             if wlan.isconnected():
                 break
@@ -110,80 +262,115 @@ def connect_to_server():
         print(f"서버 연결 실패: {e}")
         return None
 
-def receive_and_control(sock):
-    """데이터 수신 및 LED 제어"""
-    global retry_count
-    count = 0
-    
+def open_broadcast():
+    """브로드캐스트 수신 소켓 열기"""
     try:
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_BROADCAST, 1)  # ESP-IDF lwIP는 이 옵션이 있어야 브로드캐스트를 받음
+        sock.bind(("0.0.0.0", PORT))
+        print(f"브로드캐스트 수신 대기 (포트: {PORT})")
+        return sock
+    except Exception as e:
+        print(f"브로드캐스트 소켓 열기 실패: {e}")
+        return None
+
+def on_silence():
+    """브로드캐스트 수신이 RECV_TIMEOUT 동안 없음 (WiFi 끊김 또는 트랜스미터 꺼짐)"""
+    print("브로드캐스트 수신 없음")
+    cleanup_connection("수신 없음")
+
+silence_timer = evloop.Timer(on_silence)
+
+def receive_and_control():
+    """데이터 수신 및 LED 제어 (수신 이벤트에서 호출)
+
+    읽을 수 있는 데이터를 모두 받아 파싱한 뒤 마지막 값만 LED에 적용하므로
+    전송 속도가 빨라도 밀린 값을 하나씩 처리하느라 뒤처지지 않는다. 재생
+    지연을 쓰면 값은 재생 타이머가 샘플 시각에 맞춰 적용한다.
+    """
+    try:
+        # 받은 만큼 파싱 (버퍼가 가득 찼으면 남은 데이터가 있을 수 있으므로 계속)
         while True:
-            # 데이터 수신 (2바이트)
-            data = sock.recv(2)
-            if not data:
+            if BROADCAST:
+                decoder.reset()  # 데이터그램 하나가 패킷 하나 (잘린 데이터그램이 다음 패킷에 섞이지 않음)
+                decoder.recv_into(sock)  # 읽을 데이터그램이 없을 때까지 (EAGAIN)
+                loop.schedule(silence_timer, RECV_TIMEOUT)
+                continue
+            received = decoder.recv_into(sock)
+            if received == 0:
                 print("연결이 끊어짐")
                 return False
-                
-            try:
-                # 2바이트 정수로 데이터 파싱
-                value = int.from_bytes(data, 'little')
-                voltage = value / 4095 * 3.3  # ADC 값을 전압으로 변환
-                count += 1
-                print(f"[반복:{count}] 수신: ADC={value:4d} (전압: {voltage:.2f}V)")
-                
-                # LED 제어
-                set_pwm_value(value)
-                
-            except Exception as e:
-                print(f"데이터 처리 실패: {e}")
-                return False
-                
+            if received < RECV_BUFFER:
+                break
+            
+    except OSError as e:
+        if e.args[0] != errno.EAGAIN:  # EAGAIN: 더 읽을 데이터 없음
+            print(f"데이터 수신 중 오류 발생: {e}")
+            return False
     except Exception as e:
         print(f"데이터 수신 중 오류 발생: {e}")
         return False
+    
+    if latest >= 0:
+        try:
+            apply_latest()
+        except Exception as e:
+            log.warn(logcodes.LED_DATA_FAIL, data=str(e))
+            return False
+    
+    # 재생 큐에 새로 들어온 값이 더 일찍 재생될 수 있으므로 타이머 다시 설정
+    if player:
+        schedule_playout()
         
     return True
 
-# WiFi 연결
-if not connect_to_wifi():
-    print("WiFi 연결 실패, 재시작 중...")
-    time.sleep(5)
-    import machine
-    machine.reset()
+def on_socket_event(s, event):
+    """소켓 이벤트: 수신 데이터 처리 또는 연결 오류 처리"""
+    if not receive_and_control():
+        cleanup_connection("연결 끊김")
 
-# 메인 루프
-while True:
-    current_time = time.ticks_ms()
+def try_connect():
+    """WiFi와 서버 연결 (재연결 타이머에서 호출)"""
+    global sock, count, latest, stats_timer
+    link.begin()
     
     try:
-        # 서버 연결
-        sock = connect_to_server()
+        # WiFi 연결 (끊어진 경우에만 다시 연결)
+        if not connect_to_wifi():
+            cleanup_connection("WiFi 연결 실패")
+            return
+        
+        # 서버 연결 (브로드캐스트 모드: 수신 소켓 열기)
+        sock = open_broadcast() if BROADCAST else connect_to_server()
         if sock:
-            # 연결 성공 시 재시도 횟수 초기화
-            retry_count = 0
+            link.up()
+            count = 0
+            latest = -1
+            decoder.reset()
+            seqs.reset()
+            seqs.reset_stats()
+            if player:
+                player.reset()
+                player.reset_stats()
+            reset_stats()
+            stats_timer = loop.call_every(STATS_INTERVAL, print_stats)
+            if BROADCAST:
+                loop.schedule(silence_timer, RECV_TIMEOUT)
             
-            # 데이터 수신 및 LED 제어
-            if not receive_and_control(sock):
-                cleanup_connection(sock)
-                continue
-                
+            # 연결 후에는 논블로킹으로 전환하고 수신 이벤트 등록
+            sock.setblocking(False)
+            loop.register(sock, evloop.POLLIN, on_socket_event)
+        else:
+            cleanup_connection("서버 연결 실패")
+    
     except Exception as e:
         print(f"연결 처리 중 오류 발생: {e}")
-        
-        # 재시도 제한 확인
-        if check_retry_limit():
-            continue
-            
-        # 재시도 간격 확인
-        if time.ticks_diff(current_time, last_retry_time) < RETRY_INTERVAL:
-            continue
-            
-        retry_count += 1
-        last_retry_time = current_time
-        print(f"연결 시도 실패 (시도 {retry_count}/{MAX_RETRY_COUNT})")
-        
-        # WiFi 재연결 시도
-        if not connect_to_wifi():
-            cleanup_connection(sock)
-            continue
-    
-    time.sleep(0.1)  # CPU 부하 감소 
\ No newline at end of file
+        cleanup_connection("연결 처리 오류")
+
+# 최초 연결 예약 (WiFi 연결 포함)
+connect_timer = loop.call_later(0, try_connect)
+
+# 메인 루프 (소켓 이벤트와 타이머 마감 시각에 맞춰서만 깨어남)
+while True:
+    loop.run_once()
\ No newline at end of file
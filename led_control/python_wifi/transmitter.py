@@ -1,8 +1,16 @@
+import errno
 import network
 import socket
 import time
-from machine import Pin, ADC
-import array
+from machine import Pin, ADC, reset
+import adcfilter
+import adcsampler
+import evloop
+import ledproto
+import logcodes
+import rlog
+import sendonchange
+import supervisor
 
 # 시작 시 1초 딜레이
 print("트랜스미터 시작 대기 중...")
@@ -14,56 +22,98 @@ adc = ADC(Pin(3))  # GPIO 3번 핀
 adc.atten(ADC.ATTN_11DB)  # 0-3.3V 범위
 adc.width(ADC.WIDTH_12BIT)  # 12비트 해상도
 
-# ADC 필터링 설정
-ADC_SAMPLES = 5  # 이동 평균 샘플 수
-adc_values = array.array('i', [0] * ADC_SAMPLES)  # ADC 값 저장 배열
-adc_index = 0  # 현재 ADC 샘플 인덱스
+# ADC 필터링 설정 (샘플당 연산량이 창 크기와 무관, host/bench_adcfilter.py로 비교)
+ADC_FILTER = "average"  # average(이동 평균), ema(지수 이동 평균), median(중앙값, 튀는 값 제거), none
+ADC_SAMPLES = 5  # 필터 창 크기 (샘플 수)
+adc_filter = adcfilter.create(ADC_FILTER, ADC_SAMPLES)
 
 # WiFi AP 설정
 SSID = "ESP32_LED_AP"
 PASSWORD = "12345678"
 PORT = 8080
 
+# UDP 브로드캐스트 설정 (리시버의 BROADCAST와 같게 설정)
+BROADCAST = False  # True: TCP 연결 대신 AP 대역 전체에 UDP로 전송 (리시버 수와 관계없이 패킷마다 한 번 전송)
+BROADCAST_ADDR = "192.168.4.255"  # AP 대역의 브로드캐스트 주소
+
 # 재시도 설정
-MAX_RETRY_COUNT = 5  # 최대 재시도 횟수
-RETRY_INTERVAL = 5000  # 재시도 간격 (ms)
-retry_count = 0  # 현재 재시도 횟수
-last_retry_time = 0  # 마지막 재시도 시간
+RETRY_BASE_DELAY = 500  # 첫 재시도 대기 시간 (ms, 실패할 때마다 2배)
+RETRY_MAX_DELAY = 10000  # 최대 재시도 대기 시간 (ms)
+RESET_AFTER = 10  # 연속 실패가 이 횟수에 도달하면 재시작 (최후의 수단)
 
 # 전송 설정
-SEND_INTERVAL = 5000  # 데이터 전송 간격 (ms)
-last_send_time = 0  # 마지막 전송 시간
+SEND_ON_CHANGE = True     # True: 빠르게 샘플링하고 값이 바뀔 때만 전송, False: SEND_INTERVAL마다 전송
+SAMPLE_INTERVAL = 5       # 샘플링 간격 (ms, 200Hz)
+SEND_INTERVAL = 5000      # 고정 간격 전송 모드의 전송 간격 (ms)
+KEEPALIVE_INTERVAL = 1000 # 값이 그대로일 때 재전송 간격 (ms)
+STATS_INTERVAL = 10000    # 샘플/전송률 통계 출력 간격 (ms)
+
+# 묶음 전송 설정 (STREAM = True면 SEND_ON_CHANGE 대신 사용)
+STREAM = False            # True: 타이머 IRQ로 일정 간격 샘플링, 쌓인 샘플을 묶음 패킷으로 전송
+STREAM_RATE = 200         # 타이머 샘플링 주파수 (Hz)
+STREAM_INTERVAL = 50      # 묶음 전송 간격 (ms, 200Hz면 패킷당 샘플 10개)
+STREAM_BATCH = 64         # 패킷당 최대 샘플 수 (더 밀려 있으면 여러 패킷으로 전송)
+
+# 리시버와 같은 PWM 설정 (리시버가 무시하는 변화는 보내지 않음)
+PWM_MAX = 255
+PWM_THRESHOLD = 10
+DEADBAND = PWM_THRESHOLD * 4095 // PWM_MAX  # 전송 생략 범위 (ADC 단위, 약 160)
+
+# 전송 판단 (고정 간격 모드는 deadband -1: 모든 샘플 전송)
+feed = sendonchange.SendOnChange(DEADBAND if SEND_ON_CHANGE else -1, KEEPALIVE_INTERVAL)
+
+# 타이머 샘플러와 묶음 패킷 버퍼 (묶음 전송 모드에서만 타이머 사용)
+sampler = adcsampler.TimerSampler(adc, STREAM_RATE) if STREAM else None
+batch = ledproto.BatchWriter(STREAM_BATCH)
+stamped = ledproto.StampedWriter()  # 변화 시/고정 간격 모드: 순번과 샘플 시각을 붙여 전송
+streamed = 0        # 통계 구간에 묶음으로 전송한 샘플 수
+stream_packets = 0  # 통계 구간 시작 시점의 전송 횟수
+stream_from = 0     # 통계 구간 시작 시각
+
+# 링 버퍼 로거 (값마다 남기는 기록은 유휴 시간에 UART로 출력, host/rlog_decode.py로 복원)
+LOG_LEVEL = rlog.DEBUG  # 기록할 최소 레벨 (rlog.INFO: 값마다 남기는 기록 생략)
+log = rlog.RingLog(level=LOG_LEVEL)
+
+# 연결 상태
+server = None
+client = None
+udp = None  # 브로드캐스트 소켓
+count = 0
+send_errors = 0  # 브로드캐스트 모드에서 보내지 못한 패킷 수 (버퍼 부족 등)
+
+# 연결 상태 머신 (재시도 간격과 재시작 시점 관리)
+link = supervisor.Supervisor("WiFi 서버", RETRY_BASE_DELAY, RETRY_MAX_DELAY,
+                             reset_after=RESET_AFTER, on_reset=reset)
+
+# 이벤트 루프와 타이머 (소켓 이벤트나 타이머 마감 시각에만 깨어남)
+loop = evloop.EventLoop()
+loop.idle = log.drain
+send_timer = None  # 샘플링 (묶음 전송 모드: 묶음 전송) 타이머
+stats_timer = None  # 통계 출력 타이머
 
 def get_filtered_adc():
-    """ADC 값 필터링 (이동 평균)"""
-    global adc_index
-    
-    # 새로운 ADC 값 읽기
-    adc_values[adc_index] = adc.read()
-    adc_index = (adc_index + 1) % ADC_SAMPLES
-    
-    # 이동 평균 계산
-    return sum(adc_values) // ADC_SAMPLES
-
-def check_retry_limit():
-    """재시도 제한 확인"""
-    global retry_count
-    if retry_count >= MAX_RETRY_COUNT:
-        print("최대 재시도 횟수 초과. 장치를 재시작합니다.")
-        time.sleep(1)
-        import machine
-        machine.reset()
-        return True
-    return False
-
-def cleanup_connection(client):
+    """ADC 값 필터링 (ADC_FILTER)"""
+    return adc_filter.update(adc.read())
+
+def cleanup_connection(reason=""):
     """연결 정리"""
-    global retry_count
-    try:
-        client.close()
-    except:
-        pass
-    retry_count = 0  # 재시도 횟수 초기화
+    global client
+    stop_sending()
+    if client:
+        loop.unregister(client)
+        try:
+            client.close()
+        except:
+            pass
+        client = None
+        # 서버 소켓은 계속 열려 있으므로 백오프 없이 바로 다음 클라이언트 대기
+        link.fail(reason)
+        resume_accept()
+
+def resume_accept():
+    """클라이언트 연결 요청 대기 재개"""
+    link.begin("클라이언트 대기")
+    loop.modify(server, evloop.POLLIN)
 
 def setup_wifi_ap():
     """WiFi AP 설정"""
@@ -75,79 +125,186 @@ def setup_wifi_ap():
     print(f"WiFi AP 시작됨: {SSID}")
     print(f"IP 주소: {ap.ifconfig()[0]}")
 
-def handle_client(client):
-    """클라이언트 연결 처리"""
-    global last_send_time, retry_count
+def send_packet(data):
+    """패킷 하나 전송 (브로드캐스트 모드: UDP 데이터그램 하나, 아니면 연결된 클라이언트로)"""
+    if BROADCAST:
+        udp.sendto(data, broadcast_addr)
+    else:
+        loop.send(client, data)
+
+def send_failed(e):
+    """전송 실패 처리 (브로드캐스트는 연결이 없으므로 패킷만 버리고 계속)"""
+    global send_errors
+    log.warn(logcodes.LED_SEND_FAIL, data=str(e))
+    if BROADCAST:
+        send_errors += 1  # 리시버는 순번의 빈틈으로 손실을 셈
+    else:
+        cleanup_connection("전송 실패")
+
+def send_value(value, stamp):
+    """ADC 값 전송 (stamp: 샘플 시각 ms)"""
+    global count
+    try:
+        count += 1
+        log.debug(logcodes.LED_SEND, count, value)  # 전압은 디코더가 ADC 값으로 계산
+        
+        # 값 전송 (순번, 샘플 시각, 값: 6바이트)
+        send_packet(stamped.pack(stamp, value))
+    except Exception as e:
+        send_failed(e)
+
+def sample_adc():
+    """ADC 샘플링 (샘플링 타이머에서 호출, 값이 바뀌었을 때만 전송)"""
+    stamp = time.ticks_ms()
+    value = get_filtered_adc()
+    if feed.update(value):
+        send_value(value, stamp)
+
+def send_batch():
+    """타이머가 쌓은 샘플을 묶음 패킷으로 전송 (묶음 전송 타이머에서 호출)"""
+    global count, streamed
+    try:
+        while sampler.available():
+            first = sampler.tail
+            batch.begin(first, STREAM_RATE, sampler.stamp())
+            while sampler.available() and not batch.add(sampler.pop()):
+                pass
+            count += 1
+            streamed += batch.count
+            log.debug(logcodes.LED_BATCH_SEND, count, batch.count, first & ledproto.INDEX_MASK)
+            send_packet(batch.finish())
+    except Exception as e:
+        send_failed(e)
+
+def reset_stream_stats():
+    """묶음 전송 통계 구간 시작"""
+    global streamed, stream_packets, stream_from
+    streamed = 0
+    stream_packets = count
+    stream_from = time.ticks_ms()
+
+def print_stats():
+    """샘플/전송률 통계 출력"""
+    log.flush()  # 앞선 기록을 먼저 출력해서 순서 유지
+    if STREAM:
+        elapsed = time.ticks_diff(time.ticks_ms(), stream_from) / 1000
+        print(f"[통계] 샘플 {streamed / elapsed:.1f}/s | 전송 {(count - stream_packets) / elapsed:.1f}/s "
+              f"(묶음당 {streamed / max(1, count - stream_packets):.1f}개) | 유실 {sampler.overruns}개")
+        reset_stream_stats()
+    else:
+        print(f"[통계] {feed.format()}")
+        feed.reset_stats()
+    if BROADCAST:
+        print(f"[통계] 브로드캐스트 전송 실패 누적 {send_errors}개")
+
+def start_sending():
+    """ADC 샘플링과 전송 시작 (변화 시 전송: 첫 샘플은 바로 전송)"""
+    global count, send_timer, stats_timer
     count = 0
+    if STREAM:
+        # 타이머 샘플링 시작, 쌓인 샘플은 STREAM_INTERVAL마다 묶어서 전송
+        sampler.start()
+        reset_stream_stats()
+        send_timer = loop.call_every(STREAM_INTERVAL, send_batch)
+    else:
+        feed.reset()
+        feed.reset_stats()
+        stamped.reset()
+        interval = SAMPLE_INTERVAL if SEND_ON_CHANGE else SEND_INTERVAL
+        send_timer = loop.call_every(interval, sample_adc, first_delay=0)
+    stats_timer = loop.call_every(STATS_INTERVAL, print_stats)
+
+def stop_sending():
+    """ADC 샘플링과 전송 중지"""
+    loop.cancel(send_timer)
+    if sampler:
+        sampler.stop()
+    loop.cancel(stats_timer)
+
+def accept_client():
+    """클라이언트 연결 수락"""
+    global client
     
     try:
-        while True:
-            current_time = time.ticks_ms()
-            
-            # 5초마다 ADC 값 전송
-            if time.ticks_diff(current_time, last_send_time) > SEND_INTERVAL:
-                try:
-                    # 필터링된 ADC 값 읽기
-                    value = get_filtered_adc()
-                    voltage = value / 4095 * 3.3  # ADC 값을 전압으로 변환
-                    count += 1
-                    print(f"[반복:{count}] 전송: ADC={value:4d} (전압: {voltage:.2f}V)")
-                    
-                    # 값 전송 (2바이트 정수로)
-                    client.send(value.to_bytes(2, 'little'))
-                    last_send_time = current_time
-                except Exception as e:
-                    print(f"값 전송 실패: {e}")
-                    return False
-                    
-            time.sleep(0.1)  # CPU 부하 감소
-            
+        client, addr = server.accept()
+        client.setblocking(False)
+        # 연결 종료 감지를 위해 수신 이벤트 등록
+        loop.register(client, evloop.POLLIN, on_client_event)
+        # 1:1 연결이므로 연결 중에는 추가 연결 요청을 받지 않음
+        loop.modify(server, 0)
+        print(f"클라이언트 연결됨: {addr}")
+        link.up(f"{addr[0]}:{addr[1]}")
+        start_sending()
+        
     except Exception as e:
+        if isinstance(e, OSError) and e.args[0] == errno.EAGAIN:
+            return  # 대기 중인 연결 요청 없음
+        print(f"연결 처리 중 오류 발생: {e}")
+        if client:
+            cleanup_connection("연결 처리 실패")
+        else:
+            # 백오프 동안 연결 요청을 받지 않음
+            loop.modify(server, 0)
+            loop.schedule(accept_timer, link.fail("연결 수락 실패"))
+
+def on_server_event(sock, event):
+    """서버 소켓 이벤트: 연결 요청 수락"""
+    if client is None:
+        accept_client()
+
+def on_client_event(sock, event):
+    """클라이언트 소켓 이벤트: 연결 종료 또는 오류 감지"""
+    try:
+        if event & evloop.POLLIN and sock.recv(16):
+            return  # 리시버는 데이터를 보내지 않으므로 수신 데이터는 무시
+    except OSError as e:
+        if e.args[0] == errno.EAGAIN:
+            return
         print(f"클라이언트 처리 중 오류 발생: {e}")
-        return False
-        
-    return True
+    print("클라이언트 연결 종료")
+    cleanup_connection("연결 종료")
 
 # WiFi AP 시작
 setup_wifi_ap()
 
-# 서버 소켓 생성
-server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
-server.bind(('0.0.0.0', PORT))
-server.listen(1)
-print(f"서버 시작됨 (포트: {PORT})")
+if BROADCAST:
+    # 브로드캐스트 소켓 생성 (연결이 없으므로 바로 전송 시작, ESP-IDF lwIP는 SO_BROADCAST가 있어야 전송)
+    udp = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    udp.setsockopt(socket.SOL_SOCKET, socket.SO_BROADCAST, 1)
+    udp.setblocking(False)
+    broadcast_addr = socket.getaddrinfo(BROADCAST_ADDR, PORT)[0][-1]  # 전송마다 주소를 변환하지 않도록 미리 변환
+    print(f"브로드캐스트 시작됨 ({BROADCAST_ADDR}:{PORT})")
+else:
+    # 서버 소켓 생성 (논블로킹, 연결 요청이 오면 이벤트 루프가 깨어남)
+    server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    server.bind(('0.0.0.0', PORT))
+    server.listen(1)
+    server.setblocking(False)
+    loop.register(server, evloop.POLLIN, on_server_event)
+    print(f"서버 시작됨 (포트: {PORT})")
+print(f"ADC 필터: {ADC_FILTER} (창 {ADC_SAMPLES}개, {'viper' if adcfilter.using_viper() else '파이썬'} 구현)")
+if STREAM:
+    print(f"묶음 전송: 타이머 {STREAM_RATE}Hz 샘플링, {STREAM_INTERVAL}ms마다 전송")
+elif SEND_ON_CHANGE:
+    print(f"변화 시 전송: {1000 // SAMPLE_INTERVAL}Hz 샘플링, ADC 변화 {DEADBAND} 초과 시 전송 (유지 {KEEPALIVE_INTERVAL}ms)")
+else:
+    print(f"고정 간격 전송: {SEND_INTERVAL}ms")
+if BROADCAST:
+    link.up("브로드캐스트")
+    start_sending()
+else:
+    link.begin("클라이언트 대기")
+
+# 연결 수락 실패 시 백오프 후 대기 재개 타이머
+accept_timer = evloop.Timer(resume_accept)
 
-# 메인 루프
+# 메인 루프 (소켓 이벤트와 타이머 마감 시각에 맞춰서만 깨어남)
 while True:
-    current_time = time.ticks_ms()
-    
     try:
-        # 클라이언트 연결 수락
-        client, addr = server.accept()
-        print(f"클라이언트 연결됨: {addr}")
-        
-        # 연결 성공 시 재시도 횟수 초기화
-        retry_count = 0
-        
-        # 클라이언트 처리
-        if not handle_client(client):
-            cleanup_connection(client)
-            continue
-            
+        loop.run_once()
     except Exception as e:
-        print(f"연결 처리 중 오류 발생: {e}")
-        
-        # 재시도 제한 확인
-        if check_retry_limit():
-            continue
-            
-        # 재시도 간격 확인
-        if time.ticks_diff(current_time, last_retry_time) < RETRY_INTERVAL:
-            continue
-            
-        retry_count += 1
-        last_retry_time = current_time
-        print(f"연결 시도 실패 (시도 {retry_count}/{MAX_RETRY_COUNT})")
-    
-    time.sleep(0.1)  # CPU 부하 감소 
\ No newline at end of file
+        print(f"예기치 않은 오류 발생: {e}")
+        if not BROADCAST:  # 브로드캐스트는 끊을 연결이 없으므로 계속 전송
+            cleanup_connection("예기치 않은 오류")
+        time.sleep(1)  # 같은 오류가 계속되면 루프가 쉬지 않고 돌지 않도록
\ No newline at end of file
@@ -0,0 +1,202 @@
+"""ADC 값 필터 (샘플마다 일정한 연산량, 미리 할당한 배열 사용)
+
+- MovingAverage: 이동 평균. 합계를 유지하므로 창 크기와 관계없이 샘플당 덧셈 두 번
+- Ema: 지수 이동 평균 (정수 고정 소수점, 계수 1/2^shift)
+- Median: 작은 창(홀수 개)의 중앙값. 정렬된 배열을 유지하며 값 하나만 빼고 넣음
+- Passthrough: 필터 없음
+
+create(name, size)로 이름을 골라 만든다. 보드에서 @micropython.viper 구현
+(adcfilter_viper.py)을 쓸 수 있으면 자동으로 사용한다 (USE_VIPER). 첫 샘플로
+창을 채우므로 시작 직후에도 0 쪽으로 끌려가지 않는다.
+"""
+import array
+
+USE_VIPER = True  # False: 항상 파이썬 구현 사용
+
+FILTERS = ("average", "ema", "median", "none")
+
+
+class MovingAverage:
+    """최근 size개 샘플의 평균"""
+
+    def __init__(self, size):
+        if size < 1:
+            raise ValueError("size")
+        self.size = size
+        self.buf = array.array('H', bytes(2 * size))
+        self.state = array.array('i', (0, 0, 0))  # 합계, 다음 위치, 첫 샘플 채움 여부
+
+    def reset(self):
+        """다음 샘플로 창을 다시 채움 (새 연결 등)"""
+        self.state[2] = 0
+
+    def use_viper(self, fast):
+        """update()를 viper 구현으로 교체 (상태 배열은 그대로 공유)"""
+        fn, buf, state, size = fast.average, self.buf, self.state, self.size
+        self.update = lambda value: fn(buf, state, size, value)
+
+    def update(self, value):
+        """샘플 하나를 넣고 필터 출력 반환"""
+        state = self.state
+        if not state[2]:
+            for i in range(self.size):
+                self.buf[i] = value
+            state[0] = value * self.size
+            state[1] = 0
+            state[2] = 1
+            return value
+        i = state[1]
+        total = state[0] - self.buf[i] + value
+        self.buf[i] = value
+        i += 1
+        state[1] = 0 if i >= self.size else i
+        state[0] = total
+        return total // self.size
+
+
+class Ema:
+    """지수 이동 평균: 출력 += (입력 - 출력) / 2^shift
+
+    누적값을 2^shift배로 유지해서 정수 연산만 쓴다. shift 2(계수 1/4)가 이동
+    평균 창 7개와 비슷한 평활 정도이다.
+    """
+
+    def __init__(self, shift):
+        if not 0 <= shift <= 15:
+            raise ValueError("shift")
+        self.shift = shift
+        self.state = array.array('i', (0, 0))  # 누적값(출력 << shift), 첫 샘플 채움 여부
+
+    def reset(self):
+        """다음 샘플로 창을 다시 채움 (새 연결 등)"""
+        self.state[1] = 0
+
+    def use_viper(self, fast):
+        """update()를 viper 구현으로 교체 (상태 배열은 그대로 공유)"""
+        fn, state, shift = fast.ema, self.state, self.shift
+        self.update = lambda value: fn(state, shift, value)
+
+    def update(self, value):
+        state = self.state
+        if not state[1]:
+            state[0] = value << self.shift
+            state[1] = 1
+            return value
+        acc = state[0] + value - (state[0] >> self.shift)
+        state[0] = acc
+        return acc >> self.shift
+
+
+class Median:
+    """최근 size개(홀수) 샘플의 중앙값 (순간적인 튐에 강함, 창은 작게)"""
+
+    def __init__(self, size):
+        if size < 1 or not size & 1:
+            raise ValueError("size는 홀수여야 함")
+        self.size = size
+        self.buf = array.array('H', bytes(2 * size))     # 도착 순서
+        self.sorted = array.array('H', bytes(2 * size))  # 정렬된 값
+        self.state = array.array('i', (0, 0))  # 다음 위치, 첫 샘플 채움 여부
+
+    def reset(self):
+        """다음 샘플로 창을 다시 채움 (새 연결 등)"""
+        self.state[1] = 0
+
+    def use_viper(self, fast):
+        """update()를 viper 구현으로 교체 (상태 배열은 그대로 공유)"""
+        fn, buf, srt, state, size = fast.median, self.buf, self.sorted, self.state, self.size
+        self.update = lambda value: fn(buf, srt, state, size, value)
+
+    def update(self, value):
+        state = self.state
+        buf = self.buf
+        srt = self.sorted
+        n = self.size
+        if not state[1]:
+            for i in range(n):
+                buf[i] = value
+                srt[i] = value
+            state[0] = 0
+            state[1] = 1
+            return value
+        pos = state[0]
+        old = buf[pos]
+        buf[pos] = value
+        pos += 1
+        state[0] = 0 if pos >= n else pos
+        # 정렬된 배열에서 old를 빼고 value를 넣음 (그 사이 값만 한 칸씩 이동)
+        i = 0
+        while srt[i] != old:
+            i += 1
+        if value > old:
+            while i + 1 < n and srt[i + 1] < value:
+                srt[i] = srt[i + 1]
+                i += 1
+        else:
+            while i > 0 and srt[i - 1] > value:
+                srt[i] = srt[i - 1]
+                i -= 1
+        srt[i] = value
+        return srt[n >> 1]
+
+
+class Passthrough:
+    """필터 없음"""
+
+    size = 1
+
+    def reset(self):
+        pass
+
+    def update(self, value):
+        return value
+
+
+def ema_shift(size):
+    """이동 평균 창 크기와 비슷한 평활 정도의 EMA shift (5 -> 2, 16 -> 4)"""
+    return max(0, size.bit_length() - 1)
+
+
+def create(name, size, viper=True):
+    """이름으로 필터 생성 (average/ema/median/none, size: 창 크기)"""
+    if name == "average":
+        flt = MovingAverage(size)
+    elif name == "ema":
+        flt = Ema(ema_shift(size))
+    elif name == "median":
+        flt = Median(size | 1)
+    elif name == "none":
+        return Passthrough()
+    else:
+        raise ValueError(f"알 수 없는 필터: {name} (선택: {', '.join(FILTERS)})")
+    if viper and _viper is not None:
+        flt.use_viper(_viper)
+    return flt
+
+
+def using_viper():
+    """viper 구현을 쓰고 있는지 확인"""
+    return _viper is not None
+
+
+def _viper_matches():
+    """viper 구현의 출력이 파이썬 구현과 같은지 확인"""
+    values = (2048, 0, 4095, 100, 3000, 3000, 17, 4095, 2500, 1)
+    for name in FILTERS[:3]:
+        expected = create(name, 5, viper=False)
+        fast = create(name, 5)
+        for value in values:
+            if fast.update(value) != expected.update(value):
+                return False
+    return True
+
+
+# 보드에서는 viper 구현을 불러와 검증한 뒤 사용 (호스트에서는 ptr16 등이 없어 실패하므로 파이썬 구현)
+_viper = None
+if USE_VIPER:
+    try:
+        import adcfilter_viper as _viper
+        if not _viper_matches():
+            _viper = None
+    except Exception:
+        _viper = None
@@ -0,0 +1,78 @@
+"""adcfilter의 @micropython.viper 구현 (보드 전용)
+
+adcfilter가 불러와서 출력이 파이썬 구현과 같은지 확인한 뒤에만 사용한다.
+상태는 파이썬 구현과 같은 배열(ptr16: 샘플, ptr32: 상태)을 그대로 쓴다.
+"""
+import micropython
+
+
+@micropython.viper
+def average(buf, state, size: int, value: int) -> int:
+    b = ptr16(buf)
+    s = ptr32(state)
+    if s[2] == 0:
+        i = 0
+        while i < size:
+            b[i] = value
+            i += 1
+        s[0] = value * size
+        s[1] = 0
+        s[2] = 1
+        return value
+    i = s[1]
+    total = s[0] - b[i] + value
+    b[i] = value
+    i += 1
+    if i >= size:
+        i = 0
+    s[1] = i
+    s[0] = total
+    return total // size
+
+
+@micropython.viper
+def ema(state, shift: int, value: int) -> int:
+    s = ptr32(state)
+    if s[1] == 0:
+        s[0] = value << shift
+        s[1] = 1
+        return value
+    acc = s[0] + value - (s[0] >> shift)
+    s[0] = acc
+    return acc >> shift
+
+
+@micropython.viper
+def median(buf, srt, state, size: int, value: int) -> int:
+    b = ptr16(buf)
+    m = ptr16(srt)
+    s = ptr32(state)
+    if s[1] == 0:
+        i = 0
+        while i < size:
+            b[i] = value
+            m[i] = value
+            i += 1
+        s[0] = 0
+        s[1] = 1
+        return value
+    pos = s[0]
+    old = b[pos]
+    b[pos] = value
+    pos += 1
+    if pos >= size:
+        pos = 0
+    s[0] = pos
+    i = 0
+    while m[i] != old:
+        i += 1
+    if value > old:
+        while i + 1 < size and m[i + 1] < value:
+            m[i] = m[i + 1]
+            i += 1
+    else:
+        while i > 0 and m[i - 1] > value:
+            m[i] = m[i - 1]
+            i -= 1
+    m[i] = value
+    return m[size >> 1]
@@ -0,0 +1,72 @@
+"""하드웨어 타이머 IRQ로 ADC를 일정 간격으로 샘플링
+
+타이머 콜백은 ADC 값을 미리 할당한 링 버퍼(array('H'))에 쓰기만 하고, 네트워크
+쪽은 이벤트 루프에서 쌓인 샘플을 묶음으로 꺼낸다. 샘플 간격이 소켓/BLE 처리
+시간에 영향을 받지 않으므로 파형처럼 고른 간격의 샘플 스트림이 된다.
+"""
+import array
+from machine import Timer
+from ticks import ticks_ms
+
+INDEX_MASK = 0x3FFFFFFF  # 샘플 인덱스 범위 (MicroPython small int 안에서 감김)
+
+
+class TimerSampler:
+    """rate Hz로 adc.read()를 링 버퍼에 저장 (size는 2의 거듭제곱)
+
+    소비 쪽이 size개보다 많이 밀리면 가장 오래된 샘플부터 버리고 overruns에
+    센다. 인덱스는 start() 이후의 샘플 번호이다. 마지막 샘플을 읽은 시각을
+    head_ms에 남기므로 stamp()로 샘플 시각을 알 수 있다.
+    """
+
+    def __init__(self, adc, rate, size=256, timer_id=0):
+        if size & (size - 1):
+            raise ValueError("size는 2의 거듭제곱이어야 함")
+        self.adc = adc
+        self.rate = rate
+        self.size = size
+        self.buf = array.array('H', bytes(2 * size))
+        self._mask = size - 1
+        self.head = 0      # 다음에 쓸 샘플 인덱스 (타이머 IRQ만 변경)
+        self.tail = 0      # 다음에 읽을 샘플 인덱스 (소비 쪽만 변경)
+        self.overruns = 0  # 소비가 밀려서 버린 샘플 수
+        self.head_ms = 0   # 마지막 샘플 시각 (ticks_ms)
+        self._timer = Timer(timer_id)
+        self._callback = self._on_timer  # IRQ 등록용 바운드 메서드 (한 번만 생성)
+
+    def start(self):
+        """버퍼를 비우고 샘플링 시작"""
+        self.head = 0
+        self.tail = 0
+        self.overruns = 0
+        self._timer.init(mode=Timer.PERIODIC, freq=self.rate, callback=self._callback)
+
+    def stop(self):
+        """샘플링 중지"""
+        self._timer.deinit()
+
+    def _on_timer(self, timer):
+        head = self.head
+        self.buf[head & self._mask] = self.adc.read()
+        self.head_ms = ticks_ms()
+        self.head = (head + 1) & INDEX_MASK
+
+    def available(self):
+        """읽지 않은 샘플 수 (밀린 샘플은 버리고 최대 size개)"""
+        count = (self.head - self.tail) & INDEX_MASK
+        if count > self.size:
+            self.overruns += count - self.size
+            self.tail = (self.head - self.size) & INDEX_MASK
+            count = self.size
+        return count
+
+    def pop(self):
+        """가장 오래된 샘플 하나 꺼내기 (available()로 먼저 확인)"""
+        tail = self.tail
+        self.tail = (tail + 1) & INDEX_MASK
+        return self.buf[tail & self._mask]
+
+    def stamp(self):
+        """다음에 꺼낼 샘플의 시각 (ticks_ms, 샘플 간격으로 역산)"""
+        behind = (self.head - self.tail - 1) & INDEX_MASK
+        return self.head_ms - behind * 1000 // self.rate
@@ -0,0 +1,81 @@
+"""BLE 광고 데이터(AD 구조) 조립/해석
+
+광고 데이터는 [길이][종류][값] 구조의 나열이다 (길이 = 종류 1바이트 + 값 길이,
+전체 31바이트 이하). 128비트 서비스 UUID 하나(18바이트)와 플래그, 제조사
+데이터를 넣으면 이름이 들어갈 자리가 없으므로, 이름은 스캔 응답(액티브 스캔에만
+전달)에 따로 넣는다.
+"""
+
+FLAGS = 0x01            # 광고 플래그
+UUID16_MORE = 0x02      # 16비트 서비스 UUID (일부)
+UUID16 = 0x03           # 16비트 서비스 UUID (전체 목록)
+UUID128_MORE = 0x06     # 128비트 서비스 UUID (일부)
+UUID128 = 0x07          # 128비트 서비스 UUID (전체 목록)
+SHORT_NAME = 0x08       # 장치 이름 (줄임)
+COMPLETE_NAME = 0x09    # 장치 이름 (전체)
+MANUFACTURER = 0xFF     # 제조사 데이터 ([회사 ID 2바이트][값])
+
+FLAG_GENERAL = 0x06   # LE General Discoverable | BR/EDR 미지원
+MAX_SIZE = 31
+
+
+def build(name=None, services=(), manufacturer=None, flags=True):
+    """광고 데이터 조립
+
+    name: 장치 이름, services: 서비스 UUID(bluetooth.UUID 또는 리틀 엔디언 바이트),
+    manufacturer: 제조사 데이터 바이트, flags: 플래그 포함 (스캔 응답에는 False)
+    """
+    payload = bytearray((2, FLAGS, FLAG_GENERAL)) if flags else bytearray()
+    uuid16 = b"".join(bytes(uuid) for uuid in services if len(bytes(uuid)) == 2)
+    uuid128 = b"".join(bytes(uuid) for uuid in services if len(bytes(uuid)) == 16)
+    for ad_type, value in ((UUID16, uuid16), (UUID128, uuid128),
+                           (COMPLETE_NAME, name), (MANUFACTURER, manufacturer)):
+        if not value:
+            continue
+        if isinstance(value, str):
+            value = value.encode()
+        payload += bytes((len(value) + 1, ad_type))
+        payload += value
+    if len(payload) > MAX_SIZE:
+        raise ValueError(f"광고 데이터 크기 초과: {len(payload)}")
+    return bytes(payload)
+
+
+def find(adv_data, ad_type):
+    """ad_type인 첫 필드의 값 (없으면 None, 할당 없이 memoryview로 반환)"""
+    data = memoryview(adv_data)
+    i = 0
+    while i + 1 < len(data):
+        length = data[i]
+        if length == 0 or i + 1 + length > len(data):
+            break  # 잘못된 길이: 나머지는 해석하지 않음
+        if data[i + 1] == ad_type:
+            return data[i + 2:i + 1 + length]
+        i += 1 + length
+    return None
+
+
+def has_service(adv_data, uuid):
+    """광고 데이터의 서비스 UUID 목록에 uuid가 있는지 (uuid: bluetooth.UUID 또는 리틀 엔디언 바이트)"""
+    uuid = bytes(uuid)
+    size = len(uuid)
+    types = (UUID16, UUID16_MORE) if size == 2 else (UUID128, UUID128_MORE)
+    for ad_type in types:
+        value = find(adv_data, ad_type)
+        if value is None:
+            continue
+        for i in range(0, len(value) - size + 1, size):
+            for j in range(size):  # 바이트 단위 비교 (슬라이스 할당 없음)
+                if value[i + j] != uuid[j]:
+                    break
+            else:
+                return True
+    return False
+
+
+def name(adv_data):
+    """장치 이름 (전체 이름이 없으면 줄인 이름, 둘 다 없으면 None)"""
+    value = find(adv_data, COMPLETE_NAME)
+    if value is None:
+        value = find(adv_data, SHORT_NAME)
+    return None if value is None else str(bytes(value), "utf-8")
@@ -0,0 +1,97 @@
+"""BLE 이벤트 대기열 (bt_irq는 복사만 하고 처리는 메인 루프에서)
+
+bt_irq는 BLE 스택이 부르는 콜백이라, 안에서 기다리거나(time.sleep)
+gap_connect()처럼 오래 걸리는 일을 하면 그동안 다음 이벤트와 타이머 콜백이
+모두 밀린다. EventQueue.irq를 ble.irq()에 등록하면 이벤트는 미리 할당한
+대기열에 넣고 바로 돌아온다. 핸들러는 메인 루프가 dispatch()로 호출한다.
+
+이벤트 데이터의 memoryview(주소, 광고 데이터 등)는 bt_irq 안에서만 유효하므로
+bytes로 복사한다. 알림처럼 자주 오고 처리가 짧은 이벤트는 inline으로 지정한다.
+inline 이벤트는 bt_irq 안에서 바로 처리하므로 복사 할당과 대기 지연이 없다.
+"""
+import time
+import histogram
+from ticks import ticks_ms, ticks_us, ticks_diff, ticks_add
+
+POLL_MS = 1  # wait()에서 대기열을 확인하는 간격 (ms)
+
+
+class EventQueue:
+    """bt_irq 이벤트 대기열 (size: 2의 거듭제곱)
+
+    irq()만 head를, dispatch()만 tail을 바꾸므로 잠금 없이 쓸 수 있다.
+    대기열이 가득 차면 새 이벤트를 버리고 dropped를 센다.
+    """
+
+    def __init__(self, handler, size=16, inline=()):
+        self.handler = handler  # handler(event, data)
+        self.size = size
+        self.inline = inline    # bt_irq 안에서 바로 처리할 이벤트 번호
+        self.events = [0] * size
+        self.data = [None] * size
+        self.stamps = [0] * size  # 대기열에 넣은 시각 (us)
+        self.head = 0  # 다음에 쓸 위치 (irq()만 변경)
+        self.tail = 0  # 다음에 읽을 위치 (dispatch()만 변경)
+        self.residency = histogram.Histogram(1000000)  # bt_irq 안에 머문 시간 (us)
+        self.latency = histogram.Histogram(10000000)   # 대기열에 넣은 시각 -> 핸들러 시작 (us)
+        self.reset_stats()
+
+    def reset_stats(self):
+        """통계 구간 시작"""
+        self.residency.reset()
+        self.latency.reset()
+        self.max_depth = 0  # 대기열에 쌓인 최대 이벤트 수
+        self.dropped = 0    # 대기열이 가득 차서 버린 이벤트 수
+
+    def pending(self):
+        """처리하지 않은 이벤트 수"""
+        return (self.head - self.tail) & 0xFFFF
+
+    def irq(self, event, data):
+        """ble.irq()에 등록할 콜백"""
+        start = ticks_us()
+        if event in self.inline:
+            self.handler(event, data)
+        else:
+            depth = (self.head - self.tail) & 0xFFFF
+            if depth >= self.size:
+                self.dropped += 1
+            else:
+                i = self.head & (self.size - 1)
+                self.events[i] = event
+                self.data[i] = tuple(bytes(x) if isinstance(x, memoryview) else x for x in data)
+                self.stamps[i] = start
+                self.head = (self.head + 1) & 0xFFFF
+                if depth + 1 > self.max_depth:
+                    self.max_depth = depth + 1
+        self.residency.record(ticks_diff(ticks_us(), start))
+
+    def dispatch(self):
+        """쌓인 이벤트를 차례로 처리 (메인 루프에서 호출), 처리한 수 반환"""
+        handled = 0
+        while self.tail != self.head:
+            i = self.tail & (self.size - 1)
+            event = self.events[i]
+            data = self.data[i]
+            self.data[i] = None
+            self.latency.record(ticks_diff(ticks_us(), self.stamps[i]))
+            self.tail = (self.tail + 1) & 0xFFFF
+            self.handler(event, data)
+            handled += 1
+        return handled
+
+    def wait(self, timeout_ms):
+        """이벤트가 들어오거나 timeout_ms가 지날 때까지 대기 (메인 루프의 sleep 대신)"""
+        deadline = ticks_add(ticks_ms(), timeout_ms)
+        while self.tail == self.head and ticks_diff(deadline, ticks_ms()) > 0:
+            time.sleep_ms(POLL_MS)
+
+    def format(self):
+        """한 줄 요약 문자열"""
+        count, low, avg, p50, p99, high, lost = self.residency.stats()
+        line = f"bt_irq {count}회 | 체류 평균 {max(avg, 0)}us 최대 {max(high, 0)}us"
+        line += f" | 대기열 최대 {self.max_depth}/{self.size}, 버림 {self.dropped}"
+        count, low, avg, p50, p99, high, lost = self.latency.stats()
+        if count:
+            line += f" | 처리 지연 {count}건 평균 {avg / 1000:.1f}ms 최대 {high / 1000:.1f}ms"
+        return line
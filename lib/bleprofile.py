@@ -0,0 +1,45 @@
+"""BLE 연결 프로필 (스캔/연결 간격 묶음)
+
+연결 간격은 알림 지연의 상한을 정한다. 트랜스미터가 알림을 보내면 다음 연결
+이벤트까지 기다리므로 평균 간격의 절반, 최대 간격 하나만큼 늦어진다. 간격이
+짧을수록 지연이 작고 두 보드의 무선 전력 소비가 크다.
+
+- low-latency: 연결 간격 7.5~15ms (BLE 최소), 스캔 창 = 스캔 간격 (계속 수신)
+- balanced: 30~50ms (ESP32 NimBLE 기본값과 같음)
+- low-power: 100~200ms, 스캔은 1.28초 중 30ms (MicroPython 기본 간격). 창이
+  트랜스미터의 빠른 광고 간격(20ms + 임의 지연 최대 10ms)보다 길어서 스캔 간격
+  한 번 안에 찾는다 (기본 창 11.25ms는 광고 사이에 끼어 여러 번 놓침)
+
+센트럴(리시버)이 gap_scan()과 gap_connect()에 이 값을 넘긴다. MicroPython의
+bluetooth 모듈에는 연결된 상태에서 연결 파라미터를 바꾸는 함수가 없으므로
+연결 중에 프로필을 바꾸면 연결을 끊고 새 간격으로 다시 연결한다.
+"""
+
+PROFILES = ("low-latency", "balanced", "low-power")
+
+
+class Profile:
+    """스캔/연결 간격 (단위: us)"""
+
+    def __init__(self, name, min_conn_us, max_conn_us, scan_interval_us, scan_window_us):
+        self.name = name
+        self.min_conn_us = min_conn_us            # 연결 간격 하한
+        self.max_conn_us = max_conn_us            # 연결 간격 상한 (스택이 범위 안에서 고름)
+        self.scan_interval_us = scan_interval_us  # 스캔 간격
+        self.scan_window_us = scan_window_us      # 스캔 간격 중 실제로 수신하는 시간
+
+    def format(self):
+        """한 줄 요약 문자열"""
+        return (f"{self.name} (연결 간격 {self.min_conn_us / 1000:g}~{self.max_conn_us / 1000:g}ms, "
+                f"스캔 {self.scan_window_us / 1000:g}/{self.scan_interval_us / 1000:g}ms)")
+
+
+def get(name):
+    """이름으로 프로필 생성 (low-latency/balanced/low-power)"""
+    if name == "low-latency":
+        return Profile(name, 7500, 15000, 30000, 30000)
+    if name == "balanced":
+        return Profile(name, 30000, 50000, 100000, 50000)
+    if name == "low-power":
+        return Profile(name, 100000, 200000, 1280000, 30000)
+    raise ValueError(f"알 수 없는 프로필: {name} (선택: {', '.join(PROFILES)})")
@@ -0,0 +1,190 @@
+import errno
+import select
+import sys
+from ticks import ticks_ms, ticks_diff, ticks_add
+
+# CPython의 poll()은 파일 디스크립터를, MicroPython은 소켓 객체를 돌려준다
+_USE_FD = sys.implementation.name != "micropython"
+
+POLLIN = select.POLLIN
+POLLOUT = select.POLLOUT
+POLLERR = select.POLLERR
+POLLHUP = select.POLLHUP
+
+
+class Timer:
+    """이벤트 루프에 등록된 타이머 (마감 시각에 콜백 호출)"""
+
+    def __init__(self, callback, interval=0):
+        self.callback = callback
+        self.interval = interval  # 0이면 1회성, 0보다 크면 주기 타이머 (ms)
+        self.deadline = 0
+        self.active = False
+
+
+class EventLoop:
+    """select.poll 기반 이벤트 루프
+
+    소켓의 읽기/쓰기 가능 이벤트와 타이머 마감 시각 중 가장 빠른 것에 맞춰서만
+    깨어난다. 등록된 타이머가 없으면 소켓 이벤트가 올 때까지 잠든다.
+    """
+
+    def __init__(self):
+        self.poller = select.poll()
+        self.handlers = {}  # 소켓 키 -> (소켓, 이벤트 마스크, 콜백)
+        self.outgoing = {}  # 소켓 키 -> 아직 보내지 못한 데이터 (bytearray)
+        self.timers = []
+        self.wakeups = 0    # poll()에서 깨어난 횟수 (유휴 상태 확인용)
+        self.idle = None    # 잠들기 전에 호출할 함수 (할 일이 남았으면 True 반환, 예: 로그 출력)
+
+    # 소켓 관리 ----------------------------------------------------------
+
+    def _key(self, sock):
+        return sock.fileno() if _USE_FD else id(sock)
+
+    def register(self, sock, events, callback):
+        """소켓 이벤트 등록 (callback(sock, event) 호출)"""
+        self.handlers[self._key(sock)] = (sock, events, callback)
+        self.poller.register(sock, events)
+
+    def modify(self, sock, events):
+        """소켓의 감시 이벤트 변경"""
+        key = self._key(sock)
+        sock_, _, callback = self.handlers[key]
+        self.handlers[key] = (sock_, events, callback)
+        self.poller.modify(sock, events)
+
+    def unregister(self, sock):
+        """소켓 등록 해제 (전송 대기 데이터도 폐기)"""
+        key = self._key(sock)
+        if key in self.handlers:
+            del self.handlers[key]
+            try:
+                self.poller.unregister(sock)
+            except (KeyError, OSError, ValueError):
+                pass
+        if key in self.outgoing:
+            del self.outgoing[key]
+
+    def send(self, sock, data):
+        """논블로킹 전송: 다 보내지 못한 데이터는 쓰기 가능 이벤트에서 이어서 전송"""
+        key = self._key(sock)
+        pending = self.outgoing.get(key)
+        if pending:
+            pending.extend(data)
+            return
+        try:
+            sent = sock.send(data)
+        except OSError as e:
+            if e.args[0] != errno.EAGAIN:
+                raise
+            sent = 0
+        if sent is None:
+            sent = 0
+        if sent < len(data):
+            self.outgoing[key] = bytearray(data[sent:])
+            _, events, _ = self.handlers[key]
+            self.modify(sock, events | POLLOUT)
+
+    def _flush(self, key, sock):
+        pending = self.outgoing[key]
+        try:
+            sent = sock.send(pending)
+        except OSError as e:
+            if e.args[0] != errno.EAGAIN:
+                raise
+            return
+        if sent:
+            pending = pending[sent:]
+            self.outgoing[key] = pending
+        if not pending:
+            del self.outgoing[key]
+            _, events, _ = self.handlers[key]
+            self.modify(sock, events & ~POLLOUT)
+
+    # 타이머 관리 --------------------------------------------------------
+
+    def call_later(self, delay, callback):
+        """delay ms 후 1회 호출되는 타이머 생성"""
+        timer = Timer(callback)
+        self.schedule(timer, delay)
+        return timer
+
+    def call_every(self, interval, callback, first_delay=None):
+        """interval ms마다 호출되는 타이머 생성"""
+        timer = Timer(callback, interval)
+        self.schedule(timer, interval if first_delay is None else first_delay)
+        return timer
+
+    def schedule(self, timer, delay):
+        """타이머의 마감 시각을 지금부터 delay ms 후로 (재)설정"""
+        timer.deadline = ticks_add(ticks_ms(), delay)
+        if not timer.active:
+            timer.active = True
+            self.timers.append(timer)
+
+    def cancel(self, timer):
+        """타이머 취소"""
+        if timer is not None and timer.active:
+            timer.active = False
+            self.timers.remove(timer)
+
+    def _next_timeout(self, now):
+        timeout = -1
+        for timer in self.timers:
+            remaining = ticks_diff(timer.deadline, now)
+            if remaining < 0:
+                remaining = 0
+            if timeout < 0 or remaining < timeout:
+                timeout = remaining
+        return timeout
+
+    def _run_timers(self, now):
+        # 목록을 복사하지 않고 인덱스로 순회 (메시지마다 할당하지 않도록)
+        # 콜백이 다른 타이머를 취소해서 하나를 건너뛰어도 다음 run_once()에서 실행된다
+        timers = self.timers
+        i = 0
+        while i < len(timers):
+            timer = timers[i]
+            i += 1
+            if ticks_diff(timer.deadline, now) <= 0:
+                if timer.interval > 0:
+                    # 주기 타이머: 밀린 주기는 건너뛰고 다음 마감 시각 설정
+                    timer.deadline = ticks_add(timer.deadline, timer.interval)
+                    if ticks_diff(timer.deadline, now) <= 0:
+                        timer.deadline = ticks_add(now, timer.interval)
+                else:
+                    self.cancel(timer)
+                    i -= 1
+                timer.callback()
+
+    # 실행 ---------------------------------------------------------------
+
+    def run_once(self):
+        """다음 이벤트 또는 타이머 마감까지 대기 후 처리"""
+        timeout = self._next_timeout(ticks_ms())
+        if self.idle is not None and self.idle():
+            timeout = 0  # 남은 일이 있으면 이벤트만 확인하고 바로 돌아옴
+        if _USE_FD:
+            events = self.poller.poll(timeout)
+        else:
+            events = self.poller.ipoll(timeout)  # 결과 튜플을 재사용하므로 할당 없음
+        self.wakeups += 1
+        for obj, event in events:
+            key = obj if _USE_FD else id(obj)
+            entry = self.handlers.get(key)
+            if entry is None:
+                continue
+            sock, _, callback = entry
+            if event & POLLOUT and key in self.outgoing:
+                try:
+                    self._flush(key, sock)
+                except OSError:
+                    event |= POLLERR  # 전송 오류는 소켓 콜백에서 연결 오류로 처리
+            if event & (POLLIN | POLLERR | POLLHUP):
+                callback(sock, event)
+        self._run_timers(ticks_ms())
+
+    def run_forever(self):
+        while True:
+            self.run_once()
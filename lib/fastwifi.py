@@ -0,0 +1,155 @@
+import binascii
+import json
+import os
+import time
+import network
+from ticks import ticks_ms, ticks_diff
+
+CACHE_FILE = "wifi_cache.json"  # 마지막으로 연결한 AP의 채널(과 BSSID) 저장 파일
+POLL_MS = 10                    # 연결 상태 확인 간격 (ms)
+
+# 즉시 실패로 판단하는 연결 상태
+_FAIL_STATUS = (network.STAT_CONNECT_FAIL, network.STAT_NO_AP_FOUND, network.STAT_WRONG_PASSWORD)
+
+
+class FastLink:
+    """고정 IP와 캐시된 BSSID/채널로 빠르게 재연결하는 WiFi 스테이션 연결
+
+    - 고정 IP를 사용해 DHCP 과정을 생략한다.
+    - 마지막으로 연결한 AP의 채널(BSSID를 알면 BSSID도)을 플래시에 저장해 두고,
+      재연결 시 해당 채널로 바로 연결해 전체 채널 스캔을 생략한다.
+    - 연결 상태를 POLL_MS 간격으로 확인한다 (기존 1초 간격).
+    - 재연결마다 링크 복구 시간(ms)을 기록한다.
+    """
+
+    def __init__(self, wlan, ssid, password, ifconfig=None, cache_file=CACHE_FILE):
+        self.wlan = wlan
+        self.ssid = ssid
+        self.password = password
+        self.ifconfig = ifconfig  # (IP, 서브넷 마스크, 게이트웨이, DNS) 또는 None (DHCP)
+        self.cache_file = cache_file
+        self.bssid = None
+        self.channel = 0
+        # 링크 복구 시간 통계 (ms)
+        self.links = 0
+        self.last_ms = 0
+        self.min_ms = 0
+        self.max_ms = 0
+        self.total_ms = 0
+        self._load_cache()
+
+    def _load_cache(self):
+        try:
+            with open(self.cache_file) as f:
+                cache = json.load(f)
+            if cache.get("ssid") == self.ssid:
+                bssid = cache.get("bssid")
+                self.bssid = binascii.unhexlify(bssid) if bssid else None
+                self.channel = cache.get("channel", 0)
+        except (OSError, ValueError, KeyError):
+            self.bssid = None
+            self.channel = 0
+
+    def _save_cache(self):
+        try:
+            with open(self.cache_file, "w") as f:
+                bssid = binascii.hexlify(self.bssid).decode() if self.bssid else None
+                json.dump({"ssid": self.ssid, "bssid": bssid, "channel": self.channel}, f)
+        except OSError as e:
+            print(f"WiFi 캐시 저장 실패: {e}")
+
+    def forget(self):
+        """캐시된 BSSID/채널 삭제 (AP가 바뀐 경우, 다음 부팅에도 남지 않도록 캐시 파일도 삭제)"""
+        self.bssid = None
+        self.channel = 0
+        try:
+            os.remove(self.cache_file)
+        except OSError:
+            pass
+
+    def _learn_ap(self):
+        """연결된 AP의 채널을 현재 연결에서 읽어 캐시에 저장 (스캔 없음)
+
+        MicroPython은 연결된 AP의 BSSID를 알려주지 않으므로 채널만 저장한다.
+        채널을 읽을 수 없는 펌웨어에서만 전체 채널 스캔으로 찾는다.
+        """
+        try:
+            channel = self.wlan.config("channel")
+        except (ValueError, OSError):
+            channel = 0
+        if channel:
+            self.channel = channel
+            self._save_cache()
+            print(f"AP 정보 캐시됨: 채널={channel}")
+            return
+        self._scan_ap()
+
+    def _scan_ap(self):
+        """연결된 AP의 BSSID와 채널을 스캔 결과에서 찾아 캐시에 저장"""
+        try:
+            for ssid, bssid, channel, rssi, security, hidden in self.wlan.scan():
+                if ssid.decode() == self.ssid:
+                    self.bssid = bytes(bssid)
+                    self.channel = channel
+                    self._save_cache()
+                    print(f"AP 정보 캐시됨: BSSID={binascii.hexlify(self.bssid).decode()} 채널={channel}")
+                    return
+        except Exception as e:
+            print(f"AP 정보 확인 실패: {e}")
+
+    def record(self, elapsed):
+        """링크 복구 시간 기록"""
+        self.links += 1
+        self.last_ms = elapsed
+        self.total_ms += elapsed
+        if self.links == 1 or elapsed < self.min_ms:
+            self.min_ms = elapsed
+        if elapsed > self.max_ms:
+            self.max_ms = elapsed
+
+    def stats(self):
+        """(횟수, 마지막, 최소, 평균, 최대) 링크 복구 시간 (ms)"""
+        avg = self.total_ms // self.links if self.links else 0
+        return self.links, self.last_ms, self.min_ms, avg, self.max_ms
+
+    def connect(self, timeout_ms):
+        """AP 연결 (이미 연결되어 있으면 그대로 사용), 성공 여부 반환"""
+        if self.wlan.isconnected():
+            return True
+
+        start = ticks_ms()
+        if self.ifconfig:
+            self.wlan.ifconfig(self.ifconfig)  # 고정 IP (DHCP 생략)
+        cached = self.bssid is not None or self.channel != 0
+        if cached:
+            if self.channel:
+                try:
+                    self.wlan.config(channel=self.channel)
+                except Exception:
+                    pass  # 채널 지정을 지원하지 않는 펌웨어
+            if self.bssid is not None:
+                self.wlan.connect(self.ssid, self.password, bssid=self.bssid)
+            else:
+                self.wlan.connect(self.ssid, self.password)
+        else:
+            self.wlan.connect(self.ssid, self.password)
+
+        while ticks_diff(ticks_ms(), start) < timeout_ms:
+            if self.wlan.isconnected():
+                break
+            if self.wlan.status() in _FAIL_STATUS:
+                break
+            time.sleep_ms(POLL_MS)
+
+        if not self.wlan.isconnected():
+            self.wlan.disconnect()
+            if cached:
+                # AP가 바뀌었을 수 있으므로 다음 시도는 일반 연결
+                print("캐시된 AP로 연결 실패, 캐시 삭제")
+                self.forget()
+            return False
+
+        self.record(ticks_diff(ticks_ms(), start))
+        if not cached:
+            self._learn_ap()
+        return True
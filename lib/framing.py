@@ -0,0 +1,174 @@
+import errno
+import socket
+import struct
+
+# MicroPython 포트에 따라 recv_into()가 없으면 스트림의 readinto()를 사용
+_HAS_RECV_INTO = hasattr(socket.socket, "recv_into")
+
+# 프레임 구조: [길이(2바이트, big endian)][페이로드]
+HEADER_SIZE = 2
+MAX_PAYLOAD = 1024  # 최대 페이로드 크기 (바이트)
+
+
+def encode(payload):
+    """페이로드 앞에 길이 헤더를 붙여 프레임 생성"""
+    length = len(payload)
+    if length > MAX_PAYLOAD:
+        raise ValueError(f"프레임 크기 초과: {length}")
+    return struct.pack(">H", length) + payload
+
+
+class FrameReader:
+    """TCP 스트림에서 프레임 단위로 메시지를 재조립하는 버퍼
+
+    recv()로 받은 조각을 feed()로 넣고, read_frame()으로 완성된 프레임의
+    페이로드를 하나씩 꺼낸다. 여러 메시지가 한 번에 도착하거나(합쳐짐)
+    한 메시지가 여러 번에 나뉘어 도착해도(분할) 원래 경계대로 복원된다.
+    """
+
+    def __init__(self, max_payload=MAX_PAYLOAD):
+        self.max_payload = max_payload
+        # 최대 프레임 2개 분량을 미리 할당 (미완성 프레임 + 새 수신 데이터)
+        self.buf = bytearray(2 * (HEADER_SIZE + max_payload))
+        self.mv = memoryview(self.buf)
+        self.start = 0  # 아직 읽지 않은 데이터의 시작 위치
+        self.end = 0    # 수신 데이터의 끝 위치
+        self.payload_start = 0  # next_frame()이 찾은 페이로드의 buf 내 위치
+
+    def reset(self):
+        """버퍼 초기화 (새 연결 시 호출)"""
+        self.start = 0
+        self.end = 0
+
+    def pending(self):
+        """버퍼에 남아있는 바이트 수"""
+        return self.end - self.start
+
+    def feed(self, data):
+        """수신한 데이터 조각을 버퍼에 추가"""
+        length = len(data)
+        if self.end + length > len(self.buf):
+            self._compact()
+            if self.end + length > len(self.buf):
+                raise ValueError("수신 버퍼 초과")
+        self.mv[self.end:self.end + length] = data
+        self.end += length
+
+    def recv_into(self, sock):
+        """소켓에서 버퍼로 직접 수신, 받은 바이트 수 반환 (0: 연결 종료)
+
+        버퍼가 비어 있으면 미리 만든 memoryview로 받으므로 할당이 없다.
+        미완성 프레임이 남아 있을 때만 남은 공간의 memoryview를 새로 만든다.
+        읽을 데이터가 없으면 recv()와 같이 EAGAIN OSError를 낸다.
+        """
+        if self.end == 0:
+            target = self.mv
+        else:
+            if self.end == len(self.buf):
+                self._compact()
+                if self.end == len(self.buf):
+                    raise ValueError("수신 버퍼 초과")
+            target = self.mv[self.end:]
+        if _HAS_RECV_INTO:
+            count = sock.recv_into(target)
+        else:
+            count = sock.readinto(target)
+            if count is None:  # 논블로킹 스트림: 읽을 데이터 없음
+                raise OSError(errno.EAGAIN)
+        self.end += count
+        return count
+
+    def next_frame(self):
+        """완성된 프레임의 페이로드 길이 반환 (없으면 -1)
+
+        페이로드는 buf[payload_start:payload_start + 길이]에 있으며 다음
+        recv_into()/feed() 호출 전까지 유효하다. memoryview를 만들지 않는다.
+        """
+        if self.end - self.start < HEADER_SIZE:
+            return -1
+        length = (self.buf[self.start] << 8) | self.buf[self.start + 1]
+        if length > self.max_payload:
+            raise ValueError(f"잘못된 프레임 길이: {length}")
+        frame_end = self.start + HEADER_SIZE + length
+        if frame_end > self.end:
+            return -1
+        self.payload_start = self.start + HEADER_SIZE
+        self.start = frame_end
+        if self.start == self.end:
+            self.start = 0
+            self.end = 0
+        return length
+
+    def read_frame(self):
+        """완성된 프레임의 페이로드 반환 (없으면 None)
+
+        반환값은 내부 버퍼의 memoryview이므로 다음 feed() 호출 전에 사용해야 한다.
+        """
+        length = self.next_frame()
+        if length < 0:
+            return None
+        return self.mv[self.payload_start:self.payload_start + length]
+
+    def _compact(self):
+        """읽지 않은 데이터를 버퍼 앞쪽으로 이동"""
+        if self.start == 0:
+            return
+        remaining = self.end - self.start
+        self.mv[0:remaining] = self.mv[self.start:self.end]
+        self.start = 0
+        self.end = remaining
+
+
+class FrameWriter:
+    """미리 할당한 버퍼에 메시지를 조립하는 송신 버퍼
+
+    begin()으로 시작해 write()로 내용을 이어 붙이고 finish()로 완성된
+    메시지의 memoryview를 받는다. memoryview는 길이별로 한 번만 만들어
+    재사용하므로 같은 길이의 메시지를 반복해서 보낼 때 할당이 없다.
+    header=False면 길이 헤더 없이 내용만 조립한다 (BLE 등).
+    """
+
+    def __init__(self, max_payload=MAX_PAYLOAD, header=True):
+        self.offset = HEADER_SIZE if header else 0
+        self.buf = bytearray(self.offset + max_payload)
+        self.mv = memoryview(self.buf)
+        self.end = self.offset
+        self._views = {}
+
+    def begin(self):
+        """새 메시지 시작"""
+        self.end = self.offset
+
+    def write(self, src, start=0, end=-1):
+        """src[start:end]를 이어 붙임 (슬라이스를 만들지 않고 바이트 단위로 복사)"""
+        if end < 0:
+            end = len(src)
+        pos = self.end
+        if pos + end - start > len(self.buf):
+            raise ValueError("송신 버퍼 초과")
+        buf = self.buf
+        for i in range(start, end):
+            buf[pos] = src[i]
+            pos += 1
+        self.end = pos
+
+    def write_u16(self, value):
+        """2바이트 정수 (big endian) 추가"""
+        self.buf[self.end] = (value >> 8) & 0xFF
+        self.buf[self.end + 1] = value & 0xFF
+        self.end += 2
+
+    def payload_length(self):
+        return self.end - self.offset
+
+    def finish(self):
+        """길이 헤더를 채우고 완성된 메시지의 memoryview 반환"""
+        if self.offset:
+            length = self.end - self.offset
+            self.buf[0] = (length >> 8) & 0xFF
+            self.buf[1] = length & 0xFF
+        view = self._views.get(self.end)
+        if view is None:
+            view = self.mv[:self.end]
+            self._views[self.end] = view
+        return view
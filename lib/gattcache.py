@@ -0,0 +1,85 @@
+"""BLE GATT 핸들 캐시 (재연결 시 서비스/특성 검색 생략)
+
+리시버(센트럴)가 검색으로 찾은 특성 값 핸들과 CCCD 핸들을 피어 MAC과 서비스
+UUID별로 플래시(JSON)에 저장한다. 다음 연결부터는 검색 없이 바로 CCCD에 써서
+구독한다 (서비스 검색과 특성 검색의 왕복을 생략).
+
+트랜스미터는 광고의 제조사 데이터에 GATT 버전을 넣는다. 서비스 구성(특성 순서,
+종류)을 바꾸면 버전을 올리고, 리시버는 스캔 결과의 버전이 캐시와 같을 때만
+캐시를 쓴다. 버전이 없는 광고(이전 트랜스미터)는 항상 검색한다.
+"""
+import json
+import advdata
+
+CACHE_FILE = "gatt_cache.json"  # 피어별 GATT 핸들 저장 파일
+COMPANY_ID = 0xFFFF             # 제조사 데이터 회사 ID (0xFFFF: 시험/내부용)
+
+
+def manufacturer(version):
+    """광고에 넣을 제조사 데이터 ([회사 ID][GATT 버전])"""
+    return bytes((COMPANY_ID & 0xFF, COMPANY_ID >> 8, version & 0xFF))
+
+
+def adv_version(adv_data):
+    """광고 데이터의 GATT 버전 (없으면 -1)"""
+    value = advdata.find(adv_data, advdata.MANUFACTURER)
+    if value is None or len(value) < 3 or value[0] | (value[1] << 8) != COMPANY_ID:
+        return -1
+    return value[2]
+
+
+class GattCache:
+    """{피어 MAC/서비스 UUID: (GATT 버전, 값 핸들, CCCD 핸들)}
+
+    get()/put()은 메모리만 바꾸므로 bt_irq에서 불러도 되고, 플래시 저장은
+    메인 루프에서 save()로 한다.
+    """
+
+    def __init__(self, cache_file=CACHE_FILE):
+        self.cache_file = cache_file
+        self.entries = {}
+        self.dirty = False  # 저장하지 않은 변경 있음
+        try:
+            with open(cache_file) as f:
+                self.entries = json.load(f)
+        except (OSError, ValueError):
+            self.entries = {}
+
+    @staticmethod
+    def _key(addr, service_uuid):
+        return bytes(addr).hex() + "/" + bytes(service_uuid).hex()
+
+    def get(self, addr, service_uuid, version):
+        """버전이 같은 캐시의 (값 핸들, CCCD 핸들), 없으면 None"""
+        if version < 0:
+            return None
+        entry = self.entries.get(self._key(addr, service_uuid))
+        if entry is None or entry[0] != version:
+            return None
+        return entry[1], entry[2]
+
+    def put(self, addr, service_uuid, version, value_handle, cccd_handle):
+        """검색한 핸들 기록 (버전이 없는 피어는 기록하지 않음)"""
+        if version < 0:
+            return
+        key = self._key(addr, service_uuid)
+        entry = [version, value_handle, cccd_handle]
+        if self.entries.get(key) != entry:
+            self.entries[key] = entry
+            self.dirty = True
+
+    def forget(self, addr, service_uuid):
+        """캐시 삭제 (캐시한 핸들로 구독이 실패한 경우)"""
+        if self.entries.pop(self._key(addr, service_uuid), None) is not None:
+            self.dirty = True
+
+    def save(self):
+        """변경이 있으면 플래시에 저장"""
+        if not self.dirty:
+            return
+        self.dirty = False
+        try:
+            with open(self.cache_file, "w") as f:
+                json.dump(self.entries, f)
+        except OSError as e:
+            print(f"GATT 캐시 저장 실패: {e}")
@@ -0,0 +1,111 @@
+"""hello/world 요청을 여러 리시버에 동시에 보내는 asyncio 스트림 서버
+
+연결된 리시버마다 serve_client() 코루틴이 하나씩 실행되며, 각자의 반복 카운트와
+타임아웃을 가진다. 메시지 형식은 동기 트랜스미터와 같다 (길이 헤더 프레임 +
+시퀀스 태그).
+"""
+import asyncio
+import framing
+import histogram
+import pipeline
+from ticks import ticks_ms, ticks_us, ticks_diff, ticks_add
+
+
+class ServerConfig:
+    """서버 동작 설정"""
+
+    def __init__(self, send_interval=5000, request_timeout=5000, verbose=True):
+        self.send_interval = send_interval      # 요청 전송 간격 (ms)
+        self.request_timeout = request_timeout  # 응답 대기 시간 (ms)
+        self.verbose = verbose                  # 요청/응답마다 출력할지 여부
+        self.on_rtt = None                      # 왕복 시간(us)을 받을 콜백 (측정용)
+
+
+class ServerStats:
+    """전체 리시버의 누적 통계"""
+
+    def __init__(self):
+        self.clients = 0       # 현재 연결된 리시버 수
+        self.round_trips = 0   # 완료된 요청/응답 수
+        self.timeouts = 0      # 응답 타임아웃 수
+        self.rtt = histogram.Histogram()  # 전체 리시버의 왕복 시간(us) 분포
+
+
+async def read_frame(reader, frames, deadline):
+    """프레임 하나를 읽을 때까지 수신 (연결 종료 시 None, deadline(ticks_ms)이 지나면 TimeoutError)"""
+    while True:
+        payload = frames.read_frame()
+        if payload is not None:
+            return payload
+        remaining = ticks_diff(deadline, ticks_ms())
+        if remaining <= 0:
+            raise asyncio.TimeoutError
+        data = await asyncio.wait_for(reader.read(1024), remaining / 1000)
+        if not data:
+            return None
+        frames.feed(data)
+
+
+async def serve_client(reader, writer, config, stats):
+    """리시버 하나와 hello/world 요청/응답 반복"""
+    addr = writer.get_extra_info('peername')
+    frames = framing.FrameReader()
+    count = 0
+    stats.clients += 1
+    print(f"클라이언트 연결됨: {addr} (현재 {stats.clients}개)")
+
+    try:
+        while True:
+            count += 1
+            seq = count & pipeline.SEQ_MASK
+            message = "hello"
+            # 쓰기와 전송 대기(drain) 시간도 왕복 시간과 응답 제한 시간에 포함
+            sent_at = ticks_us()
+            deadline = ticks_add(ticks_ms(), config.request_timeout)
+            writer.write(framing.encode(pipeline.make_tag(seq) + message.encode()))
+            await writer.drain()
+            if config.verbose:
+                print(f"[{addr[0]} 반복:{count} | 진행:1/4] 전송할 메시지 : {message}")
+
+            # 같은 시퀀스의 응답이 올 때까지 대기 (이전 요청의 늦은 응답은 버림, 제한 시간은 요청마다 한 번)
+            try:
+                while True:
+                    payload = await read_frame(reader, frames, deadline)
+                    if payload is None:
+                        print(f"클라이언트 연결 종료: {addr}")
+                        return
+                    if pipeline.read_tag(payload) == seq:
+                        break
+            except asyncio.TimeoutError:
+                stats.timeouts += 1
+                stats.rtt.lose()
+                print(f"[{addr[0]} 반복:{count}] 응답 타임아웃")
+                continue
+
+            rtt = ticks_diff(ticks_us(), sent_at)
+            stats.round_trips += 1
+            stats.rtt.record(rtt)
+            if config.on_rtt:
+                config.on_rtt(rtt)
+            if config.verbose:
+                response = bytes(payload[pipeline.TAG_SIZE:]).decode()
+                print(f"[{addr[0]} 반복:{count} | 진행:4/4] 수신한 메시지 : {response}")
+
+            if config.send_interval > 0:
+                await asyncio.sleep(config.send_interval / 1000)
+    except Exception as e:
+        print(f"클라이언트 처리 중 오류 발생 ({addr}): {e}")
+    finally:
+        stats.clients -= 1
+        writer.close()
+        try:
+            await writer.wait_closed()
+        except Exception:
+            pass
+
+
+async def start(host, port, config, stats, backlog=8):
+    """서버 시작 후 asyncio 서버 객체 반환"""
+    async def handler(reader, writer):
+        await serve_client(reader, writer, config, stats)
+    return await asyncio.start_server(handler, host, port, backlog=backlog)
@@ -0,0 +1,161 @@
+"""왕복 시간(RTT) 로그 구간 히스토그램
+
+값(us)을 2의 거듭제곱 구간마다 SUB개씩 나눈 고정 크기 배열에 센다.
+구간 폭이 값에 비례하므로 어느 크기에서나 상대 오차가 1/SUB 이하이고,
+기록할 때 메모리 할당이 없다. TransitHistogram은 같은 배열에 한쪽 방향
+지연(보낸 시각 -> 받은 시각)을 센다.
+"""
+import array
+
+SUB_BITS = 3
+SUB = 1 << SUB_BITS  # 2의 거듭제곱 구간당 나누는 칸 수 (상대 오차 12.5% 이하)
+
+_LO_BITS = 20
+_LO_LIMIT = 1 << _LO_BITS
+
+
+def bucket_index(value):
+    """값이 들어갈 칸 번호"""
+    if value < SUB:
+        return value
+    shift = 0
+    while value >= SUB << 1:
+        value >>= 1
+        shift += 1
+    return ((shift + 1) << SUB_BITS) + value - SUB
+
+
+def bucket_upper(index):
+    """칸에 들어가는 가장 큰 값"""
+    if index < SUB:
+        return index
+    shift = (index >> SUB_BITS) - 1
+    return (((index & (SUB - 1)) + SUB + 1) << shift) - 1
+
+
+class Histogram:
+    """RTT(us) 분포와 손실 횟수 집계
+
+    max_value보다 큰 값은 마지막 칸에 모이며 최댓값은 따로 정확히 기록한다.
+    """
+
+    def __init__(self, max_value=60000000):
+        self.size = bucket_index(max_value) + 1
+        self.counts = array.array('L', [0] * self.size)
+        self.reset()
+
+    def reset(self):
+        """집계 초기화"""
+        for i in range(self.size):
+            self.counts[i] = 0
+        self.count = 0
+        self.total_hi = 0  # 합계 상위 부분 (2^20 단위, 작은 정수 범위에서 누적해 할당 없음)
+        self.total_lo = 0  # 합계 하위 20비트
+        self.min = -1
+        self.max = -1
+        self.lost = 0
+
+    def record(self, value):
+        """RTT 하나 기록"""
+        if value < 0:
+            value = 0
+        index = bucket_index(value)
+        if index >= self.size:
+            index = self.size - 1
+        self.counts[index] += 1
+        self.count += 1
+        self.total_lo += value
+        if self.total_lo >= _LO_LIMIT:
+            self.total_hi += self.total_lo >> _LO_BITS
+            self.total_lo &= _LO_LIMIT - 1
+        if self.min < 0 or value < self.min:
+            self.min = value
+        if value > self.max:
+            self.max = value
+
+    def lose(self, count=1):
+        """응답을 받지 못한 요청 기록"""
+        self.lost += count
+
+    def percentile(self, percent):
+        """백분위 값 (해당 칸의 상한, 기록이 없으면 -1)"""
+        if self.count == 0:
+            return -1
+        rank = (self.count * percent + 99) // 100  # 올림
+        if rank < 1:
+            rank = 1
+        seen = 0
+        for i in range(self.size):
+            seen += self.counts[i]
+            if seen >= rank:
+                value = bucket_upper(i)
+                if value > self.max:
+                    return self.max
+                if value < self.min:
+                    return self.min
+                return value
+        return self.max
+
+    def average(self):
+        """평균 (기록이 없으면 -1)"""
+        if self.count == 0:
+            return -1
+        return ((self.total_hi << _LO_BITS) + self.total_lo) // self.count
+
+    def loss_rate(self):
+        """손실률 (%)"""
+        sent = self.count + self.lost
+        if sent == 0:
+            return 0
+        return self.lost * 100 / sent
+
+    def stats(self):
+        """(횟수, 최소, 평균, p50, p99, 최대, 손실) 반환 (단위: us)"""
+        return (self.count, self.min, self.average(), self.percentile(50),
+                self.percentile(99), self.max, self.lost)
+
+    def format(self):
+        """한 줄 요약 문자열 (단위: ms)"""
+        count, low, avg, p50, p99, high, lost = self.stats()
+        if count == 0:
+            return f"RTT 기록 없음 | 손실 {lost}건"
+        return (f"RTT {count}건 | 최소 {low / 1000:.1f}ms | 평균 {avg / 1000:.1f}ms | "
+                f"p50 {p50 / 1000:.1f}ms | p99 {p99 / 1000:.1f}ms | 최대 {high / 1000:.1f}ms | "
+                f"손실 {lost}건 ({self.loss_rate():.1f}%)")
+
+
+class TransitHistogram(Histogram):
+    """한쪽 방향 지연 분포 (보낸 쪽 시각은 ms 하위 16비트)
+
+    두 보드의 시계는 맞춰져 있지 않으므로 지금까지 가장 빨리 도착한 값을
+    지연 0으로 보고 그보다 늦은 만큼을 기록한다. 연결 간격 대기와 재전송처럼
+    값마다 달라지는 지연이 나타나고, 모든 값에 같은 고정 지연은 빠진다.
+    더 빨리 도착한 값이 나오면 그 뒤부터 새 기준으로 기록한다.
+    """
+
+    def __init__(self, max_value=60000000):
+        super().__init__(max_value)
+        self.rebase()
+
+    def rebase(self):
+        """기준을 버림 (새 연결: 트랜스미터 시계가 바뀌었을 수 있음)"""
+        self._base = -1  # 가장 빠른 도착의 (받은 시각 - 보낸 시각) & 0xFFFF
+
+    def arrive(self, stamp, now):
+        """보낸 시각 stamp(ms 하위 16비트)의 값을 now(ms)에 받음"""
+        offset = (now - stamp) & 0xFFFF
+        if self._base < 0:
+            self._base = offset
+        late = (offset - self._base) & 0xFFFF
+        if late >= 0x8000:  # 기준보다 빨리 옴: 기준을 앞당김
+            self._base = offset
+            late = 0
+        self.record(late * 1000)
+
+    def format(self):
+        """한 줄 요약 문자열 (단위: ms)"""
+        count, low, avg, p50, p99, high, lost = self.stats()
+        if count == 0:
+            return "지연 기록 없음"
+        return (f"지연(최소 대비) {count}건 | 평균 {avg / 1000:.1f}ms | p50 {p50 / 1000:.1f}ms | "
+                f"p99 {p99 / 1000:.1f}ms | 최대 {high / 1000:.1f}ms")
@@ -0,0 +1,40 @@
+"""ADC 값(0~4095) -> PWM duty_u16(0~65535) 변환표
+
+시작할 때 한 번 계산해 두고 샘플마다 표에서 읽기만 하므로 수신 경로에 부동소수점
+연산이 없다. 눈은 밝기를 로그에 가깝게 느끼므로 gamma/cie 곡선은 낮은 밝기의
+듀티를 잘게 나눠 어두운 쪽 조절을 부드럽게 한다.
+
+- linear: 듀티가 ADC 값에 비례 (기존 동작)
+- gamma: 듀티 = x^2.2
+- cie: CIE 1931 명도(L*)가 ADC 값에 비례
+"""
+import array
+
+ADC_MAX = 4095
+DUTY_MAX = 65535
+CURVES = ("linear", "gamma", "cie")
+
+
+def _cie(x):
+    """명도(0~1) -> 상대 휘도(0~1)"""
+    lightness = x * 100
+    if lightness <= 8:
+        return lightness / 903.3
+    return ((lightness + 16) / 116) ** 3
+
+
+def build(curve="gamma", gamma=2.2):
+    """곡선 이름으로 4096칸 변환표(array('H')) 생성 (8KB)"""
+    if curve not in CURVES:
+        raise ValueError(f"알 수 없는 곡선: {curve} (선택: {', '.join(CURVES)})")
+    table = array.array('H', bytes(2 * (ADC_MAX + 1)))
+    for i in range(ADC_MAX + 1):
+        x = i / ADC_MAX
+        if curve == "linear":
+            y = x
+        elif curve == "gamma":
+            y = x ** gamma
+        else:
+            y = _cie(x)
+        table[i] = int(y * DUTY_MAX + 0.5)
+    return table
@@ -0,0 +1,256 @@
+"""led_control 전송 형식 (트랜스미터 -> 리시버)
+
+모든 값은 2바이트 리틀 엔디언 워드이다.
+
+- 단일 값: ADC 값 하나 (0~4095, 최상위 비트 0). 기존 형식 (Arduino 트랜스미터)
+- 시각 값: [0x9000 | 순번][샘플 시각][값]
+  순번은 12비트(0x0FFF에서 0으로 감김), 샘플 시각은 트랜스미터 ticks_ms의
+  하위 16비트이다.
+- 묶음 패킷: [0x8000 | 샘플 수][첫 샘플 인덱스][샘플링 주파수(Hz)][첫 샘플 시각][샘플 ...]
+  샘플 수는 최대 MAX_BATCH개, 인덱스는 트랜스미터가 샘플링을 시작한 뒤의
+  샘플 번호(0xFFFF에서 0으로 감김)이다. k번째 샘플의 시각은
+  첫 샘플 시각 + k * 1000 / 주파수(ms)이다.
+
+ADC 값은 12비트이므로 최상위 비트로 단일 값과 헤더를 구분하고, 0xA000 이상은
+다른 패킷 종류를 위해 남겨 둔다. 리시버는 시각과 순번으로 네트워크 지터와
+노브 움직임을 구분한다 (lib/playout.py).
+"""
+import errno
+import socket
+
+# MicroPython 포트에 따라 recv_into()가 없으면 스트림의 readinto()를 사용
+_HAS_RECV_INTO = hasattr(socket.socket, "recv_into")
+
+BATCH = 0x8000          # 묶음 패킷 헤더 (하위 12비트: 샘플 수)
+STAMPED = 0x9000        # 시각 값 헤더 (하위 12비트: 순번)
+TYPE_MASK = 0xF000
+COUNT_MASK = 0x0FFF
+MAX_BATCH = COUNT_MASK
+SEQ_MASK = 0x0FFF
+INDEX_MASK = 0xFFFF
+TIME_MASK = 0xFFFF
+HEADER_SIZE = 8         # 헤더 + 첫 샘플 인덱스 + 주파수 + 첫 샘플 시각
+STAMPED_SIZE = 6        # 헤더 + 시각 + 값
+
+
+def batch_capacity(payload_size):
+    """패킷 크기(바이트)에 들어가는 최대 샘플 수 (예: BLE 기본 MTU의 알림 20바이트 -> 6개)"""
+    return min(MAX_BATCH, (payload_size - HEADER_SIZE) // 2)
+
+
+class BatchWriter:
+    """묶음 패킷을 미리 할당한 버퍼에 조립 (전송마다 새 객체를 만들지 않음)"""
+
+    def __init__(self, max_samples):
+        if not 0 < max_samples <= MAX_BATCH:
+            raise ValueError("max_samples")
+        self.capacity = max_samples     # 할당한 샘플 수
+        self.max_samples = max_samples  # 패킷당 샘플 수 (set_payload()로 줄일 수 있음)
+        self.buf = bytearray(HEADER_SIZE + 2 * max_samples)
+        mv = memoryview(self.buf)
+        self._views = [mv[:HEADER_SIZE + 2 * n] for n in range(max_samples + 1)]  # 샘플 수별 전송 구간
+        self.count = 0
+
+    def set_payload(self, payload_size):
+        """패킷 크기(바이트)에 맞춰 패킷당 샘플 수 변경 (할당한 샘플 수까지, 예: BLE MTU 교환 후)"""
+        self.max_samples = max(1, min(self.capacity, batch_capacity(payload_size)))
+        return self.max_samples
+
+    def begin(self, index, rate, stamp):
+        """새 패킷 시작 (index: 첫 샘플 인덱스, rate: 샘플링 주파수 Hz, stamp: 첫 샘플 시각 ms)"""
+        buf = self.buf
+        buf[2] = index & 0xFF
+        buf[3] = (index >> 8) & 0xFF
+        buf[4] = rate & 0xFF
+        buf[5] = (rate >> 8) & 0xFF
+        buf[6] = stamp & 0xFF
+        buf[7] = (stamp >> 8) & 0xFF
+        self.count = 0
+
+    def add(self, value):
+        """샘플 추가, 패킷이 가득 차면 True"""
+        pos = HEADER_SIZE + 2 * self.count
+        self.buf[pos] = value & 0xFF
+        self.buf[pos + 1] = (value >> 8) & 0x0F
+        self.count += 1
+        return self.count >= self.max_samples
+
+    def finish(self):
+        """헤더를 채우고 전송할 부분(memoryview) 반환"""
+        header = BATCH | self.count
+        self.buf[0] = header & 0xFF
+        self.buf[1] = header >> 8
+        return self._views[self.count]
+
+
+class StampedWriter:
+    """시각 값 패킷을 미리 할당한 버퍼에 조립 (순번은 보낼 때마다 증가)"""
+
+    def __init__(self):
+        self.buf = bytearray(STAMPED_SIZE)
+        self.seq = 0  # 다음 순번
+
+    def reset(self):
+        """순번을 처음부터 (새 연결)"""
+        self.seq = 0
+
+    def pack(self, stamp, value, resend=False):
+        """값 하나를 조립해서 버퍼 반환 (stamp: 샘플 시각 ms)
+
+        resend: 직전 순번을 다시 씀 (보내지 못한 직전 패킷을 새 값으로 바꿀 때)
+        """
+        buf = self.buf
+        if resend:
+            self.seq = (self.seq - 1) & SEQ_MASK
+        header = STAMPED | self.seq
+        self.seq = (self.seq + 1) & SEQ_MASK
+        buf[0] = header & 0xFF
+        buf[1] = header >> 8
+        buf[2] = stamp & 0xFF
+        buf[3] = (stamp >> 8) & 0xFF
+        buf[4] = value & 0xFF
+        buf[5] = (value >> 8) & 0x0F
+        return buf
+
+
+class SeqTracker:
+    """순번(하위 12비트)의 빈틈과 역순 도착 집계
+
+    묶음 샘플의 인덱스도 하위 12비트로 비교한다. 빈틈이 뒤늦게 채워지면
+    lost에서 빼고 reordered로 센다.
+    """
+
+    def __init__(self):
+        self.reset()
+        self.reset_stats()
+
+    def reset(self):
+        """순번을 처음부터 (새 연결)"""
+        self.expected = -1  # 다음에 올 순번 (-1: 아직 모름)
+
+    def update(self, seq):
+        """받은 순번 기록, 이미 지나간 순번이면 False"""
+        seq &= SEQ_MASK
+        expected = self.expected
+        if expected >= 0 and seq != expected:
+            gap = (seq - expected) & SEQ_MASK
+            if gap >= (SEQ_MASK + 1) // 2:
+                self.reordered += 1
+                if self.lost:
+                    self.lost -= 1
+                return False
+            self.lost += gap
+        self.expected = (seq + 1) & SEQ_MASK
+        return True
+
+    def reset_stats(self):
+        """통계 구간 시작"""
+        self.lost = 0       # 빠진 순번 수
+        self.reordered = 0  # 늦게 도착한 순번 수
+
+
+class Decoder:
+    """받은 바이트에서 값을 꺼내 on_sample(value, seq, stamp) 호출
+
+    TCP처럼 패킷 경계가 없는 스트림을 위해 워드 중간에서 끊긴 바이트와 패킷의
+    진행 상태를 유지한다. seq는 시각 값의 순번 또는 묶음 샘플의 인덱스, stamp는
+    샘플 시각(ms 하위 16비트)이고 기존 단일 값은 둘 다 -1이다. 마지막 묶음의
+    첫 샘플 인덱스, 샘플 수, 주파수는 first, size, rate에 남고, on_sample() 안에서
+    batch_start는 방금 읽은 묶음의 첫 샘플일 때만 True이다.
+    recv_into()는 미리 할당한 buffer_size 바이트 버퍼로 소켓에서 받는다.
+    """
+
+    def __init__(self, on_sample, buffer_size=256):
+        self.on_sample = on_sample
+        self.buf = bytearray(buffer_size)
+        self.first = -1
+        self.size = 0
+        self.rate = 0
+        self.batch_start = False  # on_sample()에 넘긴 값이 묶음의 첫 샘플인지
+        self.values = 0    # 꺼낸 값 수
+        self.batches = 0   # 받은 묶음 패킷 수
+        self.errors = 0    # 알 수 없는 헤더 수
+        self.reset()
+
+    def reset(self):
+        """스트림 처음부터 다시 (새 연결)"""
+        self._low = -1     # 짝이 없는 하위 바이트 (-1: 없음)
+        self._header = 0   # 남은 묶음 헤더 워드 수 (인덱스, 주파수, 시각)
+        self._stamped = 0  # 남은 시각 값 워드 수 (시각, 값)
+        self._samples = 0  # 묶음에서 남은 샘플 수
+        self._index = -1   # 다음 샘플의 인덱스 또는 시각 값의 순번
+        self._stamp = -1   # 첫 샘플 시각 또는 시각 값의 시각
+        self._offset = 0   # 첫 샘플부터 지난 시간 (ms * 주파수)
+
+    def feed(self, data, length=-1):
+        """받은 바이트 처리 (length: data 앞부분만 처리할 때 바이트 수)"""
+        if length < 0:
+            length = len(data)
+        i = 0
+        if self._low >= 0 and length:
+            # 이전 수신에서 끊긴 워드의 상위 바이트
+            word = self._low | (data[0] << 8)
+            self._low = -1
+            self._word(word)
+            i = 1
+        while i + 1 < length:
+            self._word(data[i] | (data[i + 1] << 8))
+            i += 2
+        if i < length:
+            self._low = data[i]
+
+    def recv_into(self, sock):
+        """소켓에서 읽을 수 있는 만큼 받아서 처리, 받은 바이트 수 반환 (0: 연결 종료)
+
+        버퍼를 가득 채웠으면 더 남아 있을 수 있으므로 다시 호출한다. 읽을
+        데이터가 없으면 recv()와 같이 EAGAIN OSError를 낸다.
+        """
+        if _HAS_RECV_INTO:
+            count = sock.recv_into(self.buf)
+        else:
+            count = sock.readinto(self.buf)
+            if count is None:  # 논블로킹 스트림: 읽을 데이터 없음
+                raise OSError(errno.EAGAIN)
+        self.feed(self.buf, count)
+        return count
+
+    def _word(self, word):
+        if self._header == 3:
+            self.first = word
+            self._index = word
+            self._header = 2
+        elif self._header == 2:
+            self.rate = word or 1
+            self._header = 1
+        elif self._header == 1:
+            self._stamp = word
+            self._offset = 0
+            self._header = 0
+        elif self._samples:
+            self.batch_start = self._samples == self.size
+            self._samples -= 1
+            self.values += 1
+            self.on_sample(word, self._index, (self._stamp + self._offset // self.rate) & TIME_MASK)
+            self._index = (self._index + 1) & INDEX_MASK
+            self._offset += 1000
+        elif self._stamped == 2:
+            self._stamp = word
+            self._stamped = 1
+        elif self._stamped == 1:
+            self._stamped = 0
+            self.values += 1
+            self.batch_start = False
+            self.on_sample(word, self._index, self._stamp)
+        elif word & TYPE_MASK == BATCH:
+            self.size = self._samples = word & COUNT_MASK
+            self._header = 3
+            self.batches += 1
+        elif word & TYPE_MASK == STAMPED:
+            self._index = word & SEQ_MASK
+            self._stamped = 2
+        elif word & 0x8000:
+            self.errors += 1  # 지원하지 않는 패킷 종류
+        else:
+            self.values += 1
+            self.batch_start = False
+            self.on_sample(word, -1, -1)
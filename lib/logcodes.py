@@ -0,0 +1,64 @@
+"""rlog 메시지 코드
+
+각 코드 옆의 주석이 host/rlog_decode.py가 복원하는 메시지이다 (f-문자열 형식).
+a, b, c는 정수 인자, s는 바이트 인자를 UTF-8로 디코딩한 문자열, raw는 바이트
+인자 그대로, uuid(raw)는 128비트 UUID 문자열이다. 주석은 컴파일할 때 제거되므로
+메시지 문자열은 보드 메모리를 차지하지 않는다. 코드는 0~255, 한 번 정한 번호는
+바꾸지 않는다 (이전 기록을 디코딩할 수 있도록).
+"""
+
+# 공통 (0~9)
+DROPPED = 0                 # [로그] 버퍼가 가득 차서 기록 {a}개 유실
+IRQ_ERROR = 1               # 이벤트 처리 중 오류 발생: {s}
+
+# hello <-> world (10~29)
+HELLO_SEND = 10             # [반복:{a} | 진행:1/4] 전송할 메시지 : {s}
+HELLO_RECV = 11             # [반복:{a} | 진행:2/4] 수신한 메시지 : {s}
+HELLO_REPLY = 12            # [반복:{a} | 진행:3/4] 응답할 메시지 : {s} world
+HELLO_REPLY_RECV = 13       # [반복:{a} | 진행:4/4] 수신한 메시지 : {s}
+HELLO_UNMATCHED = 14        # 대응하는 요청이 없는 응답 (시퀀스:{a}) : {s}
+HELLO_SEND_FAIL = 15        # 메시지 전송 실패: {s}
+HELLO_REPLY_FAIL = 16       # 응답 전송 실패: {s}
+HELLO_RECV_FAIL = 17        # 메시지 수신 실패: {s}
+HELLO_TIMEOUT = 18          # 응답 타임아웃: {a}건 (누적 {b}건)
+
+# BLE 연결 (30~59)
+BLE_CLIENT_CONNECT = 30     # 클라이언트 연결됨: {raw.hex()}
+BLE_CLIENT_DISCONNECT = 31  # 클라이언트 연결 해제
+BLE_TX_FOUND = 32           # 트랜스미터 발견! RSSI: {a}
+BLE_SCAN_DONE_BUSY = 33     # 스캔 완료 (연결 진행 중)
+BLE_SCAN_DONE_MISS = 34     # 스캔 완료, 트랜스미터를 찾지 못함
+BLE_TX_CONNECT = 35         # 트랜스미터 연결됨: {raw.hex()}
+BLE_TX_DISCONNECT = 36      # 트랜스미터 연결 해제
+BLE_SERVICE_FOUND = 37      # 서비스 발견!
+BLE_CHAR_FOUND = 38         # 특성 발견!
+BLE_SERVER_CONNECT = 39     # 서버 연결됨: {raw.hex()}
+BLE_SERVER_DISCONNECT = 40  # 서버 연결 해제
+BLE_SERVICE_UUID = 41       # 서비스 발견: UUID('{uuid(raw)}')
+BLE_CHAR_UUID = 42          # 특성 발견: UUID('{uuid(raw)}')
+BLE_NOTIFY_ON = 43          # 알림 활성화됨
+BLE_CONNECTING = 44         # 트랜스미터 연결 시도 중...
+BLE_CONNECT_FAIL = 45       # 연결 시도 실패: {s}
+BLE_OTHER_DEVICE = 46       # 다른 장치 발견: {raw.hex()} (RSSI: {a})
+BLE_PARSE_FAIL = 47         # 데이터 파싱 오류: {s}
+BLE_DATA_RECV = 48          # 데이터 수신됨: {raw}
+BLE_SCAN_STOP = 49          # 스캔 중지...
+BLE_SCAN_STOP_FAIL = 50     # 스캔 중지 실패: {s}
+BLE_MTU_EXCHANGED = 51      # MTU 교환 완료: {a} (알림 최대 {a - 3}바이트)
+BLE_MTU_FAIL = 52           # MTU 교환 요청 실패: {s}
+BLE_CONN_UPDATE = 53        # 연결 파라미터 변경: 간격 {a * 1.25:.2f}ms, 슬레이브 지연 {b}, 감시 시간 {c * 10}ms
+BLE_READY = 54              # 알림 구독 완료: 연결 후 {a}ms ({'캐시한 핸들' if b else '서비스 검색'})
+BLE_CACHE_STALE = 55        # 캐시한 핸들로 구독 실패 (상태 {a}), 서비스 검색
+BLE_SUBSCRIBE_FAIL = 56     # 알림 구독 실패 (상태 {a})
+BLE_DISCOVERED = 57         # 트랜스미터 발견: {raw.hex()} (스캔 시작 후 {a}ms, RSSI: {b})
+BLE_SCAN_NAME = 58          # 스캔 응답: 이름 {s}
+
+# LED 밝기 제어 (60~89)
+LED_SEND = 60               # [반복:{a}] 전송: ADC={b:4d} (전압: {b / 4095 * 3.3:.2f}V)
+LED_RECV = 61               # [반복:{a}] 수신: ADC={b:4d} (전압: {b / 4095 * 3.3:.2f}V)
+LED_PWM = 62                # PWM 값 설정: {a} (8비트 듀티, 이전 기록용)
+LED_SEND_FAIL = 63          # 값 전송 실패: {s}
+LED_DATA_FAIL = 64          # 데이터 처리 실패: {s}
+LED_BATCH_SEND = 65         # [반복:{a}] 묶음 전송: 샘플 {b}개 (첫 인덱스 {c})
+LED_BATCH_RECV = 66         # [반복:{a}] 묶음 수신: 샘플 {b}개 (첫 인덱스 {c})
+LED_DUTY = 67               # PWM 듀티 설정: {a} ({a / 655.35:.1f}%)
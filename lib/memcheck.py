@@ -0,0 +1,43 @@
+"""메시지 처리 경로의 힙 할당량 측정
+
+메시지 N개를 처리하는 동안 gc.mem_alloc()이 얼마나 늘었는지 확인한다.
+할당 없는 수신/응답 경로라면 정상 상태에서 0이어야 한다. 측정 결과나 통계를
+출력하는 데 쓰인 할당은 rebase()로 제외한다.
+"""
+import gc
+
+
+class AllocMeter:
+    """메시지 every개마다 힙 할당 증가량(바이트) 측정"""
+
+    def __init__(self, every=1000):
+        self.every = every
+        self.count = 0
+        self.last = 0    # 마지막 측정값 (음수: 측정 중 GC 실행)
+        self.checks = 0
+        self.clean = 0   # 할당이 0이었던 측정 횟수
+        self.mark = gc.mem_alloc()
+
+    def rebase(self):
+        """기준점 재설정 (진단 출력 직후 호출해 출력에 쓰인 할당 제외)"""
+        self.mark = gc.mem_alloc()
+
+    def tick(self):
+        """메시지 하나 처리 후 호출, every개마다 True 반환 (결과는 last)"""
+        self.count += 1
+        if self.count < self.every:
+            return False
+        self.count = 0
+        self.last = gc.mem_alloc() - self.mark
+        self.checks += 1
+        if self.last == 0:
+            self.clean += 1
+        return True
+
+    def format(self):
+        """측정 결과 한 줄 요약"""
+        if self.last < 0:
+            result = "GC 실행됨 (할당 발생)"
+        else:
+            result = f"{self.last}바이트"
+        return f"[메모리] 메시지 {self.every}개 동안 할당: {result} | 할당 0인 구간 {self.clean}/{self.checks}"
@@ -0,0 +1,163 @@
+"""BLE 알림 전송 대기열 (전송 버퍼가 가득 차면 보관했다가 다시 전송)
+
+gatts_notify()는 BLE 스택의 전송 버퍼가 가득 차면 ENOMEM OSError를 낸다.
+NotifyQueue.send()는 대기열이 비어 있으면 바로 보내고, ENOMEM이면 미리 할당한
+슬롯에 복사해 두었다가 메인 루프의 flush()에서 순서대로 다시 보낸다. 대기열이
+가득 차면 policy에 따라 버린다.
+
+- DROP_OLDEST: 가장 오래된 알림을 버리고 새 알림을 넣음 (지연이 늘지 않음)
+- DROP_NEWEST: 새 알림을 버림 (이미 쌓인 순서 유지)
+- COALESCE: key가 같은 알림이 대기 중이면 그 자리의 내용을 새 알림으로 바꿈
+  (LED 값처럼 마지막 값만 의미 있는 경우), 같은 key가 없고 가득 차면 DROP_OLDEST.
+  바뀐 알림은 보내지지 않으므로, 알림에 순번이 있으면 will_coalesce()로 미리
+  확인해서 같은 순번을 다시 쓴다 (수신 측이 손실로 세지 않도록).
+
+연결마다 bind()로 연결/특성 핸들을 정하고, 연결이 끊기면 clear()로 비운다.
+send()/flush()는 한 곳(메인 루프)에서만 호출한다.
+"""
+import errno
+
+DROP_OLDEST = 0
+DROP_NEWEST = 1
+COALESCE = 2
+
+
+class NotifyQueue:
+    """알림 전송 대기열 (size: 슬롯 수, 2의 거듭제곱, slot_size: 알림 최대 크기)"""
+
+    def __init__(self, ble, size=8, slot_size=20, policy=DROP_OLDEST):
+        self.ble = ble
+        self.size = size
+        self.slot_size = slot_size
+        self.policy = policy
+        self.buf = bytearray(size * slot_size)
+        mv = memoryview(self.buf)
+        self.slots = [mv[i * slot_size:(i + 1) * slot_size] for i in range(size)]
+        self._views = [{} for _ in range(size)]  # 슬롯별 길이별 전송 구간 (한 번만 만들어 재사용)
+        self.lengths = [0] * size
+        self.keys = [None] * size
+        self.head = 0  # 다음에 넣을 위치
+        self.tail = 0  # 다음에 보낼 위치
+        self.conn_handle = None
+        self.value_handle = None
+        self.reset_stats()
+
+    def reset_stats(self):
+        """통계 구간 시작"""
+        self.sent = 0        # 보낸 알림 수 (바로 보낸 것 포함)
+        self.queued = 0      # ENOMEM으로 대기열에 넣은 알림 수
+        self.retries = 0     # flush()에서 다시 ENOMEM을 받은 횟수
+        self.dropped = 0     # 대기열이 가득 차서 버린 알림 수
+        self.coalesced = 0   # 같은 key의 대기 알림을 새 값으로 바꾼 횟수
+        self.max_depth = 0   # 대기열에 쌓인 최대 알림 수
+
+    def bind(self, conn_handle, value_handle):
+        """새 연결의 알림 대상 지정 (남은 알림은 버림)"""
+        self.clear()
+        self.conn_handle = conn_handle
+        self.value_handle = value_handle
+
+    def clear(self):
+        """대기 중인 알림을 모두 버림 (연결 해제 시)"""
+        self.head = 0
+        self.tail = 0
+        self.conn_handle = None
+
+    def pending(self):
+        """대기 중인 알림 수"""
+        return (self.head - self.tail) & 0xFFFF
+
+    def send(self, data, key=None):
+        """알림 전송, 버퍼가 가득 차면 대기열에 보관 (보냈거나 보관하면 True, 버리면 False)
+
+        ENOMEM 외의 오류(연결 끊김 등)는 그대로 낸다.
+        """
+        if self.conn_handle is None:
+            return False
+        if self.head == self.tail:
+            if self._notify(data):
+                return True
+        else:
+            slot = self._find(key)
+            if slot >= 0:
+                self._store(slot, data, key)
+                self.coalesced += 1
+                self.flush()
+                return True
+        depth = self.pending()
+        if depth >= self.size:
+            if self.policy == DROP_NEWEST:
+                self.dropped += 1
+                return False
+            self.tail = (self.tail + 1) & 0xFFFF  # 가장 오래된 알림 버림
+            self.dropped += 1
+            depth -= 1
+        self._store(self.head & (self.size - 1), data, key)
+        self.head = (self.head + 1) & 0xFFFF
+        self.queued += 1
+        if depth + 1 > self.max_depth:
+            self.max_depth = depth + 1
+        self.flush()
+        return True
+
+    def will_coalesce(self, key):
+        """지금 send(data, key)를 부르면 대기 중인 같은 key의 알림을 바꿀지 여부"""
+        return self._find(key) >= 0
+
+    def _find(self, key):
+        """COALESCE에서 같은 key로 대기 중인 슬롯 (없으면 -1)"""
+        if self.policy != COALESCE or key is None or self.conn_handle is None:
+            return -1
+        i = self.tail
+        while i != self.head:
+            slot = i & (self.size - 1)
+            if self.keys[slot] == key:
+                return slot
+            i = (i + 1) & 0xFFFF
+        return -1
+
+    def flush(self):
+        """대기 중인 알림을 순서대로 전송 (메인 루프에서 호출), 다시 ENOMEM이면 다음 호출로 미룸"""
+        while self.tail != self.head and self.conn_handle is not None:
+            slot = self.tail & (self.size - 1)
+            length = self.lengths[slot]
+            view = self._views[slot].get(length)
+            if view is None:
+                view = self.slots[slot][:length]
+                self._views[slot][length] = view
+            try:
+                if not self._notify(view):
+                    self.retries += 1
+                    return
+            except OSError:
+                self.tail = (self.tail + 1) & 0xFFFF  # 보낼 수 없는 알림은 버리고 오류를 알림
+                self.dropped += 1
+                raise
+            self.tail = (self.tail + 1) & 0xFFFF
+
+    def _notify(self, data):
+        """gatts_notify() 한 번 (버퍼가 가득 차면 False)"""
+        try:
+            self.ble.gatts_notify(self.conn_handle, self.value_handle, data)
+        except OSError as e:
+            if e.args[0] != errno.ENOMEM:
+                raise
+            return False
+        self.sent += 1
+        return True
+
+    def _store(self, slot, data, key):
+        """알림을 슬롯에 복사 (슬라이스를 만들지 않고 바이트 단위로)"""
+        length = len(data)
+        if length > self.slot_size:
+            raise ValueError(f"알림 크기 초과: {length}")
+        buf = self.slots[slot]
+        for i in range(length):
+            buf[i] = data[i]
+        self.lengths[slot] = length
+        self.keys[slot] = key
+
+    def format(self):
+        """한 줄 요약 문자열"""
+        return (f"알림 대기열 최대 {self.max_depth}/{self.size} | 보관 {self.queued}, 재시도 {self.retries}"
+                f" | 버림 {self.dropped}, 합침 {self.coalesced}")
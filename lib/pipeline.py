@@ -0,0 +1,108 @@
+import array
+from ticks import ticks_ms, ticks_us, ticks_diff
+
+# 요청/응답 페이로드 앞에 붙는 시퀀스 태그: [시퀀스(2바이트, big endian)]
+TAG_SIZE = 2
+SEQ_MASK = 0xFFFF
+
+
+def read_tag(payload, offset=0):
+    """페이로드 앞(offset 위치)의 시퀀스 번호 추출"""
+    return (payload[offset] << 8) | payload[offset + 1]
+
+
+def make_tag(seq):
+    """시퀀스 번호를 2바이트 태그로 변환"""
+    return bytes(((seq >> 8) & 0xFF, seq & 0xFF))
+
+
+class RequestWindow:
+    """응답을 기다리는 요청을 최대 size개까지 추적하는 전송 윈도우
+
+    각 요청은 시퀀스 번호와 전송 시각을 가지며, 응답의 태그로 짝을 찾고
+    timeout_ms 안에 응답이 없으면 손실로 처리한다. hist(histogram.Histogram)를
+    주면 왕복 시간(us)과 손실을 함께 기록한다.
+    """
+
+    def __init__(self, size, timeout_ms, hist=None):
+        self.size = size
+        self.timeout_ms = timeout_ms
+        self.hist = hist
+        self.seqs = array.array('l', [-1] * size)     # 슬롯별 시퀀스 (-1: 빈 슬롯)
+        self.sent_at = array.array('l', [0] * size)   # 슬롯별 전송 시각 (ms)
+        self.sent_us = array.array('l', [0] * size)   # 슬롯별 전송 시각 (us, 왕복 시간 측정용)
+        self.in_flight = 0
+        self.sent = 0
+        self.completed = 0
+        self.timeouts = 0
+        self.unknown = 0  # 대응하는 요청이 없는 응답 (중복 또는 타임아웃 후 도착)
+
+    def reset(self):
+        """모든 대기 요청 제거 (연결 종료 시 호출, 대기 중이던 요청은 손실로 기록)"""
+        if self.hist is not None:
+            self.hist.lose(self.in_flight)
+        for i in range(self.size):
+            self.seqs[i] = -1
+        self.in_flight = 0
+
+    def can_send(self):
+        """새 요청을 보낼 수 있는지 확인"""
+        return self.in_flight < self.size
+
+    def add(self, seq, now=None):
+        """전송한 요청 등록"""
+        if now is None:
+            now = ticks_ms()
+        for i in range(self.size):
+            if self.seqs[i] < 0:
+                self.seqs[i] = seq & SEQ_MASK
+                self.sent_at[i] = now
+                self.sent_us[i] = ticks_us()
+                self.in_flight += 1
+                self.sent += 1
+                return True
+        return False
+
+    def complete(self, seq, now=None):
+        """응답 처리: 요청의 왕복 시간(ms) 반환, 대응 요청이 없으면 -1"""
+        if now is None:
+            now = ticks_ms()
+        for i in range(self.size):
+            if self.seqs[i] == seq:
+                self.seqs[i] = -1
+                self.in_flight -= 1
+                self.completed += 1
+                if self.hist is not None:
+                    self.hist.record(ticks_diff(ticks_us(), self.sent_us[i]))
+                return ticks_diff(now, self.sent_at[i])
+        self.unknown += 1
+        return -1
+
+    def next_timeout(self, now=None):
+        """가장 먼저 타임아웃될 요청까지 남은 시간(ms), 대기 요청이 없으면 -1"""
+        if now is None:
+            now = ticks_ms()
+        remaining = -1
+        for i in range(self.size):
+            if self.seqs[i] >= 0:
+                left = self.timeout_ms - ticks_diff(now, self.sent_at[i])
+                if left < 0:
+                    left = 0
+                if remaining < 0 or left < remaining:
+                    remaining = left
+        return remaining
+
+    def expire(self, now=None):
+        """타임아웃된 요청 제거 후 개수 반환"""
+        if now is None:
+            now = ticks_ms()
+        expired = 0
+        for i in range(self.size):
+            if self.seqs[i] >= 0 and ticks_diff(now, self.sent_at[i]) >= self.timeout_ms:
+                self.seqs[i] = -1
+                self.in_flight -= 1
+                expired += 1
+        self.timeouts += expired
+        if expired and self.hist is not None:
+            self.hist.lose(expired)
+        return expired
@@ -0,0 +1,138 @@
+"""고정 지연 재생 큐 (지터 버퍼)
+
+트랜스미터가 붙인 샘플 시각(ms 하위 16비트)을 리시버 시계로 옮긴 뒤 delay_ms만큼
+늦춰서 적용한다. 패킷이 고르지 않게 도착해도 샘플 간격 그대로 재생되므로
+출력이 고르고, 대신 delay_ms만큼 반응이 늦어진다.
+
+- 시계 맞춤: 지금까지 가장 빨리 도착한 패킷을 기준(전송 지연 0)으로 삼는다.
+  기준보다 빨리 온 패킷이 있으면 기준을 앞당기고, WINDOW개 동안 모든 패킷이
+  늦게 왔으면 그만큼 기준을 늦춘다 (경로 지연 변화, 시계 오차 보정).
+- late: 재생 시각이 이미 지나서 버린 샘플 (delay_ms를 늘리면 줄어듦)
+- overflow: 큐가 가득 차서 버린 가장 오래된 샘플
+
+순번의 손실/역순 도착은 리시버가 ledproto.SeqTracker로 센다.
+
+큐는 미리 할당한 배열을 재생 시각 순으로 유지한다.
+"""
+import array
+from ticks import ticks_ms, ticks_diff, ticks_add
+
+WINDOW = 64  # 기준을 늦출지 판단할 샘플 수
+
+
+def _diff16(a, b):
+    """16비트 시각 차이 a - b (-32768~32767)"""
+    diff = (a - b) & 0xFFFF
+    return diff - 0x10000 if diff >= 0x8000 else diff
+
+
+class Playout:
+    """push()로 넣은 값을 샘플 시각 + delay_ms에 pop()으로 꺼냄"""
+
+    def __init__(self, delay_ms, size=64):
+        self.delay_ms = delay_ms
+        self.size = size
+        self.due = array.array('i', bytes(4 * size))   # 재생 시각 (ticks_ms)
+        self.value = array.array('H', bytes(2 * size))
+        self.count = 0
+        self.reset()
+        self.reset_stats()
+
+    def reset(self):
+        """큐와 시계 기준을 비움 (새 연결)"""
+        self.count = 0
+        self._base_ts = -1     # 기준 샘플 시각 (트랜스미터, 16비트)
+        self._base_local = 0   # 기준 샘플의 리시버 시각 (전송 지연 0으로 가정)
+        self._min_late = -1    # 이번 창에서 가장 작은 전송 지연 (ms)
+        self._pushes = 0
+
+    def push(self, value, stamp, now=None):
+        """샘플 하나 넣기 (stamp: 샘플 시각 ms, now: 받은 시각), 늦어서 버렸으면 False"""
+        if now is None:
+            now = ticks_ms()
+
+        if self._base_ts < 0:
+            self._base_ts = stamp
+            self._base_local = now
+        local = ticks_add(self._base_local, _diff16(stamp, self._base_ts))
+        transit = ticks_diff(now, local)
+        if transit < 0:
+            local = now  # 기준보다 빨리 옴: 기준을 앞당김
+            transit = 0
+        # 16비트 시각 차이가 감기지 않도록 기준을 최근 샘플로 옮김
+        self._base_ts = stamp
+        self._base_local = local
+
+        if self._min_late < 0 or transit < self._min_late:
+            self._min_late = transit
+        self._pushes += 1
+        if self._pushes >= WINDOW:
+            # 창 내내 늦게 왔으면 기준을 늦춤 (이후 샘플부터 적용)
+            self._base_local = ticks_add(self._base_local, self._min_late)
+            self._min_late = -1
+            self._pushes = 0
+
+        due = ticks_add(local, self.delay_ms)
+        if ticks_diff(due, now) < 0:
+            self.late += 1
+            return False
+
+        # 재생 시각 순으로 삽입 (대부분 순서대로 오므로 뒤에서부터 찾음)
+        if self.count >= self.size:
+            self._remove(1)
+            self.overflow += 1
+        i = self.count
+        while i > 0 and ticks_diff(self.due[i - 1], due) > 0:
+            self.due[i] = self.due[i - 1]
+            self.value[i] = self.value[i - 1]
+            i -= 1
+        self.due[i] = due
+        self.value[i] = value
+        self.count += 1
+        self.pushed += 1
+        return True
+
+    def wait(self, now=None):
+        """다음 재생까지 남은 ms (0: 지금, -1: 큐 비어 있음)"""
+        if not self.count:
+            return -1
+        if now is None:
+            now = ticks_ms()
+        return max(0, ticks_diff(self.due[0], now))
+
+    def pop(self, now=None):
+        """재생 시각이 된 값 중 가장 최근 값 반환 (-1: 없음)"""
+        if not self.count:
+            return -1
+        if now is None:
+            now = ticks_ms()
+        n = 0
+        while n < self.count and ticks_diff(self.due[n], now) <= 0:
+            n += 1
+        if not n:
+            return -1
+        value = self.value[n - 1]
+        self.played += 1
+        self.skipped += n - 1
+        self._remove(n)
+        return value
+
+    def _remove(self, n):
+        count = self.count - n
+        for i in range(count):
+            self.due[i] = self.due[i + n]
+            self.value[i] = self.value[i + n]
+        self.count = count
+
+    def reset_stats(self):
+        """통계 구간 시작"""
+        self.pushed = 0     # 큐에 넣은 샘플 수
+        self.played = 0     # 적용한 값 수
+        self.skipped = 0    # 같은 순간에 재생 시각이 돼서 건너뛴 값 수
+        self.late = 0
+        self.overflow = 0
+
+    def format(self):
+        """한 줄 요약 문자열"""
+        return (f"재생 지연 {self.delay_ms}ms | 적용 {self.played} 건너뜀 {self.skipped} | "
+                f"늦음 {self.late} 넘침 {self.overflow}")
@@ -0,0 +1,196 @@
+"""링 버퍼 바이너리 로거
+
+print()는 메시지를 문자열로 만들고 115200bps UART로 다 보낼 때까지 기다리므로
+(한글 한 글자 3바이트, 50자 메시지면 약 5ms) 메시지 처리 속도를 제한하고 지연을
+들쭉날쭉하게 만든다. RingLog는 메시지 코드와 정수 인자만 고정 크기 RAM 링 버퍼에
+바이너리로 기록하고, 유휴 시간에 drain()으로 UART에 내보낸다. 메시지 문자열은
+보드에 없으며 host/rlog_decode.py가 lib/logcodes.py의 주석으로 복원한다.
+
+기록 형식 (리틀 엔디언):
+    코드(1) | 레벨 + 정수 인자 수 << 4 (1) | 바이트 인자 길이(1) | 순번(1) |
+    ticks_ms(4) | 정수 인자(4바이트씩, 최대 3개) | 바이트 인자 (최대 MAX_DATA)
+
+UART로는 기록 하나를 "~" + 16진수 한 줄로 내보낸다 (일반 print() 출력과 섞여도
+디코더가 구분한다). 기록과 출력 모두 메모리를 할당하지 않는다.
+"""
+import sys
+from ticks import ticks_ms
+
+# 로그 레벨 (level보다 낮은 기록은 버퍼에 넣지 않음)
+DEBUG = 0
+INFO = 1
+WARN = 2
+ERROR = 3
+
+HEADER_SIZE = 8
+MAX_INTS = 3
+MAX_DATA = 48  # 바이트 인자 최대 길이 (넘는 부분은 잘림)
+MAX_RECORD = HEADER_SIZE + 4 * MAX_INTS + MAX_DATA
+
+DROPPED = 0  # 버퍼가 가득 차서 버린 기록 수를 알리는 코드 (logcodes.DROPPED)
+
+_HEX = b"0123456789abcdef"
+
+if sys.implementation.name == "micropython":
+    _stdout = getattr(sys.stdout, "buffer", sys.stdout)
+
+    def _write(data):
+        _stdout.write(data)
+else:
+    def _write(data):
+        # 호스트(시뮬레이션)의 stdout은 텍스트 스트림
+        sys.stdout.write(str(data, "ascii"))
+
+
+class RingLog:
+    """고정 크기 링 버퍼 로거
+
+    버퍼가 가득 차면 새 기록을 버리고 dropped로 센다 (이미 기록된 순서는 유지).
+    BLE/타이머 콜백이 기록 중인 코드를 끼어들어 호출한 기록도 버리고 센다.
+    """
+
+    def __init__(self, size=2048, level=INFO):
+        size_pow2 = 64
+        while size_pow2 < size:
+            size_pow2 <<= 1
+        self.size = size_pow2
+        self.mask = size_pow2 - 1
+        self.buf = bytearray(size_pow2)
+        self.head = 0     # 다음 기록 위치
+        self.tail = 0     # 다음 출력 위치
+        self.used = 0     # 출력되지 않은 바이트 수
+        self.seq = 0      # 기록 순번 (0~255, 디코더가 UART 출력 유실 확인에 사용)
+        self.level = level
+        self.dropped = 0  # 아직 알리지 않은 버린 기록 수
+        self.written = 0  # 누적 기록 수
+        self.busy = False
+
+        # 출력 줄 버퍼 ("~" + 16진수 + 줄바꿈)와 길이별 memoryview 캐시
+        self.line = bytearray(2 * MAX_RECORD + 2)
+        self.line[0] = ord("~")
+        self._views = {}
+
+    def set_level(self, level):
+        """기록할 최소 레벨 변경 (실행 중에도 가능)"""
+        self.level = level
+
+    # 기록 ---------------------------------------------------------------
+
+    def _put_int(self, head, value):
+        buf = self.buf
+        mask = self.mask
+        for _ in range(4):
+            buf[head] = value & 0xFF
+            value >>= 8
+            head = (head + 1) & mask
+        return head
+
+    def log(self, level, code, a=None, b=None, c=None, data=None, start=0, end=-1):
+        """기록 하나 추가 (정수 인자 a, b, c와 바이트 인자 data[start:end])"""
+        if level < self.level:
+            return
+        if self.busy:
+            self.dropped += 1
+            return
+        self.busy = True
+
+        if a is None:
+            ints = 0
+        elif b is None:
+            ints = 1
+        elif c is None:
+            ints = 2
+        else:
+            ints = 3
+        length = 0
+        if data is not None:
+            if isinstance(data, str):
+                data = data.encode()
+            if end < 0:
+                end = len(data)
+            length = end - start
+            if length > MAX_DATA:
+                length = MAX_DATA
+        total = HEADER_SIZE + 4 * ints + length
+        if self.size - self.used < total:
+            self.dropped += 1
+            self.busy = False
+            return
+
+        buf = self.buf
+        mask = self.mask
+        head = self.head
+        buf[head] = code
+        buf[(head + 1) & mask] = level | (ints << 4)
+        buf[(head + 2) & mask] = length
+        buf[(head + 3) & mask] = self.seq
+        head = self._put_int((head + 4) & mask, ticks_ms())
+        if ints > 0:
+            head = self._put_int(head, a)
+        if ints > 1:
+            head = self._put_int(head, b)
+        if ints > 2:
+            head = self._put_int(head, c)
+        for i in range(start, start + length):
+            buf[head] = data[i]
+            head = (head + 1) & mask
+        self.head = head
+        self.used += total
+        self.seq = (self.seq + 1) & 0xFF
+        self.written += 1
+        self.busy = False
+
+    def debug(self, code, a=None, b=None, c=None, data=None, start=0, end=-1):
+        if self.level <= DEBUG:
+            self.log(DEBUG, code, a, b, c, data, start, end)
+
+    def info(self, code, a=None, b=None, c=None, data=None, start=0, end=-1):
+        if self.level <= INFO:
+            self.log(INFO, code, a, b, c, data, start, end)
+
+    def warn(self, code, a=None, b=None, c=None, data=None, start=0, end=-1):
+        if self.level <= WARN:
+            self.log(WARN, code, a, b, c, data, start, end)
+
+    def error(self, code, a=None, b=None, c=None, data=None, start=0, end=-1):
+        self.log(ERROR, code, a, b, c, data, start, end)
+
+    # 출력 ---------------------------------------------------------------
+
+    def drain(self, limit=8):
+        """기록을 최대 limit개 UART로 출력 (유휴 시간에 호출, 남은 기록이 있으면 True)"""
+        buf = self.buf
+        mask = self.mask
+        line = self.line
+        while limit > 0 and self.used > 0:
+            tail = self.tail
+            ints = buf[(tail + 1) & mask] >> 4
+            total = HEADER_SIZE + 4 * ints + buf[(tail + 2) & mask]
+            j = 1
+            for _ in range(total):
+                value = buf[tail]
+                line[j] = _HEX[value >> 4]
+                line[j + 1] = _HEX[value & 0x0F]
+                j += 2
+                tail = (tail + 1) & mask
+            line[j] = 0x0A  # 줄바꿈
+            j += 1
+            view = self._views.get(j)
+            if view is None:
+                view = memoryview(line)[:j]
+                self._views[j] = view
+            self.tail = tail
+            self.used -= total
+            _write(view)
+            limit -= 1
+        # 버린 기록이 있으면 알림 기록 추가 (공간이 없으면 다음 drain()에서 다시 시도)
+        if self.dropped and not self.busy and self.size - self.used >= HEADER_SIZE + 4:
+            dropped = self.dropped
+            self.dropped = 0
+            self.log(ERROR, DROPPED, dropped)
+        return self.used > 0
+
+    def flush(self):
+        """남은 기록을 모두 출력"""
+        while self.drain():
+            pass
@@ -0,0 +1,75 @@
+"""변화 시 전송 (send-on-change) 판단과 전송률 통계
+
+높은 주기로 샘플링하되, 마지막으로 보낸 값에서 deadband보다 크게 바뀌었을 때만
+전송한다. 값이 그대로면 keepalive 간격마다 한 번씩만 현재 값을 보낸다.
+노브를 움직이면 즉시 반응하고 가만히 두면 트래픽이 거의 없다.
+"""
+from ticks import ticks_ms, ticks_diff
+
+
+class SendOnChange:
+    """샘플마다 update()를 호출하면 전송 여부를 돌려준다
+
+    deadband < 0이면 모든 샘플을 전송한다 (고정 간격 전송). min_interval(ms)은
+    연속 전송 사이의 최소 간격이다 (BLE처럼 연결 간격보다 자주 보내도 쌓이기만
+    하는 링크용). 이 간격 때문에 미룬 변화는 다음 샘플에서 전송된다.
+    """
+
+    def __init__(self, deadband, keepalive=1000, min_interval=0, clock=ticks_ms):
+        self.deadband = deadband
+        self.keepalive = keepalive        # 값이 그대로일 때 재전송 간격 (ms)
+        self.min_interval = min_interval  # 연속 전송 사이 최소 간격 (ms)
+        self._clock = clock
+        self.last_value = -1  # 마지막으로 전송한 값 (-1: 아직 전송하지 않음)
+        self.last_sent = 0
+        self.reset_stats()
+
+    def reset(self):
+        """새 연결: 다음 샘플을 바로 전송"""
+        self.last_value = -1
+
+    def reset_stats(self):
+        """전송률 집계 구간 시작"""
+        self.samples = 0     # 샘플 수
+        self.changes = 0     # 값 변화로 전송한 수
+        self.keepalives = 0  # keepalive로 전송한 수
+        self.stats_from = self._clock()
+
+    def update(self, value, now=None):
+        """샘플 하나 처리, 전송해야 하면 True (True를 받으면 value를 전송)"""
+        if now is None:
+            now = self._clock()
+        self.samples += 1
+        if self.last_value >= 0:
+            elapsed = ticks_diff(now, self.last_sent)
+            if elapsed < self.min_interval:
+                return False
+            diff = value - self.last_value
+            if diff < 0:
+                diff = -diff
+            if diff > self.deadband:
+                self.changes += 1
+            elif elapsed >= self.keepalive:
+                self.keepalives += 1
+            else:
+                return False
+        else:
+            self.changes += 1
+        self.last_value = value
+        self.last_sent = now
+        return True
+
+    def rates(self):
+        """집계 구간의 (샘플/s, 전송/s, 변화 전송/s, keepalive 전송/s)"""
+        elapsed = ticks_diff(self._clock(), self.stats_from)
+        if elapsed <= 0:
+            return 0, 0, 0, 0
+        scale = 1000 / elapsed
+        sent = self.changes + self.keepalives
+        return self.samples * scale, sent * scale, self.changes * scale, self.keepalives * scale
+
+    def format(self):
+        """한 줄 요약 문자열"""
+        samples, sent, changes, keepalives = self.rates()
+        return (f"샘플 {samples:.1f}/s | 전송 {sent:.1f}/s "
+                f"(변화 {changes:.1f}/s, 유지 {keepalives:.1f}/s)")
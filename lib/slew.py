@@ -0,0 +1,104 @@
+"""하드웨어 타이머 IRQ로 PWM 듀티를 목표값까지 서서히 이동 (슬루)
+
+네트워크 쪽은 set()으로 목표 듀티만 바꾸고, 타이머가 freq Hz로 현재 듀티를
+목표 쪽으로 옮긴다. 패킷이 고르지 않은 간격으로 도착해도 밝기는 일정한
+속도로 바뀌므로 계단처럼 보이지 않는다.
+
+- 일정 속도 (ramp_ms): 전체 범위(0~65535)를 ramp_ms 동안 이동하는 속도
+- 시간 상수 (tau_ms): 갱신마다 남은 차이의 일정 비율씩 이동 (지수 접근)
+
+IRQ는 정수 연산만 하고 메모리를 할당하지 않는다. 실제 갱신 주파수와 타이머
+간격의 최대 오차(지터)를 기록한다.
+"""
+from machine import Timer
+from ticks import ticks_ms, ticks_us, ticks_diff
+
+DUTY_MAX = 65535
+
+
+class Slew:
+    """pwm의 duty_u16을 target까지 freq Hz로 이동"""
+
+    def __init__(self, pwm, freq=500, ramp_ms=100, tau_ms=0, timer_id=0):
+        self.pwm = pwm
+        self.freq = freq
+        self.target = 0  # 목표 듀티 (set()으로 변경)
+        self.duty = 0    # 현재 출력 중인 듀티
+        self._period_us = 1000000 // freq
+        self._last_us = 0
+        self.set_ramp(ramp_ms, tau_ms)
+        self._timer = Timer(timer_id)
+        self._callback = self._on_timer  # IRQ 등록용 바운드 메서드 (한 번만 생성)
+        self.reset_stats()
+
+    def set_ramp(self, ramp_ms, tau_ms=0):
+        """이동 속도 설정 (ramp_ms: 전체 범위 이동 시간, 0이면 바로 적용 / tau_ms: 0이 아니면 시간 상수)"""
+        self.ramp_ms = ramp_ms
+        self.tau_ms = tau_ms
+        if ramp_ms > 0:
+            self._step = max(1, DUTY_MAX * 1000 // (ramp_ms * self.freq))  # 갱신당 최대 이동량
+        else:
+            self._step = DUTY_MAX
+        # 갱신당 이동 비율 (/256, 곱셈 결과가 small int 범위를 넘지 않도록 8비트)
+        self._gain = max(1, min(256, 256 * 1000 // (tau_ms * self.freq))) if tau_ms > 0 else 0
+
+    def start(self):
+        """타이머 시작"""
+        self._last_us = ticks_us()
+        self._timer.init(mode=Timer.PERIODIC, freq=self.freq, callback=self._callback)
+
+    def stop(self):
+        """타이머 중지 (현재 듀티 유지)"""
+        self._timer.deinit()
+
+    def set(self, duty):
+        """목표 듀티 변경 (다음 갱신부터 이동)"""
+        self.target = duty
+
+    def jump(self, duty):
+        """슬루 없이 바로 적용 (LED 끄기 등)"""
+        self.target = duty
+        self.duty = duty
+        self.pwm.duty_u16(duty)
+
+    def _on_timer(self, timer):
+        now = ticks_us()
+        error = ticks_diff(now, self._last_us) - self._period_us
+        self._last_us = now
+        if error < 0:
+            error = -error
+        if error > self.max_jitter:
+            self.max_jitter = error
+        self.updates += 1
+
+        diff = self.target - self.duty
+        if not diff:
+            return
+        if self._gain:
+            step = (diff * self._gain) >> 8
+            if not step:
+                step = 1 if diff > 0 else -1
+        elif diff > self._step:
+            step = self._step
+        elif diff < -self._step:
+            step = -self._step
+        else:
+            step = diff
+        self.duty += step
+        self.pwm.duty_u16(self.duty)
+        self.writes += 1
+
+    def reset_stats(self):
+        """통계 구간 시작"""
+        self.updates = 0     # 타이머 갱신 횟수
+        self.writes = 0      # 듀티를 실제로 바꾼 횟수
+        self.max_jitter = 0  # 갱신 간격과 설정 주기의 최대 차이 (us)
+        self.stats_from = ticks_ms()
+
+    def format(self):
+        """한 줄 요약 문자열"""
+        elapsed = ticks_diff(ticks_ms(), self.stats_from) / 1000
+        if elapsed <= 0:
+            elapsed = 1
+        return (f"슬루 갱신 {self.updates / elapsed:.0f}Hz (설정 {self.freq}Hz) | "
+                f"듀티 변경 {self.writes / elapsed:.0f}/s | 최대 지터 {self.max_jitter}us")
@@ -0,0 +1,166 @@
+import random
+from ticks import ticks_ms, ticks_diff, ticks_add
+
+# 연결 상태
+IDLE = 0        # 아직 연결을 시도하지 않음
+CONNECTING = 1  # 연결 시도 중 (스캔, 광고, 연결 대기 포함)
+CONNECTED = 2   # 연결됨
+BACKOFF = 3     # 실패 후 다음 시도까지 대기 중
+
+STATE_NAMES = ("대기", "연결 시도", "연결됨", "백오프")
+
+
+class Supervisor:
+    """연결 상태 머신 (대기 -> 연결 시도 -> 연결됨 / 백오프)
+
+    실패할 때마다 다음 시도까지의 대기 시간을 base_delay부터 2배씩 늘리고
+    (최대 max_delay), 여러 장치가 같은 주기로 재시도하지 않도록 ±jitter%의
+    무작위 편차를 더한다. 연속 실패가 reset_after회에 도달했을 때만 on_reset을
+    호출한다 (장치 재시작은 최후의 수단).
+
+    시각(clock)과 난수(rand) 함수를 바꿔 끼울 수 있어 호스트 PC에서도 그대로
+    동작을 확인할 수 있다.
+    """
+
+    def __init__(self, name, base_delay=500, max_delay=10000, jitter=25,
+                 connect_timeout=0, reset_after=10, on_reset=None,
+                 log_size=16, verbose=True, clock=ticks_ms, rand=None):
+        self.name = name
+        self.base_delay = base_delay            # 첫 재시도 대기 시간 (ms)
+        self.max_delay = max_delay              # 최대 재시도 대기 시간 (ms)
+        self.jitter = jitter                    # 대기 시간 무작위 편차 (%)
+        self.connect_timeout = connect_timeout  # 연결 시도 제한 시간 (ms, 0이면 제한 없음)
+        self.reset_after = reset_after          # 재시작까지 허용하는 연속 실패 횟수 (0이면 재시작 안 함)
+        self.on_reset = on_reset                # 재시작 함수 (machine.reset 등)
+        self.verbose = verbose
+        self._clock = clock
+        self._rand = rand or (lambda: random.getrandbits(16) / 65536)
+
+        self.state = IDLE
+        self.changed_at = clock()  # 현재 상태로 바뀐 시각
+        self.retry_at = 0          # 백오프 종료 시각
+        self.failures = 0          # 연속 실패 횟수
+        self.attempts = 0          # 누적 연결 시도 횟수
+        self.resets = 0            # 재시작 요청 횟수
+
+        # 복구 시간 통계 (연결이 끊어지거나 실패한 시점부터 다시 연결될 때까지, ms)
+        self.down_at = None
+        self.recoveries = 0
+        self.recovery_total = 0
+        self.recovery_max = 0
+
+        # 상태 전이 기록: (시각, 이전 상태, 새 상태, 이전 상태 유지 시간 ms, 연속 실패 횟수, 사유)
+        self.log_size = log_size
+        self.log = []
+
+    # 상태 전이 ----------------------------------------------------------
+
+    def _enter(self, state, reason=""):
+        now = self._clock()
+        elapsed = ticks_diff(now, self.changed_at)
+        entry = (now, self.state, state, elapsed, self.failures, reason)
+        if len(self.log) >= self.log_size:
+            self.log.pop(0)
+        self.log.append(entry)
+        if self.verbose:
+            print(self.format(entry))
+        self.state = state
+        self.changed_at = now
+        return now
+
+    def begin(self, reason=""):
+        """연결 시도 시작"""
+        self.attempts += 1
+        self._enter(CONNECTING, reason)
+
+    def up(self, reason=""):
+        """연결 성공"""
+        now = self._enter(CONNECTED, reason)
+        self.failures = 0
+        if self.down_at is not None:
+            recovery = ticks_diff(now, self.down_at)
+            self.recoveries += 1
+            self.recovery_total += recovery
+            if recovery > self.recovery_max:
+                self.recovery_max = recovery
+            self.down_at = None
+        return now
+
+    def fail(self, reason=""):
+        """연결 실패 또는 연결 끊김, 다음 시도까지의 대기 시간(ms) 반환"""
+        if self.state == CONNECTED:
+            self.failures = 0  # 연결되어 있다가 끊어진 경우 첫 실패부터 다시 계산
+        self.failures += 1
+        now = self._enter(BACKOFF, reason)
+        if self.down_at is None:
+            self.down_at = now
+        delay = self.next_delay()
+        self.retry_at = ticks_add(now, delay)
+        if self.reset_after and self.failures >= self.reset_after:
+            self.resets += 1
+            if self.verbose:
+                print(f"[{self.name}] 연속 실패 {self.failures}회. 재시작합니다.")
+            if self.on_reset:
+                self.on_reset()
+        return delay
+
+    def next_delay(self):
+        """현재 연속 실패 횟수에 따른 대기 시간 (지수 백오프 + 무작위 편차)"""
+        delay = self.base_delay
+        for _ in range(self.failures - 1):
+            delay *= 2
+            if delay >= self.max_delay:
+                delay = self.max_delay
+                break
+        if self.jitter:
+            spread = delay * self.jitter // 100
+            delay += int((self._rand() * 2 - 1) * spread)
+        return max(0, delay)
+
+    # 상태 확인 ----------------------------------------------------------
+
+    def connected(self):
+        return self.state == CONNECTED
+
+    def remaining(self):
+        """다음 연결 시도까지 남은 시간 (ms, 지금 시도할 수 있으면 0)"""
+        if self.state == IDLE:
+            return 0
+        if self.state != BACKOFF:
+            return -1
+        return max(0, ticks_diff(self.retry_at, self._clock()))
+
+    def ready(self):
+        """지금 연결을 시도해도 되는지 여부 (대기 상태 또는 백오프 종료)"""
+        return self.remaining() == 0
+
+    def check_timeout(self):
+        """연결 시도가 connect_timeout을 넘었으면 실패 처리 후 True 반환"""
+        if (self.state == CONNECTING and self.connect_timeout
+                and ticks_diff(self._clock(), self.changed_at) >= self.connect_timeout):
+            self.fail("연결 시간 초과")
+            return True
+        return False
+
+    # 기록 ---------------------------------------------------------------
+
+    def format(self, entry):
+        """상태 전이 기록 한 줄 문자열"""
+        _, old, new, elapsed, failures, reason = entry
+        line = f"[{self.name}] {STATE_NAMES[old]} -> {STATE_NAMES[new]} ({STATE_NAMES[old]} {elapsed}ms"
+        if new == BACKOFF:
+            line += f", 실패 {failures}회"
+        if reason:
+            line += f", {reason}"
+        return line + ")"
+
+    def mttr(self):
+        """평균 복구 시간 (ms)"""
+        return self.recovery_total // self.recoveries if self.recoveries else 0
+
+    def print_log(self):
+        """최근 상태 전이 기록과 복구 통계 출력"""
+        for entry in self.log:
+            print(f"  {entry[0]}ms {self.format(entry)}")
+        print(f"[{self.name}] 시도 {self.attempts}회 | 복구 {self.recoveries}회 | "
+              f"평균 복구 {self.mttr()}ms | 최대 복구 {self.recovery_max}ms | 재시작 요청 {self.resets}회")
@@ -0,0 +1,28 @@
+"""MicroPython time.ticks_* 함수 (호스트 CPython에서도 동작하도록 대체 구현 포함)"""
+import time
+
+try:
+    ticks_ms = time.ticks_ms
+    ticks_us = time.ticks_us
+    ticks_diff = time.ticks_diff
+    ticks_add = time.ticks_add
+except AttributeError:
+    # CPython: MicroPython과 같은 30비트 순환 카운터로 흉내낸다
+    _PERIOD = 1 << 30
+    _MASK = _PERIOD - 1
+    _HALF = _PERIOD >> 1
+
+    def ticks_ms():
+        return int(time.monotonic() * 1000) & _MASK
+
+    def ticks_us():
+        return int(time.monotonic() * 1000000) & _MASK
+
+    def ticks_diff(a, b):
+        diff = (a - b) & _MASK
+        if diff >= _HALF:
+            diff -= _PERIOD
+        return diff
+
+    def ticks_add(ticks, delta):
+        return (ticks + delta) & _MASK